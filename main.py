@@ -10,9 +10,14 @@ from datetime import datetime
 from typing import NoReturn
 
 from src.bots.crypto_value_handler import CryptoValueBot
+from src.data_base.archive_handler import ARCHIVE_FORMATS, ArchiveHandler
+from src.data_base.metrics_retention import MetricsRetention
 from src.handlers.load_variables_handler import get_int_variable
 from src.handlers.logger_handler import setup_logger
 from src.handlers.news_check_handler import CryptoNewsCheck
+from src.handlers.outbox_dispatcher import outbox_dispatcher
+from src.handlers.telegram_bot_pool import telegram_bot_pool
+from src.utils.http_client import http_client
 
 
 class Application:
@@ -26,6 +31,8 @@ class Application:
         self.logger.info("Main started")
         self.crypto_value_bot = CryptoValueBot()
         self.crypto_news_check = CryptoNewsCheck()
+        self.metrics_retention = MetricsRetention()
+        self.metrics_retention_task = None
         self.is_running = True
 
     def reload_data(self) -> None:
@@ -35,6 +42,14 @@ class Application:
 
     async def run_loop(self) -> NoReturn:
         """Main application loop"""
+        # Compact the metric series in the background while the bots run
+        self.metrics_retention_task = asyncio.create_task(
+            self.metrics_retention.run_forever()
+        )
+
+        # Resume the delivery of the messages queued before the last exit
+        outbox_dispatcher.start()
+
         while self.is_running:
             try:
                 self.reload_data()
@@ -62,6 +77,36 @@ class Application:
                 self.logger.error("Error in main loop: %s", str(e))
                 await asyncio.sleep(5)
 
+    async def shutdown(self) -> None:
+        """Flush the queued data base writes and close the HTTP pools before exiting"""
+        self.is_running = False
+        await self.stop_metrics_retention()
+        await self.crypto_news_check.data_base.close()
+        await self.crypto_value_bot.db.close()
+        await outbox_dispatcher.stop()
+        await http_client.close()
+        await telegram_bot_pool.close()
+
+    async def stop_metrics_retention(self) -> None:
+        """Cancel the background retention pass and wait for it to end"""
+        task = self.metrics_retention_task
+        if task is None or task.done():
+            return
+
+        task.cancel()
+
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def run(self) -> None:
+        """Run the main loop and flush the pending writes when it stops"""
+        try:
+            await self.run_loop()
+        finally:
+            await self.shutdown()
+
 
 def main() -> None:
     """
@@ -73,15 +118,51 @@ def main() -> None:
     parser.add_argument(
         "-r", "--recreate", action="store_true", help="Recreate the news data base"
     )
+    parser.add_argument(
+        "--export", metavar="FOLDER", help="Export the articles and metrics archives"
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_folder",
+        metavar="FOLDER",
+        help="Import the articles and metrics archives (after --recreate if given)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=ARCHIVE_FORMATS,
+        default="jsonl",
+        help="The format of the archives",
+    )
     args = parser.parse_args()
 
     app = Application()
 
+    if args.recreate or args.export or args.import_folder:
+        asyncio.run(run_maintenance(app, args))
+    else:
+        asyncio.run(app.run())
+
+
+async def run_maintenance(app, args) -> None:
+    """
+    Runs the requested data base maintenance: export, recreate, then import.
+    Args:
+        app (Application): The application holding the data bases.
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    archive_handler = ArchiveHandler(app.crypto_news_check.data_base)
+
+    if args.export:
+        print("Exporting the data bases...")
+        await archive_handler.export_all(args.export, args.format)
+
     if args.recreate:
         print("Recreating the data base...")
-        asyncio.run(app.crypto_news_check.recreate_data_base())
-    else:
-        asyncio.run(app.run_loop())
+        await app.crypto_news_check.recreate_data_base()
+
+    if args.import_folder:
+        print("Importing the data bases...")
+        await archive_handler.import_all(args.import_folder, args.format)
 
 
 if __name__ == "__main__":
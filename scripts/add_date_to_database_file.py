@@ -3,36 +3,72 @@ Add a 'date' column to the 'daily_stats' table in a SQLite database
 and populate it with decreasing dates.
 """
 
+# pylint: disable=wrong-import-position
+
 import asyncio
+import os
+import sys
 from datetime import datetime, timedelta
 
-import aiosqlite
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.data_base.migrations import (
+    Migration,
+    MigrationRunner,
+    add_column_if_missing,
+    backfill_in_batches,
+)
+
+SELECT_DAILY_STATS_QUERY = """
+    SELECT id FROM daily_stats WHERE id > ? ORDER BY id ASC LIMIT ?
+"""
+
+UPDATE_DATE_QUERY = "UPDATE daily_stats SET date = ? WHERE id = ? AND date IS NULL"
 
 
-async def update_dates():
+async def add_date_column(db):
+    """
+    Adds the 'date' column to the 'daily_stats' table if it doesn't exist.
+    """
+    await add_column_if_missing(db, "daily_stats", "date", "DATE")
+
+
+async def backfill_dates(db_path):
+    """
+    Gives every row without a date a decreasing date, starting with yesterday
+    for the oldest row, in small batches.
+    """
+    start_date = datetime.today().date() - timedelta(days=1)  # Yesterday
+
+    def build_params(rows, offset):
+        return [
+            (str(start_date - timedelta(days=offset + index)), row_id)
+            for index, (row_id,) in enumerate(rows)
+        ]
+
+    updated = await backfill_in_batches(
+        db_path, SELECT_DAILY_STATS_QUERY, UPDATE_DATE_QUERY, build_params
+    )
+    print(f"Dates updated for {updated} rows.")
+
+
+DAILY_STATS_DATE_MIGRATION = Migration(
+    1,
+    "Add the date column to daily_stats",
+    upgrade=add_date_column,
+    backfill=backfill_dates,
+)
+
+
+async def update_dates(db_path="data_base_path"):
     """
     This script updates the 'date' column in the 'daily_stats' table of a SQLite database.
+    Args:
+        db_path (str): The data base file, pass it as the first script argument.
     """
-    db_path = "data_base_path"  # Replace with your actual database file
-    async with aiosqlite.connect(db_path) as db:
-        # Step 1: Add the 'date' column if it doesn't exist
-        await db.execute("ALTER TABLE daily_stats ADD COLUMN date DATE")
-        await db.commit()
-
-        # Step 2: Fetch all records ordered by ID
-        async with db.execute("SELECT id FROM daily_stats ORDER BY id ASC") as cursor:
-            rows = await cursor.fetchall()
-
-        # Step 3: Update each row with a decreasing date
-        start_date = datetime.today().date() - timedelta(days=1)  # Yesterday
-        for index, (row_id,) in enumerate(rows):
-            date_value = start_date - timedelta(days=index)
-            await db.execute(
-                "UPDATE daily_stats SET date = ? WHERE id = ?", (date_value, row_id)
-            )
-        await db.commit()
-        print("Dates updated successfully!")
-
-
-# Run the async function
-asyncio.run(update_dates())
+    await MigrationRunner(db_path, [DAILY_STATS_DATE_MIGRATION]).migrate()
+    print("Dates updated successfully!")
+
+
+if __name__ == "__main__":
+    asyncio.run(update_dates(*sys.argv[1:2]))
@@ -0,0 +1,201 @@
+"""
+Benchmark the Telegram delivery of a news and alert cycle against the local Bot API
+stand-in, and report the messages per second and the end-to-end delivery latency.
+
+The articles go through the news digest, the outbox and its dispatcher, the alerts
+through the concurrent broadcast, both sharing the rate limits of one bot.
+
+Usage:
+    python scripts/benchmark_telegram.py --subscribers 500 --latency 0.05 --flood 0.01
+"""
+
+# pylint: disable=wrong-import-position
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.data_base.message_outbox import (
+    PRIORITY_IMPORTANT,
+    PRIORITY_PARTIAL,
+    MessageOutbox,
+)
+from src.handlers.news_digest import MODE_INSTANT, NewsDigest
+from src.handlers.outbox_dispatcher import OutboxDispatcher
+from src.handlers.send_telegram_message import TelegramMessagesHandler
+from src.handlers.telegram_bot_pool import TelegramBotPool
+from src.handlers.telegram_broadcast import get_broadcast_limits
+from src.utils.telegram_stand_in import TelegramStandIn
+
+BENCHMARK_TOKEN = "1:benchmark"
+
+
+def get_percentile(values, percentile):
+    """
+    Returns a percentile of sorted values, by the nearest rank.
+    Args:
+        values (list): The sorted values.
+        percentile (float): The percentile, between 0 and 100.
+    Returns:
+        float: The value, 0 if there is none.
+    """
+    if not values:
+        return 0.0
+
+    rank = max(round(percentile / 100 * len(values)) - 1, 0)
+    return values[rank]
+
+
+async def run_news_cycle(news_digest, articles, produced_at):
+    """
+    Notifies the subscribers of new articles, queued in the outbox.
+    Args:
+        news_digest (NewsDigest): The digest of the benchmark outbox.
+        articles (int): The number of articles.
+        produced_at (dict): The time each message was produced, filled in.
+    """
+    for index in range(articles):
+        item = f"📌 Benchmark article {index}\n🔗 https://example.com/{index}\n"
+        message = f"📰 <b>New Article Found!</b>\n{item}"
+
+        produced_at[message] = time.monotonic()
+        await news_digest.add_article(BENCHMARK_TOKEN, message, item)
+
+
+async def run_alert_cycle(telegram_handler, alerts, produced_at):
+    """
+    Broadcasts price alerts to the subscribers.
+    Args:
+        telegram_handler (TelegramMessagesHandler): The handler of the benchmark bot.
+        alerts (int): The number of alerts.
+        produced_at (dict): The time each message was produced, filled in.
+    """
+    for index in range(alerts):
+        message = f"🚨 <b>BTC</b> moved {index + 5}% in the last 15m #PriceAlert"
+
+        produced_at[message] = time.monotonic()
+        await telegram_handler.send_telegram_message(
+            message, BENCHMARK_TOKEN, is_important=True
+        )
+
+
+def print_report(stand_in, produced_at, started_at, expected):
+    """
+    Prints the throughput and the latency of the deliveries.
+    Args:
+        stand_in (TelegramStandIn): The stand-in the messages were sent to.
+        produced_at (dict): The time each message was produced.
+        started_at (float): The start of the cycle.
+        expected (int): The number of deliveries expected.
+    """
+    delivered = stand_in.get_records("sendMessage")
+    flooded = stand_in.get_records("sendMessage", status=429)
+
+    latencies = sorted(
+        record.answered_at - produced_at[record.parameters["text"]]
+        for record in delivered
+    )
+    elapsed = max((record.answered_at for record in delivered), default=started_at)
+    elapsed -= started_at
+
+    print(f"Delivered:      {len(delivered)} / {expected}")
+    print(f"Flood errors:   {len(flooded)}")
+    print(f"Elapsed:        {elapsed:.2f} s")
+    print(f"Throughput:     {len(delivered) / elapsed if elapsed else 0:.1f} msg/s")
+    for percentile in (50, 95, 99):
+        latency = get_percentile(latencies, percentile)
+        print(f"Latency p{percentile}:    {latency * 1000:.0f} ms")
+    print(f"Latency max:    {(latencies[-1] if latencies else 0) * 1000:.0f} ms")
+
+
+async def run_benchmark(args):
+    """
+    Runs a news and alert cycle against the stand-in and prints the report.
+    Args:
+        args (Namespace): The command line arguments.
+    """
+    subscribers = [str(100000 + index) for index in range(args.subscribers)]
+    produced_at = {}
+
+    stand_in = TelegramStandIn(
+        latency=args.latency,
+        jitter=args.jitter,
+        flood_probability=args.flood,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as folder:
+        async with stand_in:
+            bot_pool = TelegramBotPool()
+            bot_pool.api_url = stand_in.url
+
+            limits = get_broadcast_limits(BENCHMARK_TOKEN)
+            limits.global_limiter.interval = 1 / args.rate
+
+            dispatcher = OutboxDispatcher(
+                MessageOutbox(os.path.join(folder, "outbox.db")), bot_pool
+            )
+
+            news_digest = NewsDigest(dispatcher)
+            news_digest.chat_ids = {
+                PRIORITY_IMPORTANT: [],
+                PRIORITY_PARTIAL: subscribers,
+            }
+            news_digest.modes = {}
+            news_digest.default_mode = MODE_INSTANT
+
+            telegram_handler = TelegramMessagesHandler()
+            telegram_handler.bot_pool = bot_pool
+            telegram_handler.telegram_important_chat_id = subscribers
+
+            # The bot is initialized before the clock starts
+            await bot_pool.get_bot(BENCHMARK_TOKEN)
+            started_at = time.monotonic()
+
+            await asyncio.gather(
+                run_news_cycle(news_digest, args.articles, produced_at),
+                run_alert_cycle(telegram_handler, args.alerts, produced_at),
+            )
+            if dispatcher.task is not None:
+                await dispatcher.task
+
+            await bot_pool.close()
+
+    expected = args.subscribers * (args.articles + args.alerts)
+    print_report(stand_in, produced_at, started_at, expected)
+
+
+def main():
+    """
+    Parses the command line and runs the benchmark.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--articles", type=int, default=3)
+    parser.add_argument("--alerts", type=int, default=2)
+    parser.add_argument(
+        "--rate", type=float, default=30, help="Messages per second of the bot"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Answer latency, in seconds"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.05, help="Random latency added, in seconds"
+    )
+    parser.add_argument(
+        "--flood", type=float, default=0.0, help="Probability of a 429 per send"
+    )
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
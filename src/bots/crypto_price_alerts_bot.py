@@ -83,7 +83,7 @@ class PriceAlertBot:
         """
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         return await self.crypto_value_bot.check_for_major_updates_1h(update)
 
@@ -97,7 +97,7 @@ class PriceAlertBot:
         """
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         return await self.crypto_value_bot.check_for_major_updates_24h(update)
 
@@ -111,7 +111,7 @@ class PriceAlertBot:
         """
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         return await self.crypto_value_bot.check_for_major_updates_7d(update)
 
@@ -125,7 +125,7 @@ class PriceAlertBot:
         """
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         return await self.crypto_value_bot.check_for_major_updates_30d(update)
 
@@ -139,7 +139,7 @@ class PriceAlertBot:
         """
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         return await self.crypto_value_bot.check_for_major_updates(None, update)
 
@@ -5,17 +5,17 @@ and sends updates via Telegram. It also checks for major price changes and
 alerts users based on predefined thresholds.
 """
 
-import json
 import logging
 import os
-import time
 from datetime import datetime
 
-import requests
-
 import src.handlers.load_variables_handler
 from src.data_base.data_base_handler import DataBaseHandler
 from src.handlers.alerts_handler import AlertsHandler
+from src.handlers.coinmarketcap_handler import (
+    CoinMarketCapClient,
+    get_response_timestamp,
+)
 from src.handlers.data_fetcher_handler import (
     get_eth_gas_fee,
     get_fear_and_greed,
@@ -25,6 +25,7 @@ from src.handlers.market_sentiment_handler import get_market_sentiment
 from src.handlers.news_check_handler import CryptoNewsCheck
 from src.handlers.portfolio_manager import PortfolioManager
 from src.handlers.send_telegram_message import TelegramMessagesHandler
+from src.utils.quote_snapshot import QuoteSnapshot
 
 logger = logging.getLogger(__name__)
 logger.info("Load variables started")
@@ -46,9 +47,6 @@ class CryptoValueBot:
 
         self.crypto_currencies = None
 
-        self.coinmarketcap_api_key = None
-        self.coinmarketcap_api_url = None
-
         self.etherscan_api_url = None
 
         self.send_hours = None
@@ -64,10 +62,8 @@ class CryptoValueBot:
 
         self.today_ai_summary = None
 
-        self.last_api_call = 0
-        self.cache_duration = 60
-
         self.db = DataBaseHandler()
+        self.cmc = CoinMarketCapClient()
         self.alert_handler = AlertsHandler()
         self.portfolio = PortfolioManager()
         self.telegram_message = TelegramMessagesHandler()
@@ -95,8 +91,8 @@ class CryptoValueBot:
         self.sentiment_hours = variables.get("SENTIMENT_HOURS", "")
         self.save_hours = variables.get("SAVE_HOURS", "")
 
-        self.my_crypto = {}
-        self.top_100_crypto = {}
+        self.my_crypto = QuoteSnapshot.empty()
+        self.top_100_crypto = QuoteSnapshot.empty()
 
         # Reload alerts thresholds
         self.alert_handler.reload_the_data()
@@ -104,61 +100,33 @@ class CryptoValueBot:
         # Reload portfolio from file
         self.portfolio.reload_the_data()
 
+        # Reload the CoinMarketCap API settings and credit budget
+        self.cmc.reload_the_data()
+
         # Reload telegram message handler variables
         self.telegram_message.reload_the_data()
 
         self.crypto_currencies = variables.get("CRYPTOCURRENCIES", "")
 
-        # CoinMarketCap API credentials
-        self.coinmarketcap_api_key = variables.get("CMC_API_KEY", "")
-        self.coinmarketcap_api_url = variables.get("CMC_URL_LISTINGS", "")
-
     # Function to fetch cryptocurrency prices and price changes
-    def get_my_crypto(self):
+    async def get_my_crypto(self):
         """
-        Fetches the latest cryptocurrency prices and changes from CoinMarketCap API.
+        Loads the latest cryptocurrency prices and changes.
+        The listings are shared by all bot processes through the quote cache,
+        so CoinMarketCap API is called at most once per cache TTL.
         """
-        current_time = time.time()
-        if current_time - self.last_api_call < self.cache_duration:
+        data = await self.cmc.get_listings()
+
+        if data is None:
             return
 
-        headers = {
-            "Accepts": "application/json",
-            "X-CMC_PRO_API_KEY": self.coinmarketcap_api_key,
-        }
-        parameters = {
-            "start": "1",
-            "limit": "100",
-            "convert": "USD",
-        }
-        response = requests.get(
-            self.coinmarketcap_api_url, headers=headers, params=parameters, timeout=30
+        # Published as whole snapshots, readers never see a half refreshed one
+        self.top_100_crypto = QuoteSnapshot.from_listings(
+            data["data"], get_response_timestamp(data)
         )
-        data = json.loads(response.text)
-
-        if not data:
-            logger.error(
-                "Error fetching data from CoinMarketCap API: %s", data.get("status", {})
-            )
-            return
+        self.my_crypto = self.top_100_crypto.subset(self.crypto_currencies)
 
-        for crypto in data["data"]:
-            symbol = crypto["symbol"]
-            if symbol in self.crypto_currencies:
-                self.my_crypto[symbol] = {
-                    "price": crypto["quote"]["USD"]["price"],
-                    "change_1h": crypto["quote"]["USD"]["percent_change_1h"],
-                    "change_24h": crypto["quote"]["USD"]["percent_change_24h"],
-                    "change_7d": crypto["quote"]["USD"]["percent_change_7d"],
-                    "change_30d": crypto["quote"]["USD"]["percent_change_30d"],
-                }
-            self.top_100_crypto[symbol] = {
-                "price": crypto["quote"]["USD"]["price"],
-                "change_1h": crypto["quote"]["USD"]["percent_change_1h"],
-                "change_24h": crypto["quote"]["USD"]["percent_change_24h"],
-                "change_7d": crypto["quote"]["USD"]["percent_change_7d"],
-                "change_30d": crypto["quote"]["USD"]["percent_change_30d"],
-            }
+        self.alert_handler.record_prices(self.top_100_crypto)
 
     async def show_fear_and_greed(self, update=None):
         """
@@ -218,7 +186,7 @@ class CryptoValueBot:
         Args:
             update: Optional; if provided, the message will be sent as a reply to this update.
         """
-        message = await get_market_sentiment()
+        message = await get_market_sentiment(data_base=self.db)
 
         await self.telegram_message.send_telegram_message(
             message, self.articles_alert_api_token, False, update
@@ -245,11 +213,11 @@ class CryptoValueBot:
         await self.db.store_fear_greed(index_value, index_text, last_updated)
 
         print("Saving the ETH gas fee...")
-        safe_gas, propose_gas, fast_gas = get_eth_gas_fee(self.etherscan_api_url)
+        safe_gas, propose_gas, fast_gas = await get_eth_gas_fee(self.etherscan_api_url)
         await self.db.store_eth_gas_fee(safe_gas, propose_gas, fast_gas)
 
         print("Saving the market sentiment...")
-        await get_market_sentiment(save_data=True)
+        await get_market_sentiment(save_data=True, data_base=self.db)
 
         print("Saving the daily stats...")
         await self.db.store_daily_stats()
@@ -362,7 +330,7 @@ class CryptoValueBot:
         Fetches the latest cryptocurrency data, including prices, market sentiment,
         and Ethereum gas fees, and sends updates via Telegram.
         """
-        self.get_my_crypto()
+        await self.get_my_crypto()
 
         now_date = datetime.now()
 
@@ -105,7 +105,7 @@ class MarketUpdateBot:
 
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         await self.crypto_value_bot.send_market_update(datetime.now(), update)
 
@@ -131,7 +131,7 @@ class MarketUpdateBot:
 
         self.crypto_value_bot.reload_the_data()
 
-        self.crypto_value_bot.get_my_crypto()
+        await self.crypto_value_bot.get_my_crypto()
 
         await self.crypto_value_bot.send_portfolio_update(update, True)
 
@@ -5,6 +5,7 @@ My Slave Bot
 # pylint: disable=wrong-import-position
 
 
+import asyncio
 import logging
 import os
 import sys
@@ -22,6 +23,7 @@ from telegram.ext import (
     filters,
 )
 
+from src.handlers.coinmarketcap_handler import CoinMarketCapClient, is_fiat
 from src.handlers.load_variables_handler import (
     load_json,
     load_keyword_list,
@@ -59,10 +61,9 @@ class SlaveBot:
         """
         Initializes the bot with URLs and headers for API requests.
         """
-        self.cmc_url = None
-        self.cmc_top10_url = None
         self.coingecko_url = None
-        self.headers = None
+
+        self.cmc = CoinMarketCapClient()
 
     def reload_the_data(self):
         """
@@ -70,14 +71,9 @@ class SlaveBot:
         """
         variables = load_json()
 
-        self.cmc_url = variables.get("CMC_URL_QUOTES", "")
-        self.cmc_top10_url = variables.get("CMC_TOP10_URL", "")
-
         self.coingecko_url = variables.get("COINGECKO_URL", "")
 
-        cmc_api_key = variables.get("CMC_API_KEY", "")
-
-        self.headers = {"X-CMC_PRO_API_KEY": cmc_api_key}
+        self.cmc.reload_the_data()
 
     # Command: /start
     # pylint: disable=unused-argument
@@ -94,22 +90,20 @@ class SlaveBot:
         )
 
     # Function to fetch crypto data
-    def get_crypto_data(self, symbol):
+    async def get_crypto_data(self, symbol):
         """
         Fetches cryptocurrency data from CoinMarketCap API.
+        Concurrent lookups are sent as a single quotes call.
         Args:
             symbol (str): The cryptocurrency symbol (e.g., "BTC").
         Returns:
             dict: A dictionary containing the cryptocurrency data, or None if not found.
         """
-        params = {"symbol": symbol.upper(), "convert": "USD"}
-
         self.reload_the_data()
 
-        data = check_requests(self.cmc_url, self.headers, params)
+        coin_data = await self.cmc.get_quote(symbol)
 
-        if data is not None and "data" in data and symbol.upper() in data["data"]:
-            coin_data = data["data"][symbol.upper()]
+        if coin_data is not None:
             quote = coin_data["quote"]["USD"]
             return {
                 "name": coin_data["name"],
@@ -128,20 +122,19 @@ class SlaveBot:
         return None  # Coin not found
 
     # Function to fetch top 10 cryptos
-    def get_top_10(self):
+    async def get_top_10(self):
         """
         Fetches the top 10 cryptocurrencies by market cap from CoinMarketCap API.
         Returns:
             str: A formatted string with the top 10 cryptocurrencies and their details.
         """
-        params = {"start": 1, "limit": 10, "convert": "USD"}
-
         self.reload_the_data()
 
-        data = check_requests(self.cmc_top10_url, self.headers, params)
+        # The shared top 100 listings are ranked by market cap
+        data = await self.cmc.get_listings()
 
-        if data is not None and "data" in data:
-            top_10 = data["data"]
+        if data is not None:
+            top_10 = data["data"][:10]
             result = "🚀 <b>Top 10 Cryptos by Market Cap:</b>\n\n"
             for coin in top_10:
                 name = coin["name"]
@@ -157,7 +150,7 @@ class SlaveBot:
         logger.error(" Error fetching top 10 cryptocurrencies.")
         return "❌ Error fetching top 10 cryptocurrencies."
 
-    def get_ath_from_coingecko(self, symbol):
+    async def get_ath_from_coingecko(self, symbol):
         """
         Retrieves the all-time high (ATH) price of a cryptocurrency from CoinGecko.
         Args:
@@ -175,7 +168,7 @@ class SlaveBot:
         if not coin_id:
             return None  # Symbol not supported
 
-        data = check_requests(f"{self.coingecko_url}/coins/{coin_id}")
+        data = await check_requests(f"{self.coingecko_url}/coins/{coin_id}")
 
         if data is not None and "market_data" in data:
             return data["market_data"]["ath"]["usd"]
@@ -190,7 +183,7 @@ class SlaveBot:
         Returns:
             str: A formatted string with the cryptocurrency details.
         """
-        ath_price = self.get_ath_from_coingecko(symbol)
+        ath_price = await self.get_ath_from_coingecko(symbol)
 
         if ath_price is not None:
             ath_message = ath_price
@@ -231,7 +224,7 @@ class SlaveBot:
             f" User {update.effective_chat.id} " f"requested details for {symbol}"
         )
 
-        data = self.get_crypto_data(symbol)
+        data = await self.get_crypto_data(symbol)
 
         logger.info(" Requested: details %s", symbol)
 
@@ -250,7 +243,7 @@ class SlaveBot:
             update (Update): The update object containing the message.
             context (ContextTypes.DEFAULT_TYPE): The context for the command.
         """
-        text = self.get_top_10()
+        text = await self.get_top_10()
 
         logger.info(" Requested: top 10")
 
@@ -271,7 +264,9 @@ class SlaveBot:
             return
 
         symbol1, symbol2 = context.args
-        data1, data2 = self.get_crypto_data(symbol1), self.get_crypto_data(symbol2)
+        data1, data2 = await asyncio.gather(
+            self.get_crypto_data(symbol1), self.get_crypto_data(symbol2)
+        )
 
         if data1 and data2:
             message = f"""
@@ -298,29 +293,32 @@ class SlaveBot:
             )
 
     # Function to convert cryptocurrency
-    def convert_crypto(self, amount, from_symbol, to_symbol):
+    async def convert_crypto(self, amount, from_symbol, to_symbol):
         """
         Converts a specified amount of one cryptocurrency to another.
         Args:
             amount (float): The amount of the cryptocurrency to convert.
             from_symbol (str): The symbol of the cryptocurrency to convert from (e.g., "BTC").
-            to_symbol (str): The symbol of the cryptocurrency to convert to (e.g., "ETH").
+            to_symbol (str): The symbol of the cryptocurrency or fiat currency to
+                convert to (e.g., "ETH" or "EUR").
         Returns:
             float: The converted amount in the target cryptocurrency, or None if conversion is
             not possible.
         """
         self.reload_the_data()
 
-        params = {"symbol": from_symbol.upper(), "convert": to_symbol.upper()}
+        # Fiat targets are not coins, looking them up could match a token
+        if is_fiat(to_symbol):
+            price = await self.cmc.get_fiat_price(from_symbol, to_symbol)
+            return amount * price if price is not None else None
+
+        quotes = await self.cmc.get_quotes([from_symbol, to_symbol])
 
-        data = check_requests(self.cmc_url, self.headers, params)
+        if from_symbol.upper() in quotes and to_symbol.upper() in quotes:
+            from_price = quotes[from_symbol.upper()]["quote"]["USD"]["price"]
+            to_price = quotes[to_symbol.upper()]["quote"]["USD"]["price"]
+            return amount * from_price / to_price
 
-        if data is not None and "data" in data and from_symbol.upper() in data["data"]:
-            coin_data = data["data"][from_symbol.upper()]
-            if to_symbol.upper() in coin_data["quote"]:
-                conversion_rate = coin_data["quote"][to_symbol.upper()]["price"]
-                converted_amount = amount * conversion_rate
-                return converted_amount
         return None  # Conversion not possible
 
     # Handle `/convert <amount> <from_symbol> <to_symbol>` command
@@ -350,7 +348,7 @@ class SlaveBot:
             )
             return
 
-        converted_amount = self.convert_crypto(amount, from_symbol, to_symbol)
+        converted_amount = await self.convert_crypto(amount, from_symbol, to_symbol)
 
         # pylint: disable=logging-fstring-interpolation
         logger.info(f" Requested: convert {amount} {from_symbol} {to_symbol}")
@@ -385,7 +383,7 @@ class SlaveBot:
             return
 
         symbol = context.args[0].upper()
-        data = self.get_crypto_data(symbol)
+        data = await self.get_crypto_data(symbol)
 
         logger.info(" Requested: mcap change %s", symbol)
 
@@ -428,7 +426,7 @@ class SlaveBot:
             )
             return
 
-        data = self.get_crypto_data(symbol)
+        data = await self.get_crypto_data(symbol)
 
         if data:
             current_price = data["price"]
@@ -575,7 +573,7 @@ class SlaveBot:
             )
             return
 
-        data = self.get_crypto_data(symbol)
+        data = await self.get_crypto_data(symbol)
         if data:
             price = data["price"]
             total_cost = amount * price
@@ -634,7 +632,7 @@ class SlaveBot:
             )
             return
 
-        data = self.get_crypto_data(symbol)
+        data = await self.get_crypto_data(symbol)
         if data:
             price = data["price"]
             total_value = amount * price
@@ -5,6 +5,7 @@ This bot checks for crypto news articles and provides market sentiment analysis.
 
 # pylint: disable=wrong-import-position,duplicate-code
 
+import hashlib
 import logging
 import os
 import sys
@@ -12,9 +13,15 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
 
 
-from telegram import ReplyKeyboardMarkup, Update
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    ReplyKeyboardMarkup,
+    Update,
+)
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     ContextTypes,
     MessageHandler,
@@ -42,6 +49,37 @@ NEWS_KEYBOARD = ReplyKeyboardMarkup(
     one_time_keyboard=False,  # Buttons stay visible after being clicked
 )
 
+SEARCH_PAGE_SIZE = 10
+
+# Telegram limits callback data to 64 bytes, so the button carries a short key
+# of the search and the page token, and the tags of each key are kept in the
+# user data
+SEARCH_CALLBACK_PREFIX = "search:"
+SEARCH_KEY_LENGTH = 8
+SEARCH_HISTORY_SIZE = 20
+
+
+def remember_search(user_data, tags):
+    """
+    Keeps the tags of a search in the user data under a short key, so the buttons
+    of older searches still page their own results.
+    Args:
+        user_data (dict): The user data of the chat.
+        tags (list): The searched tags.
+    Returns:
+        str: The key of the search.
+    """
+    key = hashlib.sha1(" ".join(tags).encode()).hexdigest()[:SEARCH_KEY_LENGTH]
+    searches = user_data.setdefault("searches", {})
+
+    # The latest searches are kept, the oldest buttons expire
+    searches.pop(key, None)
+    searches[key] = list(tags)
+    while len(searches) > SEARCH_HISTORY_SIZE:
+        searches.pop(next(iter(searches)))
+
+    return key
+
 
 class NewsBot:
     """
@@ -85,7 +123,7 @@ class NewsBot:
         Args:
             update (Update): The update object containing the message.
         """
-        message = await get_market_sentiment()
+        message = await get_market_sentiment(data_base=self.db)
 
         await send_telegram_message_update(message, update)
 
@@ -123,7 +161,7 @@ class NewsBot:
                 "❌ Invalid command. Please use the buttons below.", update
             )
 
-    # Command: /start
+    # Command: /search
     async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Handles the /search command to search for articles by tags.
@@ -135,14 +173,58 @@ class NewsBot:
             await send_telegram_message_update("❌ Usage: /search <tags>", update)
             return
 
-        articles = await self.db.search_articles_by_tags(context.args)
+        key = remember_search(context.user_data, context.args)
 
-        print(
-            f"\nFound {len(articles)} articles with {context.args} tags in the data base!\n"
-        )
+        await self.send_search_page(update, context.args, key)
+
+    async def search_next_page(
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+    ):
+        """
+        Handles the "Next page" button of a search and sends the following page.
+        Args:
+            update (Update): The update object containing the callback query.
+            context (ContextTypes.DEFAULT_TYPE): The context for the command.
+        """
+        query = update.callback_query
+        await query.answer()
+
+        key, _, cursor = query.data.removeprefix(SEARCH_CALLBACK_PREFIX).partition(":")
+        tags = context.user_data.get("searches", {}).get(key)
+
+        if not tags or not cursor:
+            await send_telegram_message_update(
+                "❌ This search expired, please run /search again.", query
+            )
+            return
+
+        await self.send_search_page(query, tags, key, cursor)
+
+    async def send_search_page(self, update, tags, key, cursor=None):
+        """
+        Sends one page of search results, followed by a "Next page" button
+        if more articles match.
+        Args:
+            update (Update | CallbackQuery): The object holding the message to reply to.
+            tags (list): The searched tags.
+            key (str): The key of the search, see `remember_search`.
+            cursor (str, optional): The token of the page, None for the first page.
+        """
+        try:
+            articles, next_cursor = await self.db.search_articles_page(
+                tags, page_size=SEARCH_PAGE_SIZE, cursor=cursor
+            )
+        except ValueError as e:
+            logger.error(" Invalid search page token: %s", e)
+            await send_telegram_message_update(
+                "❌ Invalid page, please run /search again.", update
+            )
+            return
+
+        print(f"\nFound {len(articles)} articles with {tags} tags in the data base!\n")
 
         if len(articles) == 0:
-            message = f"No articles found with {context.args} found!"
+            message = f"No articles found with {tags} found!"
 
             await send_telegram_message_update(message, update)
 
@@ -159,6 +241,23 @@ class NewsBot:
 
             await send_telegram_message_update(message, update)
 
+        if next_cursor is not None:
+            await update.message.reply_text(
+                "More articles are available.",
+                reply_markup=InlineKeyboardMarkup(
+                    [
+                        [
+                            InlineKeyboardButton(
+                                "➡️ Next page",
+                                callback_data=(
+                                    f"{SEARCH_CALLBACK_PREFIX}{key}:{next_cursor}"
+                                ),
+                            )
+                        ]
+                    ]
+                ),
+            )
+
     # Handle `/help` command
     # pylint:disable=unused-argument
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -196,6 +295,11 @@ Example:
         app.add_handler(CommandHandler("start", self.start))
         app.add_handler(CommandHandler("search", self.search))
         app.add_handler(CommandHandler("help", self.help_command))
+        app.add_handler(
+            CallbackQueryHandler(
+                self.search_next_page, pattern=f"^{SEARCH_CALLBACK_PREFIX}"
+            )
+        )
         app.add_handler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_buttons)
         )
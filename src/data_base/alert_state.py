@@ -0,0 +1,201 @@
+"""
+alert_state.py
+This module remembers which alerts are active, so an alert is sent when a price move
+crosses its threshold and not again while the move lasts. The state is kept in SQLite
+and survives the restarts of the bot.
+"""
+
+import logging
+import math
+import os
+import time
+
+import aiosqlite
+
+import src.handlers.load_variables_handler
+from src.data_base.migrations import Migration, MigrationRunner, execute_statements
+
+logger = logging.getLogger(__name__)
+logger.info("Alert state started")
+
+# Append new migrations at the end, never edit or renumber an applied one
+ALERT_STATE_MIGRATIONS = [
+    Migration(
+        1,
+        "Create the active alerts table",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS active_alerts (
+                symbol TEXT NOT NULL,
+                alert_window TEXT NOT NULL,
+                recipients TEXT NOT NULL,
+                direction INTEGER NOT NULL,
+                threshold REAL NOT NULL,
+                fired_at REAL NOT NULL,
+                PRIMARY KEY (symbol, alert_window, recipients)
+            ) WITHOUT ROWID
+            """
+        ),
+    ),
+]
+
+
+def get_alert_key(symbol, window, recipients=()):
+    """
+    Returns the state key of an alert.
+    Args:
+        symbol (str): The cryptocurrency symbol.
+        window (str): The alert window.
+        recipients (tuple): The chat ids of the alert, empty for the default chats.
+    Returns:
+        tuple: The (symbol, window, recipients) key, recipients comma separated.
+    """
+    return symbol, window, ",".join(recipients)
+
+
+class AlertStateStore:
+    """
+    AlertStateStore is the state machine of the alerts. An alert fires when its
+    change crosses the threshold while it is armed, or crosses it the other way.
+    It then stays active, and silent, until the change decays below the lower band
+    of `rearm_ratio` times the threshold, which re-arms it. The band keeps a change
+    hovering around the threshold from firing on every check.
+    """
+
+    def __init__(self, db_path="./data_bases/alert_state.db"):
+        """
+        Initializes the AlertStateStore.
+        Args:
+            db_path (str): Path to the SQLite data base file.
+        """
+        self.db_path = db_path
+        self.schema_ready = False
+
+        self.rearm_ratio = None
+
+        # The active alerts by key, as (direction, threshold), loaded once
+        self.active = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the hysteresis settings from the variables file.
+        """
+        variables = src.handlers.load_variables_handler.load_json()
+
+        self.rearm_ratio = variables.get("ALERT_REARM_RATIO", 0.8)
+
+    async def init_db(self):
+        """
+        Migrates the schema and loads the active alerts.
+        Runs once per process, later calls return immediately.
+        """
+        if self.schema_ready:
+            return
+
+        folder_path = os.path.dirname(self.db_path)
+
+        if folder_path != "":
+            os.makedirs(folder_path, exist_ok=True)
+
+        await MigrationRunner(self.db_path, ALERT_STATE_MIGRATIONS).migrate()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT symbol, alert_window, recipients, direction, threshold "
+                "FROM active_alerts"
+            )
+            rows = await cursor.fetchall()
+
+        self.active = {
+            (symbol, window, recipients): (direction, threshold)
+            for symbol, window, recipients, direction, threshold in rows
+        }
+
+        self.schema_ready = True
+        logger.info("Alert state ready: %d active alerts", len(self.active))
+
+    def is_rearmed(self, state, change):
+        """
+        Tells whether an active alert decayed below its lower band.
+        Args:
+            state (tuple): The (direction, threshold) of the active alert.
+            change (float): The current change, NaN if unknown.
+        Returns:
+            bool: True if the alert is armed again.
+        """
+        direction, threshold = state
+
+        # A symbol missing from the quotes keeps its alert until it is seen again
+        if math.isnan(change):
+            return False
+
+        return change * direction < threshold * self.rearm_ratio
+
+    async def update(self, windows, records, get_change, now=None):
+        """
+        Applies the alerts found by a check and returns the ones to send.
+        Args:
+            windows (iterable): The windows the check evaluated.
+            records (list): The AlertRecords crossing their threshold.
+            get_change (callable): `get_change(symbol, window)` returning the
+                current change of an active alert, NaN if unknown.
+            now (float, optional): The check time.
+        Returns:
+            list: The records that fired, in the order of `records`.
+        """
+        await self.init_db()
+        now = now or time.time()
+        windows = set(windows)
+
+        fired = []
+        hits = set()
+        upserts = []
+
+        for record in records:
+            key = get_alert_key(record.symbol, record.window, record.recipients)
+            direction = 1 if record.change >= 0 else -1
+            hits.add(key)
+
+            state = self.active.get(key)
+            if state is not None and state[0] == direction:
+                continue
+
+            self.active[key] = (direction, record.threshold)
+            upserts.append((*key, direction, record.threshold, now))
+            fired.append(record)
+
+        rearmed = [
+            key
+            for key, state in self.active.items()
+            if key[1] in windows
+            and key not in hits
+            and self.is_rearmed(state, float(get_change(key[0], key[1])))
+        ]
+        for key in rearmed:
+            del self.active[key]
+
+        if upserts or rearmed:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.executemany(
+                    "INSERT OR REPLACE INTO active_alerts "
+                    "(symbol, alert_window, recipients, direction, threshold, fired_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    upserts,
+                )
+                await db.executemany(
+                    "DELETE FROM active_alerts "
+                    "WHERE symbol = ? AND alert_window = ? AND recipients = ?",
+                    rearmed,
+                )
+                await db.commit()
+
+        logger.info(
+            "Alerts: %d found, %d fired, %d re-armed",
+            len(records),
+            len(fired),
+            len(rearmed),
+        )
+
+        return fired
@@ -0,0 +1,406 @@
+"""
+archive_handler.py
+This module dumps the articles and metrics data bases to compressed JSONL or CSV
+archives and loads them back in bulk, so a recreated data base gets its history
+back without replaying the scrapers.
+"""
+
+import csv
+import gzip
+import json
+import logging
+import os
+from itertools import islice
+
+import aiosqlite
+
+from src.data_base.data_base_handler import DataBaseHandler
+
+logger = logging.getLogger(__name__)
+logger.info("Archive handler started")
+
+ARCHIVE_FORMATS = ("jsonl", "csv")
+
+# The archived tables, their columns and whether a UNIQUE key lets a load skip
+# the rows that are already stored. The tables without one name the columns a
+# load matches on instead. The articles get new ids, the ids of a data base in use
+# may belong to other articles, and are matched on their unique link.
+ARTICLES_ARCHIVE = {
+    "table": "articles",
+    "columns": (
+        "source",
+        "headline",
+        "link",
+        "highlights",
+        "openai_summary",
+        "date_scraped",
+        "sentiment",
+    ),
+    "order_by": "id",
+    "unique": True,
+}
+
+METRICS_ARCHIVE = {
+    "table": "metrics",
+    "columns": ("series", "timestamp", "value", "label"),
+    "order_by": "series, timestamp",
+    "unique": False,
+    "key": ("series", "timestamp"),
+}
+
+METRIC_ROLLUPS_ARCHIVE = {
+    "table": "metric_rollups",
+    "columns": (
+        "series",
+        "resolution",
+        "bucket_start",
+        "count",
+        "min",
+        "max",
+        "sum",
+        "last",
+    ),
+    "order_by": "series, resolution, bucket_start",
+    "unique": True,
+}
+
+# The rollup watermarks, without them the retention would roll up the archived
+# buckets again and prune the raw points before reading them
+METRIC_ROLLUP_STATE_ARCHIVE = {
+    "table": "metric_rollup_state",
+    "columns": ("series", "resolution", "watermark"),
+    "order_by": "series, resolution",
+    "unique": True,
+}
+
+
+def get_archive_path(folder, table, archive_format="jsonl"):
+    """
+    Returns the gzip compressed archive file of a table.
+    Args:
+        folder (str): The archive folder.
+        table (str): The table name.
+        archive_format (str): "jsonl" or "csv".
+    Returns:
+        str: The archive file path.
+    """
+    return os.path.join(folder, f"{table}.{archive_format}.gz")
+
+
+def open_archive(path, mode):
+    """
+    Opens an archive as text, compressed with gzip if the name ends in ".gz".
+    Args:
+        path (str): The archive file.
+        mode (str): "r" or "w".
+    Returns:
+        file: The opened text file.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, f"{mode}t", encoding="utf-8", newline="")
+
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def get_archive_format(path):
+    """
+    Returns the format of an archive from its file name.
+    Args:
+        path (str): The archive file.
+    Returns:
+        str: "jsonl" or "csv".
+    Raises:
+        ValueError: If the file name has no supported extension.
+    """
+    name = path.removesuffix(".gz")
+
+    for archive_format in ARCHIVE_FORMATS:
+        if name.endswith(f".{archive_format}"):
+            return archive_format
+
+    raise ValueError(f"Unsupported archive file: {path}")
+
+
+def read_archive_rows(file, archive_format, columns):
+    """
+    Lazily reads the rows of an archive, in the order of the given columns.
+    Args:
+        file: The opened archive.
+        archive_format (str): "jsonl" or "csv".
+        columns (tuple): The columns to read.
+    Yields:
+        tuple: One row.
+    """
+    if archive_format == "jsonl":
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield tuple(record.get(column) for column in columns)
+        return
+
+    for record in csv.DictReader(file):
+        # CSV has no NULL, empty fields are loaded as NULL
+        yield tuple(record.get(column) or None for column in columns)
+
+
+async def drop_indexes(db, table):
+    """
+    Drops the secondary indexes of a table.
+    Args:
+        db (aiosqlite.Connection): The open data base.
+        table (str): The table name.
+    Returns:
+        list: The CREATE INDEX statements needed to rebuild them.
+    """
+    cursor = await db.execute(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    )
+    indexes = await cursor.fetchall()
+
+    for name, _ in indexes:
+        await db.execute(f"DROP INDEX IF EXISTS {name}")
+    await db.commit()
+
+    return [sql for _, sql in indexes]
+
+
+def get_insert_query(archive):
+    """
+    Returns the query loading a row of an archive, ignoring the rows that break a
+    UNIQUE key.
+    Args:
+        archive (dict): The archive spec of the table.
+    Returns:
+        str: The INSERT query, with a parameter per column.
+    """
+    columns = archive["columns"]
+
+    return (
+        f"INSERT OR IGNORE INTO {archive['table']} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})"
+    )
+
+
+def get_merge_query(archive):
+    """
+    Returns the query loading a row of an archive unless a stored row has the same
+    key columns.
+    Args:
+        archive (dict): The archive spec of the table, with its key columns.
+    Returns:
+        tuple: The INSERT query, with a parameter per column then per key column,
+            and the position of each key column in the row.
+    """
+    table = archive["table"]
+    columns = archive["columns"]
+    key = archive["key"]
+
+    query = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"SELECT {', '.join('?' * len(columns))} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE "
+        + " AND ".join(f"{column} = ?" for column in key)
+        + ")"
+    )
+
+    return query, tuple(columns.index(column) for column in key)
+
+
+class ArchiveHandler:
+    """
+    ArchiveHandler exports the articles, metric points, metric rollups and their
+    watermarks to archive files and imports them back in chunked transactions.
+    """
+
+    def __init__(self, data_base=None, chunk_size=5000):
+        """
+        Initializes the ArchiveHandler.
+        Args:
+            data_base (DataBaseHandler, optional): The data bases to archive.
+            chunk_size (int): The number of rows written per transaction.
+        """
+        self.data_base = data_base or DataBaseHandler()
+        self.chunk_size = chunk_size
+
+    def get_archives(self):
+        """
+        Returns the archived tables with the data base file that holds them.
+        Returns:
+            list: Tuples of (db_path, archive spec).
+        """
+        metrics_path = self.data_base.metrics.db_path
+
+        return [
+            (self.data_base.articles_db_path, ARTICLES_ARCHIVE),
+            (metrics_path, METRICS_ARCHIVE),
+            (metrics_path, METRIC_ROLLUPS_ARCHIVE),
+            (metrics_path, METRIC_ROLLUP_STATE_ARCHIVE),
+        ]
+
+    async def export_table(self, db_path, archive, path):
+        """
+        Streams a table to an archive file, without loading it in memory.
+        Args:
+            db_path (str): The data base file.
+            archive (dict): The archive spec of the table.
+            path (str): The archive file to write.
+        Returns:
+            int: The number of rows exported.
+        """
+        columns = archive["columns"]
+        archive_format = get_archive_format(path)
+        exported = 0
+
+        async with aiosqlite.connect(db_path) as db:
+            cursor = await db.execute(
+                f"SELECT {', '.join(columns)} FROM {archive['table']} "
+                f"ORDER BY {archive['order_by']}"
+            )
+            cursor.arraysize = self.chunk_size
+
+            with open_archive(path, "w") as file:
+                writer = None
+                if archive_format == "csv":
+                    writer = csv.writer(file)
+                    writer.writerow(columns)
+
+                while rows := await cursor.fetchmany():
+                    if writer is not None:
+                        writer.writerows(rows)
+                    else:
+                        file.writelines(
+                            json.dumps(dict(zip(columns, row)), ensure_ascii=False)
+                            + "\n"
+                            for row in rows
+                        )
+                    exported += len(rows)
+
+        logger.info("Exported %d rows of %s to %s", exported, archive["table"], path)
+        return exported
+
+    async def import_table(self, db_path, archive, path):
+        """
+        Loads an archive file into its table in chunked transactions.
+        The secondary indexes of the table are dropped during the load and rebuilt
+        once at the end, which is much faster than updating them for every row.
+        A table without a UNIQUE key that already has rows keeps its indexes, and
+        only gets the archived rows whose key columns match none of its rows, so
+        an archive is never imported twice.
+        Args:
+            db_path (str): The data base file.
+            archive (dict): The archive spec of the table.
+            path (str): The archive file to read.
+        Returns:
+            int: The number of rows imported.
+        """
+        table = archive["table"]
+
+        async with aiosqlite.connect(db_path) as db:
+            merge = False
+            if not archive["unique"]:
+                cursor = await db.execute(f"SELECT 1 FROM {table} LIMIT 1")
+                merge = await cursor.fetchone() is not None
+
+            if merge:
+                # The key lookups of the merge need the indexes
+                logger.info("Merging the archive of %s into its rows", table)
+                indexes = []
+            else:
+                indexes = await drop_indexes(db, table)
+
+            try:
+                imported = await self.load_rows(db, archive, path, merge)
+            finally:
+                # Rebuild the indexes even if the archive is broken halfway
+                for sql in indexes:
+                    await db.execute(sql)
+                await db.commit()
+
+        logger.info("Imported %d rows of %s from %s", imported, table, path)
+        return imported
+
+    async def load_rows(self, db, archive, path, merge):
+        """
+        Inserts the rows of an archive file in chunked transactions.
+        Args:
+            db (aiosqlite.Connection): The open data base.
+            archive (dict): The archive spec of the table.
+            path (str): The archive file to read.
+            merge (bool): True to skip the rows matching a stored row on the key
+                columns of the archive.
+        Returns:
+            int: The number of rows inserted.
+        """
+        if merge:
+            query, key_indexes = get_merge_query(archive)
+        else:
+            query, key_indexes = get_insert_query(archive), ()
+
+        imported = 0
+
+        with open_archive(path, "r") as file:
+            rows = read_archive_rows(file, get_archive_format(path), archive["columns"])
+
+            while chunk := list(islice(rows, self.chunk_size)):
+                if key_indexes:
+                    chunk = [
+                        row + tuple(row[index] for index in key_indexes)
+                        for row in chunk
+                    ]
+                cursor = await db.executemany(query, chunk)
+                await db.commit()
+                imported += max(cursor.rowcount, 0)
+
+        return imported
+
+    async def export_all(self, folder, archive_format="jsonl"):
+        """
+        Exports the articles and metrics to a folder of compressed archives.
+        Args:
+            folder (str): The archive folder.
+            archive_format (str): "jsonl" or "csv".
+        Returns:
+            dict: The number of rows exported per table.
+        """
+        os.makedirs(folder, exist_ok=True)
+        await self.data_base.init_db()
+
+        result = {}
+        for db_path, archive in self.get_archives():
+            result[archive["table"]] = await self.export_table(
+                db_path,
+                archive,
+                get_archive_path(folder, archive["table"], archive_format),
+            )
+
+        print(f"Exported to {folder}: {result}")
+        return result
+
+    async def import_all(self, folder, archive_format="jsonl"):
+        """
+        Imports every archive found in the folder into the data bases.
+        Args:
+            folder (str): The archive folder.
+            archive_format (str): "jsonl" or "csv".
+        Returns:
+            dict: The number of rows imported per table.
+        """
+        await self.data_base.init_db()
+
+        # Queued writes must land before the indexes are dropped
+        await self.data_base.close()
+
+        result = {}
+        for db_path, archive in self.get_archives():
+            path = get_archive_path(folder, archive["table"], archive_format)
+
+            if not os.path.exists(path):
+                logger.warning("No archive found for %s at %s", archive["table"], path)
+                continue
+
+            result[archive["table"]] = await self.import_table(db_path, archive, path)
+
+        print(f"Imported from {folder}: {result}")
+        return result
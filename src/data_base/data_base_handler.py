@@ -10,72 +10,377 @@ import os
 
 import aiosqlite
 
+from src.data_base.metrics_store import MetricSeries, MetricsStore
+from src.data_base.migrations import (
+    Migration,
+    MigrationRunner,
+    add_column_if_missing,
+    backfill_in_batches,
+    execute_statements,
+)
+from src.data_base.seen_link_index import SeenLinkIndex
+from src.data_base.write_behind_queue import WriteBehindQueue
+from src.handlers.load_variables_handler import load_json
 from src.handlers.send_telegram_message import send_telegram_message_update
+from src.utils.utils import classify_sentiment
 
 logger = logging.getLogger(__name__)
 logger.info("Data Base handler started")
 
+# SQLite stores CURRENT_TIMESTAMP as UTC text in this format, so range bounds
+# built with it compare correctly against the raw date_scraped column.
+SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+ARTICLES_DATE_SOURCE_INDEX = "idx_articles_date_scraped_source"
+
+# Serves the (date_scraped, id) keyset order of the paginated search
+ARTICLES_DATE_ID_INDEX = "idx_articles_date_scraped_id"
+
+ARTICLES_SENTIMENT_INDEX = "idx_articles_sentiment_date_scraped"
+
+ARTICLE_SOURCES = ("crypto.news", "bitcoinmagazine", "cointelegraph")
+
+SOURCE_SERIES = {
+    "crypto.news": MetricSeries.ARTICLES_CRYPTO_NEWS,
+    "cointelegraph": MetricSeries.ARTICLES_COINTELEGRAPH,
+    "bitcoinmagazine": MetricSeries.ARTICLES_BITCOINMAGAZINE,
+}
+
+SENTIMENT_SERIES = {
+    "Unknown": MetricSeries.SENTIMENT_UNKNOWN,
+    "Negative": MetricSeries.SENTIMENT_NEGATIVE,
+    "Neutral": MetricSeries.SENTIMENT_NEUTRAL,
+    "Positive": MetricSeries.SENTIMENT_POSITIVE,
+}
+
+TODAYS_NEWS_QUERY = """
+    SELECT source, headline, link, highlights, openai_summary, date_scraped
+    FROM articles
+    WHERE date_scraped >= ? AND date_scraped < ?
+    ORDER BY date_scraped DESC
+"""
+
+ARTICLE_COUNTS_QUERY = """
+    SELECT source, COUNT(*)
+    FROM articles
+    WHERE date_scraped >= ? AND date_scraped < ?
+    GROUP BY source
+"""
+
+# Counts the daily, weekly and monthly windows in a single pass over the
+# index range that covers all three of them.
+ARTICLE_STATS_QUERY = """
+    SELECT source,
+           SUM(date_scraped >= ?),
+           SUM(date_scraped >= ?),
+           SUM(date_scraped >= ?)
+    FROM articles
+    WHERE date_scraped >= ? AND date_scraped < ?
+    GROUP BY source
+"""
+
+SEARCH_COLUMNS = "id, headline, link, highlights, openai_summary, date_scraped"
+
+DAILY_SENTIMENT_QUERY = """
+    SELECT sentiment, count
+    FROM daily_sentiment
+    WHERE day = ?
+"""
+
+# The daily_sentiment counts are kept in step with the sentiment column by
+# triggers, inside the same transaction as the article write
+SENTIMENT_SCHEMA = (
+    f"""
+    CREATE INDEX IF NOT EXISTS {ARTICLES_SENTIMENT_INDEX}
+    ON articles (sentiment, date_scraped)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_sentiment (
+        day TEXT NOT NULL,
+        sentiment TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, sentiment)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_articles_sentiment_insert
+    AFTER INSERT ON articles
+    WHEN NEW.sentiment IS NOT NULL AND NEW.date_scraped IS NOT NULL
+    BEGIN
+        INSERT INTO daily_sentiment (day, sentiment, count)
+        VALUES (date(NEW.date_scraped), NEW.sentiment, 1)
+        ON CONFLICT (day, sentiment) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_articles_sentiment_update
+    AFTER UPDATE OF sentiment ON articles
+    WHEN OLD.sentiment IS NOT NEW.sentiment AND NEW.date_scraped IS NOT NULL
+    BEGIN
+        UPDATE daily_sentiment SET count = count - 1
+        WHERE day = date(OLD.date_scraped) AND sentiment = OLD.sentiment;
+        INSERT INTO daily_sentiment (day, sentiment, count)
+        SELECT date(NEW.date_scraped), NEW.sentiment, 1
+        WHERE NEW.sentiment IS NOT NULL
+        ON CONFLICT (day, sentiment) DO UPDATE SET count = count + 1;
+    END
+    """,
+)
+
+
+async def add_sentiment_column(db):
+    """
+    Adds the sentiment column with its index, the daily_sentiment table and triggers.
+    """
+    await add_column_if_missing(db, "articles", "sentiment", "TEXT")
+    await execute_statements(*SENTIMENT_SCHEMA)(db)
+
+
+async def backfill_article_sentiment(db_path):
+    """
+    Classifies the summaries stored before the sentiment column existed.
+    The triggers count every classified article in daily_sentiment.
+    """
+
+    def build_params(rows, _):
+        return [(classify_sentiment(summary), row_id) for row_id, summary in rows]
+
+    updated = await backfill_in_batches(
+        db_path,
+        """
+        SELECT id, openai_summary FROM articles
+        WHERE id > ? AND openai_summary IS NOT NULL AND sentiment IS NULL
+        ORDER BY id LIMIT ?
+        """,
+        "UPDATE articles SET sentiment = ? WHERE id = ?",
+        build_params,
+    )
+    logger.info("Classified the sentiment of %d stored articles", updated)
+
+
+# Append new migrations at the end, never edit or renumber an applied one
+ARTICLES_MIGRATIONS = [
+    Migration(
+        1,
+        "Create the articles table",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                headline TEXT NOT NULL,
+                link TEXT NOT NULL UNIQUE,
+                highlights TEXT,
+                openai_summary TEXT,
+                date_scraped TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        ),
+    ),
+    Migration(
+        2,
+        "Index the articles by date_scraped and source",
+        execute_statements(
+            f"""
+            CREATE INDEX IF NOT EXISTS {ARTICLES_DATE_SOURCE_INDEX}
+            ON articles (date_scraped, source)
+            """
+        ),
+    ),
+    Migration(
+        3,
+        "Index the articles by date_scraped and id",
+        execute_statements(
+            f"""
+            CREATE INDEX IF NOT EXISTS {ARTICLES_DATE_ID_INDEX}
+            ON articles (date_scraped, id)
+            """
+        ),
+    ),
+    Migration(
+        4,
+        "Store the sentiment of every article and count it per day",
+        add_sentiment_column,
+        backfill_article_sentiment,
+    ),
+]
+
+
+def get_day_range(now=None):
+    """
+    Returns the half-open [start, end) timestamp range of the current UTC day.
+    Args:
+        now (datetime, optional): The reference time, defaults to the current UTC time.
+    Returns:
+        tuple: The start and end bounds formatted as SQLite timestamps.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + datetime.timedelta(days=1)
+
+    return (
+        start.strftime(SQLITE_TIMESTAMP_FORMAT),
+        end.strftime(SQLITE_TIMESTAMP_FORMAT),
+    )
+
+
+def get_rolling_range(delta, now=None):
+    """
+    Returns the half-open range covering the last `delta` up to the end of the current UTC day.
+    Args:
+        delta (timedelta): How far back the range should start.
+        now (datetime, optional): The reference time, defaults to the current UTC time.
+    Returns:
+        tuple: The start and end bounds formatted as SQLite timestamps.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    _, end = get_day_range(now)
+
+    return (now - delta).strftime(SQLITE_TIMESTAMP_FORMAT), end
+
+
+def get_month_range(now=None):
+    """
+    Returns the half-open [start, end) timestamp range of the current UTC calendar month.
+    Args:
+        now (datetime, optional): The reference time, defaults to the current UTC time.
+    Returns:
+        tuple: The start and end bounds formatted as SQLite timestamps.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+
+    return (
+        start.strftime(SQLITE_TIMESTAMP_FORMAT),
+        end.strftime(SQLITE_TIMESTAMP_FORMAT),
+    )
+
+
+def encode_search_cursor(date_scraped, article_id):
+    """
+    Builds the next page token of a search from the key of the last row sent.
+    Args:
+        date_scraped (str): The date_scraped of the last row.
+        article_id (int): The id of the last row.
+    Returns:
+        str: The page token, short enough for Telegram callback data.
+    """
+    return f"{date_scraped}|{article_id}"
+
+
+def decode_search_cursor(token):
+    """
+    Parses a page token built by `encode_search_cursor`.
+    Args:
+        token (str): The page token.
+    Returns:
+        tuple: The (date_scraped, id) key the next page starts after.
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    date_scraped, separator, article_id = token.rpartition("|")
+
+    if not separator or not date_scraped:
+        raise ValueError(f"Invalid search cursor: {token!r}")
+
+    datetime.datetime.strptime(date_scraped, SQLITE_TIMESTAMP_FORMAT)
+
+    return date_scraped, int(article_id)
+
+
+def build_search_query(tags=None, match_any=True, after=None):
+    """
+    Builds the keyset-paginated search query, newest articles first.
+    Args:
+        tags (list, optional): Tags the highlights must contain.
+        match_any (bool): If True any tag matches, otherwise all tags must match.
+        after (tuple, optional): The (date_scraped, id) key to continue after.
+    Returns:
+        tuple: The query, ending in a `LIMIT ?` placeholder, and its parameters
+        without the limit.
+    """
+    conditions = []
+    params = []
+
+    if tags:
+        connector = " OR " if match_any else " AND "
+        conditions.append(
+            "(" + connector.join(["lower(highlights) LIKE ?"] * len(tags)) + ")"
+        )
+        params.extend(f"%{tag.lstrip('#').lower()}%" for tag in tags)
+
+    if after is not None:
+        # Row values let SQLite seek straight to the key in the index
+        conditions.append("(date_scraped, id) < (?, ?)")
+        params.extend(after)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = f"""
+        SELECT {SEARCH_COLUMNS}
+        FROM articles
+        {where_clause}
+        ORDER BY date_scraped DESC, id DESC
+        LIMIT ?
+    """
+
+    return query, params
+
+
+# pylint: disable=too-many-public-methods
 class DataBaseHandler:
     """
     This class manages the SQLite database for storing articles and their summaries.
     """
 
-    # pylint: disable=too-many-arguments, too-many-positional-arguments
     def __init__(
         self,
         articles_db_path="./data_bases/articles.db",
-        daily_stats_db_path="./data_bases/daily_stats.db",
-        fear_greed_db_path="./data_bases/fear_greed.db",
-        eth_gas_fee_db_path="./data_bases/eth_gas_fee.db",
-        market_sentiment_db_path="./data_bases/market_sentiment.db",
+        metrics_db_path="./data_bases/metrics.db",
     ):
         self.articles_db_path = articles_db_path
-        self.daily_stats_db_path = daily_stats_db_path
-        self.fear_greed_db_path = fear_greed_db_path
-        self.eth_gas_fee_db_path = eth_gas_fee_db_path
-        self.market_sentiment_db_path = market_sentiment_db_path
+        self.metrics = MetricsStore(metrics_db_path)
+
+        # All article writes are group committed by a single writer
+        self.write_queue = WriteBehindQueue(articles_db_path)
+
+        # Links already stored, so known articles skip the data base
+        self.seen_links = SeenLinkIndex(load_json().get("SEEN_LINKS_BLOOM_CAPACITY", 0))
 
     async def init_db(self):
         """
-        Creates the 'articles' table only if the DB file doesn't exist yet.
-        If the file already exists, we assume the table was previously created.
+        Brings the articles data base up to the latest schema version.
+        New and older data bases run the same ordered migrations, every one of them
+        is applied once and recorded in the 'schema_version' table.
+        The metrics schema is migrated here too.
         """
-        folder_path = os.path.dirname(self.articles_db_path)
-
-        if folder_path != "":
-            os.makedirs(folder_path, exist_ok=True)
-
-        db_file_exists = os.path.exists(self.articles_db_path)
-
         logger.info("Creating the data base...")
         print("Creating the data base...")
 
         try:
-            async with aiosqlite.connect(self.articles_db_path) as db:
-                # If the file doesn't exist, we create the table for the first time
-                if not db_file_exists:
-                    await db.execute(
-                        """
-                        CREATE TABLE IF NOT EXISTS articles (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            source TEXT NOT NULL,
-                            headline TEXT NOT NULL,
-                            link TEXT NOT NULL UNIQUE,
-                            highlights TEXT,
-                            openai_summary TEXT,
-                            date_scraped TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        );
-                    """
-                    )
-                    await db.commit()
-                    print("Database and table created successfully.")
-                else:
-                    print("Database file already exists. Skipping table creation.")
+            version = await MigrationRunner(
+                self.articles_db_path, ARTICLES_MIGRATIONS
+            ).migrate()
+            print(f"Database ready at schema version {version}.")
         except aiosqlite.Error as e:
             logger.error("Error creating the database: %s", e)
             print("Error creating the database: ", e)
 
+        await self.warm_seen_links()
+        await self.metrics.init_db()
+
+    async def close(self):
+        """
+        Flushes the queued writes of the articles and metrics data bases on shutdown.
+        """
+        await self.write_queue.close()
+        await self.metrics.close()
+
     async def recreate_data_base(self):
         """
         Recreates the SQLite database by deleting the existing file and initializing a new one.
@@ -84,12 +389,64 @@ class DataBaseHandler:
         print("Recreating the data base...")
 
         os.remove(self.articles_db_path)
+        self.seen_links.clear()
 
         await self.init_db()
 
+    async def warm_seen_links(self, batch_size=10000):
+        """
+        Loads the links of the stored articles into the seen link index.
+        Runs once, later inserts keep the index up to date.
+        Args:
+            batch_size (int): The number of links read at a time.
+        """
+        if self.seen_links.warmed:
+            return
+
+        try:
+            async with aiosqlite.connect(self.articles_db_path) as db:
+                cursor = await db.execute("SELECT link FROM articles")
+                cursor.arraysize = batch_size
+
+                while rows := await cursor.fetchmany():
+                    self.seen_links.add_many([row[0] for row in rows])
+        except aiosqlite.Error as e:
+            logger.error("Error warming the seen links: %s", e)
+            return
+
+        self.seen_links.warmed = True
+        logger.info("Seen link index warmed with %d links", len(self.seen_links))
+
+    async def filter_unseen_links(self, links):
+        """
+        Returns the links that are not stored yet, without touching the data base
+        for the links the index knows. The "maybe seen" answers of a bloom filter are
+        confirmed with a single query, so no new article is ever dropped.
+        Args:
+            links (list): The scraped article links.
+        Returns:
+            list: The links that are not in the data base, in their original order.
+        """
+        new_links, seen_links = self.seen_links.split_links(links)
+
+        if self.seen_links.is_exact or not seen_links:
+            return new_links
+
+        async with aiosqlite.connect(self.articles_db_path) as db:
+            cursor = await db.execute(
+                f"SELECT link FROM articles WHERE link IN "
+                f"({', '.join('?' * len(seen_links))})",
+                seen_links,
+            )
+            stored = {row[0] for row in await cursor.fetchall()}
+
+        new_links = set(new_links) | (set(seen_links) - stored)
+
+        return [link for link in links if link in new_links]
+
     async def update_article_summary_in_db(self, link, summary):
         """
-        Update the openai_summary for the article matching the given link.
+        Update the openai_summary and sentiment of the article matching the given link.
         Args:
             link (str): The unique link of the article to update.
             summary (str): The new summary to set for the article.
@@ -99,16 +456,15 @@ class DataBaseHandler:
             return []
 
         try:
-            async with aiosqlite.connect(self.articles_db_path) as db:
-                await db.execute(
-                    """
-                    UPDATE articles
-                    SET openai_summary = ?
-                    WHERE link = ?
-                """,
-                    (summary, link),
-                )
-                await db.commit()
+            # Classified once here, so the sentiment is never recomputed on read
+            await self.write_queue.execute(
+                """
+                UPDATE articles
+                SET openai_summary = ?, sentiment = ?
+                WHERE link = ?
+            """,
+                (summary, classify_sentiment(summary), link),
+            )
             logger.info("Article summary updated in DB successfully.")
         except aiosqlite.Error as e:
             logger.error("Error updating article summary in DB: %s", e)
@@ -131,24 +487,17 @@ class DataBaseHandler:
             return []
 
         try:
-            async with aiosqlite.connect(self.articles_db_path) as db:
-                # 1) Insert OR IGNORE
-                await db.execute(
-                    """
-                    INSERT OR IGNORE INTO articles (source, headline, link, highlights)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (source, headline, link, highlights),
-                )
-
-                # 2) Check how many rows were changed by the *immediately previous* statement
-                cursor = await db.execute("SELECT changes()")
-                row = await cursor.fetchone()
-                # row[0] will be 1 if inserted, 0 if ignored
-                row_inserted = row[0] if row else 0
-
-                # 3) Commit your changes
-                await db.commit()
+            # The row count is 1 if inserted, 0 if ignored
+            row_inserted = await self.write_queue.execute(
+                """
+                INSERT OR IGNORE INTO articles (source, headline, link, highlights)
+                VALUES (?, ?, ?, ?)
+            """,
+                (source, headline, link, highlights),
+            )
+
+            # The link is stored now, whether it was new or not
+            self.seen_links.add(link)
 
             logger.info("Article saved to DB successfully: %s", headline)
             return row_inserted
@@ -160,12 +509,10 @@ class DataBaseHandler:
 
     async def fetch_todays_news(self):
         """
-        Fetches all articles from today (YYYY-MM-DD) from the SQLite database.
+        Fetches all articles from today (UTC) from the SQLite database.
         Returns:
             list: List of tuples with article data for today.
         """
-        today_date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
-
         if not self.article_db_exists():
             logger.warning("Articles database does not exist. Returning empty list.")
             return []
@@ -173,18 +520,42 @@ class DataBaseHandler:
         async with aiosqlite.connect(self.articles_db_path) as conn:
             cursor = await conn.cursor()
 
-            query = """
-                SELECT source, headline, link, highlights, openai_summary, date_scraped
-                FROM articles
-                WHERE DATE(date_scraped) = ?
-                ORDER BY date_scraped DESC
-            """
-
-            await cursor.execute(query, (today_date,))
+            await cursor.execute(TODAYS_NEWS_QUERY, get_day_range())
             news_data = await cursor.fetchall()
 
             return news_data  # Returns all articles from today
 
+    async def count_articles_by_source(self, start, end):
+        """
+        Counts the articles scraped in the half-open [start, end) range for each source.
+        Args:
+            start (str): Inclusive lower bound formatted as an SQLite timestamp.
+            end (str): Exclusive upper bound formatted as an SQLite timestamp.
+        Returns:
+            list: List of tuples with source and count of articles.
+        """
+        if not self.article_db_exists():
+            logger.warning("Articles database does not exist. Returning empty list.")
+            return []
+
+        async with aiosqlite.connect(self.articles_db_path) as db:
+            cursor = await db.execute(ARTICLE_COUNTS_QUERY, (start, end))
+            return await cursor.fetchall()
+
+    async def explain_query_plan(self, query, params=()):
+        """
+        Returns the SQLite query plan of the given query against the articles database.
+        Args:
+            query (str): The SQL query to explain.
+            params (tuple): The parameters of the query.
+        Returns:
+            list: The detail column of every EXPLAIN QUERY PLAN row.
+        """
+        async with aiosqlite.connect(self.articles_db_path) as db:
+            cursor = await db.execute(f"EXPLAIN QUERY PLAN {query}", params)
+            rows = await cursor.fetchall()
+            return [row[3] for row in rows]
+
     async def search_articles_by_tag(self, tag=None, limit=10):
         """
         Search articles in SQLite by a single tag.
@@ -206,10 +577,10 @@ class DataBaseHandler:
                 FROM articles
                 {"WHERE lower(highlights) LIKE ?" if cleaned_tag else ""}
                 ORDER BY date_scraped DESC
-                LIMIT {limit}
+                LIMIT ?
             """
 
-            params = (f"%{cleaned_tag}%",) if cleaned_tag else ()
+            params = ((f"%{cleaned_tag}%",) if cleaned_tag else ()) + (limit,)
             cursor = await db.execute(query, params)
             rows = await cursor.fetchall()
             return rows
@@ -252,43 +623,83 @@ class DataBaseHandler:
                FROM articles
                WHERE {where_clause}
                ORDER BY date_scraped DESC
-               LIMIT {limit}
+               LIMIT ?
            """
 
         async with aiosqlite.connect(self.articles_db_path) as db:
-            cursor = await db.execute(query, params)
+            cursor = await db.execute(query, [*params, limit])
             rows = await cursor.fetchall()
             return rows
 
+    async def fetch_search_batch(self, tags=None, match_any=True, after=None, limit=10):
+        """
+        Fetches one keyset page of search results.
+        Args:
+            tags (list, optional): Tags the highlights must contain.
+            match_any (bool): If True any tag matches, otherwise all tags must match.
+            after (tuple, optional): The (date_scraped, id) key to continue after.
+            limit (int): Maximum number of rows to return.
+        Returns:
+            list: Tuples of (id, headline, link, highlights, openai_summary, date_scraped).
+        """
+        query, params = build_search_query(tags, match_any, after)
+
+        async with aiosqlite.connect(self.articles_db_path) as db:
+            cursor = await db.execute(query, [*params, limit])
+            return await cursor.fetchall()
+
+    async def search_articles_page(
+        self, tags=None, page_size=10, cursor=None, match_any=True
+    ):
+        """
+        Returns one page of articles matching the tags, newest first.
+        Args:
+            tags (list, optional): Tags the highlights must contain.
+            page_size (int): Number of articles per page.
+            cursor (str, optional): The token of the page to return, None for the first.
+            match_any (bool): If True any tag matches, otherwise all tags must match.
+        Returns:
+            tuple: The rows of the page and the token of the next page,
+            or None if this is the last page.
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        if not self.article_db_exists():
+            logger.warning("Articles database does not exist. Returning empty page.")
+            return [], None
+
+        after = decode_search_cursor(cursor) if cursor else None
+
+        # One extra row tells whether another page exists
+        rows = await self.fetch_search_batch(tags, match_any, after, page_size + 1)
+
+        if len(rows) <= page_size:
+            return rows, None
+
+        rows = rows[:page_size]
+        return rows, encode_search_cursor(rows[-1][5], rows[-1][0])
+
     async def get_daily_article_counts(self):
         """
         Returns how many articles were inserted for each source in the last 24 hours.
         Returns:
             list: List of tuples with source and count of articles.
         """
-        sources = {"crypto.news", "bitcoinmagazine", "cointelegraph"}
-
         if not self.article_db_exists():
             logger.warning("Articles database does not exist. Returning empty list.")
             return []
 
-        async with aiosqlite.connect(self.articles_db_path) as db:
-            query = """
-                SELECT source, COUNT(*) 
-                FROM articles
-                WHERE date_scraped >= DATETIME('now', '-1 day')
-                GROUP BY source
-            """
-            cursor = await db.execute(query)
-            results = await cursor.fetchall()
+        results = await self.count_articles_by_source(
+            *get_rolling_range(datetime.timedelta(days=1))
+        )
 
-            # Convert results into a dictionary for easy lookup
-            counts = dict(results)
+        # Convert results into a dictionary for easy lookup
+        counts = dict(results)
 
-            # Ensure all three sources are included with at least 0
-            final_counts = [(source, counts.get(source, 0)) for source in sources]
+        # Ensure all three sources are included with at least 0
+        final_counts = [(source, counts.get(source, 0)) for source in ARTICLE_SOURCES]
 
-            return final_counts
+        return final_counts
 
     async def get_weekly_article_counts(self):
         """
@@ -297,20 +708,9 @@ class DataBaseHandler:
         Returns:
             list: List of tuples with source and count of articles in the last 7 days.
         """
-        if not self.article_db_exists():
-            logger.warning("Articles database does not exist. Returning empty list.")
-            return []
-
-        async with aiosqlite.connect(self.articles_db_path) as db:
-            query = """
-                SELECT source, COUNT(*) 
-                FROM articles
-                WHERE date_scraped >= DATETIME('now', '-7 days')
-                GROUP BY source
-            """
-            cursor = await db.execute(query)
-            results = await cursor.fetchall()
-            return results
+        return await self.count_articles_by_source(
+            *get_rolling_range(datetime.timedelta(days=7))
+        )
 
     async def get_monthly_article_counts(self):
         """
@@ -319,20 +719,49 @@ class DataBaseHandler:
         Returns:
             list: List of tuples with source and count of articles in the current month.
         """
+        return await self.count_articles_by_source(*get_month_range())
+
+    async def get_article_stats(self):
+        """
+        Returns the per-source article counts for the last 24 hours, the last 7 days
+        and the current month, computed with a single grouped query.
+        Example return: {"daily": [("crypto.news", 3), ...], "weekly": [...], "monthly": [...]}
+        Returns:
+            dict: Lists of (source, count) tuples keyed by "daily", "weekly" and "monthly".
+        """
+        stats = {"daily": [], "weekly": [], "monthly": []}
+
         if not self.article_db_exists():
-            logger.warning("Articles database does not exist. Returning empty list.")
-            return []
+            logger.warning("Articles database does not exist. Returning empty stats.")
+            return stats
+
+        daily_start, end = get_rolling_range(datetime.timedelta(days=1))
+        weekly_start, _ = get_rolling_range(datetime.timedelta(days=7))
+        monthly_start, _ = get_month_range()
 
         async with aiosqlite.connect(self.articles_db_path) as db:
-            query = """
-                SELECT source, COUNT(*)
-                FROM articles
-                WHERE strftime('%Y-%m', date_scraped) = strftime('%Y-%m', 'now')
-                GROUP BY source
-            """
-            cursor = await db.execute(query)
-            results = await cursor.fetchall()
-            return results
+            cursor = await db.execute(
+                ARTICLE_STATS_QUERY,
+                (
+                    daily_start,
+                    weekly_start,
+                    monthly_start,
+                    min(weekly_start, monthly_start),
+                    end,
+                ),
+            )
+            rows = await cursor.fetchall()
+
+        daily = {source: daily_count for source, daily_count, _, _ in rows}
+
+        # The daily stats always list every source, the others only the active ones
+        stats["daily"] = [(source, daily.get(source, 0)) for source in ARTICLE_SOURCES]
+        stats["weekly"] = [(source, weekly) for source, _, weekly, _ in rows if weekly]
+        stats["monthly"] = [
+            (source, monthly) for source, _, _, monthly in rows if monthly
+        ]
+
+        return stats
 
     async def show_stats(self, update):
         """
@@ -341,10 +770,10 @@ class DataBaseHandler:
         Args:
             update: The Telegram update object to send the message.
         """
-        # Suppose we want to display daily, weekly, and monthly counts
-        daily = await self.get_daily_article_counts()
-        weekly = await self.get_weekly_article_counts()
-        monthly = await self.get_monthly_article_counts()
+        stats = await self.get_article_stats()
+        daily = stats["daily"]
+        weekly = stats["weekly"]
+        monthly = stats["monthly"]
 
         # Build a message or log it
         lines = ["<b>Daily Stats:</b>"]
@@ -367,167 +796,107 @@ class DataBaseHandler:
 
     async def store_daily_stats(self):
         """
-        Stores the Fear & Greed index in an SQLite database.
+        Stores the number of articles scraped in the last 24 hours for each source.
         """
-        if not self.daily_stats_db_exists():
-            logger.warning("Daily stats database does not exist. Returning empty list.")
+        daily = dict(await self.get_daily_article_counts())
+
+        if not daily:
+            logger.warning("No daily stats available. Skipping the save.")
             return
 
-        async with aiosqlite.connect(self.daily_stats_db_path) as db:
-            await db.execute(
-                """
-                        CREATE TABLE IF NOT EXISTS daily_stats (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            crypto_news INTEGER,
-                            cointelegraph INTEGER,
-                            bitcoinmagazine INTEGER,
-                            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    """
-            )
-            daily = dict(await self.get_daily_article_counts())
-
-            await db.execute(
-                "INSERT INTO daily_stats (crypto_news, cointelegraph, bitcoinmagazine) "
-                "VALUES (?, ?, ?)",
-                (
-                    daily["crypto.news"],
-                    daily["cointelegraph"],
-                    daily["bitcoinmagazine"],
-                ),
-            )
-            await db.commit()
+        await self.metrics.write_points(
+            [
+                (series, None, daily[source], None)
+                for source, series in SOURCE_SERIES.items()
+            ]
+        )
 
     async def store_fear_greed(self, index_value, index_text, last_updated):
         """
-        Stores the Fear & Greed index in an SQLite database.
+        Stores the Fear & Greed index in the metrics data base.
         Args:
             index_value (int): The value of the Fear & Greed index.
             index_text (str): The text description of the index value.
-            last_updated (str): The timestamp when the index was last updated.
+            last_updated (str): The UTC timestamp when the index was last updated.
         """
-        if not self.fear_greed_db_exists():
-            logger.warning("Daily stats database does not exist. Returning empty list.")
+        if index_value is None:
+            logger.warning("No Fear & Greed index available. Skipping the save.")
             return
 
-        async with aiosqlite.connect(self.fear_greed_db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS fear_greed (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    index_value INTEGER,
-                    index_text TEXT,
-                    last_updated TEXT
-                )
-            """
-            )
-            await db.execute(
-                "INSERT INTO fear_greed (index_value, index_text, last_updated) VALUES (?, ?, ?)",
-                (index_value, index_text, last_updated),
-            )
-            await db.commit()
+        await self.metrics.write(
+            MetricSeries.FEAR_GREED_INDEX,
+            float(index_value),
+            label=index_text,
+            timestamp=last_updated,
+        )
 
     async def store_eth_gas_fee(self, safe_gas, propose_gas, fast_gas):
         """
-        Stores the Fear & Greed index in an SQLite database.
+        Stores the ETH gas fees in the metrics data base.
         Args:
             safe_gas (float): The safe gas fee.
             propose_gas (float): The proposed gas fee.
             fast_gas (float): The fast gas fee.
         """
-        if not self.eth_gas_fee_db_exists():
-            logger.warning("Daily stats database does not exist. Returning empty list.")
+        if safe_gas is None or propose_gas is None or fast_gas is None:
+            logger.warning("No ETH gas fees available. Skipping the save.")
             return
 
-        async with aiosqlite.connect(self.eth_gas_fee_db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS fear_greed (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    safe_gas REAL,
-                    propose_gas REAL,
-                    fast_gas REAL,
-                    saved_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            )
-            await db.execute(
-                "INSERT INTO fear_greed (safe_gas, propose_gas, fast_gas) VALUES (?, ?, ?)",
-                (safe_gas, propose_gas, fast_gas),
-            )
-            await db.commit()
+        await self.metrics.write_points(
+            [
+                (MetricSeries.ETH_GAS_SAFE, None, float(safe_gas), None),
+                (MetricSeries.ETH_GAS_PROPOSE, None, float(propose_gas), None),
+                (MetricSeries.ETH_GAS_FAST, None, float(fast_gas), None),
+            ]
+        )
 
-    async def store_market_sentiment(self, sentiment_counts):
+    async def get_daily_sentiment_counts(self, now=None):
         """
-        Stores the Fear & Greed index in an SQLite database.
+        Returns how many of today's articles have each sentiment.
         Args:
-            sentiment_counts (dict): A dictionary containing counts for each sentiment type.
-                Example: {"Unknown": 10, "Negative": 20, "Neutral": 30, "Positive": 40}
+            now (datetime, optional): The reference time, defaults to the current UTC time.
+        Returns:
+            dict: The count of every sentiment, including the ones with no article.
         """
-        if not self.market_sentiment_db_exists():
-            logger.warning("Daily stats database does not exist. Returning empty list.")
-            return
+        sentiment_counts = dict.fromkeys(SENTIMENT_SERIES, 0)
 
-        async with aiosqlite.connect(self.market_sentiment_db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS fear_greed (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    unknown INTEGER,
-                    negative INTEGER,
-                    neutral INTEGER,
-                    positive INTEGER,
-                    saved_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            )
-            await db.execute(
-                "INSERT INTO fear_greed (unknown, negative, neutral, positive) VALUES (?, ?, ?, ?)",
-                (
-                    sentiment_counts["Unknown"],
-                    sentiment_counts["Negative"],
-                    sentiment_counts["Neutral"],
-                    sentiment_counts["Positive"],
-                ),
-            )
-            await db.commit()
+        if not self.article_db_exists():
+            logger.warning("Articles database does not exist. Returning no sentiment.")
+            return sentiment_counts
 
-    def article_db_exists(self):
-        """
-        Check if the articles database file exists.
-        Returns:
-            bool: True if the database file exists, False otherwise.
-        """
-        return os.path.exists(self.articles_db_path)
+        day = get_day_range(now)[0][:10]
 
-    def daily_stats_db_exists(self):
-        """
-        Check if the daily stats database file exists.
-        Returns:
-            bool: True if the database file exists, False otherwise.
-        """
-        return os.path.exists(self.daily_stats_db_path)
+        try:
+            async with aiosqlite.connect(self.articles_db_path) as db:
+                cursor = await db.execute(DAILY_SENTIMENT_QUERY, (day,))
+                rows = await cursor.fetchall()
+        except aiosqlite.Error as e:
+            logger.error("Error reading the daily sentiment: %s", e)
+            return sentiment_counts
 
-    def fear_greed_db_exists(self):
-        """
-        Check if the Fear & Greed database file exists.
-        Returns:
-            bool: True if the database file exists, False otherwise.
-        """
-        return os.path.exists(self.fear_greed_db_path)
+        for sentiment, count in rows:
+            sentiment_counts[sentiment] = count
 
-    def eth_gas_fee_db_exists(self):
+        return sentiment_counts
+
+    async def store_market_sentiment(self, sentiment_counts):
         """
-        Check if the ETH Gas Fee database file exists.
-        Returns:
-            bool: True if the database file exists, False otherwise.
+        Stores the market sentiment counts in the metrics data base.
+        Args:
+            sentiment_counts (dict): A dictionary containing counts for each sentiment type.
+                Example: {"Unknown": 10, "Negative": 20, "Neutral": 30, "Positive": 40}
         """
-        return os.path.exists(self.eth_gas_fee_db_path)
+        await self.metrics.write_points(
+            [
+                (series, None, sentiment_counts[sentiment], None)
+                for sentiment, series in SENTIMENT_SERIES.items()
+            ]
+        )
 
-    def market_sentiment_db_exists(self):
+    def article_db_exists(self):
         """
-        Check if the Market Sentiment database file exists.
+        Check if the articles database file exists.
         Returns:
             bool: True if the database file exists, False otherwise.
         """
-        return os.path.exists(self.market_sentiment_db_path)
+        return os.path.exists(self.articles_db_path)
@@ -0,0 +1,187 @@
+"""
+file_id_cache.py
+This module remembers the file_id Telegram returns for an uploaded image, keyed by the
+hash of the image content, so an identical plot is sent again by reference instead of
+uploading its bytes once more.
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+import aiosqlite
+
+import src.handlers.load_variables_handler
+from src.data_base.migrations import Migration, MigrationRunner, execute_statements
+
+logger = logging.getLogger(__name__)
+logger.info("File id cache started")
+
+# Append new migrations at the end, never edit or renumber an applied one
+FILE_ID_CACHE_MIGRATIONS = [
+    Migration(
+        1,
+        "Create the file ids table",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS file_ids (
+                bot_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (bot_id, content_hash)
+            ) WITHOUT ROWID
+            """
+        ),
+    ),
+]
+
+
+def get_content_hash(data):
+    """
+    Returns the hash identifying a file content.
+    Args:
+        data (bytes): The file content.
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_bot_id(token):
+    """
+    Returns the id of a bot, the part of its token before the colon, so the secret
+    part is never stored.
+    Args:
+        token (str): The bot token.
+    Returns:
+        str: The bot id.
+    """
+    return str(token).split(":", maxsplit=1)[0]
+
+
+class FileIdCache:
+    """
+    FileIdCache maps (bot, content hash) to the file_id of the upload. A file_id is
+    only valid for the bot that uploaded it, hence the bot in the key. The least
+    recently used entries are dropped past `max_entries`.
+    """
+
+    def __init__(self, db_path="./data_bases/file_ids.db"):
+        """
+        Initializes the FileIdCache.
+        Args:
+            db_path (str): Path to the SQLite data base file.
+        """
+        self.db_path = db_path
+        self.schema_ready = False
+
+        self.max_entries = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the cache settings from the variables file.
+        """
+        variables = src.handlers.load_variables_handler.load_json()
+
+        self.max_entries = variables.get("FILE_ID_CACHE_MAX_ENTRIES", 1000)
+
+    async def init_db(self):
+        """
+        Migrates the cache schema and switches the data base to WAL mode.
+        Runs once per process, later calls return immediately.
+        """
+        # pylint: disable=duplicate-code
+        if self.schema_ready:
+            return
+
+        folder_path = os.path.dirname(self.db_path)
+
+        if folder_path != "":
+            os.makedirs(folder_path, exist_ok=True)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            # The bots of every process share the uploads of each other
+            await db.execute("PRAGMA journal_mode=WAL")
+
+        await MigrationRunner(self.db_path, FILE_ID_CACHE_MIGRATIONS).migrate()
+
+        self.schema_ready = True
+
+    async def get(self, bot_id, content_hash, now=None):
+        """
+        Returns the file_id of a content uploaded by a bot and marks it as used.
+        Args:
+            bot_id (str): The id of the bot.
+            content_hash (str): The hash of the content.
+            now (float, optional): The current time.
+        Returns:
+            str: The file_id, None if the content was never uploaded.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT file_id FROM file_ids WHERE bot_id = ? AND content_hash = ?",
+                (bot_id, content_hash),
+            )
+            row = await cursor.fetchone()
+
+            if row is None:
+                return None
+
+            await db.execute(
+                "UPDATE file_ids SET last_used_at = ? "
+                "WHERE bot_id = ? AND content_hash = ?",
+                (now, bot_id, content_hash),
+            )
+            await db.commit()
+
+        return row[0]
+
+    async def set(self, bot_id, content_hash, file_id, now=None):
+        """
+        Stores the file_id of an upload, dropping the least recently used entries
+        past the maximum.
+        Args:
+            bot_id (str): The id of the bot.
+            content_hash (str): The hash of the content.
+            file_id (str): The file_id Telegram returned.
+            now (float, optional): The current time.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO file_ids "
+                "(bot_id, content_hash, file_id, last_used_at) VALUES (?, ?, ?, ?)",
+                (bot_id, content_hash, file_id, now),
+            )
+            await db.execute(
+                "DELETE FROM file_ids WHERE (bot_id, content_hash) IN ("
+                "SELECT bot_id, content_hash FROM file_ids "
+                "ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            await db.commit()
+
+    async def forget(self, bot_id, content_hash):
+        """
+        Drops a file_id Telegram no longer accepts.
+        Args:
+            bot_id (str): The id of the bot.
+            content_hash (str): The hash of the content.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "DELETE FROM file_ids WHERE bot_id = ? AND content_hash = ?",
+                (bot_id, content_hash),
+            )
+            await db.commit()
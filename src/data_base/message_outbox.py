@@ -0,0 +1,455 @@
+"""
+message_outbox.py
+This module stores the outgoing Telegram messages in SQLite until they are delivered,
+so a message survives a crash of the bot or an outage of Telegram, and the code that
+produces it never waits for Telegram.
+"""
+
+import logging
+import os
+import time
+
+import aiosqlite
+
+import src.handlers.load_variables_handler
+from src.data_base.migrations import Migration, MigrationRunner, execute_statements
+
+logger = logging.getLogger(__name__)
+logger.info("Message outbox started")
+
+# The lower priorities are sent first
+PRIORITY_IMPORTANT = 0
+PRIORITY_PARTIAL = 1
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_DEAD = "dead"
+
+# Append new migrations at the end, never edit or renumber an applied one
+MESSAGE_OUTBOX_MIGRATIONS = [
+    Migration(
+        1,
+        "Create the outbox table",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                token TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                claimed_at REAL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS outbox_due
+            ON outbox (status, priority, next_attempt_at, id)
+            """,
+        ),
+    ),
+    Migration(
+        2,
+        "Create the digest items table",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS digest_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                token TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS digest_items_chat
+            ON digest_items (token, chat_id, id)
+            """,
+        ),
+    ),
+]
+
+# The due messages, plus the ones claimed by a dispatcher that died while sending
+CLAIMABLE_CONDITION = """
+    (status = 'pending' AND next_attempt_at <= ?)
+    OR (status = 'sending' AND claimed_at <= ?)
+"""
+
+
+# pylint: disable=too-few-public-methods
+class OutboxMessage:
+    """
+    A message of the outbox, to one chat.
+    """
+
+    __slots__ = ("id", "token", "chat_id", "text", "priority", "attempts")
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, message_id, token, chat_id, text, priority, attempts):
+        """
+        Initializes the OutboxMessage.
+        Args:
+            message_id (int): The row id.
+            token (str): The token of the bot sending it.
+            chat_id (str): The chat to send it to.
+            text (str): The HTML message.
+            priority (int): PRIORITY_IMPORTANT or PRIORITY_PARTIAL.
+            attempts (int): The failed deliveries so far.
+        """
+        self.id = message_id
+        self.token = token
+        self.chat_id = chat_id
+        self.text = text
+        self.priority = priority
+        self.attempts = attempts
+
+
+class MessageOutbox:
+    """
+    MessageOutbox is a durable queue of messages, one row per chat. A dispatcher
+    claims the due rows in priority order, deletes them once delivered, and
+    reschedules the failed ones with an exponential backoff until they run out of
+    attempts and are kept as dead letters.
+    The chats in digest mode collect their items here until the digest is due,
+    then the items are rendered and queued as messages in the same transaction.
+    """
+
+    def __init__(self, db_path="./data_bases/outbox.db"):
+        """
+        Initializes the MessageOutbox.
+        Args:
+            db_path (str): Path to the SQLite data base file shared by the bots.
+        """
+        self.db_path = db_path
+        self.schema_ready = False
+
+        self.max_attempts = None
+        self.retry_delay = None
+        self.claim_timeout = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the retry settings from the variables file.
+        """
+        variables = src.handlers.load_variables_handler.load_json()
+
+        self.max_attempts = variables.get("OUTBOX_MAX_ATTEMPTS", 5)
+        self.retry_delay = variables.get("OUTBOX_RETRY_DELAY", 30)
+        self.claim_timeout = variables.get("OUTBOX_CLAIM_TIMEOUT", 300)
+
+    async def init_db(self):
+        """
+        Migrates the outbox schema and switches the data base to WAL mode.
+        Runs once per process, later calls return immediately.
+        """
+        if self.schema_ready:
+            return
+
+        folder_path = os.path.dirname(self.db_path)
+
+        if folder_path != "":
+            os.makedirs(folder_path, exist_ok=True)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("PRAGMA journal_mode=WAL")
+
+        await MigrationRunner(self.db_path, MESSAGE_OUTBOX_MIGRATIONS).migrate()
+
+        self.schema_ready = True
+        logger.info("Message outbox ready: %s", self.db_path)
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    async def enqueue(self, token, chat_ids, text, priority=PRIORITY_PARTIAL, now=None):
+        """
+        Queues a message for several chats in one transaction.
+        Args:
+            token (str): The token of the bot sending it.
+            chat_ids (iterable): The chats to send it to.
+            text (str): The HTML message.
+            priority (int): PRIORITY_IMPORTANT or PRIORITY_PARTIAL.
+            now (float, optional): The enqueue time.
+        Returns:
+            int: The number of rows queued.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        rows = [
+            (token, str(chat_id), text, priority, STATUS_PENDING, now, now)
+            for chat_id in chat_ids
+        ]
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "INSERT INTO outbox "
+                "(token, chat_id, text, priority, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            await db.commit()
+
+        return len(rows)
+
+    async def claim(self, limit, now=None):
+        """
+        Claims the next due messages, the most important and oldest first.
+        Args:
+            limit (int): The maximum number of messages.
+            now (float, optional): The claim time.
+        Returns:
+            list: The claimed OutboxMessages.
+        """
+        await self.init_db()
+        now = now or time.time()
+        stale = now - self.claim_timeout
+
+        async with aiosqlite.connect(self.db_path) as db:
+            # Take the write lock first, so two dispatchers never claim the same rows
+            await db.execute("BEGIN IMMEDIATE")
+
+            cursor = await db.execute(
+                "SELECT id, token, chat_id, text, priority, attempts FROM outbox "
+                f"WHERE {CLAIMABLE_CONDITION} "
+                "ORDER BY priority, id LIMIT ?",
+                (now, stale, limit),
+            )
+            rows = await cursor.fetchall()
+
+            await db.executemany(
+                "UPDATE outbox SET status = ?, claimed_at = ? WHERE id = ?",
+                [(STATUS_SENDING, now, row[0]) for row in rows],
+            )
+            await db.commit()
+
+        return [OutboxMessage(*row) for row in rows]
+
+    async def acknowledge(self, message_ids):
+        """
+        Removes the delivered messages.
+        Args:
+            message_ids (list): The ids of the delivered messages.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "DELETE FROM outbox WHERE id = ?",
+                [(message_id,) for message_id in message_ids],
+            )
+            await db.commit()
+
+    async def fail(self, message, error, permanent=False, now=None):
+        """
+        Reschedules a message that was not delivered, or dead-letters it once it
+        ran out of attempts or can never be delivered.
+        Args:
+            message (OutboxMessage): The claimed message.
+            error (str): Why the delivery failed.
+            permanent (bool): True if sending it again would fail the same way.
+            now (float, optional): The failure time.
+        Returns:
+            bool: True if the message was dead-lettered.
+        """
+        now = now or time.time()
+        attempts = message.attempts + 1
+        dead = permanent or attempts >= self.max_attempts
+
+        status = STATUS_DEAD if dead else STATUS_PENDING
+        next_attempt_at = now + self.retry_delay * 2 ** (attempts - 1)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, "
+                "claimed_at = NULL, last_error = ? WHERE id = ?",
+                (status, attempts, next_attempt_at, error, message.id),
+            )
+            await db.commit()
+
+        if dead:
+            logger.error(
+                "Dead-lettered the message %d to %s after %d attempts: %s",
+                message.id,
+                message.chat_id,
+                attempts,
+                error,
+            )
+
+        return dead
+
+    async def get_next_attempt_at(self):
+        """
+        Returns when the next queued message is due.
+        Returns:
+            float: The UNIX time, or None if nothing is waiting to be sent.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT MIN(CASE WHEN status = 'pending' THEN next_attempt_at "
+                "ELSE claimed_at + ? END) FROM outbox WHERE status != 'dead'",
+                (self.claim_timeout,),
+            )
+            row = await cursor.fetchone()
+
+        return row[0]
+
+    async def get_depth(self):
+        """
+        Returns the number of messages of each status.
+        Returns:
+            dict: The counts by status.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+            )
+            rows = await cursor.fetchall()
+
+        return dict(rows)
+
+    async def get_dead_letters(self, limit=100):
+        """
+        Returns the dead-lettered messages, the newest first.
+        Args:
+            limit (int): The maximum number of messages.
+        Returns:
+            list: The (id, chat_id, text, attempts, last_error) rows.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT id, chat_id, text, attempts, last_error FROM outbox "
+                "WHERE status = 'dead' ORDER BY id DESC LIMIT ?",
+                (limit,),
+            )
+            return await cursor.fetchall()
+
+    async def requeue_dead_letters(self, now=None):
+        """
+        Queues the dead-lettered messages again, e.g. after a chat was fixed.
+        Args:
+            now (float, optional): The requeue time.
+        Returns:
+            int: The number of messages queued again.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, "
+                "next_attempt_at = ? WHERE status = 'dead'",
+                (now,),
+            )
+            await db.commit()
+
+        return cursor.rowcount
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    async def add_digest_items(self, token, chat_ids, item, priority, now=None):
+        """
+        Collects an item for the next digest of several chats.
+        Args:
+            token (str): The token of the bot sending the digest.
+            chat_ids (iterable): The chats in digest mode.
+            item (str): The HTML item.
+            priority (int): PRIORITY_IMPORTANT or PRIORITY_PARTIAL.
+            now (float, optional): The time of the item.
+        Returns:
+            int: The number of items collected.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        rows = [(token, str(chat_id), priority, item, now) for chat_id in chat_ids]
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "INSERT INTO digest_items (token, chat_id, priority, item, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            await db.commit()
+
+        return len(rows)
+
+    async def get_due_digests(self, window, max_items, now=None):
+        """
+        Returns the chats whose digest is due, because its oldest item waited for
+        `window` seconds or it collected `max_items` items.
+        Args:
+            window (float): The maximum wait of an item, in seconds.
+            max_items (int): The number of items that makes a digest due.
+            now (float, optional): The current time.
+        Returns:
+            list: The (token, chat_id) of the due digests.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT token, chat_id FROM digest_items GROUP BY token, chat_id "
+                "HAVING MIN(created_at) <= ? OR COUNT(*) >= ?",
+                (now - window, max_items),
+            )
+            return await cursor.fetchall()
+
+    async def flush_digest(self, token, chat_id, render, now=None):
+        """
+        Renders the collected items of a chat and queues the digest messages.
+        Args:
+            token (str): The token of the bot sending the digest.
+            chat_id (str): The chat.
+            render (callable): `render(items)` returning the digest messages.
+            now (float, optional): The current time.
+        Returns:
+            int: The number of messages queued.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            # The items and the messages change together, an item is never lost
+            # nor sent twice
+            await db.execute("BEGIN IMMEDIATE")
+
+            cursor = await db.execute(
+                "SELECT id, priority, item FROM digest_items "
+                "WHERE token = ? AND chat_id = ? ORDER BY id",
+                (token, chat_id),
+            )
+            rows = await cursor.fetchall()
+
+            if not rows:
+                await db.rollback()
+                return 0
+
+            priority = min(row[1] for row in rows)
+            messages = render([row[2] for row in rows])
+
+            await db.executemany(
+                "INSERT INTO outbox "
+                "(token, chat_id, text, priority, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (token, chat_id, text, priority, STATUS_PENDING, now, now)
+                    for text in messages
+                ],
+            )
+            await db.execute(
+                "DELETE FROM digest_items WHERE token = ? AND chat_id = ? AND id <= ?",
+                (token, chat_id, rows[-1][0]),
+            )
+            await db.commit()
+
+        return len(messages)
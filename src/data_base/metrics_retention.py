@@ -0,0 +1,290 @@
+"""
+metrics_retention.py
+This module downsamples the raw metric points into hourly, daily and weekly buckets
+and prunes the raw points that are older than the configured horizon.
+"""
+
+import asyncio
+import logging
+import time
+
+import aiosqlite
+import numpy as np
+
+from src.data_base.metrics_store import (
+    MetricSeries,
+    MetricsStore,
+    Resolution,
+    aggregate_buckets,
+    get_bucket_start,
+)
+from src.handlers.load_variables_handler import load_json
+
+logger = logging.getLogger(__name__)
+logger.info("Metrics retention started")
+
+
+class MetricsRetention:
+    """
+    MetricsRetention rolls the raw points of every series into closed hourly, daily
+    and weekly buckets (count, min, max, sum, last) and deletes the raw points that
+    are both past the retention horizon and already rolled up.
+    Every pass only handles a bounded amount of work, so it can run in the background.
+    Points written behind a watermark get their buckets rolled up again.
+    """
+
+    def __init__(self, metrics_store=None):
+        """
+        Initializes the MetricsRetention with default values and loads configuration.
+        Args:
+            metrics_store (MetricsStore, optional): The store to compact.
+        """
+        self.metrics_store = metrics_store or MetricsStore()
+
+        self.raw_retention_days = None
+        self.interval = None
+        self.max_buckets_per_pass = None
+        self.max_deletes_per_pass = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the retention settings from the variables file.
+        """
+        variables = load_json()
+
+        self.raw_retention_days = variables.get("METRICS_RAW_RETENTION_DAYS", 30)
+        self.interval = variables.get("METRICS_RETENTION_INTERVAL", 3600)
+        self.max_buckets_per_pass = variables.get(
+            "METRICS_ROLLUP_BUCKETS_PER_PASS", 500
+        )
+        self.max_deletes_per_pass = variables.get("METRICS_PRUNE_ROWS_PER_PASS", 10000)
+
+    async def get_watermark(self, db, series, resolution):
+        """
+        Returns the timestamp up to which the series is already rolled up.
+        Starts from the first raw point when the series was never rolled up.
+        Args:
+            db (aiosqlite.Connection): The open metrics data base.
+            series (MetricSeries): The series.
+            resolution (Resolution): The bucket size.
+        Returns:
+            int: The watermark, or None if the series has no points.
+        """
+        cursor = await db.execute(
+            "SELECT watermark FROM metric_rollup_state "
+            "WHERE series = ? AND resolution = ?",
+            (int(series), int(resolution)),
+        )
+        row = await cursor.fetchone()
+        if row is not None:
+            return row[0]
+
+        cursor = await db.execute(
+            "SELECT MIN(timestamp) FROM metrics WHERE series = ?", (int(series),)
+        )
+        row = await cursor.fetchone()
+        if row[0] is None:
+            return None
+
+        return int(get_bucket_start(row[0], resolution))
+
+    async def write_rollups(self, db, series, resolution, rows):
+        """
+        Aggregates raw points into buckets and stores them, replacing the buckets
+        already stored.
+        Args:
+            db (aiosqlite.Connection): The open metrics data base.
+            series (MetricSeries): The series of the points.
+            resolution (Resolution): The bucket size.
+            rows (list): The (timestamp, value) points, sorted by timestamp.
+        Returns:
+            int: The number of buckets written.
+        """
+        if not rows:
+            return 0
+
+        data = np.array(rows, dtype=np.float64)
+        buckets = aggregate_buckets(data[:, 0].astype(np.int64), data[:, 1], resolution)
+
+        await db.executemany(
+            "INSERT OR REPLACE INTO metric_rollups "
+            "(series, resolution, bucket_start, count, min, max, sum, last) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (int(series), int(resolution), *bucket)
+                for bucket in zip(*(column.tolist() for column in buckets))
+            ],
+        )
+
+        return len(buckets[0])
+
+    async def rollup_late_points(self, db, series, resolution, now):
+        """
+        Rolls up again the buckets that points were written to after the watermark
+        passed them. Buckets past the retention horizon may have lost raw points
+        to the pruning, so they are left as they are.
+        Args:
+            db (aiosqlite.Connection): The open metrics data base.
+            series (MetricSeries): The series to roll up.
+            resolution (Resolution): The bucket size.
+            now (int): The current unix time.
+        Returns:
+            int: The number of buckets written.
+        """
+        cursor = await db.execute(
+            "SELECT bucket_start FROM metric_rollup_dirty "
+            "WHERE series = ? AND resolution = ? ORDER BY bucket_start LIMIT ?",
+            (int(series), int(resolution), self.max_buckets_per_pass),
+        )
+        bucket_starts = [row[0] for row in await cursor.fetchall()]
+
+        if not bucket_starts:
+            return 0
+
+        horizon = now - int(self.raw_retention_days * Resolution.DAILY)
+        written = 0
+
+        for bucket_start in bucket_starts:
+            if bucket_start < horizon:
+                logger.warning(
+                    "Late point of %s in the pruned %s bucket %d not rolled up",
+                    series.name,
+                    resolution.name,
+                    bucket_start,
+                )
+                continue
+
+            cursor = await db.execute(
+                "SELECT timestamp, value FROM metrics "
+                "WHERE series = ? AND timestamp >= ? AND timestamp < ? "
+                "AND value IS NOT NULL ORDER BY timestamp",
+                (int(series), bucket_start, bucket_start + int(resolution)),
+            )
+            rows = await cursor.fetchall()
+            written += await self.write_rollups(db, series, resolution, rows)
+
+        await db.executemany(
+            "DELETE FROM metric_rollup_dirty "
+            "WHERE series = ? AND resolution = ? AND bucket_start = ?",
+            [(int(series), int(resolution), start) for start in bucket_starts],
+        )
+        await db.commit()
+
+        return written
+
+    async def rollup_series(self, db, series, resolution, now):
+        """
+        Rolls up the next batch of closed buckets of one series.
+        Args:
+            db (aiosqlite.Connection): The open metrics data base.
+            series (MetricSeries): The series to roll up.
+            resolution (Resolution): The bucket size.
+            now (int): The current unix time, only buckets closed before it are built.
+        Returns:
+            int: The number of buckets written.
+        """
+        watermark = await self.get_watermark(db, series, resolution)
+        cutoff = int(get_bucket_start(now, resolution))
+
+        if watermark is None or watermark >= cutoff:
+            return 0
+
+        end = min(cutoff, watermark + int(resolution) * self.max_buckets_per_pass)
+
+        cursor = await db.execute(
+            "SELECT timestamp, value FROM metrics "
+            "WHERE series = ? AND timestamp >= ? AND timestamp < ? "
+            "AND value IS NOT NULL ORDER BY timestamp",
+            (int(series), watermark, end),
+        )
+        rows = await cursor.fetchall()
+
+        written = await self.write_rollups(db, series, resolution, rows)
+
+        await db.execute(
+            "INSERT OR REPLACE INTO metric_rollup_state (series, resolution, watermark) "
+            "VALUES (?, ?, ?)",
+            (int(series), int(resolution), end),
+        )
+        await db.commit()
+
+        return written
+
+    async def prune_series(self, db, series, now):
+        """
+        Deletes the next batch of raw points that are past the retention horizon
+        and already covered by every rollup resolution.
+        Args:
+            db (aiosqlite.Connection): The open metrics data base.
+            series (MetricSeries): The series to prune.
+            now (int): The current unix time.
+        Returns:
+            int: The number of raw points deleted.
+        """
+        cursor = await db.execute(
+            "SELECT COUNT(*), MIN(watermark) FROM metric_rollup_state WHERE series = ?",
+            (int(series),),
+        )
+        resolutions_done, rolled_up_until = await cursor.fetchone()
+
+        # Never delete points that one of the resolutions still has to read
+        if resolutions_done < len(Resolution):
+            return 0
+
+        horizon = now - int(self.raw_retention_days * Resolution.DAILY)
+        bound = min(horizon, rolled_up_until)
+
+        cursor = await db.execute(
+            "DELETE FROM metrics WHERE rowid IN ("
+            "SELECT rowid FROM metrics WHERE series = ? AND timestamp < ? LIMIT ?)",
+            (int(series), bound, self.max_deletes_per_pass),
+        )
+        await db.commit()
+
+        return cursor.rowcount
+
+    async def run_once(self, now=None):
+        """
+        Runs one incremental rollup and prune pass over every series.
+        Args:
+            now (int, optional): The current unix time, defaults to the system clock.
+        Returns:
+            dict: The number of buckets written and raw points deleted.
+        """
+        now = int(now if now is not None else time.time())
+        result = {"buckets": 0, "pruned": 0}
+
+        await self.metrics_store.init_db()
+
+        try:
+            async with aiosqlite.connect(self.metrics_store.db_path) as db:
+                for series in MetricSeries:
+                    for resolution in Resolution:
+                        result["buckets"] += await self.rollup_late_points(
+                            db, series, resolution, now
+                        )
+                        result["buckets"] += await self.rollup_series(
+                            db, series, resolution, now
+                        )
+                    result["pruned"] += await self.prune_series(db, series, now)
+        except aiosqlite.Error as e:
+            logger.error("Error compacting the metrics: %s", e)
+
+        logger.info(
+            "Metrics retention pass: %d buckets written, %d raw points pruned",
+            result["buckets"],
+            result["pruned"],
+        )
+
+        return result
+
+    async def run_forever(self):
+        """
+        Runs the retention passes in the background, every `interval` seconds.
+        """
+        while True:
+            self.reload_the_data()
+            await self.run_once()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,668 @@
+"""
+metrics_store.py
+This module stores every time-series metric of the bots (Fear & Greed index, ETH gas fees,
+market sentiment and daily article stats) in a single SQLite data base.
+"""
+
+import datetime
+import logging
+import os
+from enum import IntEnum
+
+import aiosqlite
+import numpy as np
+import pandas as pd
+
+from src.data_base.migrations import Migration, MigrationRunner, execute_statements
+from src.data_base.write_behind_queue import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+logger.info("Metrics store started")
+
+METRICS_SERIES_TIMESTAMP_INDEX = "idx_metrics_series_timestamp"
+
+READ_ROLLUPS_QUERY = """
+    SELECT bucket_start, count, min, max, sum, last
+    FROM metric_rollups
+    WHERE series = ? AND resolution = ? AND bucket_start >= ? AND bucket_start < ?
+    ORDER BY bucket_start
+"""
+
+READ_SERIES_QUERY = """
+    SELECT timestamp, value
+    FROM metrics
+    WHERE series = ? AND timestamp >= ? AND timestamp < ?
+    ORDER BY timestamp
+"""
+
+
+def get_legacy_metric_files():
+    """
+    Returns the per-metric data bases written before the metrics table. The gas
+    fee and sentiment tables were created under the fear_greed name.
+    Returns:
+        list: Tuples of (file name, query, series), the query selects the UTC
+            timestamp, then a value per series, then an optional label.
+    """
+    return [
+        (
+            "fear_greed.db",
+            "SELECT last_updated, index_value, index_text FROM fear_greed",
+            (MetricSeries.FEAR_GREED_INDEX,),
+        ),
+        (
+            "eth_gas_fee.db",
+            "SELECT saved_date, safe_gas, propose_gas, fast_gas FROM fear_greed",
+            (
+                MetricSeries.ETH_GAS_SAFE,
+                MetricSeries.ETH_GAS_PROPOSE,
+                MetricSeries.ETH_GAS_FAST,
+            ),
+        ),
+        (
+            "market_sentiment.db",
+            "SELECT saved_date, unknown, negative, neutral, positive FROM fear_greed",
+            (
+                MetricSeries.SENTIMENT_UNKNOWN,
+                MetricSeries.SENTIMENT_NEGATIVE,
+                MetricSeries.SENTIMENT_NEUTRAL,
+                MetricSeries.SENTIMENT_POSITIVE,
+            ),
+        ),
+        (
+            "daily_stats.db",
+            "SELECT last_updated, crypto_news, cointelegraph, bitcoinmagazine "
+            "FROM daily_stats",
+            (
+                MetricSeries.ARTICLES_CRYPTO_NEWS,
+                MetricSeries.ARTICLES_COINTELEGRAPH,
+                MetricSeries.ARTICLES_BITCOINMAGAZINE,
+            ),
+        ),
+    ]
+
+
+async def read_legacy_points(path, query, series):
+    """
+    Reads the points of a legacy per-metric data base.
+    Args:
+        path (str): The legacy data base file.
+        query (str): Selects the timestamp, the values and an optional label.
+        series (tuple): The series of each value column.
+    Returns:
+        list: The (series, timestamp, value, label) points.
+    """
+    points = []
+
+    async with aiosqlite.connect(path) as db:
+        cursor = await db.execute(query)
+        rows = await cursor.fetchall()
+
+    for row in rows:
+        try:
+            if row[0] is None:
+                raise ValueError("missing timestamp")
+            timestamp = to_unix_timestamp(row[0])
+        except (TypeError, ValueError):
+            logger.warning("Skipping a legacy point of %s stamped %r", path, row[0])
+            continue
+
+        label = row[len(series) + 1] if len(row) > len(series) + 1 else None
+        points.extend(
+            (int(metric), timestamp, value, label)
+            for metric, value in zip(series, row[1:])
+            if value is not None
+        )
+
+    return points
+
+
+async def import_legacy_metrics(db_path):
+    """
+    Imports the history of the per-metric data bases found next to the metrics
+    data base. Every point is written in one transaction, so an interrupted import
+    is replayed from scratch without duplicates. The legacy files are kept.
+    Args:
+        db_path (str): Path to the metrics data base file.
+    """
+    folder = os.path.dirname(db_path)
+    points = []
+
+    for file_name, query, series in get_legacy_metric_files():
+        path = os.path.join(folder, file_name)
+        if not os.path.exists(path):
+            continue
+
+        try:
+            legacy_points = await read_legacy_points(path, query, series)
+        except aiosqlite.Error as e:
+            logger.warning("Skipping the legacy metrics of %s: %s", path, e)
+            continue
+
+        logger.info("Importing %d legacy points from %s", len(legacy_points), path)
+        points.extend(legacy_points)
+
+    if not points:
+        return
+
+    async with aiosqlite.connect(db_path) as db:
+        await db.executemany(
+            "INSERT INTO metrics (series, timestamp, value, label) "
+            "VALUES (?, ?, ?, ?)",
+            points,
+        )
+        await db.commit()
+
+
+# Append new migrations at the end, never edit or renumber an applied one
+METRICS_MIGRATIONS = [
+    Migration(
+        1,
+        "Create the metric series and points tables",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS metric_series (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS metrics (
+                series INTEGER NOT NULL REFERENCES metric_series (id),
+                timestamp INTEGER NOT NULL,
+                value REAL,
+                label TEXT
+            )
+            """,
+            f"""
+            CREATE INDEX IF NOT EXISTS {METRICS_SERIES_TIMESTAMP_INDEX}
+            ON metrics (series, timestamp)
+            """,
+        ),
+    ),
+    Migration(
+        2,
+        "Create the rollup tables",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS metric_rollups (
+                series INTEGER NOT NULL,
+                resolution INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                min REAL,
+                max REAL,
+                sum REAL,
+                last REAL,
+                PRIMARY KEY (series, resolution, bucket_start)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS metric_rollup_state (
+                series INTEGER NOT NULL,
+                resolution INTEGER NOT NULL,
+                watermark INTEGER NOT NULL,
+                PRIMARY KEY (series, resolution)
+            ) WITHOUT ROWID
+            """,
+        ),
+    ),
+    Migration(
+        3,
+        "Track the rolled up buckets that late points land in",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS metric_rollup_dirty (
+                series INTEGER NOT NULL,
+                resolution INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                PRIMARY KEY (series, resolution, bucket_start)
+            ) WITHOUT ROWID
+            """,
+            # A point stamped before a watermark, e.g. a daily value stamped at
+            # midnight, marks its bucket to be rolled up again. The weekly buckets
+            # start on Monday, 4 days after the unix epoch
+            """
+            CREATE TRIGGER IF NOT EXISTS metrics_mark_late_points
+            AFTER INSERT ON metrics
+            WHEN NEW.value IS NOT NULL
+            BEGIN
+                INSERT OR IGNORE INTO metric_rollup_dirty
+                    (series, resolution, bucket_start)
+                SELECT
+                    NEW.series,
+                    resolution,
+                    NEW.timestamp - (
+                        NEW.timestamp - CASE resolution
+                            WHEN 604800 THEN 345600 ELSE 0 END
+                    ) % resolution
+                FROM metric_rollup_state
+                WHERE series = NEW.series AND NEW.timestamp < watermark;
+            END
+            """,
+        ),
+    ),
+    Migration(
+        4,
+        "Import the history of the per-metric data bases",
+        backfill=import_legacy_metrics,
+    ),
+]
+
+
+class MetricSeries(IntEnum):
+    """
+    Typed identifiers of the stored metric series.
+    The values are persisted, so existing members must never be renumbered.
+    """
+
+    FEAR_GREED_INDEX = 1
+    ETH_GAS_SAFE = 2
+    ETH_GAS_PROPOSE = 3
+    ETH_GAS_FAST = 4
+    SENTIMENT_UNKNOWN = 5
+    SENTIMENT_NEGATIVE = 6
+    SENTIMENT_NEUTRAL = 7
+    SENTIMENT_POSITIVE = 8
+    ARTICLES_CRYPTO_NEWS = 9
+    ARTICLES_COINTELEGRAPH = 10
+    ARTICLES_BITCOINMAGAZINE = 11
+
+
+class Resolution(IntEnum):
+    """
+    Bucket sizes, in seconds, of the downsampled metric series.
+    """
+
+    HOURLY = 3600
+    DAILY = 86400
+    WEEKLY = 604800
+
+
+# Unix time starts on a Thursday, shift the weekly buckets so they start on Monday
+WEEKLY_BUCKET_OFFSET = 4 * Resolution.DAILY
+
+
+def get_bucket_start(timestamp, resolution):
+    """
+    Returns the start of the bucket that contains the given timestamp.
+    Works on plain integers as well as NumPy arrays.
+    Args:
+        timestamp (int | np.ndarray): Unix seconds.
+        resolution (Resolution): The bucket size.
+    Returns:
+        int | np.ndarray: The bucket start(s) in unix seconds.
+    """
+    offset = WEEKLY_BUCKET_OFFSET if resolution == Resolution.WEEKLY else 0
+
+    return timestamp - (timestamp - offset) % int(resolution)
+
+
+def aggregate_buckets(timestamps, values, resolution):
+    """
+    Aggregates sorted raw points into buckets of the given resolution.
+    Args:
+        timestamps (np.ndarray): The sorted unix timestamps of the points.
+        values (np.ndarray): The values of the points.
+        resolution (Resolution): The bucket size.
+    Returns:
+        tuple: NumPy arrays with the bucket start, count, min, max, sum and last value.
+    """
+    buckets = get_bucket_start(timestamps, resolution)
+
+    # Index of the first point of every bucket
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)]
+
+    return (
+        buckets[starts],
+        ends - starts,
+        np.minimum.reduceat(values, starts),
+        np.maximum.reduceat(values, starts),
+        np.add.reduceat(values, starts),
+        values[ends - 1],
+    )
+
+
+def to_unix_timestamp(value=None):
+    """
+    Converts a timestamp to UTC unix seconds.
+    Args:
+        value (datetime | str | int | float, optional): A datetime (naive values are
+            treated as UTC), an "%Y-%m-%d %H:%M:%S" UTC string or unix seconds.
+            Defaults to the current time.
+    Returns:
+        int: The timestamp in unix seconds.
+    """
+    if value is None:
+        value = datetime.datetime.now(datetime.timezone.utc)
+
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return int(value.timestamp())
+
+    return int(value)
+
+
+class MetricsStore:
+    """
+    MetricsStore keeps all metric series in one `metrics` table indexed by (series, timestamp).
+    """
+
+    def __init__(self, db_path="./data_bases/metrics.db"):
+        """
+        Initializes the MetricsStore.
+        Args:
+            db_path (str): Path to the SQLite data base file.
+        """
+        self.db_path = db_path
+        self.schema_ready = False
+
+        # All metric writes are group committed by a single writer
+        self.write_queue = WriteBehindQueue(db_path)
+
+    async def init_db(self):
+        """
+        Migrates the metrics schema and switches the data base to WAL mode.
+        Runs once per process, later calls return immediately.
+        """
+        if self.schema_ready:
+            return
+
+        folder_path = os.path.dirname(self.db_path)
+
+        if folder_path != "":
+            os.makedirs(folder_path, exist_ok=True)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            # The journal mode can not change inside the migration transactions
+            await db.execute("PRAGMA journal_mode=WAL")
+
+        await MigrationRunner(self.db_path, METRICS_MIGRATIONS).migrate()
+
+        # New series are registered on every start, not by a migration
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "INSERT OR IGNORE INTO metric_series (id, name) VALUES (?, ?)",
+                [(series.value, series.name) for series in MetricSeries],
+            )
+            await db.commit()
+
+        self.schema_ready = True
+        logger.info("Metrics data base ready: %s", self.db_path)
+
+    async def write_points(self, points):
+        """
+        Writes several points in a single transaction.
+        Args:
+            points (iterable): Tuples of (series, timestamp, value, label), where
+                the timestamp accepts anything `to_unix_timestamp` does.
+        Returns:
+            int: The number of points written.
+        """
+        rows = [
+            (int(series), to_unix_timestamp(timestamp), value, label)
+            for series, timestamp, value, label in points
+        ]
+
+        if not rows:
+            return 0
+
+        await self.init_db()
+
+        try:
+            await self.write_queue.executemany(
+                "INSERT INTO metrics (series, timestamp, value, label) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        except aiosqlite.Error as e:
+            logger.error("Error writing metrics: %s", e)
+            return 0
+
+        return len(rows)
+
+    async def close(self):
+        """
+        Flushes the queued metric writes on shutdown.
+        """
+        await self.write_queue.close()
+
+    async def write(self, series, value, label=None, timestamp=None):
+        """
+        Writes a single point.
+        Args:
+            series (MetricSeries): The series to write to.
+            value (float): The value of the point.
+            label (str, optional): A text label stored next to the value.
+            timestamp (optional): The time of the point, defaults to now.
+        Returns:
+            int: The number of points written.
+        """
+        return await self.write_points([(series, timestamp, value, label)])
+
+    async def read_series(self, series, start, end):
+        """
+        Reads one series for the half-open [start, end) time range.
+        Args:
+            series (MetricSeries): The series to read.
+            start: Inclusive lower bound, anything `to_unix_timestamp` accepts.
+            end: Exclusive upper bound, anything `to_unix_timestamp` accepts.
+        Returns:
+            tuple: Two NumPy arrays, the int64 unix timestamps and the float64 values.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                READ_SERIES_QUERY,
+                (int(series), to_unix_timestamp(start), to_unix_timestamp(end)),
+            )
+            rows = await cursor.fetchall()
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        data = np.array(rows, dtype=np.float64)
+        return data[:, 0].astype(np.int64), data[:, 1]
+
+    async def read_frame(self, series_list, start, end):
+        """
+        Reads several series for the half-open [start, end) time range.
+        Args:
+            series_list (list): The MetricSeries to read.
+            start: Inclusive lower bound, anything `to_unix_timestamp` accepts.
+            end: Exclusive upper bound, anything `to_unix_timestamp` accepts.
+        Returns:
+            pd.DataFrame: One column per series name, indexed by UTC timestamp.
+        """
+        columns = {}
+
+        for series in series_list:
+            timestamps, values = await self.read_series(series, start, end)
+            columns[MetricSeries(series).name] = pd.Series(
+                values, index=pd.to_datetime(timestamps, unit="s", utc=True)
+            )
+
+        return pd.DataFrame(columns).sort_index()
+
+    async def read_rollups(self, series, resolution, start, end):
+        """
+        Reads the downsampled buckets of one series for the half-open [start, end) range.
+        Args:
+            series (MetricSeries): The series to read.
+            resolution (Resolution): The bucket size to read.
+            start: Inclusive lower bound, anything `to_unix_timestamp` accepts.
+            end: Exclusive upper bound, anything `to_unix_timestamp` accepts.
+        Returns:
+            pd.DataFrame: The count, min, max, mean and last value of every bucket,
+            indexed by the UTC bucket start.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                READ_ROLLUPS_QUERY,
+                (
+                    int(series),
+                    int(resolution),
+                    to_unix_timestamp(start),
+                    to_unix_timestamp(end),
+                ),
+            )
+            rows = await cursor.fetchall()
+
+        frame = pd.DataFrame(
+            rows, columns=["bucket_start", "count", "min", "max", "sum", "last"]
+        )
+        frame["mean"] = frame["sum"] / frame["count"]
+        frame.index = pd.to_datetime(frame.pop("bucket_start"), unit="s", utc=True)
+
+        return frame[["count", "min", "max", "mean", "last"]]
+
+    async def get_rollup_watermarks(self, series):
+        """
+        Returns how far each resolution of a series is rolled up.
+        Args:
+            series (MetricSeries): The series.
+        Returns:
+            dict: The watermark of each rolled up Resolution, in unix seconds.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT resolution, watermark FROM metric_rollup_state "
+                "WHERE series = ?",
+                (int(series),),
+            )
+            rows = await cursor.fetchall()
+
+        return {Resolution(resolution): watermark for resolution, watermark in rows}
+
+    async def count_points(self, series, start, end, limit):
+        """
+        Counts the raw points of a series in the half-open [start, end) range, up to
+        a limit, so a large range is never scanned in full.
+        Args:
+            series (MetricSeries): The series.
+            start (int): Inclusive lower bound, in unix seconds.
+            end (int): Exclusive upper bound, in unix seconds.
+            limit (int): The count to stop at.
+        Returns:
+            int: The number of points, at most `limit`.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM metrics "
+                "WHERE series = ? AND timestamp >= ? AND timestamp < ? LIMIT ?)",
+                (int(series), start, end, limit),
+            )
+            row = await cursor.fetchone()
+
+        return row[0]
+
+    async def read_raw_buckets(self, series, resolution, start, end):
+        """
+        Aggregates the raw points of a series into buckets, for the range the
+        rollups do not cover yet.
+        Args:
+            series (MetricSeries): The series to read.
+            resolution (Resolution): The bucket size.
+            start (int): Inclusive lower bound, in unix seconds.
+            end (int): Exclusive upper bound, in unix seconds.
+        Returns:
+            pd.DataFrame: The bucket means in a "value" column, indexed by the UTC
+            bucket start.
+        """
+        timestamps, values = await self.read_series(series, start, end)
+        known = ~np.isnan(values)
+
+        if not known.any():
+            return pd.DataFrame({"value": []}, index=pd.DatetimeIndex([], tz="UTC"))
+
+        buckets, counts, _, _, sums, _ = aggregate_buckets(
+            timestamps[known], values[known], resolution
+        )
+
+        return pd.DataFrame(
+            {"value": sums / counts},
+            index=pd.to_datetime(buckets, unit="s", utc=True),
+        )
+
+    async def read_series_downsampled(self, series, start, end, max_points=500):
+        """
+        Reads a series at the finest resolution that keeps the result under `max_points`.
+        The raw points are read only when the range is after the rolled up history,
+        whose raw points may be pruned, and holds at most `max_points` of them.
+        Otherwise the resolution is picked from the span of the range, the rolled up
+        buckets are read from the rollups and the rest is aggregated from the raw points.
+        Args:
+            series (MetricSeries): The series to read.
+            start: Inclusive lower bound, anything `to_unix_timestamp` accepts.
+            end: Exclusive upper bound, anything `to_unix_timestamp` accepts.
+            max_points (int): The maximum number of rows wanted.
+        Returns:
+            tuple: The chosen Resolution (None for raw points) and a DataFrame with a
+            "value" column (the bucket mean for rollups) indexed by UTC timestamp.
+        """
+        start = to_unix_timestamp(start)
+        end = to_unix_timestamp(end)
+
+        # The retention only prunes once every resolution is rolled up, and never
+        # past the earliest watermark
+        watermarks = await self.get_rollup_watermarks(series)
+        raw_complete = len(watermarks) < len(Resolution) or start >= min(
+            watermarks.values()
+        )
+
+        if raw_complete and (
+            await self.count_points(series, start, end, max_points + 1) <= max_points
+        ):
+            timestamps, values = await self.read_series(series, start, end)
+            return None, pd.DataFrame(
+                {"value": values},
+                index=pd.to_datetime(timestamps, unit="s", utc=True),
+            )
+
+        resolution = next(
+            (
+                resolution
+                for resolution in Resolution
+                if (end - start) / resolution <= max_points
+            ),
+            Resolution.WEEKLY,
+        )
+        watermark = min(max(watermarks.get(resolution, start), start), end)
+
+        rollups = await self.read_rollups(series, resolution, start, watermark)
+        frame = rollups[["mean"]].rename(columns={"mean": "value"})
+
+        # The buckets not rolled up yet come from the raw points
+        recent = await self.read_raw_buckets(series, resolution, watermark, end)
+        if len(recent):
+            frame = pd.concat([frame, recent]) if len(frame) else recent
+
+        return resolution, frame
+
+    async def latest(self, series):
+        """
+        Returns the most recent point of a series.
+        Args:
+            series (MetricSeries): The series to read.
+        Returns:
+            tuple: (timestamp, value, label) or None if the series is empty.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT timestamp, value, label FROM metrics "
+                "WHERE series = ? ORDER BY timestamp DESC LIMIT 1",
+                (int(series),),
+            )
+            return await cursor.fetchone()
@@ -0,0 +1,266 @@
+"""
+migrations.py
+This module runs the versioned schema migrations of the SQLite data bases and
+provides the helpers used to write them (column checks and chunked backfills).
+"""
+
+import asyncio
+import logging
+import os
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+logger.info("Migrations started")
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+# pylint: disable=too-few-public-methods
+class Migration:
+    """
+    A single schema change of a data base.
+    The `upgrade` step runs inside one write transaction and must be idempotent,
+    because a crash between it and the version bookkeeping replays it.
+    The optional `backfill` step runs afterwards in its own small transactions,
+    so long data updates never hold the write lock for long.
+    """
+
+    def __init__(self, version, description, upgrade=None, backfill=None):
+        """
+        Initializes the Migration.
+        Args:
+            version (int): The schema version the migration upgrades to.
+            description (str): What the migration changes.
+            upgrade (callable, optional): `async def upgrade(db)` run in a transaction.
+            backfill (callable, optional): `async def backfill(db_path)` run in batches.
+        """
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.backfill = backfill
+
+
+def execute_statements(*statements):
+    """
+    Builds an upgrade step that executes the given idempotent SQL statements.
+    Args:
+        statements (str): The statements, e.g. `CREATE ... IF NOT EXISTS`.
+    Returns:
+        callable: The upgrade coroutine function.
+    """
+
+    async def upgrade(db):
+        for statement in statements:
+            await db.execute(statement)
+
+    return upgrade
+
+
+async def column_exists(db, table, column):
+    """
+    Checks if a table has a column.
+    Args:
+        db (aiosqlite.Connection): The open data base.
+        table (str): The table name.
+        column (str): The column name.
+    Returns:
+        bool: True if the column exists.
+    """
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    rows = await cursor.fetchall()
+
+    return any(row[1] == column for row in rows)
+
+
+async def add_column_if_missing(db, table, column, definition):
+    """
+    Adds a column unless it already exists, SQLite has no `ADD COLUMN IF NOT EXISTS`.
+    Args:
+        db (aiosqlite.Connection): The open data base.
+        table (str): The table name.
+        column (str): The column name.
+        definition (str): The column type and constraints.
+    Returns:
+        bool: True if the column was added.
+    """
+    if await column_exists(db, table, column):
+        return False
+
+    await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+async def backfill_in_batches(
+    db_path,
+    select_query,
+    update_query,
+    build_params,
+    batch_size=500,
+    pause=0.0,
+    start_key=0,
+):
+    """
+    Updates a large table in small keyset batches, each committed on its own,
+    so the bots can keep reading and writing the data base while it runs.
+    Args:
+        db_path (str): Path to the SQLite data base file.
+        select_query (str): Selects the next rows, takes (last_key, batch_size) and
+            returns the ascending key in the first column.
+        update_query (str): The statement run for every parameter tuple.
+        build_params (callable): `build_params(rows, offset)` returns the update
+            parameters of a batch, `offset` is the number of rows walked before it.
+        batch_size (int): Number of rows per transaction.
+        pause (float): Seconds to sleep between batches.
+        start_key: The key the first batch starts after.
+    Returns:
+        int: The number of rows changed.
+    """
+    last_key = start_key
+    offset = 0
+    changed = 0
+
+    while True:
+        async with aiosqlite.connect(db_path) as db:
+            cursor = await db.execute(select_query, (last_key, batch_size))
+            rows = await cursor.fetchall()
+
+            if not rows:
+                break
+
+            cursor = await db.executemany(update_query, build_params(rows, offset))
+            await db.commit()
+
+        changed += max(cursor.rowcount, 0)
+        offset += len(rows)
+        last_key = rows[-1][0]
+
+        if len(rows) < batch_size:
+            break
+
+        # Let the other writers take the lock between batches
+        await asyncio.sleep(pause)
+
+    return changed
+
+
+class MigrationRunner:
+    """
+    MigrationRunner brings a data base up to the latest version of its migrations
+    and records every applied version in the `schema_version` table.
+    """
+
+    def __init__(self, db_path, migrations):
+        """
+        Initializes the MigrationRunner.
+        Args:
+            db_path (str): Path to the SQLite data base file.
+            migrations (list): The Migration steps, ordered by version.
+        Raises:
+            ValueError: If the versions are not strictly increasing.
+        """
+        versions = [migration.version for migration in migrations]
+
+        if any(older >= newer for older, newer in zip(versions, versions[1:])):
+            raise ValueError(f"Migration versions must be increasing: {versions}")
+
+        self.db_path = db_path
+        self.migrations = migrations
+
+    async def get_version(self, db=None):
+        """
+        Returns the current schema version of the data base.
+        Args:
+            db (aiosqlite.Connection, optional): An open connection to reuse.
+        Returns:
+            int: The highest applied version, 0 for a new data base.
+        """
+        if db is None:
+            async with aiosqlite.connect(self.db_path) as db:
+                return await self.get_version(db)
+
+        await db.execute(SCHEMA_VERSION_TABLE)
+        cursor = await db.execute("SELECT MAX(version) FROM schema_version")
+        row = await cursor.fetchone()
+
+        return row[0] or 0
+
+    async def apply(self, migration):
+        """
+        Applies one migration unless another process already did.
+        Args:
+            migration (Migration): The migration to apply.
+        Returns:
+            bool: True if the migration was applied by this call.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            # Take the write lock first, so only one bot upgrades the schema
+            await db.execute("BEGIN IMMEDIATE")
+
+            if await self.get_version(db) >= migration.version:
+                await db.rollback()
+                return False
+
+            if migration.upgrade is not None:
+                await migration.upgrade(db)
+
+            if migration.backfill is None:
+                await db.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (migration.version, migration.description),
+                )
+
+            await db.commit()
+
+        if migration.backfill is None:
+            return True
+
+        # The backfill only touches the rows that still need it, so it resumes
+        # where it stopped if the bot is restarted halfway
+        await migration.backfill(self.db_path)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "INSERT OR IGNORE INTO schema_version (version, description) "
+                "VALUES (?, ?)",
+                (migration.version, migration.description),
+            )
+            await db.commit()
+
+        return True
+
+    async def migrate(self):
+        """
+        Applies every migration newer than the current schema version, in order.
+        Returns:
+            int: The schema version after the run.
+        """
+        folder_path = os.path.dirname(self.db_path)
+
+        if folder_path != "":
+            os.makedirs(folder_path, exist_ok=True)
+
+        current_version = await self.get_version()
+
+        for migration in self.migrations:
+            if migration.version <= current_version:
+                continue
+
+            if await self.apply(migration):
+                logger.info(
+                    "Migrated %s to version %d: %s",
+                    self.db_path,
+                    migration.version,
+                    migration.description,
+                )
+
+            current_version = migration.version
+
+        return current_version
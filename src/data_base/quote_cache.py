@@ -0,0 +1,298 @@
+"""
+quote_cache.py
+This module keeps the market data fetched from the price APIs in a SQLite file shared
+by every bot process, so identical requests are sent once per TTL instead of once per
+process.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+import aiosqlite
+
+import src.handlers.load_variables_handler
+from src.data_base.migrations import Migration, MigrationRunner, execute_statements
+
+logger = logging.getLogger(__name__)
+logger.info("Quote cache started")
+
+# Append new migrations at the end, never edit or renumber an applied one
+QUOTE_CACHE_MIGRATIONS = [
+    Migration(
+        1,
+        "Create the quote cache and fetch lease tables",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS quote_cache (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS fetch_leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """,
+        ),
+    ),
+    Migration(
+        2,
+        "Track the API credits spent per day",
+        execute_statements(
+            """
+            CREATE TABLE IF NOT EXISTS api_credits (
+                api TEXT NOT NULL,
+                day TEXT NOT NULL,
+                credits INTEGER NOT NULL,
+                PRIMARY KEY (api, day)
+            ) WITHOUT ROWID
+            """
+        ),
+    ),
+]
+
+# Takes the lease when nobody holds it or the previous holder let it expire,
+# a single statement so two processes can never both win it
+ACQUIRE_LEASE_QUERY = """
+    INSERT INTO fetch_leases (key, owner, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT (key) DO UPDATE
+    SET owner = excluded.owner, expires_at = excluded.expires_at
+    WHERE fetch_leases.expires_at <= ?
+"""
+
+
+class QuoteCache:
+    """
+    QuoteCache is a TTL cache of API responses stored in SQLite.
+    When an entry is stale, the first process to take the fetch lease of its key
+    calls the API while the others wait for the fresh entry, so a response is
+    fetched once for all the bots.
+    """
+
+    def __init__(self, db_path="./data_bases/quote_cache.db"):
+        """
+        Initializes the QuoteCache.
+        Args:
+            db_path (str): Path to the SQLite data base file shared by the bots.
+        """
+        self.db_path = db_path
+        self.schema_ready = False
+
+        self.ttl = None
+        self.lease_duration = None
+        self.poll_interval = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the cache settings from the variables file.
+        """
+        variables = src.handlers.load_variables_handler.load_json()
+
+        self.ttl = variables.get("QUOTE_CACHE_TTL", 60)
+        self.lease_duration = variables.get("QUOTE_CACHE_LEASE", 30)
+        self.poll_interval = variables.get("QUOTE_CACHE_POLL_INTERVAL", 0.25)
+
+    async def init_db(self):
+        """
+        Migrates the cache schema and switches the data base to WAL mode.
+        Runs once per process, later calls return immediately.
+        """
+        if self.schema_ready:
+            return
+
+        folder_path = os.path.dirname(self.db_path)
+
+        if folder_path != "":
+            os.makedirs(folder_path, exist_ok=True)
+
+        async with aiosqlite.connect(self.db_path) as db:
+            # Readers in the other processes never wait for the fetcher's writes
+            await db.execute("PRAGMA journal_mode=WAL")
+
+        await MigrationRunner(self.db_path, QUOTE_CACHE_MIGRATIONS).migrate()
+
+        self.schema_ready = True
+        logger.info("Quote cache ready: %s", self.db_path)
+
+    async def read(self, key):
+        """
+        Reads a cached response, fresh or not.
+        Args:
+            key (str): The cache key.
+        Returns:
+            tuple: The decoded payload and its fetch time, or None if never cached.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT payload, fetched_at FROM quote_cache WHERE key = ?", (key,)
+            )
+            row = await cursor.fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0]), row[1]
+
+    async def store(self, key, payload, now=None):
+        """
+        Stores a response.
+        Args:
+            key (str): The cache key.
+            payload: The JSON serializable response.
+            now (float, optional): The fetch time, defaults to the current time.
+        """
+        await self.store_many({key: payload}, now)
+
+    async def store_many(self, payloads, now=None):
+        """
+        Stores several responses in a single transaction.
+        Args:
+            payloads (dict): The JSON serializable responses by cache key.
+            now (float, optional): The fetch time, defaults to the current time.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO quote_cache (key, payload, fetched_at) "
+                "VALUES (?, ?, ?)",
+                [(key, json.dumps(payload), now) for key, payload in payloads.items()],
+            )
+            await db.commit()
+
+    async def acquire_lease(self, key, owner, now=None):
+        """
+        Tries to become the single fetcher of a key.
+        Args:
+            key (str): The cache key.
+            owner (str): A unique id of the caller.
+            now (float, optional): The current time.
+        Returns:
+            bool: True if the caller holds the lease.
+        """
+        await self.init_db()
+        now = now or time.time()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                ACQUIRE_LEASE_QUERY, (key, owner, now + self.lease_duration, now)
+            )
+            await db.commit()
+
+        return cursor.rowcount == 1
+
+    async def release_lease(self, key, owner):
+        """
+        Releases a lease, unless it expired and was taken by someone else.
+        Args:
+            key (str): The cache key.
+            owner (str): The id the lease was acquired with.
+        """
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "DELETE FROM fetch_leases WHERE key = ? AND owner = ?", (key, owner)
+            )
+            await db.commit()
+
+    async def add_credits(self, api, spent, day):
+        """
+        Adds the credits spent by a call to the shared ledger of an API.
+        Args:
+            api (str): The API name.
+            spent (int): The credits spent.
+            day (str): The UTC day of the call, as YYYY-MM-DD.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute(
+                "INSERT INTO api_credits (api, day, credits) VALUES (?, ?, ?) "
+                "ON CONFLICT (api, day) "
+                "DO UPDATE SET credits = credits + excluded.credits",
+                (api, day, spent),
+            )
+            await db.commit()
+
+    async def get_credits(self, api, start_day, end_day):
+        """
+        Returns the credits spent on an API by all the processes in a range of days.
+        Args:
+            api (str): The API name.
+            start_day (str): The first day, as YYYY-MM-DD.
+            end_day (str): The day after the last one, as YYYY-MM-DD.
+        Returns:
+            int: The credits spent.
+        """
+        await self.init_db()
+
+        async with aiosqlite.connect(self.db_path) as db:
+            cursor = await db.execute(
+                "SELECT COALESCE(SUM(credits), 0) FROM api_credits "
+                "WHERE api = ? AND day >= ? AND day < ?",
+                (api, start_day, end_day),
+            )
+            row = await cursor.fetchone()
+
+        return row[0]
+
+    async def get_or_fetch(self, key, fetch, ttl=None):
+        """
+        Returns the cached response of a key, fetching it if stale.
+        Only the lease holder calls `fetch`, the other callers poll the cache until
+        the fresh response lands or the lease expires. A failed fetch falls back to
+        the stale response.
+        Args:
+            key (str): The cache key.
+            fetch (callable): `async def fetch()` returning the response, or None.
+            ttl (float, optional): How long a response stays fresh, in seconds.
+        Returns:
+            The response, or None if it could not be fetched and was never cached.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        deadline = time.time() + self.lease_duration
+
+        while True:
+            cached = await self.read(key)
+            stale = cached[0] if cached is not None else None
+
+            if cached is not None and time.time() - cached[1] < ttl:
+                return stale
+
+            if await self.acquire_lease(key, owner):
+                try:
+                    # The previous holder may have stored it since the read
+                    cached = await self.read(key)
+                    if cached is not None and time.time() - cached[1] < ttl:
+                        return cached[0]
+
+                    payload = await fetch()
+                    # Stored before the release, so no waiter fetches it again
+                    if payload is not None:
+                        await self.store(key, payload)
+                finally:
+                    await self.release_lease(key, owner)
+
+                if payload is None:
+                    logger.warning("Fetching %s failed, serving the stale entry", key)
+                    return stale
+
+                return payload
+
+            if time.time() >= deadline:
+                logger.warning("Timed out waiting for the fetch of %s", key)
+                return stale
+
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,188 @@
+"""
+seen_link_index.py
+This module keeps the links of the stored articles in memory, so the scrape cycles
+can drop the articles they already know without a data base round-trip.
+"""
+
+import hashlib
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.info("Seen link index started")
+
+
+def get_link_hashes(link):
+    """
+    Returns two independent 64-bit hashes of a link.
+    Args:
+        link (str): The article link.
+    Returns:
+        tuple: The two hashes.
+    """
+    digest = hashlib.blake2b(link.encode("utf-8"), digest_size=16).digest()
+
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class BloomFilter:
+    """
+    BloomFilter is a compact set of strings that answers "maybe seen" or "never seen".
+    A "never seen" answer is always right, a "maybe seen" answer is wrong with
+    roughly `error_rate` probability while it holds up to `capacity` items.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Initializes the BloomFilter.
+        Args:
+            capacity (int): The number of items the filter is sized for.
+            error_rate (float): The false positive rate at full capacity.
+        """
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def get_positions(self, links):
+        """
+        Returns the bit positions of the given links, one row per link.
+        Args:
+            links (list): The article links.
+        Returns:
+            np.ndarray: A (len(links), hash_count) array of bit positions.
+        """
+        hashes = np.array([get_link_hashes(link) for link in links], dtype=np.uint64)
+        hashes = hashes.reshape(-1, 2)
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+
+        # Double hashing, the uint64 arithmetic wraps around on purpose
+        with np.errstate(over="ignore"):
+            positions = hashes[:, :1] + steps * hashes[:, 1:]
+
+        return positions % np.uint64(self.size)
+
+    def add_many(self, links):
+        """
+        Adds several links at once.
+        Args:
+            links (list): The article links.
+        """
+        if not links:
+            return
+
+        positions = self.get_positions(links).ravel()
+        np.bitwise_or.at(
+            self.bits,
+            (positions >> np.uint64(3)).astype(np.intp),
+            (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)),
+        )
+        self.count += len(links)
+
+    def contains_many(self, links):
+        """
+        Checks several links at once.
+        Args:
+            links (list): The article links.
+        Returns:
+            np.ndarray: A boolean per link, True if the link may have been added.
+        """
+        if not links:
+            return np.zeros(0, dtype=bool)
+
+        positions = self.get_positions(links)
+        bytes_ = self.bits[(positions >> np.uint64(3)).astype(np.intp)]
+        masks = np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)
+
+        return np.all(bytes_ & masks, axis=1)
+
+
+class SeenLinkIndex:
+    """
+    SeenLinkIndex remembers the links of the stored articles.
+    By default it is an exact set. With a bloom capacity it uses a BloomFilter instead,
+    which keeps large histories in a few bytes per link, and its "maybe seen"
+    answers are confirmed against the data base by the caller.
+    """
+
+    def __init__(self, bloom_capacity=0, error_rate=0.001):
+        """
+        Initializes the SeenLinkIndex.
+        Args:
+            bloom_capacity (int): Number of links the bloom filter is sized for,
+                0 keeps the links in an exact set.
+            error_rate (float): The false positive rate of the bloom filter.
+        """
+        self.bloom_capacity = bloom_capacity
+        self.error_rate = error_rate
+        self.links = None
+        self.bloom = None
+        self.warmed = False
+
+        self.clear()
+
+    @property
+    def is_exact(self):
+        """
+        Returns True if the index can not report false positives.
+        """
+        return self.bloom is None
+
+    def clear(self):
+        """
+        Forgets every link, used when the data base is recreated.
+        """
+        if self.bloom_capacity:
+            self.bloom = BloomFilter(self.bloom_capacity, self.error_rate)
+        else:
+            self.links = set()
+
+        self.warmed = False
+
+    def add_many(self, links):
+        """
+        Remembers several links.
+        Args:
+            links (list): The article links.
+        """
+        if self.is_exact:
+            self.links.update(links)
+        else:
+            self.bloom.add_many(list(links))
+
+    def add(self, link):
+        """
+        Remembers a link.
+        Args:
+            link (str): The article link.
+        """
+        self.add_many([link])
+
+    def __len__(self):
+        """
+        Returns the number of remembered links.
+        """
+        return len(self.links) if self.is_exact else self.bloom.count
+
+    def split_links(self, links):
+        """
+        Splits links into the ones known to be new and the ones that were seen.
+        Args:
+            links (list): The article links.
+        Returns:
+            tuple: The new links and the seen links. With a bloom filter the seen
+            links are only "maybe seen" and need to be confirmed.
+        """
+        if self.is_exact:
+            seen = [link in self.links for link in links]
+        else:
+            seen = self.bloom.contains_many(list(links)).tolist()
+
+        new_links = [link for link, was_seen in zip(links, seen) if not was_seen]
+        seen_links = [link for link, was_seen in zip(links, seen) if was_seen]
+
+        return new_links, seen_links
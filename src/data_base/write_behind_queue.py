@@ -0,0 +1,241 @@
+"""
+write_behind_queue.py
+This module funnels the writes of an SQLite data base through a single writer coroutine
+that groups the queued statements into one transaction (group commit).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+logger.info("Write behind queue started")
+
+
+# pylint: disable=too-many-instance-attributes
+class WriteBehindQueue:
+    """
+    WriteBehindQueue collects write statements from any caller and commits them in batches.
+    A batch is written once `max_batch_size` statements are queued or `max_delay_ms`
+    passed since the writer woke up, whichever comes first. Every caller gets an awaitable
+    that resolves with the row count of its own statement once the batch is committed.
+    A statement awaited alone on an idle queue is written right away, so a sequential
+    caller does not wait `max_delay_ms` for every write.
+    """
+
+    def __init__(self, db_path, max_batch_size=100, max_delay_ms=50):
+        """
+        Initializes the WriteBehindQueue.
+        Args:
+            db_path (str): Path to the SQLite data base file.
+            max_batch_size (int): The number of statements that triggers a commit.
+            max_delay_ms (int): The maximum time a statement waits for its batch.
+        """
+        self.db_path = db_path
+        self.max_batch_size = max_batch_size
+        self.max_delay_ms = max_delay_ms
+
+        self.pending = deque()
+        self.writer_task = None
+        self.batch_full = None
+        self.flushing = False
+        self.write_now = False
+
+        self.metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "max_depth": 0,
+            "last_batch_size": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    @property
+    def depth(self):
+        """
+        Returns the number of statements waiting to be written.
+        """
+        return len(self.pending)
+
+    def get_metrics(self):
+        """
+        Returns the queue metrics, including the current depth.
+        Returns:
+            dict: The counters of the queue.
+        """
+        return {**self.metrics, "depth": self.depth}
+
+    def submit(self, sql, params=(), many=False):
+        """
+        Queues a write statement without waiting for it, always grouped with the
+        next ones, which suits the producers that do not need the row count.
+        Args:
+            sql (str): The statement to execute.
+            params (tuple | list): Its parameters, or a list of parameter tuples if `many`.
+            many (bool): If True the statement is run with executemany.
+        Returns:
+            asyncio.Future: Resolves with the row count of the statement once committed.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        self.pending.append((sql, params, many, future))
+        self.metrics["enqueued"] += 1
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], self.depth)
+
+        self._ensure_writer(loop)
+
+        if self.depth >= self.max_batch_size:
+            self._wake_writer()
+
+        return future
+
+    async def execute(self, sql, params=()):
+        """
+        Queues a write statement and waits until it is committed.
+        Args:
+            sql (str): The statement to execute.
+            params (tuple): Its parameters.
+        Returns:
+            int: The number of rows changed by the statement.
+        """
+        return await self._submit_and_wait(sql, params)
+
+    async def executemany(self, sql, params_list):
+        """
+        Queues a statement for several parameter tuples and waits until it is committed.
+        Args:
+            sql (str): The statement to execute.
+            params_list (list): The parameter tuples.
+        Returns:
+            int: The number of rows changed by the statement.
+        """
+        return await self._submit_and_wait(sql, params_list, many=True)
+
+    async def flush(self):
+        """
+        Waits until every statement queued so far is committed.
+        """
+        self.flushing = True
+        try:
+            while self.pending or (
+                self.writer_task is not None and not self.writer_task.done()
+            ):
+                self._ensure_writer(asyncio.get_running_loop())
+                self._wake_writer()
+                await asyncio.shield(self.writer_task)
+        finally:
+            self.flushing = False
+
+    async def close(self):
+        """
+        Flushes the queue on shutdown and logs the final metrics.
+        """
+        await self.flush()
+        logger.info("Write behind queue closed: %s", self.get_metrics())
+
+    def _submit_and_wait(self, sql, params, many=False):
+        """
+        Queues a statement its caller waits for. On an idle queue nothing else is
+        waiting for a batch, so it is written without the batching delay, unless
+        other statements are queued before the writer starts.
+        Returns:
+            asyncio.Future: Resolves with the row count of the statement once committed.
+        """
+        idle = not self.pending and (
+            self.writer_task is None or self.writer_task.done()
+        )
+
+        future = self.submit(sql, params, many)
+        if idle:
+            self.write_now = True
+
+        return future
+
+    def _ensure_writer(self, loop):
+        """
+        Starts the writer coroutine on the given loop if it is not running there.
+        """
+        if (
+            self.writer_task is None
+            or self.writer_task.done()
+            or self.writer_task.get_loop() is not loop
+        ):
+            self.writer_task = loop.create_task(self._writer())
+
+    def _wake_writer(self):
+        """
+        Ends the wait of the writer so the queued statements are written right away.
+        """
+        if self.batch_full is not None and not self.batch_full.done():
+            self.batch_full.set_result(True)
+
+    async def _writer(self):
+        """
+        Writes batches until the queue is empty, then exits.
+        """
+        loop = asyncio.get_running_loop()
+
+        while self.pending:
+            # Only the lone statement of an idle queue skips the wait
+            write_now = self.write_now and self.depth == 1
+            self.write_now = False
+
+            if self.depth < self.max_batch_size and not self.flushing and not write_now:
+                self.batch_full = loop.create_future()
+                await asyncio.wait({self.batch_full}, timeout=self.max_delay_ms / 1000)
+                self.batch_full = None
+
+            batch = [
+                self.pending.popleft()
+                for _ in range(min(self.max_batch_size, self.depth))
+            ]
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch):
+        """
+        Executes a batch in one transaction and resolves the futures of its statements.
+        A failing statement only fails its own future, the rest of the batch is committed.
+        Each statement runs in a savepoint, so the rows an `executemany` wrote before
+        it failed are rolled back with it.
+        """
+        started = time.perf_counter()
+        results = []
+
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute("BEGIN")
+                for sql, params, many, _ in batch:
+                    await db.execute("SAVEPOINT statement")
+                    try:
+                        if many:
+                            cursor = await db.executemany(sql, params)
+                        else:
+                            cursor = await db.execute(sql, params)
+                        results.append(cursor.rowcount)
+                    except aiosqlite.Error as e:
+                        await db.execute("ROLLBACK TO statement")
+                        results.append(e)
+                    await db.execute("RELEASE statement")
+                await db.commit()
+        except aiosqlite.Error as e:
+            logger.error("Error committing a batch of %d writes: %s", len(batch), e)
+            results = [e] * len(batch)
+
+        for (_, _, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                self.metrics["failed"] += 1
+                future.set_exception(result)
+            else:
+                self.metrics["written"] += 1
+                future.set_result(result)
+
+        self.metrics["batches"] += 1
+        self.metrics["last_batch_size"] = len(batch)
+        self.metrics["last_batch_ms"] = (time.perf_counter() - started) * 1000
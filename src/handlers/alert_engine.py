@@ -0,0 +1,190 @@
+"""
+alert_engine.py
+This module evaluates the price change thresholds of every alert window against a
+quote snapshot in a single vectorized pass. The alerts found are returned as records
+and rendered as Telegram messages in a separate step.
+"""
+
+import numpy as np
+
+from src.utils.quote_snapshot import QUOTE_FIELDS, QuoteSnapshot
+from src.utils.utils import format_change
+
+# The alert windows and the snapshot field holding their change
+ALERT_WINDOWS = {
+    "1h": "change_1h",
+    "24h": "change_24h",
+    "7d": "change_7d",
+    "30d": "change_30d",
+}
+
+# How the windows are named in the alert messages
+WINDOW_LABELS = {
+    "1h": "1-hour",
+    "24h": "24-hours",
+    "7d": "7-days",
+    "30d": "30-days",
+}
+
+
+def get_move_window(minutes):
+    """
+    Returns the name of a window measured on the price history.
+    Args:
+        minutes (str | int): The window length, in minutes.
+    Returns:
+        str: The window, e.g. "15m".
+    """
+    return f"{minutes}m"
+
+
+def is_move_window(window):
+    """
+    Checks if a window is measured on the price history, e.g. "15m".
+    Args:
+        window (str): The window.
+    Returns:
+        bool: True for a window in minutes.
+    """
+    if not isinstance(window, str) or not window.endswith("m"):
+        return False
+
+    try:
+        return float(window[:-1]) > 0
+    except ValueError:
+        return False
+
+
+def get_window_label(window):
+    """
+    Returns how a window is named in the alert messages.
+    Args:
+        window (str): A key of ALERT_WINDOWS or a window in minutes.
+    Returns:
+        str: The label, e.g. "24-hours" or "15-minutes".
+    """
+    return WINDOW_LABELS.get(window) or f"{window[:-1]}-minutes"
+
+
+# pylint: disable=too-few-public-methods
+class AlertRecord:
+    """
+    A price change of a symbol that crossed the threshold of an alert window.
+    """
+
+    __slots__ = ("symbol", "window", "change", "threshold", "recipients")
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, symbol, window, change, threshold, recipients=()):
+        """
+        Initializes the AlertRecord.
+        Args:
+            symbol (str): The cryptocurrency symbol.
+            window (str): The alert window, a key of ALERT_WINDOWS or a window
+                in minutes.
+            change (float): The price change in percent.
+            threshold (float): The threshold it crossed, in percent.
+            recipients (tuple): The chat ids to alert, empty for the default chats.
+        """
+        self.symbol = symbol
+        self.window = window
+        self.change = change
+        self.threshold = threshold
+        self.recipients = recipients
+
+    def __repr__(self):
+        return (
+            f"AlertRecord({self.symbol!r}, {self.window!r}, "
+            f"change={self.change}, threshold={self.threshold})"
+        )
+
+
+def as_snapshot(quotes):
+    """
+    Returns the quotes as a QuoteSnapshot.
+    Args:
+        quotes (Mapping): A QuoteSnapshot, or a {symbol: {field: value}} dict whose
+            missing fields are read as NaN.
+    Returns:
+        QuoteSnapshot: The snapshot.
+    """
+    if isinstance(quotes, QuoteSnapshot):
+        return quotes
+
+    symbols = list(quotes)
+    values = np.array(
+        [[quotes[symbol].get(field) for field in QUOTE_FIELDS] for symbol in symbols],
+        dtype=np.float64,
+    )
+
+    return QuoteSnapshot(symbols, values)
+
+
+def evaluate_alerts(quotes, thresholds):
+    """
+    Finds the changes crossing their window threshold, for all windows at once.
+    Args:
+        quotes (Mapping): The quotes, see `as_snapshot`.
+        thresholds (dict): The threshold in percent of each window to evaluate.
+    Returns:
+        list: The AlertRecords, grouped by window in the order of `thresholds`
+        and by symbol in the order of the quotes.
+    """
+    snapshot = as_snapshot(quotes)
+    windows = list(thresholds)
+
+    columns = [QUOTE_FIELDS.index(ALERT_WINDOWS[window]) for window in windows]
+    changes = snapshot.values[:, columns]
+    limits = np.array([thresholds[window] for window in windows], dtype=np.float64)
+
+    # NaN changes never cross a threshold
+    with np.errstate(invalid="ignore"):
+        hits = np.abs(changes) >= limits
+
+    window_indexes, rows = np.nonzero(hits.T)
+
+    return [
+        AlertRecord(
+            str(snapshot.symbols[row]),
+            windows[column],
+            float(changes[row, column]),
+            float(limits[column]),
+        )
+        for column, row in zip(window_indexes.tolist(), rows.tolist())
+    ]
+
+
+def group_alerts(records):
+    """
+    Groups alert records by window.
+    Args:
+        records (list): The AlertRecords.
+    Returns:
+        dict: The records of each window that has any.
+    """
+    groups = {}
+
+    for record in records:
+        groups.setdefault(record.window, []).append(record)
+
+    return groups
+
+
+def render_alerts(window, records):
+    """
+    Renders the alerts of a window as a Telegram message.
+    Args:
+        window (str): The alert window.
+        records (list): The AlertRecords of the window.
+    Returns:
+        str: The HTML message.
+    """
+    lines = [
+        f"<b>{record.symbol}</b> → {format_change(record.change)}\n"
+        for record in records
+    ]
+
+    return (
+        f"🚨 <b>Crypto Alert!</b> Significant {get_window_label(window)} change "
+        f"detected:\n\n{''.join(lines)}"
+    )
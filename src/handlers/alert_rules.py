@@ -0,0 +1,365 @@
+"""
+alert_rules.py
+This module compiles the alert rules into an index. A rule targets a symbol, a group
+of symbols or a range of market cap ranks, with its own thresholds and recipients.
+The index resolves the rules of every symbol once per ranking, so a refresh is
+evaluated against all of them in a few array operations.
+"""
+
+import logging
+
+import numpy as np
+
+from src.handlers.alert_engine import (
+    ALERT_WINDOWS,
+    AlertRecord,
+    as_snapshot,
+    is_move_window,
+)
+from src.utils.quote_snapshot import QUOTE_FIELDS
+
+logger = logging.getLogger(__name__)
+logger.info("Alert rules started")
+
+WINDOWS = tuple(ALERT_WINDOWS)
+
+# The snapshot column of each window
+WINDOW_COLUMNS = tuple(QUOTE_FIELDS.index(ALERT_WINDOWS[window]) for window in WINDOWS)
+
+# A more specific target wins over a less specific one for the same recipients
+SPECIFICITY_ALL = 0
+SPECIFICITY_RANKS = 1
+SPECIFICITY_GROUP = 2
+SPECIFICITY_SYMBOLS = 3
+
+
+# pylint: disable=too-few-public-methods
+class AlertRule:
+    """
+    An alert rule, with thresholds for some of the alert windows and of the
+    windows in minutes measured on the price history.
+    A rule without symbols or ranks applies to every symbol, and a rule without
+    recipients alerts the default chats.
+    """
+
+    __slots__ = (
+        "name",
+        "thresholds",
+        "move_thresholds",
+        "symbols",
+        "ranks",
+        "recipients",
+        "specificity",
+    )
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(
+        self,
+        name,
+        thresholds,
+        symbols=None,
+        ranks=None,
+        recipients=(),
+        specificity=None,
+    ):
+        """
+        Initializes the AlertRule.
+        Args:
+            name (str): The rule name, used in the logs.
+            thresholds (dict): The threshold in percent of each window it checks.
+            symbols (iterable, optional): The symbols it targets.
+            ranks (tuple, optional): The inclusive (first, last) market cap ranks
+                it targets.
+            recipients (iterable): The chat ids to alert.
+            specificity (int, optional): Overrides the precedence of the target.
+        Raises:
+            ValueError: If a window is unknown or the rule has two targets.
+        """
+        unknown = {
+            window
+            for window in thresholds
+            if window not in WINDOWS and not is_move_window(window)
+        }
+        if unknown:
+            raise ValueError(f"Unknown alert windows: {sorted(unknown)}")
+
+        if symbols is not None and ranks is not None:
+            raise ValueError("A rule targets either symbols or ranks")
+
+        self.name = name
+        self.thresholds = np.array(
+            [thresholds.get(window, np.nan) for window in WINDOWS], dtype=np.float64
+        )
+        self.move_thresholds = {
+            window: float(threshold)
+            for window, threshold in thresholds.items()
+            if window not in WINDOWS
+        }
+        self.symbols = (
+            frozenset(symbol.upper() for symbol in symbols)
+            if symbols is not None
+            else None
+        )
+        self.ranks = tuple(ranks) if ranks is not None else None
+        self.recipients = tuple(str(chat_id) for chat_id in recipients)
+
+        if specificity is not None:
+            self.specificity = specificity
+        elif self.symbols is not None:
+            self.specificity = SPECIFICITY_SYMBOLS
+        elif self.ranks is not None:
+            self.specificity = SPECIFICITY_RANKS
+        else:
+            self.specificity = SPECIFICITY_ALL
+
+    @classmethod
+    def from_config(cls, config, groups):
+        """
+        Builds a rule from its configuration, e.g.
+        `{"name": "majors", "group": "majors", "thresholds": {"1h": 1.5},
+        "chat_ids": ["123"]}`, targeting a "symbol", "symbols", "group" or "ranks".
+        Args:
+            config (dict): The rule configuration.
+            groups (dict): The symbols of each group.
+        Returns:
+            AlertRule: The rule.
+        Raises:
+            ValueError: If the configuration is invalid.
+        """
+        targets = [
+            key for key in ("symbol", "symbols", "group", "ranks") if key in config
+        ]
+        if len(targets) > 1:
+            raise ValueError(f"A rule has a single target, got {targets}")
+
+        name = config.get("name", "unnamed")
+        symbols = None
+        specificity = None
+
+        if "symbol" in config:
+            symbols = [config["symbol"]]
+        elif "symbols" in config:
+            symbols = config["symbols"]
+        elif "group" in config:
+            if config["group"] not in groups:
+                raise ValueError(f"Unknown group {config['group']!r}")
+            symbols = groups[config["group"]]
+            specificity = SPECIFICITY_GROUP
+
+        return cls(
+            name,
+            config.get("thresholds", {}),
+            symbols=symbols,
+            ranks=config.get("ranks"),
+            recipients=config.get("chat_ids", []),
+            specificity=specificity,
+        )
+
+
+class AlertRuleIndex:
+    """
+    AlertRuleIndex maps every symbol to the rules that apply to it. For each ranking
+    of symbols it resolves, per recipients and window, the threshold of the most
+    specific rule, and caches the result as arrays until the ranking changes.
+    The windows in minutes of the rules are resolved after the alert windows.
+    """
+
+    def __init__(self, rules):
+        """
+        Initializes the AlertRuleIndex.
+        Args:
+            rules (list): The AlertRules.
+        """
+        self.rules = list(rules)
+
+        self.move_windows = tuple(
+            sorted({window for rule in self.rules for window in rule.move_thresholds})
+        )
+
+        self.by_symbol = {}
+        self.rank_rules = []
+        self.global_rules = []
+
+        for rule_id, rule in enumerate(self.rules):
+            if rule.symbols is not None:
+                for symbol in rule.symbols:
+                    self.by_symbol.setdefault(symbol, []).append(rule_id)
+            elif rule.ranks is not None:
+                self.rank_rules.append(rule_id)
+            else:
+                self.global_rules.append(rule_id)
+
+        self.compiled_symbols = None
+        self.compiled = None
+
+    @classmethod
+    def from_config(cls, config, default_thresholds):
+        """
+        Builds the index of the configured rules plus the default rule.
+        Invalid rules are logged and skipped.
+        Args:
+            config (dict): The "groups" and "rules" of the alert rules file.
+            default_thresholds (dict): The global threshold of each window.
+        Returns:
+            AlertRuleIndex: The index.
+        """
+        groups = {
+            name: [symbol.upper() for symbol in symbols]
+            for name, symbols in config.get("groups", {}).items()
+        }
+        rules = [AlertRule("default", default_thresholds)]
+
+        for rule_config in config.get("rules", []):
+            try:
+                rules.append(AlertRule.from_config(rule_config, groups))
+            except (TypeError, ValueError) as e:
+                logger.error("Skipping alert rule %s: %s", rule_config, e)
+                print(f"❌ Skipping alert rule {rule_config}: {e}")
+
+        return cls(rules)
+
+    def get_rules(self, symbol, rank):
+        """
+        Returns the rules that apply to a symbol at a rank.
+        Args:
+            symbol (str): The symbol.
+            rank (int): Its market cap rank, starting from 1.
+        Returns:
+            list: The rule ids.
+        """
+        rule_ids = self.global_rules + self.by_symbol.get(symbol, [])
+
+        for rule_id in self.rank_rules:
+            first, last = self.rules[rule_id].ranks
+            if first <= rank <= last:
+                rule_ids.append(rule_id)
+
+        return rule_ids
+
+    def compile(self, symbols):
+        """
+        Resolves the thresholds of a ranking of symbols.
+        Args:
+            symbols (tuple): The symbols, ordered by market cap rank.
+        Returns:
+            tuple: One entry per (symbol, recipients) pair: the row of the symbol,
+            the recipients, and the (entries x windows) thresholds of WINDOWS then
+            `move_windows`, NaN where no rule checks the window.
+        """
+        if symbols == self.compiled_symbols:
+            return self.compiled
+
+        rows = []
+        recipients = []
+        thresholds = []
+
+        for row, symbol in enumerate(symbols):
+            by_recipients = {}
+
+            for rule_id in self.get_rules(symbol, row + 1):
+                rule = self.rules[rule_id]
+                by_recipients.setdefault(rule.recipients, []).append(rule)
+
+            for rule_recipients, rules in by_recipients.items():
+                resolved = np.full(len(WINDOWS) + len(self.move_windows), np.nan)
+
+                # The most specific rules are applied last and win
+                for rule in sorted(rules, key=lambda rule: rule.specificity):
+                    rule_thresholds = np.concatenate(
+                        [
+                            rule.thresholds,
+                            [
+                                rule.move_thresholds.get(window, np.nan)
+                                for window in self.move_windows
+                            ],
+                        ]
+                    )
+                    checked = ~np.isnan(rule_thresholds)
+                    resolved[checked] = rule_thresholds[checked]
+
+                rows.append(row)
+                recipients.append(rule_recipients)
+                thresholds.append(resolved)
+
+        self.compiled_symbols = symbols
+        self.compiled = (
+            np.array(rows, dtype=np.intp),
+            recipients,
+            np.array(thresholds, dtype=np.float64).reshape(
+                -1, len(WINDOWS) + len(self.move_windows)
+            ),
+        )
+
+        return self.compiled
+
+    def evaluate(self, quotes, windows=None):
+        """
+        Finds the changes crossing the threshold of their rules.
+        Args:
+            quotes (Mapping): The quotes, ordered by market cap rank.
+            windows (list, optional): The windows to check, all by default.
+        Returns:
+            list: The AlertRecords, grouped by window and ordered by rank.
+        """
+        snapshot = as_snapshot(quotes)
+        windows = list(windows or WINDOWS)
+
+        rows, recipients, thresholds = self.compile(tuple(snapshot.symbols.tolist()))
+
+        columns = [WINDOWS.index(window) for window in windows]
+        changes = snapshot.values[rows][:, [WINDOW_COLUMNS[c] for c in columns]]
+        limits = thresholds[:, columns]
+
+        # Windows without a threshold are NaN and never match
+        with np.errstate(invalid="ignore"):
+            hits = np.abs(changes) >= limits
+
+        window_indexes, entries = np.nonzero(hits.T)
+
+        return [
+            AlertRecord(
+                str(snapshot.symbols[rows[entry]]),
+                windows[column],
+                float(changes[entry, column]),
+                float(limits[entry, column]),
+                recipients[entry],
+            )
+            for column, entry in zip(window_indexes.tolist(), entries.tolist())
+        ]
+
+    def evaluate_moves(self, symbols, window, changes, default_threshold):
+        """
+        Finds the moves over a window in minutes crossing the threshold of their
+        rules. The configured threshold of the window is its default rule.
+        Args:
+            symbols (tuple): The symbols, ordered by market cap rank.
+            window (str): The window in minutes, e.g. "15m".
+            changes (np.ndarray): The change of each symbol over the window.
+            default_threshold (float): The threshold of the default chats.
+        Returns:
+            list: The AlertRecords, ordered by rank.
+        """
+        rows, recipients, thresholds = self.compile(tuple(symbols))
+
+        if window in self.move_windows:
+            limits = thresholds[:, len(WINDOWS) + self.move_windows.index(window)]
+        else:
+            limits = np.full(len(rows), np.nan)
+
+        defaults = np.array([not chats for chats in recipients], dtype=bool)
+        limits = np.where(np.isnan(limits) & defaults, default_threshold, limits)
+        changes = np.asarray(changes, dtype=np.float64)[rows]
+
+        with np.errstate(invalid="ignore"):
+            hits = np.flatnonzero(np.abs(changes) >= limits)
+
+        return [
+            AlertRecord(
+                str(symbols[rows[entry]]),
+                window,
+                float(changes[entry]),
+                float(limits[entry]),
+                recipients[entry],
+            )
+            for entry in hits.tolist()
+        ]
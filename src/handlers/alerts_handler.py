@@ -4,12 +4,22 @@ Alerts module for monitoring significant price changes in cryptocurrencies.
 
 import asyncio
 import logging
+import math
 from datetime import datetime
 
+from src.data_base.alert_state import AlertStateStore
 from src.handlers import load_variables_handler as LoadVariables
+from src.handlers.alert_engine import (
+    ALERT_WINDOWS,
+    as_snapshot,
+    get_move_window,
+    group_alerts,
+    render_alerts,
+)
+from src.handlers.alert_rules import AlertRuleIndex
 from src.handlers.crypto_rsi_handler import CryptoRSIHandler
 from src.handlers.send_telegram_message import TelegramMessagesHandler
-from src.utils.utils import format_change
+from src.utils.price_history import PriceHistory
 
 logger = logging.getLogger(__name__)
 logger.info("Alerts script started")
@@ -42,11 +52,26 @@ class AlertsHandler:
 
         self.telegram_message = TelegramMessagesHandler()
         self.rsi_handler = CryptoRSIHandler()
+        self.alert_state = AlertStateStore()
 
         self.rsi_timeframes = []
 
+        self.alert_windows = {}
+
+        self.rule_index = None
+
         self.reload_the_data()
 
+        # Kept across reloads, it is fed by every quote refresh
+        variables = LoadVariables.load_json()
+        self.price_history = PriceHistory(
+            variables.get("PRICE_HISTORY_CAPACITY", 2880),
+            variables.get("PRICE_HISTORY_MAX_GAP", 1.0),
+        )
+
+        # The symbols of the last quote refresh, ordered by market cap rank
+        self.ranking = ()
+
     def reload_the_data(self):
         """
         Reloads the configuration data for alerts from the variables file.
@@ -68,146 +93,201 @@ class AlertsHandler:
 
         self.rsi_timeframes = variables.get("RSI_CHECK_TIMEFRAMES", ["1h"])
 
+        # Thresholds of the price moves measured locally, by window in minutes
+        self.alert_windows = variables.get("ALERT_WINDOWS_MINUTES", {})
+
+        # The global thresholds are the default rule of every symbol
+        self.rule_index = AlertRuleIndex.from_config(
+            LoadVariables.load_alert_rules(),
+            {
+                "1h": self.alert_threshold_1h,
+                "24h": self.alert_threshold_24h,
+                "7d": self.alert_threshold_7d,
+                "30d": self.alert_threshold_30d,
+            },
+        )
+
         self.telegram_message.reload_the_data()
         self.rsi_handler.reload_the_data()
+        self.alert_state.reload_the_data()
 
-    # Check for alerts every 30 minutes
-    async def check_for_major_updates_1h(self, top_100_crypto, update=None):
+    async def send_alerts(self, windows, records, update=None):
         """
-        Checks for significant price changes in the last hour for the top 100 cryptocurrencies.
+        Renders and sends one alert message per window and recipients.
+        The alerts of rules with their own recipients are only sent by the
+        scheduled checks, a reply to an update gets the default alerts.
+        Args:
+            windows (list): The evaluated alert windows.
+            records (list): The AlertRecords found for them.
+            update: Optional; if provided, the message will be sent as a reply to this update.
+        Returns:
+            set: The windows an alert was sent for.
         """
-        alert_message = (
-            "🚨 <b>Crypto Alert!</b> Significant 1-hour change detected:\n\n"
-        )
-        alerts_found = False
+        by_recipients = {}
+        for record in records:
+            by_recipients.setdefault(record.recipients, []).append(record)
 
-        for symbol, data in top_100_crypto.items():
-            change_1h = data["change_1h"]
+        default_groups = group_alerts(by_recipients.pop((), []))
 
-            if abs(change_1h) >= self.alert_threshold_1h:
-                alerts_found = True
-                alert_message += f"<b>{symbol}</b> → {format_change(change_1h)}\n"
+        for window in windows:
+            if window not in default_groups:
+                logger.error(" No major price movement for %s!", window)
+                print(f"\nNo major {window} price movement at ", datetime.now(), "\n")
+                continue
 
-        if alerts_found:
             await self.telegram_message.send_telegram_message(
-                alert_message, self.telegram_api_token_alerts, False, update
+                render_alerts(window, default_groups[window]),
+                self.telegram_api_token_alerts,
+                False,
+                update,
             )
 
-            return True
+        if update is not None:
+            return set(default_groups)
 
-        logger.error("No major price movement for 1h!")
-        print("\nNo major 1h price movement at ", datetime.now(), "\n")
+        for recipients, recipient_records in by_recipients.items():
+            for window, window_records in group_alerts(recipient_records).items():
+                await self.telegram_message.send_telegram_message_to_chats(
+                    render_alerts(window, window_records),
+                    self.telegram_api_token_alerts,
+                    recipients,
+                )
 
-        return False
+        return {record.window for record in records}
 
-    async def check_for_major_updates_24h(self, top_100_crypto, update=None):
+    async def check_windows(self, windows, top_100_crypto, update=None):
         """
-        Checks for significant price changes in the last 24 hours for the top 100 cryptocurrencies.
+        Checks the top 100 cryptocurrencies against the alert rules of several
+        alert windows in a single pass and sends the alerts found.
+        The scheduled checks only send the alerts that just fired, a reply to an
+        update lists every move above its threshold.
+        Args:
+            windows (list): The alert windows, keys of ALERT_WINDOWS.
+            top_100_crypto (Mapping): The quotes to check, ordered by rank.
+            update: Optional; if provided, the message will be sent as a reply to this update.
+        Returns:
+            set: The windows an alert was sent for.
         """
-        alert_message = (
-            "🚨 <b>Crypto Alert!</b> Significant 24-hours change detected:\n\n"
-        )
-        alerts_found = False
+        snapshot = as_snapshot(top_100_crypto)
+        records = self.rule_index.evaluate(snapshot, windows)
 
-        for symbol, data in top_100_crypto.items():
-            change_24h = data["change_24h"]
+        if update is None:
 
-            if abs(change_24h) >= self.alert_threshold_24h:
-                alerts_found = True
-                alert_message += f"<b>{symbol}</b> → {format_change(change_24h)}\n"
+            def get_change(symbol, window):
+                if symbol not in snapshot:
+                    return math.nan
+                return snapshot[symbol][ALERT_WINDOWS[window]]
 
-        if alerts_found:
-            await self.telegram_message.send_telegram_message(
-                alert_message, self.telegram_api_token_alerts, False, update
-            )
+            records = await self.alert_state.update(windows, records, get_change)
 
-            return True
+        return await self.send_alerts(windows, records, update)
 
-        logger.error(" No major price movement for 24h!")
-        print("No major 24h price movement at ", datetime.now(), "\n")
+    # Check for alerts every 30 minutes
+    async def check_for_major_updates_1h(self, top_100_crypto, update=None):
+        """
+        Checks for significant price changes in the last hour for the top 100 cryptocurrencies.
+        """
+        return bool(await self.check_windows(["1h"], top_100_crypto, update))
 
-        return False
+    async def check_for_major_updates_24h(self, top_100_crypto, update=None):
+        """
+        Checks for significant price changes in the last 24 hours for the top 100 cryptocurrencies.
+        """
+        return bool(await self.check_windows(["24h"], top_100_crypto, update))
 
     async def check_for_major_updates_7d(self, top_100_crypto, update=None):
         """
         Checks for significant price changes in the last 7 days for the top 100 cryptocurrencies.
         """
-        alert_message = (
-            "🚨 <b>Crypto Alert!</b> Significant 7-days change detected:\n\n"
-        )
-        alerts_found = False
-
-        for symbol, data in top_100_crypto.items():
-            change_7d = data["change_7d"]
-
-            if abs(change_7d) >= self.alert_threshold_7d:
-                alerts_found = True
-                alert_message += f"<b>{symbol}</b> → {format_change(change_7d)}\n"
-
-        if alerts_found:
-            await self.telegram_message.send_telegram_message(
-                alert_message, self.telegram_api_token_alerts, False, update
-            )
-
-            return True
-        logger.error(" No major price movement for 7d!")
-        print("\nNo major 7d price movement at ", datetime.now(), "\n")
-
-        return False
+        return bool(await self.check_windows(["7d"], top_100_crypto, update))
 
     async def check_for_major_updates_30d(self, top_100_crypto, update=None):
         """
         Checks for significant price changes in the last 30 days for the top 100 cryptocurrencies.
         """
-        alert_message = (
-            "🚨 <b>Crypto Alert!</b> Significant 30-days change detected:\n\n"
-        )
-        alerts_found = False
+        return bool(await self.check_windows(["30d"], top_100_crypto, update))
 
-        for symbol, data in top_100_crypto.items():
-            change_30d = data["change_30d"]
+    def record_prices(self, snapshot):
+        """
+        Adds the prices of a quote refresh to the price history.
+        Args:
+            snapshot (QuoteSnapshot): The refreshed quotes.
+        """
+        self.price_history.record(snapshot)
+        self.ranking = tuple(snapshot.symbols.tolist())
+
+    async def check_for_window_moves(self, update=None):
+        """
+        Checks for significant price changes over the configured custom windows,
+        measured on the recorded price history instead of the API changes.
+        The moves go through the alert rules and the alert state like the other
+        windows, the configured threshold of a window being its default rule.
+        Args:
+            update: Optional; if provided, the message will be sent as a reply to this update.
+        Returns:
+            bool: True if an alert was sent.
+        """
+        windows = []
+        records = []
+        changes = {}
 
-            if abs(change_30d) >= self.alert_threshold_30d:
-                alerts_found = True
-                alert_message += f"<b>{symbol}</b> → {format_change(change_30d)}\n"
+        for minutes, threshold in self.alert_windows.items():
+            window = get_move_window(minutes)
+            windows.append(window)
 
-        if alerts_found:
-            await self.telegram_message.send_telegram_message(
-                alert_message, self.telegram_api_token_alerts, False, update
+            changes[window] = self.price_history.change_over(float(minutes) * 60)
+            ranked = changes[window][self.price_history.get_rows(self.ranking)]
+
+            records.extend(
+                self.rule_index.evaluate_moves(self.ranking, window, ranked, threshold)
             )
 
-            return True
+        if update is None:
 
-        logger.error(" No major price movement for 30d!")
-        print("\nNo major 30d price movement at: ", datetime.now(), "\n")
+            def get_change(symbol, window):
+                # A persisted alert may be for a symbol not recorded yet
+                if window not in changes or symbol not in self.price_history.index:
+                    return math.nan
+                return changes[window][self.price_history.index[symbol]]
 
-        return False
+            records = await self.alert_state.update(windows, records, get_change)
+
+        return bool(await self.send_alerts(windows, records, update))
 
     async def check_for_alerts(self, now_date, top_100_crypto, update=None):
         """
-        Checks for significant price changes in the top 100 cryptocurrencies
+        Checks for significant price changes in the top 100 cryptocurrencies.
+        The 1-hour window is checked on every call, the longer windows once per
+        hour at their send hours.
+        Args:
+            now_date: The current date and time, None to check every window.
+            top_100_crypto (Mapping): The quotes to check, ordered by rank.
+            update: Optional; if provided, the message will be sent as a reply to this update.
+        Returns:
+            bool: True if an alert was sent for a longer window.
         """
-        await self.check_for_major_updates_1h(top_100_crypto, update)
+        windows = ["1h"]
+        hour_slot = (
+            now_date.replace(minute=0, second=0, microsecond=0) if now_date else None
+        )
 
-        found_alerts = False
+        if now_date is None or self.last_hour_sent != hour_slot:
+            self.last_hour_sent = hour_slot
 
-        if now_date is None or self.last_hour_sent != now_date.hour:
-            self.last_hour_sent = datetime.now()
+            for window, send_hours in (
+                ("24h", self.alert_send_hours_24h),
+                ("7d", self.alert_send_hours_7d),
+                ("30d", self.alert_send_hours_30d),
+            ):
+                if now_date is None or now_date.hour in send_hours:
+                    windows.append(window)
 
-            if now_date is None or now_date.hour in self.alert_send_hours_24h:
-                found_alerts = await self.check_for_major_updates_24h(
-                    top_100_crypto, update
-                )
-            if now_date is None or now_date.hour in self.alert_send_hours_7d:
-                found_alerts = await self.check_for_major_updates_7d(
-                    top_100_crypto, update
-                )
-            if now_date is None or now_date.hour in self.alert_send_hours_30d:
-                found_alerts = await self.check_for_major_updates_30d(
-                    top_100_crypto, update
-                )
+        # Every due window is evaluated in the same pass
+        alerted = await self.check_windows(windows, top_100_crypto, update)
+
+        await self.check_for_window_moves(update)
 
-        return found_alerts
+        return bool(alerted - {"1h"})
 
     async def rsi_check(self):
         """
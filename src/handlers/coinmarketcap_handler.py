@@ -0,0 +1,494 @@
+"""
+coinmarketcap_handler.py
+This module is the single entry point to CoinMarketCap API. It keeps the credits spent
+by all the bots within the plan budget, serves quotes from the shared listings snapshot
+when it is fresh enough and batches the remaining symbol lookups into one call.
+"""
+
+import asyncio
+import datetime
+import functools
+import logging
+import math
+import time
+
+import src.handlers.load_variables_handler
+from src.data_base.quote_cache import QuoteCache
+from src.utils.utils import check_requests
+
+logger = logging.getLogger(__name__)
+logger.info("CoinMarketCap handler started")
+
+CMC_API = "coinmarketcap"
+
+# The top 100 listings, shared by every bot through the quote cache
+LISTINGS_CACHE_KEY = "cmc:listings:USD:100"
+LISTINGS_LIMIT = 100
+
+BUDGET_OK = "ok"
+BUDGET_LOW = "low"
+BUDGET_EXHAUSTED = "exhausted"
+
+# Fiat currencies quoted by CoinMarketCap through the convert parameter
+FIAT_SYMBOLS = frozenset(
+    {
+        "USD",
+        "EUR",
+        "GBP",
+        "JPY",
+        "CHF",
+        "CAD",
+        "AUD",
+        "NZD",
+        "CNY",
+        "HKD",
+        "SGD",
+        "KRW",
+        "INR",
+        "BRL",
+        "MXN",
+        "RUB",
+        "TRY",
+        "PLN",
+        "SEK",
+        "NOK",
+        "DKK",
+        "CZK",
+        "HUF",
+        "RON",
+        "UAH",
+        "ZAR",
+    }
+)
+
+
+def get_quote_cache_key(symbol, currency="USD"):
+    """
+    Returns the quote cache key of a symbol.
+    Args:
+        symbol (str): The cryptocurrency symbol (e.g., "BTC").
+        currency (str, optional): The currency of the quote. Defaults to "USD".
+    Returns:
+        str: The cache key.
+    """
+    return f"cmc:quotes:{currency}:{symbol}"
+
+
+def is_fiat(symbol):
+    """
+    Checks if a symbol is a fiat currency rather than a cryptocurrency.
+    Args:
+        symbol (str): The symbol (e.g., "EUR").
+    Returns:
+        bool: True if CoinMarketCap quotes it as a fiat currency.
+    """
+    return symbol.upper() in FIAT_SYMBOLS
+
+
+def get_call_credits(results):
+    """
+    Estimates the credits of a call, one per call and per started 100 results.
+    Used when the response does not report its own credit count.
+    Args:
+        results (int): The number of results requested.
+    Returns:
+        int: The credits.
+    """
+    return max(1, math.ceil(results / 100))
+
+
+def get_budget_days(now=None):
+    """
+    Returns the UTC days bounding the daily and monthly credit budgets.
+    Args:
+        now (datetime, optional): The reference time, defaults to the current UTC time.
+    Returns:
+        tuple: The day, next day, first day of the month and of the next month,
+        formatted as YYYY-MM-DD.
+    """
+    today = (now or datetime.datetime.now(datetime.timezone.utc)).date()
+    month_start = today.replace(day=1)
+    next_month = (month_start + datetime.timedelta(days=32)).replace(day=1)
+
+    return (
+        today.isoformat(),
+        (today + datetime.timedelta(days=1)).isoformat(),
+        month_start.isoformat(),
+        next_month.isoformat(),
+    )
+
+
+def get_response_timestamp(data):
+    """
+    Returns when CoinMarketCap produced a response.
+    Args:
+        data (dict): The API response.
+    Returns:
+        float: The UNIX timestamp of the response, or None if it has none.
+    """
+    timestamp = data.get("status", {}).get("timestamp")
+
+    try:
+        return datetime.datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+# pylint: disable=too-many-instance-attributes
+class CoinMarketCapClient:
+    """
+    CoinMarketCapClient fetches listings and quotes from CoinMarketCap API.
+    Every call is recorded in the credit ledger shared by the bot processes.
+    When the budget runs low the cached data is kept longer, and when it is spent
+    only cached data is served.
+    """
+
+    def __init__(self, quote_cache=None):
+        """
+        Initializes the CoinMarketCapClient.
+        Args:
+            quote_cache (QuoteCache, optional): The shared cache of the responses.
+        """
+        self.api_key = None
+        self.listings_url = None
+        self.quotes_url = None
+
+        self.daily_credit_limit = None
+        self.monthly_credit_limit = None
+        self.low_budget_ratio = None
+        self.low_budget_ttl = None
+
+        self.listings_max_age = None
+        self.coalesce_window = None
+
+        self.quote_cache = quote_cache or QuoteCache()
+
+        # Symbols waiting for the next batched quotes call
+        self.pending = {}
+        self.batch_task = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the API settings and the credit budget from the variables file.
+        """
+        variables = src.handlers.load_variables_handler.load_json()
+
+        self.api_key = variables.get("CMC_API_KEY", "")
+        self.listings_url = variables.get("CMC_URL_LISTINGS", "")
+        self.quotes_url = variables.get("CMC_URL_QUOTES", "")
+
+        self.daily_credit_limit = variables.get("CMC_DAILY_CREDIT_LIMIT", 330)
+        self.monthly_credit_limit = variables.get("CMC_MONTHLY_CREDIT_LIMIT", 10000)
+        self.low_budget_ratio = variables.get("CMC_LOW_BUDGET_RATIO", 0.2)
+        self.low_budget_ttl = variables.get("CMC_LOW_BUDGET_TTL", 900)
+
+        self.listings_max_age = variables.get("CMC_LISTINGS_MAX_AGE", 300)
+        self.coalesce_window = variables.get("CMC_COALESCE_WINDOW", 0.05)
+
+        self.quote_cache.reload_the_data()
+
+    async def get_credits_used(self, now=None):
+        """
+        Returns the credits spent by all the bots today and this month.
+        Args:
+            now (datetime, optional): The reference time.
+        Returns:
+            tuple: The daily and monthly credits.
+        """
+        day, next_day, month_start, next_month = get_budget_days(now)
+
+        daily = await self.quote_cache.get_credits(CMC_API, day, next_day)
+        monthly = await self.quote_cache.get_credits(CMC_API, month_start, next_month)
+
+        return daily, monthly
+
+    async def get_budget_state(self, now=None):
+        """
+        Returns how much of the daily and monthly budgets is left.
+        Args:
+            now (datetime, optional): The reference time.
+        Returns:
+            str: BUDGET_OK, BUDGET_LOW or BUDGET_EXHAUSTED.
+        """
+        daily, monthly = await self.get_credits_used(now)
+
+        left = min(
+            1 - daily / self.daily_credit_limit,
+            1 - monthly / self.monthly_credit_limit,
+        )
+
+        if left <= 0:
+            return BUDGET_EXHAUSTED
+        if left < self.low_budget_ratio:
+            return BUDGET_LOW
+        return BUDGET_OK
+
+    async def get_cache_ttl(self):
+        """
+        Returns how long cached responses stay fresh with the budget left.
+        Returns:
+            float: The TTL in seconds, infinite once the budget is spent.
+        """
+        state = await self.get_budget_state()
+
+        if state == BUDGET_EXHAUSTED:
+            return math.inf
+        if state == BUDGET_LOW:
+            return max(self.quote_cache.ttl, self.low_budget_ttl)
+        return self.quote_cache.ttl
+
+    async def request(self, url, params, results):
+        """
+        Calls CoinMarketCap API and records the credits it cost.
+        Args:
+            url (str): The endpoint URL.
+            params (dict): The query parameters.
+            results (int): The number of results requested, to estimate the credits.
+        Returns:
+            dict: The API response, or None if it failed or the budget is spent.
+        """
+        if await self.get_budget_state() == BUDGET_EXHAUSTED:
+            logger.warning("CoinMarketCap credit budget spent, serving cached data")
+            return None
+
+        headers = {
+            "Accepts": "application/json",
+            "X-CMC_PRO_API_KEY": self.api_key,
+        }
+        data = await check_requests(url, headers=headers, params=params)
+
+        if not data or "data" not in data:
+            logger.error(
+                "Error fetching data from CoinMarketCap API: %s",
+                (data or {}).get("status", {}),
+            )
+            return None
+
+        spent = data.get("status", {}).get("credit_count") or get_call_credits(results)
+        await self.quote_cache.add_credits(CMC_API, spent, get_budget_days()[0])
+
+        return data
+
+    async def fetch_listings(self):
+        """
+        Fetches the top 100 cryptocurrencies.
+        Returns:
+            dict: The API response, or None if the request failed.
+        """
+        parameters = {
+            "start": "1",
+            "limit": str(LISTINGS_LIMIT),
+            "convert": "USD",
+        }
+
+        return await self.request(self.listings_url, parameters, LISTINGS_LIMIT)
+
+    async def get_listings(self):
+        """
+        Returns the top 100 cryptocurrencies by market cap, from the shared cache.
+        Returns:
+            dict: The listings response, or None if it was never fetched.
+        """
+        ttl = await self.get_cache_ttl()
+
+        return await self.quote_cache.get_or_fetch(
+            LISTINGS_CACHE_KEY, self.fetch_listings, ttl
+        )
+
+    async def get_listings_quotes(self, symbols, max_age):
+        """
+        Looks symbols up in the cached listings, without fetching them.
+        Args:
+            symbols (set): The upper case symbols.
+            max_age (float): The maximum age of the listings, in seconds.
+        Returns:
+            dict: The coin data of the symbols found, by symbol.
+        """
+        cached = await self.quote_cache.read(LISTINGS_CACHE_KEY)
+
+        if cached is None or time.time() - cached[1] >= max_age:
+            return {}
+
+        quotes = {}
+        for coin in cached[0]["data"]:
+            if coin["symbol"] in symbols:
+                # The listings are ranked, the first coin of a symbol is the main one
+                quotes.setdefault(coin["symbol"], coin)
+
+        return quotes
+
+    async def get_quotes(self, symbols):
+        """
+        Returns the latest USD quotes of several symbols.
+        The fresh listings snapshot is used first, then the cached quotes, and the
+        rest is fetched in one call batched with the concurrent lookups.
+        Args:
+            symbols (iterable): The cryptocurrency symbols.
+        Returns:
+            dict: The coin data by upper case symbol, missing symbols are left out.
+        """
+        symbols = {symbol.upper() for symbol in symbols}
+        ttl = await self.get_cache_ttl()
+
+        quotes = await self.get_listings_quotes(
+            symbols, max(self.listings_max_age, ttl)
+        )
+
+        for symbol in symbols - quotes.keys():
+            cached = await self.quote_cache.read(get_quote_cache_key(symbol))
+            if cached is not None and time.time() - cached[1] < ttl:
+                quotes[symbol] = cached[0]
+
+        missing = symbols - quotes.keys()
+        if missing:
+            quotes.update(await self.fetch_coalesced(missing))
+
+        return quotes
+
+    async def get_quote(self, symbol):
+        """
+        Returns the latest USD quote of a symbol.
+        Args:
+            symbol (str): The cryptocurrency symbol (e.g., "BTC").
+        Returns:
+            dict: The coin data, or None if not found.
+        """
+        quotes = await self.get_quotes([symbol])
+
+        return quotes.get(symbol.upper())
+
+    async def get_fiat_price(self, symbol, fiat):
+        """
+        Returns the price of a cryptocurrency in a fiat currency.
+        USD prices come from the shared quotes, other currencies are converted by
+        CoinMarketCap in one call and cached like the quotes.
+        Args:
+            symbol (str): The cryptocurrency symbol (e.g., "BTC").
+            fiat (str): The fiat currency (e.g., "EUR").
+        Returns:
+            float: The price, or None if not found.
+        """
+        symbol, fiat = symbol.upper(), fiat.upper()
+
+        if fiat == "USD":
+            coin = await self.get_quote(symbol)
+        else:
+            coin = await self.quote_cache.get_or_fetch(
+                get_quote_cache_key(symbol, fiat),
+                functools.partial(self.fetch_fiat_quote, symbol, fiat),
+                await self.get_cache_ttl(),
+            )
+
+        if coin is None or fiat not in coin.get("quote", {}):
+            return None
+
+        return coin["quote"][fiat]["price"]
+
+    async def fetch_fiat_quote(self, symbol, fiat):
+        """
+        Fetches the quote of a symbol converted to a fiat currency.
+        Args:
+            symbol (str): The upper case symbol.
+            fiat (str): The upper case fiat currency.
+        Returns:
+            dict: The coin data, or None if the request failed or it was not found.
+        """
+        parameters = {"symbol": symbol, "convert": fiat}
+        data = await self.request(self.quotes_url, parameters, 1)
+
+        if data is None or not data["data"].get(symbol):
+            return None
+
+        coin = data["data"][symbol]
+        return coin[0] if isinstance(coin, list) else coin
+
+    async def fetch_coalesced(self, symbols):
+        """
+        Queues symbols for the next batched quotes call and waits for it.
+        Args:
+            symbols (set): The upper case symbols.
+        Returns:
+            dict: The coin data of the symbols found, by symbol.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.batch_task is not None and self.batch_task.get_loop() is not loop:
+            # A batch of a closed event loop will never be sent
+            self.pending = {}
+            self.batch_task = None
+
+        futures = {}
+        for symbol in symbols:
+            futures[symbol] = loop.create_future()
+            self.pending.setdefault(symbol, []).append(futures[symbol])
+
+        if self.batch_task is None:
+            self.batch_task = loop.create_task(self.send_batch())
+
+        results = await asyncio.gather(*futures.values())
+
+        return {
+            symbol: quote
+            for symbol, quote in zip(futures, results)
+            if quote is not None
+        }
+
+    async def send_batch(self):
+        """
+        Waits for the lookups of the coalesce window and sends them as one call.
+        """
+        await asyncio.sleep(self.coalesce_window)
+
+        # Lookups made from now on go to the next batch
+        pending, self.pending = self.pending, {}
+        self.batch_task = None
+
+        try:
+            quotes = await self.fetch_quotes(sorted(pending))
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.error("Error fetching the quotes of %s: %s", sorted(pending), e)
+            quotes = {}
+
+        for symbol, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(quotes.get(symbol))
+
+    async def fetch_quotes(self, symbols):
+        """
+        Fetches the quotes of several symbols in one call and caches them.
+        Falls back to the cached quotes, however old, if the call is not possible.
+        Args:
+            symbols (list): The upper case symbols.
+        Returns:
+            dict: The coin data of the symbols found, by symbol.
+        """
+        parameters = {
+            "symbol": ",".join(symbols),
+            "convert": "USD",
+            # Unknown symbols are left out instead of failing the whole batch
+            "skip_invalid": "true",
+        }
+        data = await self.request(self.quotes_url, parameters, len(symbols))
+
+        if data is None:
+            quotes = await self.get_listings_quotes(set(symbols), math.inf)
+            for symbol in symbols:
+                cached = await self.quote_cache.read(get_quote_cache_key(symbol))
+                if cached is not None:
+                    quotes[symbol] = cached[0]
+            return quotes
+
+        quotes = {
+            symbol: coin[0] if isinstance(coin, list) else coin
+            for symbol, coin in data["data"].items()
+            if coin
+        }
+        await self.quote_cache.store_many(
+            {get_quote_cache_key(symbol): coin for symbol, coin in quotes.items()}
+        )
+
+        return quotes
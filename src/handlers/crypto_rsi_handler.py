@@ -7,6 +7,7 @@ from datetime import datetime, timedelta, timezone
 
 from src.handlers.crypto_rsi_calculator import CryptoRSICalculator
 from src.handlers.load_variables_handler import load_json, load_rsi_categories
+from src.handlers.message_builder import MessageBuilder
 from src.handlers.save_data_handler import save_new_rsi_data
 from src.handlers.send_telegram_message import TelegramMessagesHandler
 
@@ -14,6 +15,23 @@ logger = logging.getLogger(__name__)
 logger.info("Crypto RSI handler started")
 
 
+def get_rsi_category_lines(category, entries):
+    """
+    Yields the lines of an RSI category, the highest values first.
+    Args:
+        category (dict): The RSI category.
+        entries (list): The (symbol, value) pairs of the category.
+    Yields:
+        str: The HTML lines.
+    """
+    yield f"{category['emoji']} <b>{category['name']} ({category['label']}):</b>"
+
+    for symbol, value in sorted(entries, key=lambda x: -x[1]):
+        yield f"- <i>{symbol}</i> — <b>{value:.2f}</b>"
+
+    yield "---------------------------------------------------------------"
+
+
 class CryptoRSIHandler:
     """
     CryptoRSIHandler class to handle RSI calculations for different timeframes.
@@ -27,7 +45,7 @@ class CryptoRSIHandler:
         self.should_calculate_rsi = True
 
         self.json = {}
-        self.message = None
+        self.messages = None
 
         self.new_data = None
 
@@ -65,17 +83,19 @@ class CryptoRSIHandler:
 
     def prepare_rsi_message_for_telegram(self, timeframe, rsi_data):
         """
-        Prepare the RSI message for Telegram based on the calculated RSI data.
+        Prepare the RSI messages for Telegram based on the calculated RSI data,
+        as many as the length limit of a message requires.
         Args:
             timeframe (str): The timeframe for which the RSI data is calculated.
             rsi_data (dict): The RSI data for the specified timeframe.
         """
         if not rsi_data:
             logger.error("No RSI data available.")
-            self.message = "An error occurred while fetching RSI data."
+            self.messages = ["An error occurred while fetching RSI data."]
             return
 
-        lines = [f"📊 <b>RSI Data for {timeframe}:</b>\n"]
+        builder = MessageBuilder()
+        builder.add_line(f"📊 <b>RSI Data for {timeframe}:</b>\n")
         any_found = False
 
         rsi_categories = load_rsi_categories()
@@ -88,44 +108,37 @@ class CryptoRSIHandler:
                     buckets[cat["name"]].append((symbol, value))
                     break
 
-        # Build the message
+        # Build the messages, a category in one message whenever it fits
         for cat in rsi_categories:
             entries = buckets[cat["name"]]
             if not entries:
                 continue
             any_found = True
 
-            # Header
-            lines.append(f"{cat['emoji']} <b>{cat['name']} ({cat['label']}):</b>")
-            # Entries
-            for symbol, value in sorted(entries, key=lambda x: -x[1]):
-                lines.append(f"- <i>{symbol}</i> — <b>{value:.2f}</b>")
-            lines.append(
-                "---------------------------------------------------------------"
-            )
+            builder.add_section(get_rsi_category_lines(cat, entries))
 
         if not any_found:
-            lines.append("<i>No significant RSI values found.</i>")
+            builder.add_line("<i>No significant RSI values found.</i>")
 
-        lines.append("#RSI")
-        self.message = "\n".join(lines)
+        builder.add_line("#RSI")
+        self.messages = builder.build()
 
     async def send_rsi_to_telegram(self, bot, is_important=False, update=None):
         """
-        Send RSI data to Telegram for the specified timeframe.
+        Send the RSI messages to Telegram, in order.
         Args:
             bot (Bot): The Telegram bot instance to send messages.
             is_important (bool): Flag to indicate if the message is important.
             update (Update, optional): The update object containing the message context.
         """
-        if not self.message:
+        if not self.messages:
             logger.error("Failed to calculate or send RSI data.")
-            self.message = "An error occurred while fetching RSI data."
+            self.messages = ["An error occurred while fetching RSI data."]
 
-        telegram_handler = TelegramMessagesHandler()
-        await telegram_handler.send_telegram_message(
-            self.message, bot, is_important, update
-        )
+        for message in self.messages:
+            await self.telegram_handler.queue_telegram_message(
+                message, bot, is_important, update
+            )
 
     def check_if_should_calculate_rsi(self, timeframe):
         """
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 logger.info("Data Fetcher started")
 
 
-def get_eth_gas_fee(etherscan_api_url):
+async def get_eth_gas_fee(etherscan_api_url):
     """
     Fetches the current Ethereum gas fees from the Etherscan API.
     Args:
@@ -23,7 +23,7 @@ def get_eth_gas_fee(etherscan_api_url):
                 Returns (None, None, None) if the request fails or data is not available.
     """
     try:
-        data = check_requests(etherscan_api_url)
+        data = await check_requests(etherscan_api_url)
 
         if data is not None and data["status"] == "1":
             gas_data = data["result"]
@@ -50,7 +50,7 @@ async def get_fear_and_greed_message():
     """
     url = "https://api.alternative.me/fng/"
 
-    data = check_requests(url)
+    data = await check_requests(url)
 
     if data is not None:
         index_value = data["data"][0]["value"]  # Fear & Greed Score
@@ -83,7 +83,7 @@ async def get_fear_and_greed():
                Returns (None, None, None) if the request fails or data is not available.
     """
     url = "https://api.alternative.me/fng/"
-    data = check_requests(url)
+    data = await check_requests(url)
 
     if data is not None:
         index_value = data["data"][0]["value"]  # Fear & Greed Score
@@ -282,3 +282,27 @@ def load_rsi_categories(filepath="./config/rsi_categories.json"):
         else:
             cat["test"] = lambda v: False  # fallback
     return raw_categories
+
+
+def load_alert_rules(file_path="./config/alert_rules.json"):
+    """
+    Load the alert rules and symbol groups from a JSON file.
+    Args:
+        file_path (str): Path to the JSON file containing the alert rules.
+    Returns:
+        dict: The "groups" and "rules" of the file,
+        or an empty dictionary if the file is missing or invalid.
+    """
+    if not os.path.exists(file_path):
+        logger.info(" Alert rules file %s not found. Using no rules.", file_path)
+        return {}
+
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            alert_rules = json.load(file)
+            print(f"✅ Alert rules loaded from '{file_path}'.")
+            return alert_rules
+    except json.JSONDecodeError:
+        logger.error(" Invalid JSON in alert rules file %s. Using no rules.", file_path)
+        print(f"❌ Invalid JSON in alert rules file '{file_path}'. Using no rules.")
+        return {}
@@ -3,6 +3,7 @@ Contains functions to calculate the market sentiment based on news articles.
 """
 
 from src.data_base.data_base_handler import DataBaseHandler
+from src.utils.utils import classify_sentiment
 
 
 async def extract_sentiment_from_summary(summary):
@@ -14,43 +15,17 @@ async def extract_sentiment_from_summary(summary):
         str: The sentiment of the summary, which can be
         "Positive", "Negative", "Neutral", or "Unknown".
     """
-    summary_lower = summary.lower()  # Convert to lowercase for easier matching
-
-    if "bullish" in summary_lower and (
-        "bearish" in summary_lower or "neutral" in summary_lower
-    ):
-        return "Unknown"
-    if "bullish" in summary_lower:
-        return "Positive"
-    if "bearish" in summary_lower:
-        return "Negative"
-    if "neutral" in summary_lower:
-        return "Neutral"
-    return "Unknown"  # If no sentiment is found
-
-
-async def calculate_sentiment_trend(news_items, save_data=False):
+    return classify_sentiment(summary)
+
+
+def format_sentiment_trend(sentiment_counts):
     """
-    Calculates the market sentiment trend based on news items.
+    Builds the market sentiment message from the sentiment counts.
     Args:
-        news_items (list): A list of news items, where each item is a tuple
-        containing news data, including the summary at index 4.
-        save_data (bool): If True, saves the sentiment data to the database.
+        sentiment_counts (dict): The number of articles per sentiment.
     Returns:
-        str: A message summarizing the market sentiment trend,
+        str: A message summarizing the market sentiment trend.
     """
-    sentiment_counts = {"Unknown": 0, "Negative": 0, "Neutral": 0, "Positive": 0}
-
-    for item in news_items:
-        if item[4] is not None:
-            sentiment = await extract_sentiment_from_summary(item[4])
-            sentiment_counts[sentiment] += 1  # Count occurrences
-    if save_data:
-        db = DataBaseHandler()
-
-        await db.store_market_sentiment(sentiment_counts)
-        return ""
-
     print("Calculating the sentiment...")
 
     max_sentiment = max(sentiment_counts, key=sentiment_counts.get)
@@ -72,12 +47,50 @@ async def calculate_sentiment_trend(news_items, save_data=False):
     return trend_message
 
 
-async def get_market_sentiment(save_data=False):
+async def calculate_sentiment_trend(news_items, save_data=False, data_base=None):
     """
-    Fetches today's news articles and calculates the market sentiment trend.
+    Calculates the market sentiment trend based on news items.
+    Args:
+        news_items (list): A list of news items, where each item is a tuple
+        containing news data, including the summary at index 4.
+        save_data (bool): If True, saves the sentiment data to the database.
+        data_base (DataBaseHandler, optional): The data base of the caller, so its
+            queued writes are flushed with the others.
+    Returns:
+        str: A message summarizing the market sentiment trend,
+    """
+    sentiment_counts = {"Unknown": 0, "Negative": 0, "Neutral": 0, "Positive": 0}
+
+    for item in news_items:
+        if item[4] is not None:
+            sentiment = classify_sentiment(item[4])
+            sentiment_counts[sentiment] += 1  # Count occurrences
+    if save_data:
+        db = data_base or DataBaseHandler()
+
+        await db.store_market_sentiment(sentiment_counts)
+        return ""
+
+    return format_sentiment_trend(sentiment_counts)
+
+
+async def get_market_sentiment(save_data=False, data_base=None):
     """
-    db = DataBaseHandler()
+    Reads today's sentiment counts, classified when the summaries were saved,
+    and builds the market sentiment message or stores the counts.
+    Args:
+        save_data (bool): If True, saves the sentiment data to the database.
+        data_base (DataBaseHandler, optional): The data base of the caller, so its
+            queued writes are flushed with the others.
+    Returns:
+        str: The market sentiment message, empty if the data was saved.
+    """
+    db = data_base or DataBaseHandler()
+
+    sentiment_counts = await db.get_daily_sentiment_counts()
 
-    articles = await db.fetch_todays_news()
+    if save_data:
+        await db.store_market_sentiment(sentiment_counts)
+        return ""
 
-    return await calculate_sentiment_trend(articles, save_data)
+    return format_sentiment_trend(sentiment_counts)
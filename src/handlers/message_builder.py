@@ -0,0 +1,222 @@
+"""
+message_builder.py
+This module assembles long HTML reports into Telegram messages. The lines are packed
+into as few messages as the length limit allows, split at line or section
+boundaries, and a text too long for one message is split without breaking its HTML
+tags or entities.
+"""
+
+import re
+
+# The maximum length of a Telegram message
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# A tag, e.g. <b> or </a>, or an entity, e.g. &amp;
+HTML_TOKEN_PATTERN = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^>]*>|&#?\w+;")
+
+
+def get_html_tokens(text):
+    """
+    Splits an HTML text into tags, entities and single characters.
+    Args:
+        text (str): The HTML text.
+    Returns:
+        list: The (token, tag_name, is_closing) tuples, tag_name is None for the
+            entities and the characters.
+    """
+    tokens = []
+    position = 0
+
+    for match in HTML_TOKEN_PATTERN.finditer(text):
+        tokens.extend((char, None, False) for char in text[position : match.start()])
+        tokens.append((match.group(0), match.group(2), match.group(1) == "/"))
+        position = match.end()
+
+    tokens.extend((char, None, False) for char in text[position:])
+
+    return tokens
+
+
+def get_closing_tags(opened):
+    """
+    Returns the tags closing the open ones, innermost first.
+    Args:
+        opened (list): The (tag_name, tag) of the open tags, outermost first.
+    Returns:
+        str: The closing tags.
+    """
+    return "".join(f"</{name}>" for name, _ in reversed(opened))
+
+
+def get_opened_tags(opened, token, name, is_closing):
+    """
+    Returns the open tags after a token.
+    Args:
+        opened (list): The (tag_name, tag) of the open tags, outermost first.
+        token (str): The token.
+        name (str): The tag name of the token, None if it is not a tag.
+        is_closing (bool): True if the token closes a tag.
+    Returns:
+        list: The open tags, `opened` itself if the token is not a tag.
+    """
+    if name is None:
+        return opened
+
+    if not is_closing:
+        return opened + [(name, token)]
+
+    names = [opened_name for opened_name, _ in opened]
+    if name not in names:
+        return opened
+
+    index = len(names) - 1 - names[::-1].index(name)
+    return opened[:index] + opened[index + 1 :]
+
+
+def get_part_end(tokens, start, start_opened, limit):
+    """
+    Finds where the part starting at a token ends: at its last line break, else at
+    its last space, else at the last token fitting in the limit.
+    Args:
+        tokens (list): The tokens of the text.
+        start (int): The first token of the part.
+        start_opened (list): The tags open at the start of the part.
+        limit (int): The maximum length of the part.
+    Returns:
+        tuple: The index after the last token and the tags open there.
+    """
+    length = sum(len(tag) for _, tag in start_opened)
+    opened = start_opened
+    line_break = None
+    space = None
+    end = start
+
+    while end < len(tokens):
+        token = tokens[end][0]
+        next_opened = get_opened_tags(opened, *tokens[end])
+
+        size = length + len(token) + len(get_closing_tags(next_opened))
+        if size > limit and end > start:
+            break
+
+        length += len(token)
+        opened = next_opened
+        end += 1
+
+        if token == "\n":
+            line_break = (end, opened)
+        elif token.isspace():
+            space = (end, opened)
+
+    if end == len(tokens):
+        return end, opened
+
+    # Prefer the line breaks, then the spaces, over a split inside a word
+    return line_break or space or (end, opened)
+
+
+def split_html(text, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Splits an HTML text into parts within the limit, at the last line break of each
+    part, else at its last space. The tags open at a split are closed at the end of
+    the part and opened again at the start of the next one.
+    Args:
+        text (str): The HTML text.
+        limit (int): The maximum length of a part.
+    Returns:
+        list: The parts.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    tokens = get_html_tokens(text)
+    parts = []
+    start = 0
+    opened = []
+
+    while start < len(tokens):
+        prefix = "".join(tag for _, tag in opened)
+        end, opened = get_part_end(tokens, start, opened, limit)
+
+        body = "".join(token for token, _, _ in tokens[start:end])
+        parts.append(prefix + body + get_closing_tags(opened))
+
+        start = end
+
+    return parts
+
+
+class MessageBuilder:
+    """
+    MessageBuilder streams lines into Telegram messages. Each line is expected to
+    close the tags it opens; a line too long for a message is split on its own.
+    A section stays in one message whenever it fits in one.
+    """
+
+    def __init__(self, limit=TELEGRAM_MESSAGE_LIMIT):
+        """
+        Initializes the MessageBuilder.
+        Args:
+            limit (int): The maximum length of a message.
+        """
+        self.limit = limit
+
+        self.messages = []
+        self.lines = []
+        self.length = 0
+
+    def add_line(self, line):
+        """
+        Adds a line to the current message, or starts a new one if it is full.
+        Args:
+            line (str): The HTML line, it may span several lines.
+        """
+        for part in split_html(line, self.limit):
+            if self.lines and self.length + 1 + len(part) > self.limit:
+                self.flush()
+
+            self.length += len(part) + (1 if self.lines else 0)
+            self.lines.append(part)
+
+    def add_lines(self, lines):
+        """
+        Adds lines, from any iterable or generator.
+        Args:
+            lines (iterable): The HTML lines.
+        """
+        for line in lines:
+            self.add_line(line)
+
+    def add_section(self, lines):
+        """
+        Adds lines that start a new message rather than be split, if they fit in one.
+        Args:
+            lines (iterable): The HTML lines of the section.
+        """
+        lines = list(lines)
+        length = sum(len(line) for line in lines) + len(lines) - 1
+
+        if self.lines and length <= self.limit < self.length + 1 + length:
+            self.flush()
+
+        self.add_lines(lines)
+
+    def flush(self):
+        """
+        Ends the current message.
+        """
+        if self.lines:
+            self.messages.append("\n".join(self.lines))
+
+        self.lines = []
+        self.length = 0
+
+    def build(self):
+        """
+        Ends the current message and returns all of them.
+        Returns:
+            list: The messages, in order.
+        """
+        self.flush()
+
+        return list(self.messages)
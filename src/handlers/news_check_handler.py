@@ -18,6 +18,8 @@ from src.handlers.load_variables_handler import (
     load_json,
     load_keyword_list,
 )
+from src.handlers.message_builder import MessageBuilder
+from src.handlers.news_digest import NewsDigest
 from src.handlers.open_ai_prompt_handler import OpenAIPrompt
 from src.handlers.send_telegram_message import TelegramMessagesHandler
 from src.scrapers.bitcoin_magazine_scraper import BitcoinMagazineScraper
@@ -68,6 +70,7 @@ class CryptoNewsCheck:
         self.max_retries = 5
 
         self.telegram_message = TelegramMessagesHandler()
+        self.news_digest = NewsDigest()
 
     def reload_the_data(self):
         """
@@ -88,18 +91,21 @@ class CryptoNewsCheck:
         self.send_ai_summary = variables.get("SEND_AI_SUMMARY", "False")
 
         self.telegram_message.reload_the_data()
+        self.news_digest.reload_the_data()
 
     async def fetch_page(self, url):
         """
         Fetch the page with retry logic and exponential backoff.
-        Switch to `await asyncio.sleep(...)` for true async non-blocking retries.
+        The pages go through cloudscraper for its Cloudflare challenge handling,
+        in a worker thread so the event loop keeps running.
         Args:
             url (str): The URL to fetch.
         """
         for attempt in range(1, self.max_retries + 1):
             delay = 2**attempt
             try:
-                response = self.scraper.get(url, timeout=10)
+                # cloudscraper is blocking, keep it off the event loop
+                response = await asyncio.to_thread(self.scraper.get, url, timeout=10)
                 if response.status_code == 200:
                     return response.text
                 if response.status_code in [403, 429]:
@@ -186,15 +192,33 @@ class CryptoNewsCheck:
                 print(f"📰 Found {len(articles)} articles from {source}.")
                 logger.info("Found %d articles from %s.", len(articles), source)
 
-                for article in articles:
-                    # Insert or ignore in DB
-                    row_inserted = await self.data_base.save_article_to_db(
-                        source,
-                        article["headline"],
-                        article["link"],
-                        article["highlights"],
+                # Drop the links that are already stored before touching SQLite
+                unseen_links = set(
+                    await self.data_base.filter_unseen_links(
+                        [article["link"] for article in articles]
                     )
+                )
+                skipped = len(articles) - len(unseen_links)
+                if skipped:
+                    logger.info("Skipping %d known articles from %s.", skipped, source)
+                articles = [
+                    article for article in articles if article["link"] in unseen_links
+                ]
+
+                # Insert or ignore in DB, queued together so they share one commit
+                rows_inserted = await asyncio.gather(
+                    *(
+                        self.data_base.save_article_to_db(
+                            source,
+                            article["headline"],
+                            article["link"],
+                            article["highlights"],
+                        )
+                        for article in articles
+                    )
+                )
 
+                for article, row_inserted in zip(articles, rows_inserted):
                     # If brand-new article, optionally generate summary and send message
                     if row_inserted == 1:
                         summary_text = ""
@@ -205,29 +229,25 @@ class CryptoNewsCheck:
                                 article["link"], summary_text
                             )
 
-                        # Build the Telegram message
+                        # Build the digest item and the Telegram message
+                        item = f"📌 {article['headline']}\n🔗 {article['link']}\n"
                         if summary_text:
-                            message = (
-                                f"📰 <b>New Article Found!</b>\n"
-                                f"📌 {article['headline']}\n"
-                                f"🔗 {article['link']}\n"
-                                f"🤖 {summary_text}\n"
-                                f"🔍 Highlights: {article['highlights']}\n"
-                            )
-                        else:
-                            message = (
-                                f"📰 <b>New Article Found!</b>\n"
-                                f"📌 {article['headline']}\n"
-                                f"🔗 {article['link']}\n"
-                                f"🔍 Highlights: {article['highlights']}\n"
-                            )
+                            item += f"🤖 {summary_text}\n"
+                        item += f"🔍 Highlights: {article['highlights']}\n"
+
+                        message = f"📰 <b>New Article Found!</b>\n{item}"
 
                         found_articles = True
 
-                        # Send Telegram message
-                        await self.telegram_message.send_telegram_message(
-                            message, self.telegram_api_token, update=update
-                        )
+                        # Reply right away, or notify every chat in its own mode
+                        if update is not None:
+                            await self.telegram_message.queue_telegram_message(
+                                message, self.telegram_api_token, update=update
+                            )
+                        else:
+                            await self.news_digest.add_article(
+                                self.telegram_api_token, message, item
+                            )
                     else:
                         # Already in DB
                         logger.info("Skipping existing article: %s", article["link"])
@@ -254,11 +274,15 @@ class CryptoNewsCheck:
                 message, max_tokens=2000
             )
 
-            ai_message += "\n #DailyReport"
+            # A long summary is split at its lines, its tags kept balanced
+            builder = MessageBuilder()
+            builder.add_line(ai_message)
+            builder.add_line(" #DailyReport")
 
-            await self.telegram_message.send_telegram_message(
-                ai_message, self.telegram_api_token
-            )
+            for part in builder.build():
+                await self.telegram_message.queue_telegram_message(
+                    part, self.telegram_api_token
+                )
 
     async def recreate_data_base(self):
         """
@@ -300,3 +324,6 @@ class CryptoNewsCheck:
             self.check_news("bitcoinmagazine"),
         ]
         await asyncio.gather(*tasks)  # Run all scrapers in parallel
+
+        # Send the digests whose window ended
+        await self.news_digest.flush()
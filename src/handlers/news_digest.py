@@ -0,0 +1,194 @@
+"""
+news_digest.py
+This module coalesces the new-article notifications. The chats in instant mode get a
+message per article, the chats in digest mode get the articles collected over a
+window, rendered into as few messages as Telegram's length limit allows.
+"""
+
+import logging
+
+from src.data_base.message_outbox import PRIORITY_IMPORTANT, PRIORITY_PARTIAL
+from src.handlers.load_variables_handler import load_json
+from src.handlers.message_builder import TELEGRAM_MESSAGE_LIMIT, split_html
+from src.handlers.outbox_dispatcher import outbox_dispatcher
+
+logger = logging.getLogger(__name__)
+logger.info("News digest started")
+
+MODE_INSTANT = "instant"
+MODE_DIGEST = "digest"
+
+
+def get_digest_header(count):
+    """
+    Returns the header of a digest message.
+    Args:
+        count (int): The number of articles in the message.
+    Returns:
+        str: The HTML header.
+    """
+    if count == 1:
+        return "📰 <b>New Article Found!</b>\n"
+    return f"📰 <b>{count} New Articles Found!</b>\n"
+
+
+def render_digests(items, limit=TELEGRAM_MESSAGE_LIMIT):
+    """
+    Packs article items into digest messages, in order, each within the limit.
+    An item too long to share a message is sent on its own, split if it does not fit
+    in one either.
+    Args:
+        items (list): The HTML items, one per article.
+        limit (int): The maximum length of a message.
+    Returns:
+        list: The digest messages.
+    """
+    single_limit = limit - len(get_digest_header(1))
+
+    groups = []
+    group = []
+    length = 0
+
+    for item in items:
+        if len(item) > single_limit:
+            if group:
+                groups.append(group)
+            groups.extend([part] for part in split_html(item, single_limit))
+            group = []
+            length = 0
+            continue
+
+        # The header is at most as long as the one of the final count
+        header_length = len(get_digest_header(len(group) + 1))
+        separators = len(group)
+
+        if group and header_length + separators + length + len(item) > limit:
+            groups.append(group)
+            group = []
+            length = 0
+
+        group.append(item)
+        length += len(item)
+
+    if group:
+        groups.append(group)
+
+    return [get_digest_header(len(group)) + "\n".join(group) for group in groups]
+
+
+class NewsDigest:
+    """
+    NewsDigest routes the new articles to the chats according to their mode, queues
+    the instant notifications in the outbox and collects the digest items there
+    until their digest is due.
+    """
+
+    def __init__(self, dispatcher=None):
+        """
+        Initializes the NewsDigest.
+        Args:
+            dispatcher (OutboxDispatcher, optional): The dispatcher of the outbox.
+        """
+        self.dispatcher = dispatcher or outbox_dispatcher
+
+        self.chat_ids = None
+
+        self.modes = None
+        self.default_mode = None
+        self.window = None
+        self.max_articles = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the chats and their notification modes from the variables file.
+        """
+        variables = load_json()
+
+        # The chats of each priority, the important ones first
+        self.chat_ids = {
+            PRIORITY_IMPORTANT: variables.get("TELEGRAM_CHAT_ID_FULL_DETAILS", []),
+            PRIORITY_PARTIAL: variables.get("TELEGRAM_CHAT_ID_PARTIAL_DATA", []),
+        }
+
+        # {chat_id: "instant" | "digest"}, the other chats use the default
+        self.modes = {
+            str(chat_id): mode
+            for chat_id, mode in variables.get("NEWS_NOTIFICATION_MODES", {}).items()
+        }
+        self.default_mode = variables.get(
+            "NEWS_DEFAULT_NOTIFICATION_MODE", MODE_INSTANT
+        )
+        self.window = variables.get("NEWS_DIGEST_WINDOW", 1800)
+        self.max_articles = variables.get("NEWS_DIGEST_MAX_ARTICLES", 20)
+
+    def get_mode(self, chat_id):
+        """
+        Returns the notification mode of a chat.
+        Args:
+            chat_id (int | str): The chat id.
+        Returns:
+            str: MODE_INSTANT or MODE_DIGEST.
+        """
+        return self.modes.get(str(chat_id), self.default_mode)
+
+    def get_chats(self):
+        """
+        Returns the chats of each priority, a chat listed twice keeps the first.
+        Returns:
+            list: The (priority, chat_ids) pairs.
+        """
+        chats = []
+        seen = set()
+
+        for priority, chat_ids in self.chat_ids.items():
+            chats.append(
+                (priority, [c for c in dict.fromkeys(chat_ids) if c not in seen])
+            )
+            seen.update(chat_ids)
+
+        return chats
+
+    async def add_article(self, token, message, item):
+        """
+        Notifies the chats of a new article.
+        Args:
+            token (str): The token of the articles bot.
+            message (str): The message of the article, for the instant chats.
+            item (str): The item of the article, for the digests.
+        """
+        outbox = self.dispatcher.outbox
+
+        for priority, chat_ids in self.get_chats():
+            instant = [c for c in chat_ids if self.get_mode(c) != MODE_DIGEST]
+            digest = [c for c in chat_ids if self.get_mode(c) == MODE_DIGEST]
+
+            await outbox.enqueue(token, instant, message, priority)
+            await outbox.add_digest_items(token, digest, item, priority)
+
+        # A busy news day sends the digests before the window ends
+        await self.flush()
+
+        self.dispatcher.start()
+
+    async def flush(self, force=False):
+        """
+        Queues the due digests, or every digest if forced.
+        Args:
+            force (bool): Send the collected items even if their window is open.
+        Returns:
+            int: The number of digest messages queued.
+        """
+        outbox = self.dispatcher.outbox
+        window = 0 if force else self.window
+
+        queued = 0
+        for token, chat_id in await outbox.get_due_digests(window, self.max_articles):
+            queued += await outbox.flush_digest(token, chat_id, render_digests)
+
+        if queued:
+            logger.info("Queued %d digest messages", queued)
+            self.dispatcher.start()
+
+        return queued
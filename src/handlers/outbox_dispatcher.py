@@ -0,0 +1,154 @@
+"""
+outbox_dispatcher.py
+This module drains the message outbox in the background: it claims the due messages
+in batches, broadcasts each message to its chats and records the outcome of every
+chat back in the outbox.
+"""
+
+import asyncio
+import logging
+import time
+
+from src.data_base.message_outbox import MessageOutbox
+from src.handlers.load_variables_handler import load_json
+from src.handlers.telegram_bot_pool import telegram_bot_pool
+from src.handlers.telegram_broadcast import get_broadcaster
+
+logger = logging.getLogger(__name__)
+logger.info("Outbox dispatcher started")
+
+
+class OutboxDispatcher:
+    """
+    OutboxDispatcher sends the queued messages until the outbox has nothing left to
+    send, then exits; producers start it again when they queue a message. The rows
+    of a batch that share a bot and a text are sent as one concurrent broadcast,
+    the important ones first.
+    """
+
+    def __init__(self, outbox=None, bot_pool=None):
+        """
+        Initializes the OutboxDispatcher.
+        Args:
+            outbox (MessageOutbox, optional): The outbox to drain.
+            bot_pool (TelegramBotPool, optional): The pool of the bots sending it.
+        """
+        self.outbox = outbox or MessageOutbox()
+        self.bot_pool = bot_pool or telegram_bot_pool
+
+        self.batch_size = None
+        self.max_wait = None
+
+        self.task = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the dispatcher settings from the variables file.
+        """
+        variables = load_json()
+
+        self.batch_size = variables.get("OUTBOX_BATCH_SIZE", 30)
+        self.max_wait = variables.get("OUTBOX_MAX_WAIT", 60)
+
+        self.outbox.reload_the_data()
+
+    def start(self):
+        """
+        Starts draining the outbox in the background, unless it already is.
+        Returns:
+            asyncio.Task: The dispatcher task.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+
+        return self.task
+
+    async def stop(self):
+        """
+        Stops the dispatcher. The messages not sent yet stay in the outbox.
+        """
+        if self.task is None or self.task.done():
+            return
+
+        self.task.cancel()
+
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    async def run(self):
+        """
+        Dispatches batches until no message is waiting, sleeping until the next
+        retry is due in between.
+        """
+        while True:
+            try:
+                if await self.dispatch_batch():
+                    continue
+
+                next_attempt_at = await self.outbox.get_next_attempt_at()
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                logger.error("Error dispatching the outbox: %s", e)
+                next_attempt_at = time.time() + self.max_wait
+
+            if next_attempt_at is None:
+                return
+
+            delay = min(max(next_attempt_at - time.time(), 0), self.max_wait)
+            await asyncio.sleep(delay)
+
+    async def dispatch_batch(self):
+        """
+        Claims a batch of due messages and sends it.
+        Returns:
+            int: The number of messages claimed.
+        """
+        messages = await self.outbox.claim(self.batch_size)
+
+        # The claim is ordered by priority, so are the groups
+        groups = {}
+        for message in messages:
+            groups.setdefault((message.token, message.text), []).append(message)
+
+        for (token, text), group in groups.items():
+            await self.send_group(token, text, group)
+
+        return len(messages)
+
+    async def send_group(self, token, text, messages):
+        """
+        Broadcasts one message to its chats and records the outcome of each.
+        Args:
+            token (str): The bot token.
+            text (str): The HTML message.
+            messages (list): The claimed OutboxMessages of the chats.
+        """
+        by_chat = {}
+        for message in messages:
+            by_chat.setdefault(message.chat_id, []).append(message)
+
+        bot = await self.bot_pool.get_bot(token)
+        results = await get_broadcaster(bot, token).broadcast(
+            list(by_chat), text, parse_mode="HTML"
+        )
+
+        delivered = []
+        for chat_messages, result in zip(by_chat.values(), results):
+            if result.delivered:
+                delivered.extend(message.id for message in chat_messages)
+                continue
+
+            for message in chat_messages:
+                await self.outbox.fail(message, result.error, result.permanent)
+
+        if delivered:
+            await self.outbox.acknowledge(delivered)
+
+
+outbox_dispatcher = OutboxDispatcher()
@@ -4,15 +4,42 @@ Send messages to Telegram using the Telegram Bot API.
 
 import logging
 
-from telegram import Bot
+from telegram.error import BadRequest
 
+from src.data_base.file_id_cache import FileIdCache, get_bot_id, get_content_hash
+from src.data_base.message_outbox import PRIORITY_IMPORTANT, PRIORITY_PARTIAL
 from src.handlers.data_fetcher_handler import get_eth_gas_fee
 from src.handlers.load_variables_handler import load_json
+from src.handlers.message_builder import MessageBuilder
+from src.handlers.outbox_dispatcher import outbox_dispatcher
+from src.handlers.telegram_bot_pool import telegram_bot_pool
+from src.handlers.telegram_broadcast import get_broadcaster, reload_broadcasters
 from src.utils.utils import format_change
 
 logger = logging.getLogger(__name__)
 logger.info("Telegram message handler started")
 
+# The file_ids of the plots already uploaded, shared by every bot of the process
+plot_file_id_cache = FileIdCache()
+
+
+def get_market_update_lines(symbol, data):
+    """
+    Yields the lines of a cryptocurrency in the market update.
+    Args:
+        symbol (str): The cryptocurrency symbol.
+        data (dict): Its price and changes.
+    Yields:
+        str: The HTML lines.
+    """
+    yield f"<b>{symbol}</b>"
+    yield f"Price: $<b>{data['price']:.2f}</b>"
+    yield f"1h: {format_change(data['change_1h'])}"
+    yield f"24h: {format_change(data['change_24h'])}"
+    yield f"7d: {format_change(data['change_7d'])}"
+    yield f"30d: {format_change(data['change_30d'])}"
+    yield ""
+
 
 async def send_telegram_message_update(message, update):
     """
@@ -26,16 +53,57 @@ async def send_telegram_message_update(message, update):
     await update.message.reply_text(message, parse_mode="HTML")
 
 
-async def send_plot_to_telegram(image_path, update):
+async def send_plot_to_telegram(image_path, update, file_id_cache=None):
     """
     Send the generated plot image to a Telegram chat asynchronously.
+    An image identical to one the bot already uploaded is sent by its file_id
+    instead of uploading the bytes again.
     Args:
         image_path (str): The path to the image file to send.
         update (Update): The update object containing the message context.
+        file_id_cache (FileIdCache, optional): The cache of the uploaded images.
     """
-    if update is not None:
-        with open(image_path, "rb") as img:
-            await update.message.reply_photo(photo=img)
+    if update is None:
+        return
+
+    file_id_cache = file_id_cache or plot_file_id_cache
+
+    with open(image_path, "rb") as img:
+        data = img.read()
+
+    bot_id = get_bot_id(update.get_bot().token)
+    content_hash = get_content_hash(data)
+
+    try:
+        file_id = await file_id_cache.get(bot_id, content_hash)
+    # pylint: disable=broad-exception-caught
+    except Exception as e:
+        logger.error("Error reading the file id cache: %s", e)
+        file_id = None
+
+    if file_id is not None:
+        try:
+            await update.message.reply_photo(photo=file_id)
+            return
+        except BadRequest as e:
+            # The file is gone from Telegram, upload it again
+            logger.warning("Cached file id of %s rejected: %s", image_path, e)
+
+            try:
+                await file_id_cache.forget(bot_id, content_hash)
+            # pylint: disable=broad-exception-caught
+            except Exception as forget_error:
+                logger.error(
+                    "Error dropping the file id of %s: %s", image_path, forget_error
+                )
+
+    message = await update.message.reply_photo(photo=data)
+
+    try:
+        await file_id_cache.set(bot_id, content_hash, message.photo[-1].file_id)
+    # pylint: disable=broad-exception-caught
+    except Exception as e:
+        logger.error("Error caching the file id of %s: %s", image_path, e)
 
 
 class TelegramMessagesHandler:
@@ -52,6 +120,12 @@ class TelegramMessagesHandler:
 
         self.etherscan_api_url = None
 
+        # The process wide bots, one per token
+        self.bot_pool = telegram_bot_pool
+
+        # The durable queue of the messages sent in the background
+        self.dispatcher = outbox_dispatcher
+
         self.reload_the_data()
 
     def reload_the_data(self):
@@ -73,6 +147,8 @@ class TelegramMessagesHandler:
             "ETHERSCAN_GAS_API_URL", ""
         ) + variables.get("ETHERSCAN_API_KEY", "")
 
+        reload_broadcasters()
+
     # Function to send a message via Telegram
     async def send_telegram_message(
         self, message, bot, is_important=False, update=None
@@ -84,34 +160,93 @@ class TelegramMessagesHandler:
             bot (str): The Telegram bot token.
             is_important (bool): Flag to indicate if the message is important.
             update (Update, optional): The update object containing the message context.
+        Returns:
+            list: The DeliveryResult of each chat, None for a reply to an update.
         """
         if update is not None:
             await send_telegram_message_update(message, update)
 
-            return
-
-        bot = Bot(token=bot)
+            return None
 
-        # if message.count("*") % 2 == 1:
-        #    message = message.replace("*", "\*")
+        chat_ids = list(self.telegram_important_chat_id)
+        if not is_important:
+            chat_ids = list(self.telegram_not_important_chat_id) + chat_ids
 
         print(f"\n\nSent to Telegram:\n {message}")
         print(f"To {len(self.telegram_important_chat_id)} important users!")
         print(f"To {len(self.telegram_not_important_chat_id)} not important users!")
 
-        try:
-            if not is_important:
-                for chat_id in self.telegram_not_important_chat_id:
-                    await bot.send_message(
-                        chat_id=chat_id, text=message, parse_mode="HTML"
-                    )
-            for chat_id in self.telegram_important_chat_id:
-                await bot.send_message(chat_id=chat_id, text=message, parse_mode="HTML")
-        # pylint:disable=broad-exception-caught
-        except Exception as e:
-            error_message = f" Error sending message: {e}"
-            logger.error(error_message)
-            print(error_message)
+        return await self.broadcast(message, bot, chat_ids)
+
+    async def queue_telegram_message(
+        self, message, bot, is_important=False, update=None
+    ):
+        """
+        Queue a message in the outbox instead of waiting for Telegram. It is sent in
+        the background, the important chats first, and kept until delivered.
+        Args:
+            message (str): The message to send.
+            bot (str): The Telegram bot token.
+            is_important (bool): Flag to indicate if the message is important.
+            update (Update, optional): The update object containing the message context,
+                a reply is sent right away.
+        """
+        if update is not None:
+            await send_telegram_message_update(message, update)
+
+            return
+
+        outbox = self.dispatcher.outbox
+
+        await outbox.enqueue(
+            bot, self.telegram_important_chat_id, message, PRIORITY_IMPORTANT
+        )
+        if not is_important:
+            await outbox.enqueue(
+                bot, self.telegram_not_important_chat_id, message, PRIORITY_PARTIAL
+            )
+
+        self.dispatcher.start()
+
+    async def send_telegram_message_to_chats(self, message, bot, chat_ids):
+        """
+        Send a message to the given chats instead of the configured ones.
+        Args:
+            message (str): The message to send.
+            bot (str): The Telegram bot token.
+            chat_ids (iterable): The chat ids to send the message to.
+        Returns:
+            list: The DeliveryResult of each chat.
+        """
+        print(f"\n\nSent to Telegram:\n {message}")
+        print(f"To {len(chat_ids)} rule recipients!")
+
+        return await self.broadcast(message, bot, chat_ids)
+
+    async def broadcast(self, message, bot, chat_ids):
+        """
+        Send a message to several chats concurrently, within the rate limits of
+        the bot. A chat that fails is retried on its own and never stops the
+        delivery to the others.
+        Args:
+            message (str): The message to send.
+            bot (str): The Telegram bot token.
+            chat_ids (iterable): The chat ids to send the message to.
+        Returns:
+            list: The DeliveryResult of each chat.
+        """
+        broadcaster = get_broadcaster(await self.bot_pool.get_bot(bot), bot)
+        results = await broadcaster.broadcast(chat_ids, message, parse_mode="HTML")
+
+        for result in results:
+            if not result.delivered:
+                error_message = (
+                    f" Error sending message to {result.chat_id}: {result.error}"
+                )
+                logger.error(error_message)
+                print(error_message)
+
+        return results
 
     async def send_eth_gas_fee(self, telegram_api_token, update=None):
         """
@@ -121,7 +256,7 @@ class TelegramMessagesHandler:
             update (Update, optional): The update object containing the message context.
         """
         message = ""
-        safe_gas, propose_gas, fast_gas = get_eth_gas_fee(self.etherscan_api_url)
+        safe_gas, propose_gas, fast_gas = await get_eth_gas_fee(self.etherscan_api_url)
         if safe_gas and propose_gas and fast_gas:
             message += (
                 f"⛽ <b>ETH Gas Fees (Gwei)</b>:\n"
@@ -137,24 +272,20 @@ class TelegramMessagesHandler:
     ):
         """
         Send a market update message to Telegram with current cryptocurrency prices and changes.
+        A long update is sent as several messages, a cryptocurrency never split.
         Args:
             telegram_api_token (str): The Telegram bot token.
             now_date (datetime): The current date and time for the update.
             my_crypto (dict): A dictionary containing cryptocurrency data.
             update (Update, optional): The update object containing the message context.
         """
-        message = f"🕒 <b>Market Update at {now_date.strftime('%H:%M')}</b>"
+        builder = MessageBuilder()
+        builder.add_line(f"🕒 <b>Market Update at {now_date.strftime('%H:%M')}</b>")
 
         for symbol, data in my_crypto.items():
-            message += (
-                f"\n<b>{symbol}</b>\n"
-                f"Price: $<b>{data['price']:.2f}</b>\n"
-                f"1h: {format_change(data['change_1h'])}\n"
-                f"24h: {format_change(data['change_24h'])}\n"
-                f"7d: {format_change(data['change_7d'])}\n"
-                f"30d: {format_change(data['change_30d'])}\n"
-            )
+            builder.add_section(get_market_update_lines(symbol, data))
 
-        message += "#MarketUpdate\n\n"
+        builder.add_line("#MarketUpdate")
 
-        await self.send_telegram_message(message, telegram_api_token, False, update)
+        for message in builder.build():
+            await self.send_telegram_message(message, telegram_api_token, False, update)
@@ -0,0 +1,148 @@
+"""
+telegram_bot_pool.py
+This module keeps one initialized Telegram Bot client per token for the whole
+process, so the messages reuse its pooled HTTP connections instead of opening a new
+client, and a new TLS handshake, for every send.
+"""
+
+import asyncio
+import logging
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from src.handlers.load_variables_handler import load_json
+
+logger = logging.getLogger(__name__)
+logger.info("Telegram bot pool started")
+
+
+class TelegramBotPool:
+    """
+    TelegramBotPool creates the Bot of a token on its first use and initializes it
+    once, however many sends wait for it. Like the HTTP client, the connections are
+    bound to the event loop that opened them, so the bots are recreated when the
+    pool is used from another loop.
+    """
+
+    def __init__(self, bot_factory=None):
+        """
+        Initializes the TelegramBotPool.
+        Args:
+            bot_factory (callable, optional): `bot_factory(token)` returning a Bot,
+                to inject fake bots in the tests. Defaults to `create_bot`.
+        """
+        self.bot_factory = bot_factory or self.create_bot
+
+        self.api_url = None
+        self.pool_size = None
+        self.timeout = None
+
+        self.bots = {}
+        self.ready = {}
+        self.bots_loop = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the Bot API settings from the variables file.
+        New settings apply to the bots created afterwards.
+        """
+        variables = load_json()
+
+        self.api_url = variables.get("TELEGRAM_API_URL", "https://api.telegram.org")
+        self.pool_size = variables.get("TELEGRAM_CONNECTION_POOL_SIZE", 10)
+        self.timeout = variables.get("TELEGRAM_TIMEOUT", 10)
+
+    def create_bot(self, token):
+        """
+        Creates the Bot of a token, with a pool of keep-alive connections large
+        enough for the concurrent broadcasts.
+        Args:
+            token (str): The bot token.
+        Returns:
+            Bot: The bot, not initialized yet.
+        """
+        request = HTTPXRequest(
+            connection_pool_size=self.pool_size,
+            read_timeout=self.timeout,
+            write_timeout=self.timeout,
+            connect_timeout=self.timeout,
+            pool_timeout=self.timeout,
+        )
+
+        return Bot(
+            token=token,
+            base_url=f"{self.api_url.rstrip('/')}/bot",
+            base_file_url=f"{self.api_url.rstrip('/')}/file/bot",
+            request=request,
+        )
+
+    async def initialize_bot(self, token, bot):
+        """
+        Initializes a bot, forgetting it if it fails so the next send tries again.
+        Args:
+            token (str): The bot token.
+            bot (Bot): The bot.
+        """
+        try:
+            await bot.initialize()
+        # pylint: disable=broad-exception-caught
+        except Exception as e:
+            logger.error("Error initializing the Telegram bot: %s", e)
+            print(f"❌ Error initializing the Telegram bot: {e}")
+
+            if self.bots.get(token) is bot:
+                del self.bots[token]
+                del self.ready[token]
+
+    async def get_bot(self, token):
+        """
+        Returns the initialized Bot of a token, creating it on its first use.
+        Args:
+            token (str): The bot token.
+        Returns:
+            Bot: The bot.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.bots_loop is not loop:
+            # The connections of another loop can not be used, nor closed, here
+            self.bots = {}
+            self.ready = {}
+            self.bots_loop = loop
+
+        bot = self.bots.get(token)
+
+        if bot is None:
+            bot = self.bot_factory(token)
+            self.bots[token] = bot
+            self.ready[token] = loop.create_task(self.initialize_bot(token, bot))
+
+        await self.ready[token]
+
+        return bot
+
+    async def close(self):
+        """
+        Shuts the bots of the current event loop down and closes their connections.
+        """
+        bots = list(self.bots.values())
+        same_loop = self.bots_loop is asyncio.get_running_loop()
+
+        self.bots = {}
+        self.ready = {}
+
+        if not same_loop:
+            return
+
+        for bot in bots:
+            try:
+                await bot.shutdown()
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                logger.error("Error shutting the Telegram bot down: %s", e)
+
+
+telegram_bot_pool = TelegramBotPool()
@@ -0,0 +1,349 @@
+"""
+telegram_broadcast.py
+This module sends a message to many Telegram chats concurrently, within the rate
+limits of the Bot API. Every chat is delivered and retried on its own, so a slow or
+failing chat never delays or aborts the others.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+
+from telegram.error import (
+    BadRequest,
+    ChatMigrated,
+    Forbidden,
+    NetworkError,
+    RetryAfter,
+)
+
+from src.handlers.load_variables_handler import load_json
+
+logger = logging.getLogger(__name__)
+logger.info("Telegram broadcast started")
+
+
+class RateLimiter:
+    """
+    RateLimiter spaces out calls to one per `interval` seconds, allowing bursts of
+    up to `burst` calls (a generic cell rate algorithm). It only keeps the time of
+    the next free slot, so it works with any event loop.
+    """
+
+    def __init__(self, interval, burst=1):
+        """
+        Initializes the RateLimiter.
+        Args:
+            interval (float): The sustained time between two calls, in seconds.
+            burst (int): The number of calls allowed back to back.
+        """
+        self.interval = interval
+        self.burst = burst
+
+        # The theoretical arrival time of the next call
+        self.next_slot = 0.0
+
+    def reserve(self):
+        """
+        Reserves the next slot.
+        Returns:
+            float: How long to wait before using it, in seconds.
+        """
+        now = time.monotonic()
+        slot = max(self.next_slot, now)
+        start = max(now, slot - (self.burst - 1) * self.interval)
+
+        self.next_slot = slot + self.interval
+
+        return start - now
+
+    async def wait(self):
+        """
+        Waits for the next slot.
+        """
+        delay = self.reserve()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """
+        Delays every call for at least `seconds`.
+        Args:
+            seconds (float): The pause, in seconds.
+        """
+        resume = time.monotonic() + seconds + (self.burst - 1) * self.interval
+
+        self.next_slot = max(self.next_slot, resume)
+
+
+class BroadcastLimits:
+    """
+    BroadcastLimits holds the rate limiters of a bot: a global one and one per chat,
+    with a lower rate for the group chats.
+    """
+
+    def __init__(self):
+        """
+        Initializes the BroadcastLimits.
+        """
+        self.global_limiter = RateLimiter(1 / 30)
+        self.chat_limiters = {}
+
+        self.chat_interval = None
+        self.chat_burst = None
+        self.group_interval = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the rate limits from the variables file.
+        """
+        variables = load_json()
+
+        self.global_limiter.interval = 1 / variables.get(
+            "TELEGRAM_MESSAGES_PER_SECOND", 30
+        )
+        self.chat_interval = variables.get("TELEGRAM_CHAT_INTERVAL", 1.0)
+        self.chat_burst = variables.get("TELEGRAM_CHAT_BURST", 3)
+        self.group_interval = variables.get("TELEGRAM_GROUP_INTERVAL", 3.0)
+
+        self.chat_limiters = {}
+
+    def get_chat_limiter(self, chat_id):
+        """
+        Returns the rate limiter of a chat.
+        Args:
+            chat_id (int | str): The chat id, negative for the groups and channels.
+        Returns:
+            RateLimiter: The limiter of the chat.
+        """
+        key = str(chat_id)
+
+        if key not in self.chat_limiters:
+            interval = (
+                self.group_interval if key.startswith("-") else self.chat_interval
+            )
+            self.chat_limiters[key] = RateLimiter(interval, self.chat_burst)
+
+        return self.chat_limiters[key]
+
+
+# The limits of each bot token, shared by every broadcast of the process
+broadcast_limits = {}
+
+
+def get_broadcast_limits(token):
+    """
+    Returns the rate limits of a bot.
+    Args:
+        token (str): The bot token.
+    Returns:
+        BroadcastLimits: The limits of the bot.
+    """
+    if token not in broadcast_limits:
+        broadcast_limits[token] = BroadcastLimits()
+
+    return broadcast_limits[token]
+
+
+def get_retry_after(error):
+    """
+    Returns how long Telegram asked to wait.
+    Args:
+        error (RetryAfter): The flood control error.
+    Returns:
+        float: The wait, in seconds.
+    """
+    retry_after = error.retry_after
+
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+# pylint: disable=too-few-public-methods
+class DeliveryResult:
+    """
+    The outcome of the delivery of a message to one chat.
+    """
+
+    __slots__ = ("chat_id", "delivered", "attempts", "error", "permanent")
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(self, chat_id, delivered, attempts, error=None, permanent=False):
+        """
+        Initializes the DeliveryResult.
+        Args:
+            chat_id (int | str): The chat id the message was sent to.
+            delivered (bool): True if Telegram accepted the message.
+            attempts (int): The number of send attempts.
+            error (str, optional): The last error, if it was not delivered.
+            permanent (bool): True if sending it again would fail the same way.
+        """
+        self.chat_id = chat_id
+        self.delivered = delivered
+        self.attempts = attempts
+        self.error = error
+        self.permanent = permanent
+
+    def __repr__(self):
+        return (
+            f"DeliveryResult({self.chat_id!r}, delivered={self.delivered}, "
+            f"attempts={self.attempts}, error={self.error!r})"
+        )
+
+
+class TelegramBroadcaster:
+    """
+    TelegramBroadcaster fans a message out to many chats concurrently.
+    The sends wait for the per-chat and global rate limits of the bot, a flood
+    control error pauses the whole bot for the time Telegram asked, and network
+    errors are retried with an exponential backoff. Chats that blocked the bot or
+    do not exist are not retried.
+    """
+
+    def __init__(self, bot, token=None):
+        """
+        Initializes the TelegramBroadcaster.
+        Args:
+            bot (Bot): The Telegram bot.
+            token (str, optional): The bot token the rate limits are shared by,
+                defaults to the token of the bot.
+        """
+        self.bot = bot
+        self.limits = get_broadcast_limits(token or bot.token)
+
+        self.max_concurrency = None
+        self.max_attempts = None
+        self.retry_delay = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the broadcast settings from the variables file.
+        """
+        variables = load_json()
+
+        self.max_concurrency = variables.get("TELEGRAM_MAX_CONCURRENCY", 10)
+        self.max_attempts = variables.get("TELEGRAM_SEND_ATTEMPTS", 3)
+        self.retry_delay = variables.get("TELEGRAM_RETRY_DELAY", 1.0)
+
+    async def send(self, chat_id, text, **kwargs):
+        """
+        Sends a message to one chat, retrying it until delivered or given up.
+        Args:
+            chat_id (int | str): The chat id.
+            text (str): The message.
+            kwargs: The other `send_message` arguments, e.g. parse_mode.
+        Returns:
+            DeliveryResult: The outcome.
+        """
+        attempts = 0
+        error = None
+        permanent = False
+
+        while attempts < self.max_attempts:
+            attempts += 1
+            chat_limiter = self.limits.get_chat_limiter(chat_id)
+
+            await chat_limiter.wait()
+            await self.limits.global_limiter.wait()
+
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                return DeliveryResult(chat_id, True, attempts)
+            except RetryAfter as e:
+                # Flood control applies to the bot, not only to this chat
+                self.limits.global_limiter.pause(get_retry_after(e))
+                error = e
+            except ChatMigrated as e:
+                logger.warning("Chat %s migrated to %s", chat_id, e.new_chat_id)
+                chat_id = e.new_chat_id
+                error = e
+            except (BadRequest, Forbidden) as e:
+                error = e
+                permanent = True
+                break
+            except NetworkError as e:
+                chat_limiter.pause(self.retry_delay * 2 ** (attempts - 1))
+                error = e
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                error = e
+                break
+
+        logger.error(
+            "Message not delivered to %s after %d attempts: %s",
+            chat_id,
+            attempts,
+            error,
+        )
+
+        return DeliveryResult(chat_id, False, attempts, str(error), permanent)
+
+    async def broadcast(self, chat_ids, text, **kwargs):
+        """
+        Sends a message to several chats concurrently.
+        Args:
+            chat_ids (iterable): The chat ids, duplicates are sent once.
+            text (str): The message.
+            kwargs: The other `send_message` arguments, e.g. parse_mode.
+        Returns:
+            list: The DeliveryResult of each chat, in the order of `chat_ids`.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send_limited(chat_id):
+            async with semaphore:
+                return await self.send(chat_id, text, **kwargs)
+
+        results = await asyncio.gather(
+            *(send_limited(chat_id) for chat_id in dict.fromkeys(chat_ids))
+        )
+
+        failed = [result for result in results if not result.delivered]
+        if failed:
+            logger.warning(
+                "Delivered to %d of %d chats, failed: %s",
+                len(results) - len(failed),
+                len(results),
+                [result.chat_id for result in failed],
+            )
+
+        return list(results)
+
+
+# The broadcaster of each bot token, so its settings are read once per bot
+broadcasters = {}
+
+
+def get_broadcaster(bot, token=None):
+    """
+    Returns the broadcaster of a bot, created on its first use.
+    Args:
+        bot (Bot): The Telegram bot.
+        token (str, optional): The bot token, defaults to the token of the bot.
+    Returns:
+        TelegramBroadcaster: The broadcaster of the bot.
+    """
+    token = token or bot.token
+
+    if token not in broadcasters:
+        broadcasters[token] = TelegramBroadcaster(bot, token)
+
+    # The pool recreates the bots on another event loop
+    broadcasters[token].bot = bot
+
+    return broadcasters[token]
+
+
+def reload_broadcasters():
+    """
+    Reloads the settings of every broadcaster from the variables file.
+    """
+    for broadcaster in broadcasters.values():
+        broadcaster.reload_the_data()
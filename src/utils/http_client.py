@@ -0,0 +1,174 @@
+"""
+http_client.py
+This module provides the shared asynchronous HTTP client used for every outbound
+API call, with pooled keep-alive connections, timeouts and retries.
+"""
+
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+
+import src.handlers.load_variables_handler
+
+logger = logging.getLogger(__name__)
+logger.info("HTTP client started")
+
+# Status codes worth another attempt, everything else is returned as is
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class HttpClient:
+    """
+    HttpClient wraps an httpx.AsyncClient that keeps a pool of keep-alive connections
+    per host. The pool is bound to the event loop that created it, so a new pool is
+    opened when the client is used from another loop (e.g. a bot started later).
+    """
+
+    def __init__(self):
+        """
+        Initializes the HttpClient and loads its settings.
+        """
+        self.timeout = None
+        self.retries = None
+        self.backoff = None
+        self.max_connections = None
+        self.max_keepalive_connections = None
+
+        self.client = None
+        self.client_loop = None
+
+        self.reload_the_data()
+
+    def reload_the_data(self):
+        """
+        Reloads the HTTP settings from the variables file.
+        New settings apply to the next connection pool.
+        """
+        variables = src.handlers.load_variables_handler.load_json()
+
+        self.timeout = variables.get("HTTP_TIMEOUT", 10)
+        self.retries = variables.get("HTTP_RETRIES", 3)
+        self.backoff = variables.get("HTTP_BACKOFF", 0.5)
+        self.max_connections = variables.get("HTTP_MAX_CONNECTIONS", 20)
+        self.max_keepalive_connections = variables.get("HTTP_MAX_KEEPALIVE", 10)
+
+    def create_client(self, transport=None):
+        """
+        Creates the pooled httpx client.
+        Args:
+            transport (httpx.AsyncBaseTransport, optional): A custom transport.
+        Returns:
+            httpx.AsyncClient: The client.
+        """
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            ),
+            http2=HTTP2_AVAILABLE,
+            # Connection failures are retried by the transport itself
+            transport=transport or httpx.AsyncHTTPTransport(retries=self.retries),
+            follow_redirects=True,
+        )
+
+    def get_client(self):
+        """
+        Returns the client of the running event loop, opening its pool if needed.
+        Returns:
+            httpx.AsyncClient: The client.
+        """
+        loop = asyncio.get_running_loop()
+
+        if self.client is None or self.client.is_closed or self.client_loop is not loop:
+            self.client = self.create_client()
+            self.client_loop = loop
+
+        return self.client
+
+    def get_retry_delay(self, attempt, response=None):
+        """
+        Returns how long to wait before the next attempt.
+        Honors the Retry-After header of rate limited responses.
+        Args:
+            attempt (int): The attempt that failed, starting from 0.
+            response (httpx.Response, optional): The failed response.
+        Returns:
+            float: The delay in seconds.
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return float(retry_after)
+
+        return self.backoff * 2**attempt
+
+    async def request(self, method, url, **kwargs):
+        """
+        Sends a request, retrying timeouts, rate limits and server errors.
+        Args:
+            method (str): The HTTP method.
+            url (str): The URL.
+            **kwargs: Passed to httpx (headers, params, json, ...).
+        Returns:
+            httpx.Response: The last response.
+        Raises:
+            httpx.HTTPError: If every attempt failed without a response.
+        """
+        client = self.get_client()
+
+        for attempt in range(self.retries + 1):
+            is_last_attempt = attempt == self.retries
+
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TimeoutException:
+                if is_last_attempt:
+                    raise
+                logger.warning("Request to %s timed out, retrying...", url)
+                await asyncio.sleep(self.get_retry_delay(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or is_last_attempt:
+                return response
+
+            logger.warning(
+                "Request to %s returned %d, retrying...", url, response.status_code
+            )
+            await asyncio.sleep(self.get_retry_delay(attempt, response))
+
+        return response
+
+    async def get_json(self, url, headers=None, params=None):
+        """
+        Sends a GET request and returns the decoded JSON body.
+        Args:
+            url (str): The URL to send the request to.
+            headers (dict, optional): Headers to include in the request.
+            params (dict, optional): Query parameters to include in the request.
+        Returns:
+            dict: The JSON response if successful, otherwise None.
+        """
+        try:
+            response = await self.request("GET", url, headers=headers, params=params)
+            return response.json()
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.error("Exception while requests from %s: %s", url, e)
+            print(f"Exception while requests from {url}: {e}")
+        return None
+
+    async def close(self):
+        """
+        Closes the pooled connections of the current client.
+        """
+        if self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+
+
+http_client = HttpClient()
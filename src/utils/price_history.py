@@ -0,0 +1,209 @@
+"""
+price_history.py
+This module keeps a rolling window of the recent prices of every symbol in memory,
+fed by the quote refreshes, so price moves over any window can be measured without
+extra API calls.
+"""
+
+import numpy as np
+
+
+class PriceHistory:
+    """
+    PriceHistory stores the last `capacity` (timestamp, price) samples of each symbol
+    in ring buffers, one row of a 2D array per symbol, so its memory is fixed per
+    symbol. The queries work on all the symbols at once and return arrays aligned
+    with `symbols`, NaN where the history is too short or has a gap.
+    """
+
+    def __init__(self, capacity=2880, max_gap=1.0):
+        """
+        Initializes the PriceHistory.
+        Args:
+            capacity (int): The number of samples kept per symbol.
+            max_gap (float): How far before a window start its reference sample
+                may be, as a fraction of the window.
+        """
+        self.capacity = capacity
+        self.max_gap = max_gap
+
+        self.symbols = []
+        self.index = {}
+
+        self.timestamps = np.full((0, capacity), np.nan)
+        self.prices = np.full((0, capacity), np.nan)
+        self.heads = np.zeros(0, dtype=np.intp)
+
+    def get_rows(self, symbols):
+        """
+        Returns the rows of the symbols, adding rows for the new ones.
+        Args:
+            symbols (iterable): The symbols.
+        Returns:
+            np.ndarray: The row of each symbol.
+        """
+        for symbol in symbols:
+            if symbol not in self.index:
+                self.index[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+
+        missing = len(self.symbols) - len(self.heads)
+        if missing > 0:
+            new_rows = np.full((missing, self.capacity), np.nan)
+            self.timestamps = np.vstack([self.timestamps, new_rows])
+            self.prices = np.vstack([self.prices, new_rows])
+            self.heads = np.concatenate([self.heads, np.zeros(missing, np.intp)])
+
+        return np.array([self.index[symbol] for symbol in symbols], dtype=np.intp)
+
+    def record(self, snapshot):
+        """
+        Appends the prices of a quote snapshot, overwriting the oldest samples.
+        Samples not newer than the last one of their symbol are skipped, so the
+        same cached snapshot can be recorded more than once.
+        Args:
+            snapshot (QuoteSnapshot): The refreshed quotes.
+        Returns:
+            int: The number of samples recorded.
+        """
+        rows = self.get_rows(snapshot.symbols.tolist())
+        prices = snapshot.column("price")
+
+        latest = self.timestamps[rows, (self.heads[rows] - 1) % self.capacity]
+        keep = ~(latest >= snapshot.timestamp) & ~np.isnan(prices)
+        rows = rows[keep]
+
+        self.timestamps[rows, self.heads[rows]] = snapshot.timestamp
+        self.prices[rows, self.heads[rows]] = prices[keep]
+        self.heads[rows] = (self.heads[rows] + 1) % self.capacity
+
+        return len(rows)
+
+    def get_ordered(self):
+        """
+        Returns the samples of every symbol from the oldest to the newest.
+        Returns:
+            tuple: The (symbols x capacity) timestamps and prices, the unused
+            slots are NaN and come first.
+        """
+        order = (self.heads[:, None] + np.arange(self.capacity)) % self.capacity
+
+        return (
+            np.take_along_axis(self.timestamps, order, axis=1),
+            np.take_along_axis(self.prices, order, axis=1),
+        )
+
+    def get_history(self, symbol):
+        """
+        Returns the samples of a symbol from the oldest to the newest.
+        Args:
+            symbol (str): The symbol.
+        Returns:
+            tuple: The timestamps and prices arrays, empty for an unknown symbol.
+        """
+        if symbol not in self.index:
+            return np.empty(0), np.empty(0)
+
+        timestamps, prices = self.get_ordered()
+        row = self.index[symbol]
+        used = ~np.isnan(timestamps[row])
+
+        return timestamps[row, used], prices[row, used]
+
+    def get_window_mask(self, timestamps, window):
+        """
+        Marks the samples of the last `window` seconds of each symbol.
+        Args:
+            timestamps (np.ndarray): The ordered timestamps.
+            window (float): The window length, in seconds.
+        Returns:
+            np.ndarray: True for the samples in the window.
+        """
+        with np.errstate(invalid="ignore"):
+            return timestamps >= timestamps[:, -1:] - window
+
+    def change_over(self, window, max_gap=None):
+        """
+        Returns the price change of each symbol over the last `window` seconds.
+        The change is measured from the last sample at or before the window start,
+        so a history shorter than the window gives NaN. So does a reference sample
+        more than `max_gap` times the window before the start, e.g. after the
+        feed stopped for a while, as the change would span a much longer window.
+        Args:
+            window (float): The window length, in seconds.
+            max_gap (float, optional): The largest gap before the window start, as
+                a fraction of the window, `self.max_gap` by default.
+        Returns:
+            np.ndarray: The changes in percent.
+        """
+        if max_gap is None:
+            max_gap = self.max_gap
+
+        timestamps, prices = self.get_ordered()
+        start = timestamps[:, -1] - window
+
+        with np.errstate(invalid="ignore"):
+            before = timestamps <= start[:, None]
+
+        # The last True of each row is the reference sample
+        reference = self.capacity - 1 - np.argmax(before[:, ::-1], axis=1)
+        reference_timestamps = np.take_along_axis(
+            timestamps, reference[:, None], axis=1
+        )[:, 0]
+        reference_prices = np.take_along_axis(prices, reference[:, None], axis=1)[:, 0]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            changes = (prices[:, -1] / reference_prices - 1) * 100
+            recent = start - reference_timestamps <= max_gap * window
+
+        return np.where(before.any(axis=1) & recent, changes, np.nan)
+
+    def volatility(self, window):
+        """
+        Returns the standard deviation of the sample to sample returns of each
+        symbol over the last `window` seconds.
+        Args:
+            window (float): The window length, in seconds.
+        Returns:
+            np.ndarray: The volatility in percent, NaN with less than two returns.
+        """
+        timestamps, prices = self.get_ordered()
+        in_window = self.get_window_mask(timestamps, window)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            returns = np.diff(np.log(prices), axis=1)
+            valid = in_window[:, :-1] & in_window[:, 1:] & ~np.isnan(returns)
+
+            count = valid.sum(axis=1)
+            returns = np.where(valid, returns, 0.0)
+            mean = returns.sum(axis=1) / count
+            squares = np.where(valid, (returns - mean[:, None]) ** 2, 0.0)
+            deviation = np.sqrt(squares.sum(axis=1) / (count - 1)) * 100
+
+        return np.where(count >= 2, deviation, np.nan)
+
+    def drawdown(self, window):
+        """
+        Returns the largest drop from a running peak of each symbol over the last
+        `window` seconds.
+        Args:
+            window (float): The window length, in seconds.
+        Returns:
+            np.ndarray: The drawdowns in percent, 0 or negative.
+        """
+        timestamps, prices = self.get_ordered()
+        in_window = self.get_window_mask(timestamps, window) & ~np.isnan(prices)
+
+        prices = np.where(in_window, prices, np.nan)
+        peaks = np.fmax.accumulate(prices, axis=1)
+
+        with np.errstate(invalid="ignore"):
+            drops = np.where(in_window, (prices / peaks - 1) * 100, np.inf)
+
+        return np.where(in_window.any(axis=1), drops.min(axis=1), np.nan)
+
+    def __len__(self):
+        """
+        Returns the number of tracked symbols.
+        """
+        return len(self.symbols)
@@ -0,0 +1,130 @@
+"""
+quote_snapshot.py
+This module provides the QuoteSnapshot, an immutable set of cryptocurrency quotes
+stored as NumPy columns, which the alerts and updates can scan without walking
+nested dictionaries.
+"""
+
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
+# The columns of every quote, in the order of the values array
+QUOTE_FIELDS = ("price", "change_1h", "change_24h", "change_7d", "change_30d")
+
+# The CoinMarketCap USD quote key of each column
+CMC_QUOTE_KEYS = (
+    "price",
+    "percent_change_1h",
+    "percent_change_24h",
+    "percent_change_7d",
+    "percent_change_30d",
+)
+
+
+class QuoteSnapshot(Mapping):
+    """
+    QuoteSnapshot holds the quotes of a refresh as a (symbols x fields) float array
+    with a symbol to row map. It never changes once built, so a refresh publishes a
+    new snapshot by rebinding a single attribute and readers keep a consistent view.
+    It reads like the former `{symbol: {"price": ..., "change_1h": ...}}` dict.
+    """
+
+    __slots__ = ("symbols", "values", "index", "timestamp")
+
+    def __init__(self, symbols, values, timestamp=None):
+        """
+        Initializes the QuoteSnapshot.
+        Args:
+            symbols (list): The unique symbols, one per row.
+            values (array-like): The quotes, one row per symbol and one column per
+                field of QUOTE_FIELDS.
+            timestamp (float, optional): When the quotes were fetched.
+        """
+        self.symbols = np.array(symbols, dtype=str)
+        self.values = np.asarray(values, dtype=np.float64).reshape(
+            len(self.symbols), len(QUOTE_FIELDS)
+        )
+        self.values.setflags(write=False)
+        self.index = {symbol: row for row, symbol in enumerate(symbols)}
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @classmethod
+    def empty(cls):
+        """
+        Returns a snapshot without quotes.
+        """
+        return cls([], np.empty((0, len(QUOTE_FIELDS))))
+
+    @classmethod
+    def from_listings(cls, coins, timestamp=None):
+        """
+        Builds a snapshot from the coins of a CoinMarketCap listings response.
+        A symbol listed twice keeps its best ranked coin, missing values are NaN.
+        Args:
+            coins (list): The `data` of the listings response.
+            timestamp (float, optional): When the listings were fetched.
+        Returns:
+            QuoteSnapshot: The snapshot.
+        """
+        symbols = []
+        rows = []
+        seen = set()
+
+        for coin in coins:
+            if coin["symbol"] in seen:
+                continue
+            seen.add(coin["symbol"])
+
+            quote = coin["quote"]["USD"]
+            symbols.append(coin["symbol"])
+            rows.append([quote.get(key) for key in CMC_QUOTE_KEYS])
+
+        values = np.array(rows, dtype=np.float64).reshape(-1, len(QUOTE_FIELDS))
+
+        return cls(symbols, values, timestamp)
+
+    def column(self, field):
+        """
+        Returns one field of every quote, without copying.
+        Args:
+            field (str): A field of QUOTE_FIELDS.
+        Returns:
+            np.ndarray: The read-only column, in the order of `symbols`.
+        """
+        return self.values[:, QUOTE_FIELDS.index(field)]
+
+    def subset(self, symbols):
+        """
+        Returns the snapshot of some symbols, keeping their order in this one.
+        Args:
+            symbols (iterable): The symbols to keep, unknown ones are ignored.
+        Returns:
+            QuoteSnapshot: The smaller snapshot.
+        """
+        mask = np.isin(self.symbols, list(symbols))
+
+        return QuoteSnapshot(
+            self.symbols[mask].tolist(), self.values[mask], self.timestamp
+        )
+
+    def __getitem__(self, symbol):
+        """
+        Returns the quote of a symbol as a dict of its fields.
+        """
+        row = self.values[self.index[symbol]]
+
+        return dict(zip(QUOTE_FIELDS, row.tolist()))
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return f"QuoteSnapshot({len(self)} symbols, timestamp={self.timestamp})"
@@ -0,0 +1,429 @@
+"""
+telegram_stand_in.py
+This module is a local stand-in for the Telegram Bot API, to measure the bots
+against hundreds of chats, flood control errors and slow responses without calling
+Telegram. It answers the methods the project uses over plain HTTP, with a
+configurable latency, injected 429 errors, and records every request.
+"""
+
+import asyncio
+import email
+import email.policy
+import itertools
+import json
+import logging
+import random
+import time
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+logger.info("Telegram stand-in started")
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    429: "Too Many Requests",
+}
+
+
+def get_chat(chat_id):
+    """
+    Returns the Chat object of a chat id.
+    Args:
+        chat_id (str): The chat id, negative for the groups, or a @username.
+    Returns:
+        dict: The Chat, as the Bot API returns it.
+    """
+    if chat_id.lstrip("-").isdigit():
+        chat = {"id": int(chat_id), "type": "private"}
+        if chat_id.startswith("-"):
+            chat.update(type="group", title="Group")
+        return chat
+
+    return {"id": 0, "type": "channel", "title": chat_id, "username": chat_id[1:]}
+
+
+def parse_parameters(content_type, body):
+    """
+    Parses the parameters of a Bot API request, url encoded or multipart.
+    Args:
+        content_type (str): The Content-Type header.
+        body (bytes): The request body.
+    Returns:
+        tuple: The parameters as strings, and the size of each uploaded file.
+    """
+    if content_type.startswith("multipart/form-data"):
+        message = email.message_from_bytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body,
+            policy=email.policy.HTTP,
+        )
+        parameters = {}
+        files = {}
+
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True)
+
+            if part.get_filename() is not None:
+                files[name] = len(payload)
+            else:
+                parameters[name] = payload.decode("utf-8")
+
+        return parameters, files
+
+    if content_type.startswith("application/json"):
+        return {k: str(v) for k, v in json.loads(body or b"{}").items()}, {}
+
+    return dict(parse_qsl(body.decode("utf-8"))), {}
+
+
+# pylint: disable=too-few-public-methods
+class RecordedRequest:
+    """
+    A request the stand-in answered.
+    """
+
+    __slots__ = (
+        "method",
+        "parameters",
+        "uploaded_bytes",
+        "status",
+        "received_at",
+        "answered_at",
+    )
+
+    def __init__(self, method, parameters, uploaded_bytes, received_at):
+        """
+        Initializes the RecordedRequest.
+        Args:
+            method (str): The Bot API method, e.g. sendMessage.
+            parameters (dict): The parameters, as strings.
+            uploaded_bytes (int): The size of the uploaded files.
+            received_at (float): The `time.monotonic()` the request arrived.
+        """
+        self.method = method
+        self.parameters = parameters
+        self.uploaded_bytes = uploaded_bytes
+        self.status = None
+        self.received_at = received_at
+        self.answered_at = None
+
+    def __repr__(self):
+        return (
+            f"RecordedRequest({self.method!r}, status={self.status}, "
+            f"chat_id={self.parameters.get('chat_id')!r})"
+        )
+
+
+# pylint: disable=too-many-instance-attributes
+class TelegramStandIn:
+    """
+    TelegramStandIn serves getMe, sendMessage, sendPhoto and getUpdates on a local
+    port. Point the bots at it with TELEGRAM_API_URL, or the `api_url` of a
+    TelegramBotPool. Every answer waits `latency` seconds plus a random jitter, and
+    a request is refused with a 429 and `retry_after` at `flood_probability` or
+    when injected with `inject_flood`.
+    """
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        flood_probability=0.0,
+        retry_after=1,
+        seed=None,
+    ):
+        """
+        Initializes the TelegramStandIn.
+        Args:
+            latency (float): The minimum time to answer a request, in seconds.
+            jitter (float): The maximum random time added to the latency.
+            flood_probability (float): The probability to refuse a send with a 429.
+            retry_after (int): The seconds a 429 asks to wait.
+            seed (int, optional): The seed of the latency and flood randomness.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_probability = flood_probability
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+
+        self.records = []
+        self.floods_injected = 0
+
+        self.updates = []
+        self.updates_added = None
+        self.update_ids = itertools.count(1)
+        self.message_ids = itertools.count(1)
+        self.file_ids = itertools.count(1)
+
+        self.server = None
+        self.connections = set()
+        self.url = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts serving, on a free port by default.
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port, 0 for any free one.
+        Returns:
+            str: The base URL of the stand-in, for TELEGRAM_API_URL.
+        """
+        self.updates_added = asyncio.Event()
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+
+        host, port = self.server.sockets[0].getsockname()[:2]
+        self.url = f"http://{host}:{port}"
+        logger.info("Telegram stand-in listening on %s", self.url)
+
+        return self.url
+
+    async def stop(self):
+        """
+        Stops serving and closes the open connections.
+        """
+        if self.server is None:
+            return
+
+        self.server.close()
+        for writer in self.connections:
+            writer.close()
+        await self.server.wait_closed()
+        self.server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def inject_flood(self, count=1):
+        """
+        Refuses the next sends with a 429.
+        Args:
+            count (int): The number of sends to refuse.
+        """
+        self.floods_injected += count
+
+    def add_update(self, update):
+        """
+        Queues an update for getUpdates.
+        Args:
+            update (dict): The update without its update_id, e.g. {"message": ...}.
+        """
+        self.updates.append({"update_id": next(self.update_ids), **update})
+        self.updates_added.set()
+
+    def get_records(self, method, status=200):
+        """
+        Returns the recorded requests of a method.
+        Args:
+            method (str): The Bot API method.
+            status (int, optional): Only the requests answered with this status,
+                None for all of them.
+        Returns:
+            list: The RecordedRequests, in their arrival order.
+        """
+        return [
+            record
+            for record in self.records
+            if record.method == method and status in (None, record.status)
+        ]
+
+    async def read_request(self, reader):
+        """
+        Reads an HTTP request.
+        Args:
+            reader (StreamReader): The connection.
+        Returns:
+            tuple: The path, the headers and the body, None if the client closed.
+        """
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        return request_line.split()[1].decode("latin-1"), headers, body
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answers the requests of a keep-alive connection until it closes.
+        Args:
+            reader (StreamReader): The connection input.
+            writer (StreamWriter): The connection output.
+        """
+        self.connections.add(writer)
+
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+
+                path, headers, body = request
+                status, payload = await self.handle_request(path, headers, body)
+
+                content = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n\r\n".encode("latin-1")
+                    + content
+                )
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def handle_request(self, path, headers, body):
+        """
+        Answers a Bot API request, after the latency.
+        Args:
+            path (str): The path, /bot<token>/<method>.
+            headers (dict): The lowercase request headers.
+            body (bytes): The request body.
+        Returns:
+            tuple: The HTTP status and the JSON payload.
+        """
+        method = path.rstrip("/").rsplit("/", 1)[-1]
+        parameters, files = parse_parameters(headers.get("content-type", ""), body)
+
+        record = RecordedRequest(
+            method, parameters, sum(files.values()), time.monotonic()
+        )
+        self.records.append(record)
+
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+
+        record.status, payload = self.answer(method, parameters)
+
+        if method == "getUpdates":
+            payload["result"] = await self.wait_for_updates(parameters)
+
+        record.answered_at = time.monotonic()
+
+        return record.status, payload
+
+    def is_flooded(self):
+        """
+        Tells whether to refuse the current send with a 429.
+        Returns:
+            bool: True if an injected or random flood applies.
+        """
+        if self.floods_injected:
+            self.floods_injected -= 1
+            return True
+
+        return self.random.random() < self.flood_probability
+
+    def answer(self, method, parameters):
+        """
+        Builds the answer of a Bot API method.
+        Args:
+            method (str): The Bot API method.
+            parameters (dict): The parameters, as strings.
+        Returns:
+            tuple: The HTTP status and the JSON payload.
+        """
+        if method in ("sendMessage", "sendPhoto") and self.is_flooded():
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+
+        if method == "getMe":
+            result = {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "Stand-in",
+                "username": "stand_in_bot",
+            }
+        elif method in ("sendMessage", "sendPhoto"):
+            result = {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": get_chat(parameters.get("chat_id", "0")),
+            }
+            if method == "sendMessage":
+                result["text"] = parameters.get("text", "")
+            else:
+                result["photo"] = [self.get_photo_size(parameters)]
+        elif method in ("getUpdates", "deleteWebhook"):
+            result = [] if method == "getUpdates" else True
+        else:
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+
+        return 200, {"ok": True, "result": result}
+
+    def get_photo_size(self, parameters):
+        """
+        Returns the PhotoSize of a sent photo, a new file_id for an upload.
+        Args:
+            parameters (dict): The sendPhoto parameters.
+        Returns:
+            dict: The PhotoSize.
+        """
+        file_id = parameters.get("photo")
+        if file_id is None or file_id.startswith("attach://"):
+            file_id = f"stand-in-file-{next(self.file_ids)}"
+
+        return {
+            "file_id": file_id,
+            "file_unique_id": file_id,
+            "width": 1280,
+            "height": 960,
+        }
+
+    async def wait_for_updates(self, parameters):
+        """
+        Long polls the updates from the offset, for the timeout of the request.
+        Args:
+            parameters (dict): The getUpdates parameters.
+        Returns:
+            list: The updates from the offset.
+        """
+        offset = int(parameters.get("offset", 0))
+        timeout = float(parameters.get("timeout", 0))
+        deadline = time.monotonic() + timeout
+
+        while True:
+            updates = [u for u in self.updates if u["update_id"] >= offset]
+            remaining = deadline - time.monotonic()
+            if updates or remaining <= 0:
+                return updates
+
+            self.updates_added.clear()
+            try:
+                await asyncio.wait_for(self.updates_added.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
@@ -4,17 +4,17 @@ Utility functions for handling requests and checking user permissions.
 
 import logging
 
-import requests
-
 import src.handlers.load_variables_handler
+from src.utils.http_client import http_client
 
 logger = logging.getLogger(__name__)
 logger.info("Alerts script started")
 
 
-def check_requests(url, headers=None, params=None):
+async def check_requests(url, headers=None, params=None):
     """
     Check if the request to the given URL is successful and return the JSON response.
+    The request goes through the shared pooled HTTP client, so it never blocks the loop.
     Args:
         url (str): The URL to send the request to.
         headers (dict, optional): Headers to include in the request.
@@ -22,14 +22,7 @@ def check_requests(url, headers=None, params=None):
     Returns:
         dict: The JSON response from the request if successful, otherwise None.
     """
-    try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        return response.json()
-    # pylint: disable=broad-except
-    except Exception as e:
-        logger.error("Exception while requests from %s: %s", url, e)
-        print(f"Exception while requests from {url}: {e}")
-    return None
+    return await http_client.get_json(url, headers=headers, params=params)
 
 
 def format_change(change):
@@ -46,6 +39,33 @@ def format_change(change):
     return f"🟢 +{change:.2f}%"  # Positive change in monospace
 
 
+def classify_sentiment(summary):
+    """
+    Classifies the sentiment of an article summary.
+    Args:
+        summary (str): The summary text.
+    Returns:
+        str: "Positive", "Negative", "Neutral" or "Unknown",
+        or None if there is no summary.
+    """
+    if summary is None:
+        return None
+
+    summary_lower = summary.lower()  # Convert to lowercase for easier matching
+
+    if "bullish" in summary_lower and (
+        "bearish" in summary_lower or "neutral" in summary_lower
+    ):
+        return "Unknown"
+    if "bullish" in summary_lower:
+        return "Positive"
+    if "bearish" in summary_lower:
+        return "Negative"
+    if "neutral" in summary_lower:
+        return "Neutral"
+    return "Unknown"  # If no sentiment is found
+
+
 def check_if_special_user(user_id):
     """
     Check if the given user_id is in the special user list from the config file.
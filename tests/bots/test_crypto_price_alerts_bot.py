@@ -28,6 +28,7 @@ def price_alert_bot():
         mock_crypto_value_bot.check_for_major_updates_7d = AsyncMock(return_value=True)
         mock_crypto_value_bot.check_for_major_updates_30d = AsyncMock(return_value=True)
         mock_crypto_value_bot.check_for_major_updates = AsyncMock(return_value=True)
+        mock_crypto_value_bot.get_my_crypto = AsyncMock()
 
         # Create bot AFTER setting up the mock
         bot = PriceAlertBot()
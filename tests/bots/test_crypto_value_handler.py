@@ -4,7 +4,6 @@ Crypto Value Handler Test Suite
 
 # pylint: disable=redefined-outer-name, line-too-long
 
-import json
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -25,6 +24,8 @@ def crypto_bot():
     ) as mock_telegram_class, patch(
         "src.bots.crypto_value_handler.CryptoNewsCheck"
     ) as mock_news_class, patch(
+        "src.bots.crypto_value_handler.CoinMarketCapClient"
+    ) as mock_cmc_class, patch(
         "src.bots.crypto_value_handler.src.handlers.load_variables_handler.load_json"
     ) as mock_load_vars:
         # Create mock instances
@@ -62,6 +63,10 @@ def crypto_bot():
         mock_news.send_today_summary = AsyncMock()
         mock_news.reload_the_data = MagicMock()
 
+        mock_cmc = MagicMock()
+        mock_cmc_class.return_value = mock_cmc
+        mock_cmc.get_listings = AsyncMock()
+
         # Configure mock variables
         mock_load_vars.return_value = {
             "TELEGRAM_API_TOKEN_VALUE": "test_token_value",
@@ -87,6 +92,7 @@ def crypto_bot():
             "portfolio": mock_portfolio,
             "telegram": mock_telegram,
             "news": mock_news,
+            "cmc": mock_cmc,
         }
 
 
@@ -116,7 +122,7 @@ async def test_reload_the_data(crypto_bot):
 @pytest.mark.asyncio
 async def test_get_my_crypto(crypto_bot):
     """Test get_my_crypto method fetches crypto data"""
-    bot, _ = crypto_bot
+    bot, mocks = crypto_bot
 
     # Initialize my_crypto as an empty dictionary
     bot.my_crypto = {}
@@ -125,15 +131,7 @@ async def test_get_my_crypto(crypto_bot):
     # Set cryptocurrencies list
     bot.crypto_currencies = ["BTC", "ETH", "XRP"]
 
-    # Set API credentials
-    bot.coinmarketcap_api_key = "test_api_key"
-    bot.coinmarketcap_api_url = "https://test-api-url.com"
-
-    # Reset the last API call time to ensure we make a new call
-    bot.last_api_call = 0
-    bot.cache_duration = 0
-
-    # Mock requests.get for CoinMarketCap API
+    # Mock the CoinMarketCap API response
     sample_response = {
         "data": [
             {
@@ -187,29 +185,24 @@ async def test_get_my_crypto(crypto_bot):
         ]
     }
 
-    mock_response = MagicMock()
-    mock_response.json = MagicMock(return_value=sample_response)
-    mock_response.text = json.dumps(sample_response)
+    mocks["cmc"].get_listings.return_value = sample_response
 
-    with patch(
-        "src.bots.crypto_value_handler.requests.get", return_value=mock_response
-    ) as mock_get:
-        # Call the method
-        bot.get_my_crypto()
+    # Call the method
+    await bot.get_my_crypto()
 
-        # Verify API call was made
-        mock_get.assert_called_once()
+    # Verify the listings were requested
+    mocks["cmc"].get_listings.assert_awaited_once()
 
-        # Verify data was processed correctly
-        assert len(bot.my_crypto) == 3
-        assert "BTC" in bot.my_crypto
-        assert "ETH" in bot.my_crypto
-        assert "XRP" in bot.my_crypto
-        assert bot.my_crypto["BTC"]["price"] == 50000
+    # Verify data was processed correctly
+    assert len(bot.my_crypto) == 3
+    assert "BTC" in bot.my_crypto
+    assert "ETH" in bot.my_crypto
+    assert "XRP" in bot.my_crypto
+    assert bot.my_crypto["BTC"]["price"] == 50000
 
-        # Verify top_100_crypto contains all coins from the response
-        assert len(bot.top_100_crypto) == 4
-        assert "DOGE" in bot.top_100_crypto
+    # Verify top_100_crypto contains all coins from the response
+    assert len(bot.top_100_crypto) == 4
+    assert "DOGE" in bot.top_100_crypto
 
 
 @pytest.mark.asyncio
@@ -264,7 +257,7 @@ async def test_save_today_data(crypto_bot):
         "src.bots.crypto_value_handler.get_eth_gas_fee", return_value=(50, 60, 70)
     ), patch(
         "src.bots.crypto_value_handler.get_market_sentiment", AsyncMock()
-    ), patch(
+    ) as mock_sentiment, patch(
         "src.bots.crypto_value_handler.os.path.exists", return_value=True
     ):
         # Call the method
@@ -274,6 +267,7 @@ async def test_save_today_data(crypto_bot):
         mocks["db"].store_fear_greed.assert_called_once_with(60, "Greed", "2023-05-01")
         mocks["db"].store_eth_gas_fee.assert_called_once_with(50, 60, 70)
         mocks["db"].store_daily_stats.assert_called_once()
+        mock_sentiment.assert_called_once_with(save_data=True, data_base=bot.db)
 
 
 @pytest.mark.asyncio
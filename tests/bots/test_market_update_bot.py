@@ -33,10 +33,10 @@ def market_bot():
         mock_crypto_bot.send_eth_gas_fee = AsyncMock()
         mock_crypto_bot.send_portfolio_update = AsyncMock()
         mock_crypto_bot.show_fear_and_greed = AsyncMock()
+        mock_crypto_bot.get_my_crypto = AsyncMock()
 
         # Set up regular methods
         mock_crypto_bot.reload_the_data = MagicMock()
-        mock_crypto_bot.get_my_crypto = MagicMock()
 
         mock_telegram = MagicMock()
         mock_telegram_class.return_value = mock_telegram
@@ -8,7 +8,14 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from src.bots.news_check_bot import NEWS_KEYBOARD, NewsBot
+from src.bots.news_check_bot import (
+    NEWS_KEYBOARD,
+    SEARCH_CALLBACK_PREFIX,
+    SEARCH_HISTORY_SIZE,
+    SEARCH_PAGE_SIZE,
+    NewsBot,
+    remember_search,
+)
 
 
 @pytest.fixture
@@ -31,7 +38,7 @@ def news_bot():
         mock_db = MagicMock()
         mock_db_class.return_value = mock_db
         mock_db.show_stats = AsyncMock()
-        mock_db.search_articles_by_tags = AsyncMock()
+        mock_db.search_articles_page = AsyncMock(return_value=([], None))
 
         # Mock the send_telegram_message_update function
         mock_send_message.side_effect = AsyncMock()
@@ -205,9 +212,10 @@ async def test_search_no_results(news_bot):
     mock_update = MagicMock()
     mock_context = MagicMock()
     mock_context.args = ["BTC", "Crypto"]
+    mock_context.user_data = {}
 
     # Mock empty search results
-    mocks["db"].search_articles_by_tags.return_value = []
+    mocks["db"].search_articles_page.return_value = ([], None)
 
     # Call the method
     await bot.search(mock_update, mock_context)
@@ -227,6 +235,7 @@ async def test_search_with_results(news_bot):
     mock_update = MagicMock()
     mock_context = MagicMock()
     mock_context.args = ["BTC"]
+    mock_context.user_data = {}
 
     # Mock search results (ID, Title, Link, Highlights, Summary)
     mock_articles = [
@@ -239,12 +248,13 @@ async def test_search_with_results(news_bot):
             "Market summary",
         ),
     ]
-    mocks["db"].search_articles_by_tags.return_value = mock_articles
+    mocks["db"].search_articles_page.return_value = (mock_articles, None)
 
     # Call the method
     await bot.search(mock_update, mock_context)
 
     # Verify messages were sent for each article
+    assert list(mock_context.user_data["searches"].values()) == [["BTC"]]
     assert mocks["send_message"].call_count == 2
     for i, article in enumerate(mock_articles):
         expected_message = (
@@ -257,6 +267,96 @@ async def test_search_with_results(news_bot):
         mocks["send_message"].assert_any_call(expected_message, mock_update)
 
 
+@pytest.mark.asyncio
+async def test_search_with_next_page(news_bot):
+    """Test search command adds a next page button when more articles match"""
+    bot, mocks = news_bot
+
+    mock_update = MagicMock()
+    mock_update.message.reply_text = AsyncMock()
+    mock_context = MagicMock()
+    mock_context.args = ["BTC"]
+    mock_context.user_data = {}
+
+    mock_articles = [(7, "Bitcoin Surges", "http://example.com/7", "BTC", "Summary")]
+    mocks["db"].search_articles_page.return_value = (
+        mock_articles,
+        "2025-03-14 10:00:00|7",
+    )
+
+    await bot.search(mock_update, mock_context)
+
+    markup = mock_update.message.reply_text.call_args.kwargs["reply_markup"]
+    button = markup.inline_keyboard[0][0]
+
+    key = remember_search({}, ["BTC"])
+    assert button.callback_data == (
+        f"{SEARCH_CALLBACK_PREFIX}{key}:2025-03-14 10:00:00|7"
+    )
+    assert len(button.callback_data.encode()) <= 64
+
+
+@pytest.mark.asyncio
+async def test_search_next_page(news_bot):
+    """Test the next page button continues the search after the cursor"""
+    bot, mocks = news_bot
+
+    mock_update = MagicMock()
+    mock_update.callback_query.answer = AsyncMock()
+    mock_context = MagicMock()
+    mock_context.user_data = {}
+    key = remember_search(mock_context.user_data, ["BTC"])
+    remember_search(mock_context.user_data, ["ETH"])
+    mock_update.callback_query.data = (
+        f"{SEARCH_CALLBACK_PREFIX}{key}:2025-03-14 10:00:00|7"
+    )
+
+    mock_articles = [(6, "Older News", "http://example.com/6", "BTC", "Summary")]
+    mocks["db"].search_articles_page.return_value = (mock_articles, None)
+
+    await bot.search_next_page(mock_update, mock_context)
+
+    mocks["db"].search_articles_page.assert_called_once_with(
+        ["BTC"], page_size=SEARCH_PAGE_SIZE, cursor="2025-03-14 10:00:00|7"
+    )
+    assert mocks["send_message"].call_count == 1
+    assert mocks["send_message"].call_args[0][1] is mock_update.callback_query
+
+
+def test_remember_search_keeps_the_latest_searches():
+    """Test that each search has its own key and the oldest ones expire"""
+    user_data = {}
+
+    keys = [remember_search(user_data, [f"TAG{i}"]) for i in range(25)]
+
+    assert len(set(keys)) == 25
+    assert list(user_data["searches"]) == keys[-SEARCH_HISTORY_SIZE:]
+    assert remember_search(user_data, ["TAG24"]) == keys[-1]
+    assert user_data["searches"][keys[-1]] == ["TAG24"]
+
+
+@pytest.mark.asyncio
+async def test_search_next_page_expired(news_bot):
+    """Test the next page button without a stored search asks for a new one"""
+    bot, mocks = news_bot
+
+    mock_update = MagicMock()
+    mock_update.callback_query.answer = AsyncMock()
+    mock_update.callback_query.data = (
+        f"{SEARCH_CALLBACK_PREFIX}{remember_search({}, ['BTC'])}:2025-03-14 10:00:00|7"
+    )
+    mock_context = MagicMock()
+    mock_context.user_data = {}
+
+    await bot.search_next_page(mock_update, mock_context)
+
+    mocks["db"].search_articles_page.assert_not_called()
+    mocks["send_message"].assert_called_once_with(
+        "❌ This search expired, please run /search again.",
+        mock_update.callback_query,
+    )
+
+
 @pytest.mark.asyncio
 async def test_help_command(news_bot):
     """Test help_command sends help message"""
@@ -308,8 +408,8 @@ def test_run_bot(news_bot):
 
         # Verify handlers were added
         assert (
-            mock_app.add_handler.call_count == 4
-        )  # 3 command handlers + 1 message handler
+            mock_app.add_handler.call_count == 5
+        )  # 3 command handlers + 1 callback handler + 1 message handler
 
         # Verify polling was started
         mock_run_polling.assert_called_once()
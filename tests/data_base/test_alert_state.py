@@ -0,0 +1,140 @@
+"""
+Test suite for the alert state in the src.data_base module.
+This suite tests the alert transitions, the hysteresis and the persistence.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import math
+
+import pytest
+
+from src.data_base.alert_state import AlertStateStore, get_alert_key
+from src.handlers.alert_engine import AlertRecord
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Returns the path of a temporary alert state data base."""
+    return str(tmp_path / "alert_state.db")
+
+
+def get_changes(changes):
+    """Returns a `get_change` callable reading the 1h changes of a dict."""
+    return lambda symbol, _: changes.get(symbol, math.nan)
+
+
+async def check(store, changes, threshold=2.5):
+    """Runs a 1h check of the changes and returns the symbols that fired."""
+    records = [
+        AlertRecord(symbol, "1h", change, threshold)
+        for symbol, change in changes.items()
+        if abs(change) >= threshold
+    ]
+    fired = await store.update(["1h"], records, get_changes(changes))
+
+    return [record.symbol for record in fired]
+
+
+@pytest.mark.asyncio
+async def test_alert_fires_once_while_active(db_path):
+    """
+    Test that a lasting move only fires on its first check.
+    """
+    store = AlertStateStore(db_path)
+
+    assert await check(store, {"BTC": 3.0, "ETH": 1.0}) == ["BTC"]
+    assert await check(store, {"BTC": 3.5, "ETH": 3.0}) == ["ETH"]
+    assert not await check(store, {"BTC": 4.0, "ETH": 2.6})
+
+
+@pytest.mark.asyncio
+async def test_alert_rearms_below_the_lower_band(db_path):
+    """
+    Test that an alert re-arms only once the change decays below the band.
+    """
+    store = AlertStateStore(db_path)
+    store.rearm_ratio = 0.8
+
+    await check(store, {"BTC": 3.0})
+
+    # Hovering around the threshold keeps it active
+    assert not await check(store, {"BTC": 2.2})
+    assert not await check(store, {"BTC": 2.6})
+
+    await check(store, {"BTC": 1.9})
+
+    assert await check(store, {"BTC": 2.6}) == ["BTC"]
+
+
+@pytest.mark.asyncio
+async def test_reversed_move_fires_again(db_path):
+    """
+    Test that a move crossing the threshold the other way fires.
+    """
+    store = AlertStateStore(db_path)
+
+    await check(store, {"BTC": 3.0})
+
+    assert await check(store, {"BTC": -3.0}) == ["BTC"]
+    assert store.active[get_alert_key("BTC", "1h")] == (-1, 2.5)
+
+
+@pytest.mark.asyncio
+async def test_missing_symbol_stays_active(db_path):
+    """
+    Test that a symbol missing from the quotes keeps its alert.
+    """
+    store = AlertStateStore(db_path)
+
+    await check(store, {"BTC": 3.0})
+    await check(store, {})
+
+    assert not await check(store, {"BTC": 3.0})
+
+
+@pytest.mark.asyncio
+async def test_other_windows_are_left_alone(db_path):
+    """
+    Test that a check only re-arms the alerts of the windows it evaluated.
+    """
+    store = AlertStateStore(db_path)
+
+    await store.update(["24h"], [AlertRecord("BTC", "24h", 6.0, 5.0)], None)
+    await check(store, {"BTC": 0.0})
+
+    assert get_alert_key("BTC", "24h") in store.active
+
+
+@pytest.mark.asyncio
+async def test_state_survives_restarts(db_path):
+    """
+    Test that the active alerts are reloaded by a new store.
+    """
+    store = AlertStateStore(db_path)
+    await check(store, {"BTC": 3.0, "ETH": 3.0})
+    await check(store, {"BTC": 3.0, "ETH": 0.0})
+
+    restarted = AlertStateStore(db_path)
+
+    assert not await check(restarted, {"BTC": 3.0})
+    assert await check(restarted, {"ETH": 3.0}) == ["ETH"]
+
+
+@pytest.mark.asyncio
+async def test_recipients_have_their_own_state(db_path):
+    """
+    Test that the alert of a rule with chat ids does not silence the default one.
+    """
+    store = AlertStateStore(db_path)
+
+    fired = await store.update(
+        ["1h"],
+        [
+            AlertRecord("BTC", "1h", 3.0, 2.5),
+            AlertRecord("BTC", "1h", 3.0, 1.0, ("42",)),
+        ],
+        get_changes({}),
+    )
+
+    assert len(fired) == 2
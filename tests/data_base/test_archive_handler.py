@@ -0,0 +1,252 @@
+"""
+Test suite for the ArchiveHandler class in the src.data_base module.
+This suite tests exporting the data bases to archives and importing them back.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import gzip
+import json
+
+import aiosqlite
+import pytest
+
+from src.data_base.archive_handler import (
+    ArchiveHandler,
+    get_archive_format,
+    get_archive_path,
+)
+from src.data_base.data_base_handler import ARTICLES_DATE_ID_INDEX, DataBaseHandler
+from src.data_base.metrics_retention import MetricsRetention
+from src.data_base.metrics_store import MetricSeries, Resolution
+
+
+@pytest.fixture
+def data_base(tmp_path):
+    """Fixture to create the data bases in a temporary folder."""
+    return DataBaseHandler(
+        articles_db_path=str(tmp_path / "articles.db"),
+        metrics_db_path=str(tmp_path / "metrics.db"),
+    )
+
+
+async def fill_data_base(data_base):
+    """Stores a few articles and metric points."""
+    await data_base.init_db()
+
+    for index in range(5):
+        await data_base.save_article_to_db(
+            "crypto.news", f"Headline {index}", f"link_{index}", f"#tag{index}"
+        )
+    await data_base.update_article_summary_in_db("link_0", "Summary, with a comma")
+
+    await data_base.metrics.write_points(
+        [
+            (MetricSeries.FEAR_GREED_INDEX, 1741564800, 42.0, "Fear"),
+            (MetricSeries.ETH_GAS_FAST, 1741564800, 3.25, None),
+        ]
+    )
+    await data_base.close()
+
+
+def test_get_archive_format():
+    """
+    Test detecting the archive format from the file name.
+    """
+    assert get_archive_format("articles.jsonl.gz") == "jsonl"
+    assert get_archive_format("articles.csv") == "csv"
+
+    with pytest.raises(ValueError):
+        get_archive_format("articles.txt")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("archive_format", ["jsonl", "csv"])
+async def test_export_and_import_round_trip(tmp_path, data_base, archive_format):
+    """
+    Test that a recreated data base gets every row back from the archives.
+    """
+    await fill_data_base(data_base)
+
+    handler = ArchiveHandler(data_base, chunk_size=2)
+    folder = str(tmp_path / "archive")
+
+    exported = await handler.export_all(folder, archive_format)
+    assert exported == {
+        "articles": 5,
+        "metrics": 2,
+        "metric_rollups": 0,
+        "metric_rollup_state": 0,
+    }
+
+    restored = DataBaseHandler(
+        articles_db_path=str(tmp_path / "restored_articles.db"),
+        metrics_db_path=str(tmp_path / "restored_metrics.db"),
+    )
+    imported = await ArchiveHandler(restored, chunk_size=2).import_all(
+        folder, archive_format
+    )
+    assert imported == {
+        "articles": 5,
+        "metrics": 2,
+        "metric_rollups": 0,
+        "metric_rollup_state": 0,
+    }
+
+    async with aiosqlite.connect(restored.articles_db_path) as db:
+        cursor = await db.execute(
+            "SELECT headline, openai_summary FROM articles WHERE link = 'link_0'"
+        )
+        assert await cursor.fetchone() == ("Headline 0", "Summary, with a comma")
+
+        # The indexes dropped for the load are rebuilt
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+            (ARTICLES_DATE_ID_INDEX,),
+        )
+        assert await cursor.fetchone() is not None
+
+    latest = await restored.metrics.latest(MetricSeries.FEAR_GREED_INDEX)
+    assert latest == (1741564800, 42.0, "Fear")
+
+
+@pytest.mark.asyncio
+async def test_import_twice_skips_existing_rows(tmp_path, data_base):
+    """
+    Test that importing an archive again does not duplicate any row.
+    """
+    await fill_data_base(data_base)
+
+    handler = ArchiveHandler(data_base)
+    folder = str(tmp_path / "archive")
+    await handler.export_all(folder)
+
+    imported = await handler.import_all(folder)
+    assert imported == {
+        "articles": 0,
+        "metrics": 0,
+        "metric_rollups": 0,
+        "metric_rollup_state": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_import_articles_into_a_data_base_in_use(tmp_path, data_base):
+    """
+    Test that the archived articles are matched on their link, not on the ids
+    the articles stored since the data base was recreated already use.
+    """
+    await fill_data_base(data_base)
+
+    folder = str(tmp_path / "archive")
+    await ArchiveHandler(data_base).export_all(folder)
+
+    restored = DataBaseHandler(
+        articles_db_path=str(tmp_path / "restored_articles.db"),
+        metrics_db_path=str(tmp_path / "restored_metrics.db"),
+    )
+    await restored.init_db()
+    await restored.save_article_to_db("crypto.news", "New headline", "new_link", "")
+    await restored.save_article_to_db("crypto.news", "Headline 0", "link_0", "")
+    await restored.close()
+
+    imported = await ArchiveHandler(restored).import_all(folder)
+    assert imported["articles"] == 4
+
+    async with aiosqlite.connect(restored.articles_db_path) as db:
+        cursor = await db.execute("SELECT id, link FROM articles ORDER BY id")
+        rows = await cursor.fetchall()
+
+    assert [link for _, link in rows] == [
+        "new_link",
+        "link_0",
+        "link_1",
+        "link_2",
+        "link_3",
+        "link_4",
+    ]
+    assert len({article_id for article_id, _ in rows}) == 6
+
+
+@pytest.mark.asyncio
+async def test_export_writes_compressed_jsonl(tmp_path, data_base):
+    """
+    Test that the JSONL archive is gzip compressed with one record per line.
+    """
+    await fill_data_base(data_base)
+
+    folder = str(tmp_path / "archive")
+    await ArchiveHandler(data_base).export_all(folder)
+
+    with gzip.open(get_archive_path(folder, "articles"), "rt") as file:
+        records = [json.loads(line) for line in file]
+
+    assert [record["link"] for record in records] == [f"link_{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_import_merges_metrics_into_stored_points(tmp_path, data_base):
+    """
+    Test that the archived points are merged into a metrics table that has rows,
+    without duplicating the points stored in both.
+    """
+    await fill_data_base(data_base)
+
+    folder = str(tmp_path / "archive")
+    await ArchiveHandler(data_base).export_all(folder)
+
+    restored = DataBaseHandler(
+        articles_db_path=str(tmp_path / "restored_articles.db"),
+        metrics_db_path=str(tmp_path / "restored_metrics.db"),
+    )
+    await restored.init_db()
+    await restored.metrics.write_points(
+        [
+            (MetricSeries.FEAR_GREED_INDEX, 1741564800, 42.0, "Fear"),
+            (MetricSeries.FEAR_GREED_INDEX, 1741651200, 55.0, "Greed"),
+        ]
+    )
+    await restored.close()
+
+    imported = await ArchiveHandler(restored).import_all(folder)
+    assert imported["metrics"] == 1
+
+    async with aiosqlite.connect(restored.metrics.db_path) as db:
+        cursor = await db.execute(
+            "SELECT series, timestamp FROM metrics ORDER BY series, timestamp"
+        )
+        assert await cursor.fetchall() == [
+            (int(MetricSeries.FEAR_GREED_INDEX), 1741564800),
+            (int(MetricSeries.FEAR_GREED_INDEX), 1741651200),
+            (int(MetricSeries.ETH_GAS_FAST), 1741564800),
+        ]
+
+
+@pytest.mark.asyncio
+async def test_export_and_import_rollup_watermarks(tmp_path, data_base):
+    """
+    Test that the rollup watermarks are restored along with the rollups.
+    """
+    await fill_data_base(data_base)
+    await MetricsRetention(data_base.metrics).run_once(now=1741564800 + 86400 * 40)
+
+    watermarks = await data_base.metrics.get_rollup_watermarks(
+        MetricSeries.FEAR_GREED_INDEX
+    )
+    assert watermarks[Resolution.DAILY] > 0
+
+    folder = str(tmp_path / "archive")
+    exported = await ArchiveHandler(data_base).export_all(folder)
+    assert exported["metric_rollup_state"] > 0
+
+    restored = DataBaseHandler(
+        articles_db_path=str(tmp_path / "restored_articles.db"),
+        metrics_db_path=str(tmp_path / "restored_metrics.db"),
+    )
+    imported = await ArchiveHandler(restored).import_all(folder)
+    assert imported["metric_rollup_state"] == exported["metric_rollup_state"]
+
+    restored_watermarks = await restored.metrics.get_rollup_watermarks(
+        MetricSeries.FEAR_GREED_INDEX
+    )
+    assert restored_watermarks == watermarks
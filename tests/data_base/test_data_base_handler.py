@@ -4,12 +4,19 @@ This suite tests the creation, insertion, updating, and
 fetching of articles in the database.
 """
 
+import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import aiosqlite
 import pytest
 
 from src.data_base import data_base_handler
 
 TABLE_NAME = "test_table.db"
-DB_HANDLER = data_base_handler.DataBaseHandler(articles_db_path=TABLE_NAME)
+METRICS_TABLE_NAME = "test_metrics.db"
+DB_HANDLER = data_base_handler.DataBaseHandler(
+    articles_db_path=TABLE_NAME, metrics_db_path=METRICS_TABLE_NAME
+)
 
 
 @pytest.mark.asyncio
@@ -167,3 +174,371 @@ async def test_fetch_monthly_article_counts():
     crypto_news_count = counts.get("crypto.news", 0)
 
     assert crypto_news_count == 1, "There should be one article for this month."
+
+
+@pytest.mark.asyncio
+async def test_todays_news_query_uses_index():
+    """
+    Test that fetching today's articles searches the date_scraped index
+    instead of scanning the whole table.
+    """
+    print("\nTesting the query plan of today's articles...")
+
+    plan = await DB_HANDLER.explain_query_plan(
+        data_base_handler.TODAYS_NEWS_QUERY, data_base_handler.get_day_range()
+    )
+
+    date_indexes = (
+        data_base_handler.ARTICLES_DATE_SOURCE_INDEX,
+        data_base_handler.ARTICLES_DATE_ID_INDEX,
+    )
+    assert any(
+        index in detail for detail in plan for index in date_indexes
+    ), f"Today's news query should use a date index, got: {plan}"
+    assert not any(
+        detail.startswith("SCAN articles") for detail in plan
+    ), f"Today's news query should not scan the table, got: {plan}"
+
+
+@pytest.mark.asyncio
+async def test_article_counts_query_uses_index():
+    """
+    Test that the per-source article counts search the date_scraped index
+    instead of scanning the whole table.
+    """
+    print("\nTesting the query plan of the article counts...")
+
+    plan = await DB_HANDLER.explain_query_plan(
+        data_base_handler.ARTICLE_COUNTS_QUERY, data_base_handler.get_month_range()
+    )
+
+    assert any(
+        data_base_handler.ARTICLES_DATE_SOURCE_INDEX in detail for detail in plan
+    ), f"Article counts query should use the date index, got: {plan}"
+    assert not any(
+        detail.startswith("SCAN articles") for detail in plan
+    ), f"Article counts query should not scan the table, got: {plan}"
+
+
+def test_get_day_range():
+    """
+    Test that the day range covers exactly one UTC day.
+    """
+    now = datetime.datetime(2025, 3, 14, 15, 9, 26, tzinfo=datetime.timezone.utc)
+
+    assert data_base_handler.get_day_range(now) == (
+        "2025-03-14 00:00:00",
+        "2025-03-15 00:00:00",
+    )
+
+
+def test_get_month_range():
+    """
+    Test that the month range covers the calendar month, including the year rollover.
+    """
+    now = datetime.datetime(2025, 12, 31, 23, 59, 59, tzinfo=datetime.timezone.utc)
+
+    assert data_base_handler.get_month_range(now) == (
+        "2025-12-01 00:00:00",
+        "2026-01-01 00:00:00",
+    )
+
+
+def test_get_rolling_range():
+    """
+    Test that the rolling range starts `delta` ago and ends with the current UTC day.
+    """
+    now = datetime.datetime(2025, 3, 14, 15, 9, 26, tzinfo=datetime.timezone.utc)
+
+    assert data_base_handler.get_rolling_range(datetime.timedelta(days=7), now) == (
+        "2025-03-07 15:09:26",
+        "2025-03-15 00:00:00",
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_article_stats():
+    """
+    Test fetching the daily, weekly and monthly stats in one pass.
+    """
+    print("\nTesting fetching the article stats...")
+
+    stats = await DB_HANDLER.get_article_stats()
+
+    assert dict(stats["daily"]) == {
+        "crypto.news": 1,
+        "bitcoinmagazine": 0,
+        "cointelegraph": 0,
+    }, "Daily stats should list every source."
+    assert stats["weekly"] == [("crypto.news", 1)]
+    assert stats["monthly"] == [("crypto.news", 1)]
+
+
+@pytest.mark.asyncio
+async def test_article_stats_query_uses_index():
+    """
+    Test that the single-pass stats query searches the date_scraped index.
+    """
+    print("\nTesting the query plan of the article stats...")
+
+    month_start, end = data_base_handler.get_month_range()
+    plan = await DB_HANDLER.explain_query_plan(
+        data_base_handler.ARTICLE_STATS_QUERY,
+        (month_start, month_start, month_start, month_start, end),
+    )
+
+    assert any(
+        data_base_handler.ARTICLES_DATE_SOURCE_INDEX in detail for detail in plan
+    ), f"Article stats query should use the date index, got: {plan}"
+    assert not any(
+        detail.startswith("SCAN articles") for detail in plan
+    ), f"Article stats query should not scan the table, got: {plan}"
+
+
+@pytest.mark.asyncio
+async def test_show_stats():
+    """
+    Test that the statistics message contains every window.
+    """
+    print("\nTesting showing the statistics...")
+
+    mock_update = MagicMock()
+    mock_update.message.reply_text = AsyncMock()
+
+    await DB_HANDLER.show_stats(mock_update)
+
+    mock_update.message.reply_text.assert_called_once()
+    message = mock_update.message.reply_text.call_args[0][0]
+    assert "Daily Stats" in message
+    assert "Weekly Stats" in message
+    assert "Monthly Stats" in message
+    assert "<b>crypto.news</b>: <b>1</b> articles in this month" in message
+
+
+@pytest.mark.asyncio
+async def test_store_daily_stats():
+    """
+    Test storing the daily stats in the metrics data base.
+    """
+    print("\nTesting storing the daily stats...")
+
+    await DB_HANDLER.store_daily_stats()
+
+    latest = await DB_HANDLER.metrics.latest(
+        data_base_handler.MetricSeries.ARTICLES_CRYPTO_NEWS
+    )
+    assert latest[1] == 1, "The crypto.news daily count should be stored."
+
+
+@pytest.mark.asyncio
+async def test_store_fear_greed_and_gas_fee():
+    """
+    Test storing the Fear & Greed index and the ETH gas fees in the metrics data base.
+    """
+    print("\nTesting storing the Fear & Greed index and the gas fees...")
+
+    await DB_HANDLER.store_fear_greed("42", "Fear", "2025-03-14 00:00:00")
+    await DB_HANDLER.store_eth_gas_fee("1.5", "2", "3.25")
+
+    fear_greed = await DB_HANDLER.metrics.latest(
+        data_base_handler.MetricSeries.FEAR_GREED_INDEX
+    )
+    fast_gas = await DB_HANDLER.metrics.latest(
+        data_base_handler.MetricSeries.ETH_GAS_FAST
+    )
+
+    assert fear_greed[1:] == (42.0, "Fear")
+    assert fast_gas[1] == 3.25
+
+
+@pytest.mark.asyncio
+async def test_store_skips_missing_values():
+    """
+    Test that failed API fetches are not stored as empty points.
+    """
+    print("\nTesting storing missing values...")
+
+    await DB_HANDLER.store_eth_gas_fee(None, None, None)
+    await DB_HANDLER.store_fear_greed(None, None, None)
+
+    fast_gas = await DB_HANDLER.metrics.latest(
+        data_base_handler.MetricSeries.ETH_GAS_FAST
+    )
+    assert fast_gas[1] == 3.25, "Missing gas fees should not overwrite the last value."
+
+
+@pytest.mark.asyncio
+async def test_search_cursor_round_trip():
+    """
+    Test encoding and decoding the search page token.
+    """
+    print("\nTesting the search page token...")
+
+    token = data_base_handler.encode_search_cursor("2025-03-14 10:00:00", 42)
+
+    assert data_base_handler.decode_search_cursor(token) == ("2025-03-14 10:00:00", 42)
+
+    with pytest.raises(ValueError):
+        data_base_handler.decode_search_cursor("not a cursor")
+
+
+@pytest.mark.asyncio
+async def test_search_pages_follow_keyset(tmp_path):
+    """
+    Test that the search pages walk every matching article exactly once,
+    newest first, including articles that share the same date_scraped.
+    """
+    print("\nTesting the keyset paginated search...")
+
+    handler = data_base_handler.DataBaseHandler(
+        articles_db_path=str(tmp_path / "articles.db"),
+        metrics_db_path=str(tmp_path / "metrics.db"),
+    )
+    await handler.init_db()
+
+    for index in range(7):
+        await handler.save_article_to_db(
+            "crypto.news", f"Headline {index}", f"link_{index}", "#bitcoin"
+        )
+    await handler.save_article_to_db("crypto.news", "Other", "link_other", "#eth")
+
+    pages = []
+    cursor = None
+    while True:
+        rows, cursor = await handler.search_articles_page(
+            ["bitcoin"], page_size=3, cursor=cursor
+        )
+        pages.append([row[0] for row in rows])
+        if cursor is None:
+            break
+
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+
+    rows, cursor = await handler.search_articles_page(["#BITCOIN"], page_size=10)
+    assert [row[0] for row in rows] == [7, 6, 5, 4, 3, 2, 1]
+    assert cursor is None
+
+
+@pytest.mark.asyncio
+async def test_search_query_uses_keyset_index():
+    """
+    Test that the paginated search walks the (date_scraped, id) index
+    instead of sorting the results.
+    """
+    print("\nTesting the search query plan...")
+
+    query, params = data_base_handler.build_search_query(
+        ["bitcoin"], after=("2025-03-14 10:00:00", 5)
+    )
+    plan = await DB_HANDLER.explain_query_plan(query, [*params, 10])
+
+    assert any(data_base_handler.ARTICLES_DATE_ID_INDEX in detail for detail in plan)
+    assert not any("TEMP B-TREE" in detail for detail in plan)
+
+
+@pytest.mark.asyncio
+async def test_seen_links_are_warmed_and_updated(tmp_path):
+    """
+    Test that the seen link index is loaded from the data base at startup
+    and that known links are dropped before reaching SQLite.
+    """
+    print("\nTesting the seen link index...")
+
+    articles_path = str(tmp_path / "articles.db")
+    metrics_path = str(tmp_path / "metrics.db")
+
+    handler = data_base_handler.DataBaseHandler(articles_path, metrics_path)
+    await handler.init_db()
+    await handler.save_article_to_db("crypto.news", "Headline", "link_1", "#btc")
+    assert await handler.filter_unseen_links(["link_1", "link_2"]) == ["link_2"]
+
+    restarted = data_base_handler.DataBaseHandler(articles_path, metrics_path)
+    await restarted.init_db()
+
+    assert restarted.seen_links.warmed
+    assert await restarted.filter_unseen_links(["link_1", "link_2"]) == ["link_2"]
+
+
+@pytest.mark.asyncio
+async def test_bloom_seen_links_are_confirmed(tmp_path):
+    """
+    Test that the "maybe seen" answers of the bloom filter are confirmed against
+    the data base, so a false positive never drops a new article.
+    """
+    print("\nTesting the bloom filter seen link index...")
+
+    handler = data_base_handler.DataBaseHandler(
+        str(tmp_path / "articles.db"), str(tmp_path / "metrics.db")
+    )
+    handler.seen_links = data_base_handler.SeenLinkIndex(bloom_capacity=1000)
+    await handler.init_db()
+    await handler.save_article_to_db("crypto.news", "Headline", "link_1", "#btc")
+
+    # Every link looks seen to a saturated filter
+    handler.seen_links.bloom.bits[:] = 0xFF
+
+    assert await handler.filter_unseen_links(["link_1", "link_2"]) == ["link_2"]
+
+
+@pytest.mark.asyncio
+async def test_sentiment_is_stored_with_the_summary(tmp_path):
+    """
+    Test that saving a summary classifies it once and keeps the daily counts
+    up to date, including when a summary is rewritten.
+    """
+    print("\nTesting the stored sentiment...")
+
+    handler = data_base_handler.DataBaseHandler(
+        str(tmp_path / "articles.db"), str(tmp_path / "metrics.db")
+    )
+    await handler.init_db()
+
+    for index in range(3):
+        await handler.save_article_to_db("crypto.news", "Headline", f"link_{index}", "")
+
+    await handler.update_article_summary_in_db("link_0", "A bullish day")
+    await handler.update_article_summary_in_db("link_1", "A bullish week")
+    await handler.update_article_summary_in_db("link_2", "Bearish")
+
+    counts = await handler.get_daily_sentiment_counts()
+    assert counts == {"Unknown": 0, "Negative": 1, "Neutral": 0, "Positive": 2}
+
+    await handler.update_article_summary_in_db("link_1", "Neutral after all")
+
+    counts = await handler.get_daily_sentiment_counts()
+    assert counts == {"Unknown": 0, "Negative": 1, "Neutral": 1, "Positive": 1}
+
+
+@pytest.mark.asyncio
+async def test_sentiment_migration_backfills_summaries(tmp_path):
+    """
+    Test that the summaries stored before the sentiment column are classified
+    and counted by the migration.
+    """
+    print("\nTesting the sentiment backfill...")
+
+    articles_path = str(tmp_path / "articles.db")
+    await data_base_handler.MigrationRunner(
+        articles_path, data_base_handler.ARTICLES_MIGRATIONS[:3]
+    ).migrate()
+
+    async with aiosqlite.connect(articles_path) as db:
+        await db.executemany(
+            "INSERT INTO articles (source, headline, link, openai_summary) "
+            "VALUES ('crypto.news', 'Headline', ?, ?)",
+            [("link_0", "Bullish"), ("link_1", "Bearish"), ("link_2", None)],
+        )
+        await db.commit()
+
+    handler = data_base_handler.DataBaseHandler(
+        articles_path, str(tmp_path / "metrics.db")
+    )
+    await handler.init_db()
+
+    counts = await handler.get_daily_sentiment_counts()
+    assert counts == {"Unknown": 0, "Negative": 1, "Neutral": 0, "Positive": 1}
+
+    plan = await handler.explain_query_plan(
+        data_base_handler.DAILY_SENTIMENT_QUERY, ("2025-03-14",)
+    )
+    assert not any(detail.startswith("SCAN") for detail in plan)
@@ -0,0 +1,65 @@
+"""
+Test suite for the file id cache in the src.data_base module.
+This suite tests the lookups, the eviction and the persistence of the file ids.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import pytest
+
+from src.data_base.file_id_cache import FileIdCache, get_bot_id, get_content_hash
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Returns a file id cache in a temporary data base."""
+    cache = FileIdCache(str(tmp_path / "file_ids.db"))
+    cache.max_entries = 2
+    return cache
+
+
+def test_get_bot_id_drops_the_secret():
+    """
+    Test that only the public part of the token identifies the bot.
+    """
+    assert get_bot_id("123456:ABC-secret") == "123456"
+
+
+@pytest.mark.asyncio
+async def test_file_ids_are_per_bot_and_content(cache):
+    """
+    Test that a file_id is only returned for the bot and content it was stored for.
+    """
+    content_hash = get_content_hash(b"plot")
+
+    await cache.set("1", content_hash, "file", now=1)
+
+    assert await cache.get("1", content_hash) == "file"
+    assert await cache.get("2", content_hash) is None
+    assert await cache.get("1", get_content_hash(b"other plot")) is None
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_file_ids_are_evicted(cache):
+    """
+    Test that the entries past the maximum are dropped, the least used first.
+    """
+    await cache.set("1", "a", "file a", now=1)
+    await cache.set("1", "b", "file b", now=2)
+    await cache.get("1", "a", now=3)
+    await cache.set("1", "c", "file c", now=4)
+
+    assert await cache.get("1", "a") == "file a"
+    assert await cache.get("1", "b") is None
+    assert await cache.get("1", "c") == "file c"
+
+
+@pytest.mark.asyncio
+async def test_file_ids_survive_a_restart(cache):
+    """
+    Test that a new cache on the same file finds the stored file ids.
+    """
+    await cache.set("1", "a", "file a")
+    await cache.forget("1", "missing")
+
+    assert await FileIdCache(cache.db_path).get("1", "a") == "file a"
@@ -0,0 +1,151 @@
+"""
+Test suite for the message outbox in the src.data_base module.
+This suite tests the claims, the retries and the dead letters of the outbox.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import pytest
+
+from src.data_base.message_outbox import (
+    PRIORITY_IMPORTANT,
+    PRIORITY_PARTIAL,
+    MessageOutbox,
+)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    """Returns an outbox in a temporary data base."""
+    outbox = MessageOutbox(str(tmp_path / "outbox.db"))
+    outbox.max_attempts = 3
+    outbox.retry_delay = 10
+    outbox.claim_timeout = 100
+    return outbox
+
+
+@pytest.mark.asyncio
+async def test_claim_important_messages_first(outbox):
+    """
+    Test that the important messages are claimed before the older partial ones.
+    """
+    await outbox.enqueue("token", ["1", "2"], "partial", PRIORITY_PARTIAL, now=1)
+    await outbox.enqueue("token", ["3"], "important", PRIORITY_IMPORTANT, now=2)
+
+    messages = await outbox.claim(10, now=5)
+
+    assert [(m.chat_id, m.text) for m in messages] == [
+        ("3", "important"),
+        ("1", "partial"),
+        ("2", "partial"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_claimed_messages_are_not_claimed_twice(outbox):
+    """
+    Test that a claimed message is only claimed again once its claim timed out.
+    """
+    await outbox.enqueue("token", ["1"], "Hello", now=1)
+
+    assert len(await outbox.claim(10, now=5)) == 1
+    assert not await outbox.claim(10, now=50)
+    assert len(await outbox.claim(10, now=200)) == 1
+
+
+@pytest.mark.asyncio
+async def test_acknowledged_messages_are_removed(outbox):
+    """
+    Test that the delivered messages leave the outbox.
+    """
+    await outbox.enqueue("token", ["1", "2"], "Hello", now=1)
+    messages = await outbox.claim(10, now=5)
+
+    await outbox.acknowledge([messages[0].id])
+
+    assert await outbox.get_depth() == {"sending": 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_message_is_retried_with_backoff(outbox):
+    """
+    Test that a failed message is due again after the backoff delay.
+    """
+    await outbox.enqueue("token", ["1"], "Hello", now=1)
+    message = (await outbox.claim(10, now=5))[0]
+
+    assert not await outbox.fail(message, "timed out", now=5)
+    assert await outbox.get_next_attempt_at() == 15
+    assert not await outbox.claim(10, now=14)
+
+    message = (await outbox.claim(10, now=15))[0]
+    assert message.attempts == 1
+
+    await outbox.fail(message, "timed out", now=15)
+    assert await outbox.get_next_attempt_at() == 35
+
+
+@pytest.mark.asyncio
+async def test_messages_are_dead_lettered(outbox):
+    """
+    Test that a message is dead-lettered after its last attempt, or right away
+    when it can never be delivered, and can be queued again.
+    """
+    await outbox.enqueue("token", ["1", "2"], "Hello", now=1)
+    blocked, flaky = await outbox.claim(10, now=5)
+
+    assert await outbox.fail(blocked, "bot was blocked", permanent=True, now=5)
+
+    for attempt in range(3):
+        flaky.attempts = attempt
+        dead = await outbox.fail(flaky, "timed out", now=5)
+
+    assert dead
+    assert await outbox.get_depth() == {"dead": 2}
+    assert await outbox.get_next_attempt_at() is None
+    assert [row[4] for row in await outbox.get_dead_letters()] == [
+        "timed out",
+        "bot was blocked",
+    ]
+
+    assert await outbox.requeue_dead_letters(now=10) == 2
+    assert len(await outbox.claim(10, now=10)) == 2
+
+
+@pytest.mark.asyncio
+async def test_messages_survive_a_restart(outbox):
+    """
+    Test that the queued messages are read by a new outbox of the same file.
+    """
+    await outbox.enqueue("token", ["1"], "Hello", now=1)
+
+    restarted = MessageOutbox(outbox.db_path)
+
+    assert [m.text for m in await restarted.claim(10, now=5)] == ["Hello"]
+
+
+@pytest.mark.asyncio
+async def test_digest_items_are_flushed_into_the_outbox(outbox):
+    """
+    Test that a due digest is rendered into the outbox and its items removed.
+    """
+    await outbox.add_digest_items("token", ["1", "2"], "a", PRIORITY_PARTIAL, now=1)
+    await outbox.add_digest_items("token", ["1"], "b", PRIORITY_IMPORTANT, now=50)
+
+    assert await outbox.get_due_digests(100, 10, now=60) == []
+    assert await outbox.get_due_digests(100, 2, now=60) == [("token", "1")]
+    assert sorted(await outbox.get_due_digests(50, 10, now=60)) == [
+        ("token", "1"),
+        ("token", "2"),
+    ]
+
+    queued = await outbox.flush_digest(
+        "token", "1", lambda items: ["+".join(items)], now=60
+    )
+    messages = await outbox.claim(10, now=60)
+
+    assert queued == 1
+    assert [(m.chat_id, m.text, m.priority) for m in messages] == [
+        ("1", "a+b", PRIORITY_IMPORTANT)
+    ]
+    assert await outbox.get_due_digests(0, 10, now=60) == [("token", "2")]
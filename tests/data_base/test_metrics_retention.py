@@ -0,0 +1,276 @@
+"""
+Test suite for the MetricsRetention class in the src.data_base module.
+This suite tests the downsampling of the raw metric points and their pruning.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import numpy as np
+import pytest
+
+from src.data_base.metrics_retention import MetricsRetention, aggregate_buckets
+from src.data_base.metrics_store import (
+    MetricSeries,
+    MetricsStore,
+    Resolution,
+    get_bucket_start,
+)
+
+HOUR = int(Resolution.HOURLY)
+DAY = int(Resolution.DAILY)
+
+# Monday, 2025-03-10 00:00:00 UTC
+MONDAY = 1741564800
+
+
+@pytest.fixture
+def metrics_store(tmp_path):
+    """Fixture to create a MetricsStore in a temporary folder."""
+    return MetricsStore(str(tmp_path / "metrics.db"))
+
+
+@pytest.fixture
+def retention(metrics_store):
+    """Fixture to create a MetricsRetention with known settings."""
+    handler = MetricsRetention(metrics_store)
+    handler.raw_retention_days = 1
+    handler.max_buckets_per_pass = 500
+    handler.max_deletes_per_pass = 10000
+    return handler
+
+
+def test_get_bucket_start():
+    """
+    Test that the buckets are aligned on hours, days and Mondays.
+    """
+    timestamp = MONDAY + 3 * DAY + 5 * HOUR + 17
+
+    assert get_bucket_start(timestamp, Resolution.HOURLY) == timestamp - 17
+    assert get_bucket_start(timestamp, Resolution.DAILY) == MONDAY + 3 * DAY
+    assert get_bucket_start(timestamp, Resolution.WEEKLY) == MONDAY
+
+
+def test_aggregate_buckets():
+    """
+    Test the min, max, sum and last value of every bucket.
+    """
+    timestamps = np.array([0, 10, 20, HOUR, HOUR + 5], dtype=np.int64)
+    values = np.array([3.0, 1.0, 2.0, 7.0, 5.0])
+
+    starts, counts, mins, maxs, sums, last = aggregate_buckets(
+        timestamps, values, Resolution.HOURLY
+    )
+
+    np.testing.assert_array_equal(starts, [0, HOUR])
+    np.testing.assert_array_equal(counts, [3, 2])
+    np.testing.assert_array_equal(mins, [1.0, 5.0])
+    np.testing.assert_array_equal(maxs, [3.0, 7.0])
+    np.testing.assert_array_equal(sums, [6.0, 12.0])
+    np.testing.assert_array_equal(last, [2.0, 5.0])
+
+
+@pytest.mark.asyncio
+async def test_run_once_rolls_up_closed_buckets(metrics_store, retention):
+    """
+    Test that only closed buckets are rolled up.
+    """
+    await metrics_store.write_points(
+        [
+            (MetricSeries.ETH_GAS_SAFE, MONDAY + 60, 1.0, None),
+            (MetricSeries.ETH_GAS_SAFE, MONDAY + 120, 3.0, None),
+            (MetricSeries.ETH_GAS_SAFE, MONDAY + HOUR + 60, 8.0, None),
+        ]
+    )
+
+    await retention.run_once(now=MONDAY + HOUR + 120)
+
+    hourly = await metrics_store.read_rollups(
+        MetricSeries.ETH_GAS_SAFE, Resolution.HOURLY, MONDAY, MONDAY + DAY
+    )
+    daily = await metrics_store.read_rollups(
+        MetricSeries.ETH_GAS_SAFE, Resolution.DAILY, MONDAY, MONDAY + DAY
+    )
+
+    assert len(hourly) == 1, "The current hour is still open."
+    assert hourly.iloc[0].to_dict() == {
+        "count": 2,
+        "min": 1.0,
+        "max": 3.0,
+        "mean": 2.0,
+        "last": 3.0,
+    }
+    assert daily.empty, "The current day is still open."
+
+    # Once the day is over the next pass picks up the remaining buckets
+    await retention.run_once(now=MONDAY + DAY)
+
+    hourly = await metrics_store.read_rollups(
+        MetricSeries.ETH_GAS_SAFE, Resolution.HOURLY, MONDAY, MONDAY + DAY
+    )
+    daily = await metrics_store.read_rollups(
+        MetricSeries.ETH_GAS_SAFE, Resolution.DAILY, MONDAY, MONDAY + DAY
+    )
+
+    assert hourly["last"].tolist() == [3.0, 8.0]
+    assert daily.iloc[0]["count"] == 3
+    assert daily.iloc[0]["max"] == 8.0
+
+
+@pytest.mark.asyncio
+async def test_run_once_is_incremental(metrics_store, retention):
+    """
+    Test that a pass only handles a bounded number of buckets.
+    """
+    await metrics_store.write_points(
+        [
+            (MetricSeries.FEAR_GREED_INDEX, MONDAY + hour * HOUR, hour, None)
+            for hour in range(6)
+        ]
+    )
+    retention.max_buckets_per_pass = 2
+
+    result = await retention.run_once(now=MONDAY + 6 * HOUR)
+    hourly = await metrics_store.read_rollups(
+        MetricSeries.FEAR_GREED_INDEX, Resolution.HOURLY, MONDAY, MONDAY + DAY
+    )
+    assert result["buckets"] == 2
+    assert len(hourly) == 2
+
+    await retention.run_once(now=MONDAY + 6 * HOUR)
+    await retention.run_once(now=MONDAY + 6 * HOUR)
+    hourly = await metrics_store.read_rollups(
+        MetricSeries.FEAR_GREED_INDEX, Resolution.HOURLY, MONDAY, MONDAY + DAY
+    )
+    assert hourly["last"].tolist() == [0, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_run_once_rolls_up_late_points_again(metrics_store, retention):
+    """
+    Test that points written behind the watermark reach their rolled up buckets.
+    """
+    series = MetricSeries.FEAR_GREED_INDEX
+    await metrics_store.write(series, 40.0, timestamp=MONDAY + HOUR + 60)
+    await retention.run_once(now=MONDAY + 2 * HOUR)
+
+    # A daily value stamped at midnight, and a late point of a rolled up hour
+    await metrics_store.write(series, 42.0, timestamp=MONDAY)
+    await metrics_store.write(series, 44.0, timestamp=MONDAY + HOUR + 120)
+    await retention.run_once(now=MONDAY + 2 * HOUR)
+
+    hourly = await metrics_store.read_rollups(
+        series, Resolution.HOURLY, MONDAY, MONDAY + DAY
+    )
+    assert hourly["count"].tolist() == [1, 2]
+    assert hourly["last"].tolist() == [42.0, 44.0]
+
+    # The hourly history keeps the late points once the raw points are pruned
+    await retention.run_once(now=MONDAY + 8 * DAY)
+    await retention.run_once(now=MONDAY + 8 * DAY)
+    timestamps, _ = await metrics_store.read_series(series, 0, MONDAY + 30 * DAY)
+    assert len(timestamps) == 0
+
+    hourly = await metrics_store.read_rollups(
+        series, Resolution.HOURLY, MONDAY, MONDAY + DAY
+    )
+    daily = await metrics_store.read_rollups(
+        series, Resolution.DAILY, MONDAY, MONDAY + DAY
+    )
+    assert hourly["count"].tolist() == [1, 2]
+    assert daily.iloc[0]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_run_once_prunes_rolled_up_points(metrics_store, retention):
+    """
+    Test that raw points are deleted only once they are past the horizon and rolled up.
+    """
+    await metrics_store.write_points(
+        [
+            (MetricSeries.ETH_GAS_FAST, MONDAY + 60, 1.0, None),
+            (MetricSeries.ETH_GAS_FAST, MONDAY + 8 * DAY, 2.0, None),
+        ]
+    )
+
+    # The weekly bucket of the first point is still open, nothing can be pruned
+    result = await retention.run_once(now=MONDAY + 3 * DAY)
+    assert result["pruned"] == 0
+
+    result = await retention.run_once(now=MONDAY + 8 * DAY + 60)
+    timestamps, _ = await metrics_store.read_series(
+        MetricSeries.ETH_GAS_FAST, 0, MONDAY + 30 * DAY
+    )
+
+    assert result["pruned"] == 1
+    np.testing.assert_array_equal(timestamps, [MONDAY + 8 * DAY])
+
+    weekly = await metrics_store.read_rollups(
+        MetricSeries.ETH_GAS_FAST, Resolution.WEEKLY, MONDAY, MONDAY + DAY
+    )
+    assert (
+        weekly.iloc[0]["last"] == 1.0
+    ), "The pruned point should live on in the rollups."
+
+
+@pytest.mark.asyncio
+async def test_read_series_downsampled(metrics_store, retention):
+    """
+    Test that long ranges are read from the rollups instead of the raw points.
+    """
+    await metrics_store.write_points(
+        [
+            (MetricSeries.SENTIMENT_POSITIVE, MONDAY + minute * 60, minute, None)
+            for minute in range(3 * 24 * 60)
+        ]
+    )
+    await retention.run_once(now=MONDAY + 3 * DAY)
+
+    resolution, frame = await metrics_store.read_series_downsampled(
+        MetricSeries.SENTIMENT_POSITIVE, MONDAY, MONDAY + 3 * DAY, max_points=100
+    )
+    assert resolution == Resolution.HOURLY
+    assert len(frame) == 72
+    assert frame["value"].iloc[0] == pytest.approx(29.5)
+
+    resolution, frame = await metrics_store.read_series_downsampled(
+        MetricSeries.SENTIMENT_POSITIVE, MONDAY, MONDAY + HOUR, max_points=100
+    )
+    assert resolution is None
+    assert len(frame) == 60
+
+
+@pytest.mark.asyncio
+async def test_read_series_downsampled_after_pruning(metrics_store, retention):
+    """
+    Test that a range older than the retention horizon is read from the rollups,
+    and that a range reaching the present adds the buckets not rolled up yet.
+    """
+    now = MONDAY + 120 * DAY + 12 * HOUR
+    await metrics_store.write_points(
+        [
+            (MetricSeries.ETH_GAS_SAFE, MONDAY + hour * HOUR, 1.0, None)
+            for hour in range(120 * 24 + 12)
+        ]
+    )
+    retention.raw_retention_days = 30
+    while (await retention.run_once(now=now))["buckets"]:
+        pass
+
+    timestamps, _ = await metrics_store.read_series(
+        MetricSeries.ETH_GAS_SAFE, MONDAY, MONDAY + 60 * DAY
+    )
+    assert timestamps.size == 0, "The old raw points should be pruned."
+
+    resolution, frame = await metrics_store.read_series_downsampled(
+        MetricSeries.ETH_GAS_SAFE, MONDAY, MONDAY + 60 * DAY, max_points=100
+    )
+    assert resolution == Resolution.DAILY
+    assert len(frame) == 60
+    assert (frame["value"] == 1.0).all()
+
+    resolution, frame = await metrics_store.read_series_downsampled(
+        MetricSeries.ETH_GAS_SAFE, MONDAY, now, max_points=200
+    )
+    assert resolution == Resolution.DAILY
+    assert len(frame) == 121
+    assert frame.index.is_monotonic_increasing
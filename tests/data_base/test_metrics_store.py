@@ -0,0 +1,230 @@
+"""
+Test suite for the MetricsStore class in the src.data_base module.
+This suite tests writing and bulk reading of the metric series.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import datetime
+
+import aiosqlite
+import numpy as np
+import pytest
+
+from src.data_base.metrics_store import (
+    METRICS_SERIES_TIMESTAMP_INDEX,
+    READ_SERIES_QUERY,
+    MetricSeries,
+    MetricsStore,
+    to_unix_timestamp,
+)
+
+
+@pytest.fixture
+def metrics_store(tmp_path):
+    """Fixture to create a MetricsStore in a temporary folder."""
+    return MetricsStore(str(tmp_path / "metrics" / "metrics.db"))
+
+
+def test_to_unix_timestamp():
+    """
+    Test converting the supported timestamp formats to unix seconds.
+    """
+    expected = 1741910400
+
+    assert to_unix_timestamp("2025-03-14 00:00:00") == expected
+    assert to_unix_timestamp(datetime.datetime(2025, 3, 14)) == expected
+    assert (
+        to_unix_timestamp(
+            datetime.datetime(2025, 3, 14, 2, tzinfo=datetime.timezone.utc)
+            - datetime.timedelta(hours=2)
+        )
+        == expected
+    )
+    assert to_unix_timestamp(float(expected)) == expected
+
+
+@pytest.mark.asyncio
+async def test_init_db_creates_schema(metrics_store):
+    """
+    Test that the schema, the series index and the WAL journal are created once.
+    """
+    await metrics_store.init_db()
+    await metrics_store.init_db()
+
+    assert metrics_store.schema_ready
+
+    async with aiosqlite.connect(metrics_store.db_path) as db:
+        cursor = await db.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+
+        cursor = await db.execute("SELECT COUNT(*) FROM metric_series")
+        assert (await cursor.fetchone())[0] == len(MetricSeries)
+
+        cursor = await db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name = ?",
+            (METRICS_SERIES_TIMESTAMP_INDEX,),
+        )
+        assert await cursor.fetchone() is not None
+
+
+@pytest.mark.asyncio
+async def test_read_series_returns_arrays(metrics_store):
+    """
+    Test that a time range of one series is returned as sorted NumPy arrays.
+    """
+    await metrics_store.write_points(
+        [
+            (MetricSeries.ETH_GAS_SAFE, 300, 3.0, None),
+            (MetricSeries.ETH_GAS_SAFE, 100, 1.0, None),
+            (MetricSeries.ETH_GAS_SAFE, 200, 2.0, None),
+            (MetricSeries.ETH_GAS_FAST, 200, 9.0, None),
+        ]
+    )
+
+    timestamps, values = await metrics_store.read_series(
+        MetricSeries.ETH_GAS_SAFE, 100, 300
+    )
+
+    assert timestamps.dtype == np.int64
+    assert values.dtype == np.float64
+    np.testing.assert_array_equal(timestamps, [100, 200])
+    np.testing.assert_array_equal(values, [1.0, 2.0])
+
+
+@pytest.mark.asyncio
+async def test_read_series_empty(metrics_store):
+    """
+    Test reading a range without any points.
+    """
+    timestamps, values = await metrics_store.read_series(
+        MetricSeries.FEAR_GREED_INDEX, 0, 100
+    )
+
+    assert timestamps.size == 0
+    assert values.size == 0
+
+
+@pytest.mark.asyncio
+async def test_read_frame(metrics_store):
+    """
+    Test reading several series into one DataFrame.
+    """
+    await metrics_store.write_points(
+        [
+            (MetricSeries.ETH_GAS_SAFE, 100, 1.0, None),
+            (MetricSeries.ETH_GAS_FAST, 100, 5.0, None),
+            (MetricSeries.ETH_GAS_FAST, 200, 6.0, None),
+        ]
+    )
+
+    frame = await metrics_store.read_frame(
+        [MetricSeries.ETH_GAS_SAFE, MetricSeries.ETH_GAS_FAST], 0, 1000
+    )
+
+    assert list(frame.columns) == ["ETH_GAS_SAFE", "ETH_GAS_FAST"]
+    assert len(frame) == 2
+    assert frame["ETH_GAS_FAST"].tolist() == [5.0, 6.0]
+    assert str(frame.index.tz) == "UTC"
+
+
+@pytest.mark.asyncio
+async def test_latest(metrics_store):
+    """
+    Test fetching the most recent point of a series.
+    """
+    assert await metrics_store.latest(MetricSeries.FEAR_GREED_INDEX) is None
+
+    await metrics_store.write(MetricSeries.FEAR_GREED_INDEX, 30, "Fear", 100)
+    await metrics_store.write(MetricSeries.FEAR_GREED_INDEX, 70, "Greed", 200)
+
+    assert await metrics_store.latest(MetricSeries.FEAR_GREED_INDEX) == (
+        200,
+        70.0,
+        "Greed",
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_series_query_uses_index(metrics_store):
+    """
+    Test that range reads search the (series, timestamp) index.
+    """
+    await metrics_store.init_db()
+
+    async with aiosqlite.connect(metrics_store.db_path) as db:
+        cursor = await db.execute(
+            f"EXPLAIN QUERY PLAN {READ_SERIES_QUERY}", (1, 0, 100)
+        )
+        plan = [row[3] for row in await cursor.fetchall()]
+
+    assert any(METRICS_SERIES_TIMESTAMP_INDEX in detail for detail in plan), plan
+
+
+async def create_legacy_data_base(path, schema, query, rows):
+    """Creates a legacy per-metric data base with the given rows."""
+    async with aiosqlite.connect(path) as db:
+        await db.execute(schema)
+        await db.executemany(query, rows)
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_init_db_imports_the_legacy_data_bases(tmp_path):
+    """
+    Test that the per-metric data bases are imported once into the metrics table.
+    """
+    await create_legacy_data_base(
+        str(tmp_path / "fear_greed.db"),
+        "CREATE TABLE fear_greed (id INTEGER PRIMARY KEY, index_value INTEGER, "
+        "index_text TEXT, last_updated TEXT)",
+        "INSERT INTO fear_greed (index_value, index_text, last_updated) "
+        "VALUES (?, ?, ?)",
+        [(25, "Fear", "2025-03-14 00:00:00"), (70, "Greed", None)],
+    )
+    await create_legacy_data_base(
+        str(tmp_path / "eth_gas_fee.db"),
+        "CREATE TABLE fear_greed (id INTEGER PRIMARY KEY, safe_gas INTEGER, "
+        "propose_gas INTEGER, fast_gas INTEGER, saved_date TEXT)",
+        "INSERT INTO fear_greed (safe_gas, propose_gas, fast_gas, saved_date) "
+        "VALUES (?, ?, ?, ?)",
+        [(1, 2, 3, "2025-03-14 00:00:00")],
+    )
+    await create_legacy_data_base(
+        str(tmp_path / "daily_stats.db"),
+        "CREATE TABLE daily_stats (id INTEGER PRIMARY KEY, crypto_news INTEGER, "
+        "cointelegraph INTEGER, bitcoinmagazine INTEGER, last_updated TEXT)",
+        "INSERT INTO daily_stats (crypto_news, cointelegraph, bitcoinmagazine, "
+        "last_updated) VALUES (?, ?, ?, ?)",
+        [(4, 5, 6, "2025-03-14 00:00:00")],
+    )
+    (tmp_path / "market_sentiment.db").write_text("not a data base")
+
+    metrics_store = MetricsStore(str(tmp_path / "metrics.db"))
+    await metrics_store.init_db()
+    await MetricsStore(str(tmp_path / "metrics.db")).init_db()
+
+    assert await metrics_store.latest(MetricSeries.FEAR_GREED_INDEX) == (
+        1741910400,
+        25.0,
+        "Fear",
+    )
+
+    async with aiosqlite.connect(metrics_store.db_path) as db:
+        cursor = await db.execute(
+            "SELECT series, value FROM metrics ORDER BY series, value"
+        )
+        rows = await cursor.fetchall()
+
+    assert rows == sorted(
+        (int(series), value)
+        for series, value in [
+            (MetricSeries.FEAR_GREED_INDEX, 25.0),
+            (MetricSeries.ETH_GAS_SAFE, 1.0),
+            (MetricSeries.ETH_GAS_PROPOSE, 2.0),
+            (MetricSeries.ETH_GAS_FAST, 3.0),
+            (MetricSeries.ARTICLES_CRYPTO_NEWS, 4.0),
+            (MetricSeries.ARTICLES_COINTELEGRAPH, 5.0),
+            (MetricSeries.ARTICLES_BITCOINMAGAZINE, 6.0),
+        ]
+    )
@@ -0,0 +1,218 @@
+"""
+Test suite for the migrations module in the src.data_base module.
+This suite tests the ordered, idempotent schema migrations and the chunked backfills.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+
+import aiosqlite
+import pytest
+
+from src.data_base.data_base_handler import ARTICLES_MIGRATIONS, DataBaseHandler
+from src.data_base.migrations import (
+    Migration,
+    MigrationRunner,
+    add_column_if_missing,
+    backfill_in_batches,
+    column_exists,
+    execute_statements,
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Fixture that returns the path of a temporary data base."""
+    return str(tmp_path / "migrations.db")
+
+
+def create_items_migrations(calls):
+    """Builds two migrations that record every upgrade call."""
+
+    async def create_table(db):
+        calls.append(1)
+        await db.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY)")
+
+    async def add_name(db):
+        calls.append(2)
+        await add_column_if_missing(db, "items", "name", "TEXT")
+
+    return [
+        Migration(1, "Create items", create_table),
+        Migration(2, "Add the item name", add_name),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_migrate_applies_every_version_once(db_path):
+    """
+    Test that a new data base gets every migration in order and a rerun is a no-op.
+    """
+    calls = []
+    runner = MigrationRunner(db_path, create_items_migrations(calls))
+
+    assert await runner.migrate() == 2
+    assert await runner.migrate() == 2
+    assert calls == [1, 2]
+
+    async with aiosqlite.connect(db_path) as db:
+        assert await column_exists(db, "items", "name")
+        cursor = await db.execute("SELECT version FROM schema_version ORDER BY version")
+        assert await cursor.fetchall() == [(1,), (2,)]
+
+
+@pytest.mark.asyncio
+async def test_migrate_only_applies_newer_versions(db_path):
+    """
+    Test that a data base at an older version only runs the missing migrations.
+    """
+    calls = []
+    migrations = create_items_migrations(calls)
+
+    await MigrationRunner(db_path, migrations[:1]).migrate()
+    assert await MigrationRunner(db_path, migrations).migrate() == 2
+
+    assert calls == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_runners_apply_once(db_path):
+    """
+    Test that two bots starting together do not apply a migration twice.
+    """
+    calls = []
+    migrations = create_items_migrations(calls)
+
+    await asyncio.gather(
+        MigrationRunner(db_path, migrations).migrate(),
+        MigrationRunner(db_path, migrations).migrate(),
+    )
+
+    assert calls == [1, 2]
+
+
+def test_migrations_must_be_ordered(db_path):
+    """
+    Test that out of order or duplicated versions are rejected.
+    """
+    upgrade = execute_statements("SELECT 1")
+
+    with pytest.raises(ValueError):
+        MigrationRunner(
+            db_path, [Migration(2, "b", upgrade), Migration(1, "a", upgrade)]
+        )
+
+    with pytest.raises(ValueError):
+        MigrationRunner(
+            db_path, [Migration(1, "a", upgrade), Migration(1, "b", upgrade)]
+        )
+
+
+@pytest.mark.asyncio
+async def test_add_column_if_missing_is_idempotent(db_path):
+    """
+    Test that adding an existing column is skipped.
+    """
+    async with aiosqlite.connect(db_path) as db:
+        await db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+
+        assert await add_column_if_missing(db, "items", "name", "TEXT")
+        assert not await add_column_if_missing(db, "items", "name", "TEXT")
+
+
+@pytest.mark.asyncio
+async def test_backfill_in_batches(db_path):
+    """
+    Test that the backfill walks every row once, in batches, with the running offset.
+    """
+    async with aiosqlite.connect(db_path) as db:
+        await db.execute(
+            "CREATE TABLE items (id INTEGER PRIMARY KEY, position INTEGER)"
+        )
+        await db.executemany(
+            "INSERT INTO items (id) VALUES (?)", [(row_id,) for row_id in range(1, 8)]
+        )
+        await db.commit()
+
+    batches = []
+
+    def build_params(rows, offset):
+        batches.append(len(rows))
+        return [(offset + index, row_id) for index, (row_id,) in enumerate(rows)]
+
+    changed = await backfill_in_batches(
+        db_path,
+        "SELECT id FROM items WHERE id > ? ORDER BY id LIMIT ?",
+        "UPDATE items SET position = ? WHERE id = ?",
+        build_params,
+        batch_size=3,
+    )
+
+    assert changed == 7
+    assert batches == [3, 3, 1]
+
+    async with aiosqlite.connect(db_path) as db:
+        cursor = await db.execute("SELECT position FROM items ORDER BY id")
+        assert [row[0] for row in await cursor.fetchall()] == list(range(7))
+
+
+@pytest.mark.asyncio
+async def test_backfill_records_version_when_done(db_path):
+    """
+    Test that a migration with a backfill is only recorded after the backfill ran.
+    """
+    seen_versions = []
+    runner = MigrationRunner(db_path, [])
+
+    async def backfill(path):
+        async with aiosqlite.connect(path) as db:
+            seen_versions.append(await runner.get_version(db))
+
+    runner.migrations = [
+        Migration(1, "Backfill", execute_statements("SELECT 1"), backfill)
+    ]
+
+    assert await runner.migrate() == 1
+    assert seen_versions == [0]
+    assert await runner.get_version() == 1
+
+
+@pytest.mark.asyncio
+async def test_articles_legacy_data_base_is_migrated(tmp_path):
+    """
+    Test that an articles data base created before the migrations keeps its rows
+    and gets the indexes and the schema version.
+    """
+    articles_path = str(tmp_path / "articles.db")
+
+    async with aiosqlite.connect(articles_path) as db:
+        await db.execute(
+            """
+            CREATE TABLE articles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                headline TEXT NOT NULL,
+                link TEXT NOT NULL UNIQUE,
+                highlights TEXT,
+                openai_summary TEXT,
+                date_scraped TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        await db.execute(
+            "INSERT INTO articles (source, headline, link) VALUES ('a', 'b', 'c')"
+        )
+        await db.commit()
+
+    handler = DataBaseHandler(
+        articles_db_path=articles_path, metrics_db_path=str(tmp_path / "metrics.db")
+    )
+    await handler.init_db()
+
+    runner = MigrationRunner(articles_path, ARTICLES_MIGRATIONS)
+    assert await runner.get_version() == ARTICLES_MIGRATIONS[-1].version
+
+    async with aiosqlite.connect(articles_path) as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM articles")
+        assert (await cursor.fetchone())[0] == 1
@@ -0,0 +1,103 @@
+"""
+Test suite for the QuoteCache class in the src.data_base module.
+This suite tests the TTL freshness and the single fetcher lease of the shared cache.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.data_base.quote_cache import QuoteCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Fixture to place the shared cache in a temporary folder."""
+    return str(tmp_path / "quote_cache.db")
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_is_served_without_fetching(db_path):
+    """
+    Test that a fresh entry is read from the cache instead of the API.
+    """
+    cache = QuoteCache(db_path)
+    fetch = AsyncMock(return_value={"data": [1, 2]})
+
+    assert await cache.get_or_fetch("listings", fetch, ttl=60) == {"data": [1, 2]}
+    assert await cache.get_or_fetch("listings", fetch, ttl=60) == {"data": [1, 2]}
+
+    fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_fetched_again(db_path):
+    """
+    Test that an expired entry is fetched and replaced.
+    """
+    cache = QuoteCache(db_path)
+    await cache.store("listings", {"data": "old"}, now=time.time() - 120)
+
+    result = await cache.get_or_fetch(
+        "listings", AsyncMock(return_value={"data": "new"}), ttl=60
+    )
+
+    assert result == {"data": "new"}
+    assert (await cache.read("listings"))[0] == {"data": "new"}
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_serves_the_stale_entry(db_path):
+    """
+    Test that a failed fetch falls back to the stale entry and releases the lease.
+    """
+    cache = QuoteCache(db_path)
+    await cache.store("listings", {"data": "old"}, now=time.time() - 120)
+
+    result = await cache.get_or_fetch("listings", AsyncMock(return_value=None), ttl=60)
+
+    assert result == {"data": "old"}
+    assert await cache.acquire_lease("listings", "another-process")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_processes_fetch_once(db_path):
+    """
+    Test that several caches sharing the file send a single request.
+    """
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"data": "quotes"}
+
+    caches = [QuoteCache(db_path) for _ in range(5)]
+    for cache in caches:
+        cache.poll_interval = 0.01
+
+    results = await asyncio.gather(
+        *(cache.get_or_fetch("listings", fetch, ttl=60) for cache in caches)
+    )
+
+    assert results == [{"data": "quotes"}] * 5
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_can_be_taken_over(db_path):
+    """
+    Test that the lease of a crashed fetcher is taken over once it expires.
+    """
+    cache = QuoteCache(db_path)
+    now = time.time()
+
+    assert await cache.acquire_lease("listings", "crashed", now=now)
+    assert not await cache.acquire_lease("listings", "waiting", now=now + 1)
+    assert await cache.acquire_lease(
+        "listings", "waiting", now=now + cache.lease_duration
+    )
@@ -0,0 +1,68 @@
+"""
+Test suite for the SeenLinkIndex class in the src.data_base module.
+This suite tests the exact and bloom filter modes of the seen link index.
+"""
+
+from src.data_base.seen_link_index import BloomFilter, SeenLinkIndex
+
+
+def test_exact_index_splits_links():
+    """
+    Test that the exact index knows exactly the added links.
+    """
+    index = SeenLinkIndex()
+    index.add_many(["link_1", "link_2"])
+    index.add("link_3")
+
+    new_links, seen_links = index.split_links(["link_0", "link_1", "link_3"])
+
+    assert index.is_exact
+    assert len(index) == 3
+    assert new_links == ["link_0"]
+    assert seen_links == ["link_1", "link_3"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Test that every added link is reported as maybe seen.
+    """
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    links = [f"https://example.com/article/{index}" for index in range(10000)]
+
+    bloom.add_many(links)
+
+    assert bloom.contains_many(links).all()
+
+
+def test_bloom_filter_false_positive_rate():
+    """
+    Test that the false positive rate stays close to the configured one.
+    """
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    bloom.add_many([f"https://example.com/seen/{index}" for index in range(10000)])
+
+    unseen = [f"https://example.com/unseen/{index}" for index in range(10000)]
+    false_positives = bloom.contains_many(unseen).mean()
+
+    assert false_positives < 0.02
+
+
+def test_bloom_index_and_clear():
+    """
+    Test the bloom filter mode and that clearing forgets every link.
+    """
+    index = SeenLinkIndex(bloom_capacity=1000)
+    index.add_many(["link_1", "link_2"])
+    index.warmed = True
+
+    new_links, seen_links = index.split_links(["link_1", "link_2"])
+
+    assert not index.is_exact
+    assert len(index) == 2
+    assert new_links == []
+    assert seen_links == ["link_1", "link_2"]
+
+    index.clear()
+
+    assert not index.warmed
+    assert index.split_links(["link_1"]) == (["link_1"], [])
@@ -0,0 +1,173 @@
+"""
+Test suite for the WriteBehindQueue class in the src.data_base module.
+This suite tests the batching, the per-statement results and the flushing of the queue.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import sqlite3
+
+import aiosqlite
+import pytest
+
+from src.data_base.write_behind_queue import WriteBehindQueue
+
+INSERT_QUERY = "INSERT OR IGNORE INTO items (name) VALUES (?)"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Fixture to create a data base with a single `items` table."""
+    path = str(tmp_path / "queue.db")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    return path
+
+
+async def count_items(db_path):
+    """Returns the number of rows in the `items` table."""
+    async with aiosqlite.connect(db_path) as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM items")
+        return (await cursor.fetchone())[0]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_batch(db_path):
+    """
+    Test that statements queued together are committed in a single transaction.
+    """
+    queue = WriteBehindQueue(db_path, max_batch_size=100, max_delay_ms=20)
+
+    results = await asyncio.gather(
+        *(queue.execute(INSERT_QUERY, (f"item {i}",)) for i in range(30))
+    )
+
+    assert results == [1] * 30
+    assert await count_items(db_path) == 30
+
+    metrics = queue.get_metrics()
+    assert metrics["batches"] == 1
+    assert metrics["written"] == 30
+    assert metrics["max_depth"] == 30
+    assert metrics["depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sequential_writes_do_not_wait_for_a_batch(db_path):
+    """
+    Test that a write awaited alone on an idle queue is committed right away.
+    """
+    queue = WriteBehindQueue(db_path, max_batch_size=100, max_delay_ms=10_000)
+
+    for i in range(5):
+        result = await asyncio.wait_for(
+            queue.execute(INSERT_QUERY, (f"item {i}",)), timeout=1
+        )
+        assert result == 1
+
+    await asyncio.wait_for(
+        queue.executemany(INSERT_QUERY, [("item 5",), ("item 6",)]), timeout=1
+    )
+
+    assert queue.get_metrics()["batches"] == 6
+    assert await count_items(db_path) == 7
+
+
+@pytest.mark.asyncio
+async def test_full_batches_are_written_without_waiting(db_path):
+    """
+    Test that reaching `max_batch_size` commits right away and splits large bursts.
+    """
+    queue = WriteBehindQueue(db_path, max_batch_size=10, max_delay_ms=10_000)
+
+    await asyncio.wait_for(
+        asyncio.gather(
+            *(queue.execute(INSERT_QUERY, (f"item {i}",)) for i in range(20))
+        ),
+        timeout=5,
+    )
+
+    metrics = queue.get_metrics()
+    assert metrics["batches"] == 2
+    assert metrics["last_batch_size"] == 10
+    assert await count_items(db_path) == 20
+
+
+@pytest.mark.asyncio
+async def test_row_count_of_ignored_insert(db_path):
+    """
+    Test that every caller gets the row count of its own statement.
+    """
+    queue = WriteBehindQueue(db_path)
+
+    results = await asyncio.gather(
+        queue.execute(INSERT_QUERY, ("same",)),
+        queue.execute(INSERT_QUERY, ("same",)),
+    )
+
+    assert results == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_failing_statement_does_not_fail_the_batch(db_path):
+    """
+    Test that an invalid statement only fails its own awaitable.
+    """
+    queue = WriteBehindQueue(db_path)
+
+    results = await asyncio.gather(
+        queue.execute(INSERT_QUERY, ("good",)),
+        queue.execute("INSERT INTO missing_table VALUES (?)", (1,)),
+        queue.executemany(INSERT_QUERY, [("a",), ("b",)]),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 1
+    assert isinstance(results[1], aiosqlite.OperationalError)
+    assert results[2] == 2
+    assert await count_items(db_path) == 3
+    assert queue.get_metrics()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_executemany_writes_none_of_its_rows(db_path):
+    """
+    Test that a multi-row statement failing halfway rolls back the rows it wrote,
+    while the rest of the batch is committed.
+    """
+    queue = WriteBehindQueue(db_path)
+
+    results = await asyncio.gather(
+        queue.execute(INSERT_QUERY, ("good",)),
+        queue.executemany(
+            "INSERT INTO items (name) VALUES (?)", [("a",), ("b",), ("a",)]
+        ),
+        queue.execute(INSERT_QUERY, ("after",)),
+        return_exceptions=True,
+    )
+
+    assert results[0] == 1
+    assert isinstance(results[1], sqlite3.IntegrityError)
+    assert results[2] == 1
+    assert queue.get_metrics()["batches"] == 1
+
+    async with aiosqlite.connect(db_path) as db:
+        cursor = await db.execute("SELECT name FROM items ORDER BY id")
+        assert [row[0] for row in await cursor.fetchall()] == ["good", "after"]
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_writes(db_path):
+    """
+    Test that closing the queue writes the statements nobody awaited yet.
+    """
+    queue = WriteBehindQueue(db_path, max_delay_ms=10_000)
+
+    futures = [queue.submit(INSERT_QUERY, (f"item {i}",)) for i in range(5)]
+    assert queue.depth == 5
+
+    await asyncio.wait_for(queue.close(), timeout=5)
+
+    assert all(future.done() for future in futures)
+    assert await count_items(db_path) == 5
@@ -0,0 +1,74 @@
+"""
+Test suite for the alert engine in the src.handlers module.
+This suite tests the vectorized evaluation and the rendering of the alerts.
+"""
+
+import numpy as np
+
+from src.handlers.alert_engine import (
+    as_snapshot,
+    evaluate_alerts,
+    group_alerts,
+    render_alerts,
+)
+from src.utils.quote_snapshot import QuoteSnapshot
+
+QUOTES = {
+    "BTC": {"change_1h": 3.5, "change_24h": 6.0, "change_7d": 1.0},
+    "ETH": {"change_1h": -4.0, "change_24h": 2.0, "change_7d": -15.0},
+    "XRP": {"change_1h": 1.0, "change_24h": None, "change_7d": 3.0},
+}
+
+
+def test_evaluate_all_windows_in_one_pass():
+    """
+    Test that every window is evaluated against its own threshold.
+    """
+    records = evaluate_alerts(QUOTES, {"1h": 2.5, "24h": 5, "7d": 10})
+
+    assert [(r.symbol, r.window, r.change, r.threshold) for r in records] == [
+        ("BTC", "1h", 3.5, 2.5),
+        ("ETH", "1h", -4.0, 2.5),
+        ("BTC", "24h", 6.0, 5.0),
+        ("ETH", "7d", -15.0, 10.0),
+    ]
+
+
+def test_missing_changes_never_alert():
+    """
+    Test that missing or NaN changes are ignored.
+    """
+    snapshot = as_snapshot(QUOTES)
+
+    assert np.isnan(snapshot["XRP"]["change_24h"])
+    assert np.isnan(snapshot["BTC"]["change_30d"])
+    assert not evaluate_alerts(QUOTES, {"30d": 0})
+
+
+def test_render_alerts():
+    """
+    Test that rendering is a separate step over the grouped records.
+    """
+    groups = group_alerts(evaluate_alerts(QUOTES, {"1h": 2.5, "24h": 5}))
+
+    assert set(groups) == {"1h", "24h"}
+    assert render_alerts("1h", groups["1h"]) == (
+        "🚨 <b>Crypto Alert!</b> Significant 1-hour change detected:\n\n"
+        "<b>BTC</b> → 🟢 +3.50%\n"
+        "<b>ETH</b> → 🔴 -4.00%\n"
+    )
+
+
+def test_evaluate_large_snapshot():
+    """
+    Test the evaluation of a top 1000 snapshot.
+    """
+    changes = np.zeros((1000, 5))
+    changes[::100, 1] = 5.0
+    snapshot = QuoteSnapshot([f"COIN{i}" for i in range(1000)], changes)
+
+    records = evaluate_alerts(snapshot, {"1h": 2.5, "24h": 5, "7d": 10, "30d": 10})
+
+    assert [record.symbol for record in records] == [
+        f"COIN{i}" for i in range(0, 1000, 100)
+    ]
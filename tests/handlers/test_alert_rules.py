@@ -0,0 +1,168 @@
+"""
+Test suite for the alert rules in the src.handlers module.
+This suite tests the rule precedence, the rank ranges and the compiled index.
+"""
+
+import numpy as np
+
+from src.handlers.alert_rules import AlertRule, AlertRuleIndex
+
+DEFAULTS = {"1h": 5, "24h": 10, "7d": 20, "30d": 30}
+
+QUOTES = {
+    "BTC": {"change_1h": 2.0, "change_24h": 4.0},
+    "ETH": {"change_1h": 3.0, "change_24h": 1.0},
+    "DOGE": {"change_1h": 6.0, "change_24h": 12.0},
+}
+
+
+def get_index(rules, groups=None):
+    """
+    Builds an index of the default thresholds plus the given rules.
+    """
+    return AlertRuleIndex.from_config(
+        {"groups": groups or {}, "rules": rules}, DEFAULTS
+    )
+
+
+def summarize(records):
+    """
+    Returns the (symbol, window, threshold, recipients) of the records.
+    """
+    return [(r.symbol, r.window, r.threshold, r.recipients) for r in records]
+
+
+def test_default_rule_uses_global_thresholds():
+    """
+    Test that without configured rules the global thresholds apply.
+    """
+    records = get_index([]).evaluate(QUOTES)
+
+    assert summarize(records) == [
+        ("DOGE", "1h", 5.0, ()),
+        ("DOGE", "24h", 10.0, ()),
+    ]
+
+
+def test_symbol_beats_group_beats_default():
+    """
+    Test that the most specific rule of a symbol sets its threshold.
+    """
+    index = get_index(
+        [
+            {"name": "majors", "group": "majors", "thresholds": {"1h": 2.5}},
+            {"name": "btc", "symbol": "btc", "thresholds": {"1h": 1.5}},
+        ],
+        groups={"majors": ["BTC", "ETH"]},
+    )
+
+    records = index.evaluate(QUOTES, ["1h"])
+
+    assert summarize(records) == [
+        ("BTC", "1h", 1.5, ()),
+        ("ETH", "1h", 2.5, ()),
+        ("DOGE", "1h", 5.0, ()),
+    ]
+
+
+def test_rule_keeps_default_of_unset_windows():
+    """
+    Test that a rule only overrides the windows it sets.
+    """
+    index = get_index([{"symbol": "ETH", "thresholds": {"24h": 0.5}}])
+
+    records = index.evaluate(QUOTES, ["1h", "24h"])
+
+    assert ("ETH", "24h", 0.5, ()) in summarize(records)
+    assert ("ETH", "1h", 5.0, ()) not in summarize(records)
+
+
+def test_rank_range_rule():
+    """
+    Test that a rank rule only applies to the symbols ranked in its range.
+    """
+    index = get_index([{"ranks": [2, 3], "thresholds": {"1h": 2.5}}])
+
+    records = index.evaluate(QUOTES, ["1h"])
+
+    assert summarize(records) == [
+        ("ETH", "1h", 2.5, ()),
+        ("DOGE", "1h", 2.5, ()),
+    ]
+
+
+def test_recipients_get_their_own_alerts():
+    """
+    Test that a rule with chat ids alerts them besides the default chats.
+    """
+    index = get_index(
+        [{"symbol": "BTC", "thresholds": {"1h": 1}, "chat_ids": [123, "456"]}]
+    )
+
+    records = index.evaluate(QUOTES, ["1h"])
+
+    assert summarize(records) == [
+        ("BTC", "1h", 1.0, ("123", "456")),
+        ("DOGE", "1h", 5.0, ()),
+    ]
+
+
+def test_move_window_rules():
+    """
+    Test that the windows in minutes follow the rules, the configured threshold
+    of the window being the default rule.
+    """
+    index = get_index(
+        [
+            {"symbol": "BTC", "thresholds": {"15m": 1}},
+            {"symbol": "ETH", "thresholds": {"15m": 2}, "chat_ids": [7]},
+        ]
+    )
+
+    records = index.evaluate_moves(
+        ("BTC", "ETH", "DOGE"), "15m", np.array([1.5, 2.5, 2.5]), 3
+    )
+
+    assert summarize(records) == [
+        ("BTC", "15m", 1.0, ()),
+        ("ETH", "15m", 2.0, ("7",)),
+    ]
+    assert not index.evaluate_moves(("BTC",), "30m", np.array([2.5]), 3)
+
+
+def test_invalid_rules_are_skipped():
+    """
+    Test that invalid rules are skipped and the valid ones kept.
+    """
+    index = get_index(
+        [
+            {"symbol": "BTC", "thresholds": {"2h": 1}},
+            {"symbol": "BTC", "ranks": [1, 2], "thresholds": {"1h": 1}},
+            {"group": "unknown", "thresholds": {"1h": 1}},
+            {"symbol": "ETH", "thresholds": {"1h": 1}},
+        ]
+    )
+
+    assert [rule.name for rule in index.rules] == ["default", "unnamed"]
+    assert index.by_symbol == {"ETH": [1]}
+
+
+def test_empty_group_targets_no_symbol():
+    """
+    Test that a rule of an empty group does not become a global rule.
+    """
+    rule = AlertRule("empty", {"1h": 0}, symbols=[])
+
+    assert not AlertRuleIndex([rule]).evaluate(QUOTES)
+
+
+def test_compile_is_cached_per_ranking():
+    """
+    Test that the rules are resolved once per ranking of symbols.
+    """
+    index = get_index([])
+
+    first = index.compile(("BTC", "ETH"))
+
+    assert index.compile(("BTC", "ETH")) is first
+    assert index.compile(("ETH", "BTC")) is not first
@@ -4,18 +4,25 @@ Alert handler tests.
 
 # pylint: disable=redefined-outer-name
 
+import math
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from src.data_base.alert_state import AlertStateStore
+from src.handlers.alert_engine import AlertRecord
+from src.handlers.alert_rules import AlertRuleIndex
 from src.handlers.alerts_handler import AlertsHandler
+from src.utils.quote_snapshot import QuoteSnapshot
 
 
 @pytest.fixture
-def alerts_handler():
+def alerts_handler(tmp_path):
     """Fixture to create a mocked AlertsHandler for testing."""
     with patch("src.handlers.alerts_handler.LoadVariables") as mock_load_vars:
         # Mock the variables that would be loaded from LoadVariables
+        mock_load_vars.load_alert_rules.return_value = {}
         mock_load_vars.load_json.return_value = {
             "TELEGRAM_API_TOKEN_ALERTS": "test_token",
             "ALERT_THRESHOLD_1H": 2.5,
@@ -30,6 +37,8 @@ def alerts_handler():
         # Create handler instance with mocked reload_the_data
         handler = AlertsHandler()
 
+        handler.alert_state = AlertStateStore(str(tmp_path / "alert_state.db"))
+
         # Mock the TelegramMessagesHandler
         handler.telegram_message = MagicMock()
         handler.telegram_message.send_telegram_message = AsyncMock()
@@ -259,3 +268,156 @@ async def test_check_for_alerts(alerts_handler):
 
     # Verify the telegram message was sent for all significant changes
     alerts_handler.telegram_message.send_telegram_message.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_check_for_window_moves(alerts_handler):
+    """Test that the custom window alerts use the recorded price history."""
+    alerts_handler.alert_windows = {"15": 3}
+
+    alerts_handler.record_prices(
+        QuoteSnapshot(["BTC", "ETH"], [[100, 0, 0, 0, 0], [50, 0, 0, 0, 0]], 0)
+    )
+    alerts_handler.record_prices(
+        QuoteSnapshot(["BTC", "ETH"], [[101, 0, 0, 0, 0], [45, 0, 0, 0, 0]], 900)
+    )
+
+    result = await alerts_handler.check_for_window_moves()
+
+    assert result is True
+    message = alerts_handler.telegram_message.send_telegram_message.call_args[0][0]
+    assert "15-minutes" in message
+    assert "ETH" in message
+    assert "BTC" not in message
+
+
+@pytest.mark.asyncio
+async def test_check_for_window_moves_with_unknown_active_symbol(
+    alerts_handler, tmp_path
+):
+    """
+    Test that a persisted custom window alert for a symbol the price history has
+    not recorded yet does not break the check.
+    """
+    db_path = str(tmp_path / "alert_state.db")
+    await AlertStateStore(db_path).update(
+        ["15m"], [AlertRecord("OLD", "15m", 5.0, 3)], lambda *_: math.nan
+    )
+
+    # After a restart, the state is loaded from the data base
+    alerts_handler.alert_state = AlertStateStore(db_path)
+    alerts_handler.alert_windows = {"15": 3}
+
+    alerts_handler.record_prices(QuoteSnapshot(["BTC"], [[100, 0, 0, 0, 0]], 0))
+    alerts_handler.record_prices(QuoteSnapshot(["BTC"], [[110, 0, 0, 0, 0]], 900))
+
+    assert await alerts_handler.check_for_window_moves() is True
+    assert ("OLD", "15m", "") in alerts_handler.alert_state.active
+
+
+@pytest.mark.asyncio
+async def test_check_for_window_moves_with_rule_recipients(alerts_handler):
+    """
+    Test that the custom window moves follow the alert rules and are sent once.
+    """
+    alerts_handler.rule_index = AlertRuleIndex.from_config(
+        {"rules": [{"symbol": "BTC", "thresholds": {"15m": 0.5}, "chat_ids": [42]}]},
+        {"1h": 2.5},
+    )
+    alerts_handler.telegram_message.send_telegram_message_to_chats = AsyncMock()
+    alerts_handler.alert_windows = {"15": 3}
+
+    alerts_handler.record_prices(
+        QuoteSnapshot(["BTC", "ETH"], [[100, 0, 0, 0, 0], [50, 0, 0, 0, 0]], 0)
+    )
+    alerts_handler.record_prices(
+        QuoteSnapshot(["BTC", "ETH"], [[101, 0, 0, 0, 0], [45, 0, 0, 0, 0]], 900)
+    )
+
+    assert await alerts_handler.check_for_window_moves() is True
+    assert await alerts_handler.check_for_window_moves() is False
+
+    send = alerts_handler.telegram_message.send_telegram_message
+    send.assert_called_once()
+    assert "ETH" in send.call_args[0][0]
+    assert "BTC" not in send.call_args[0][0]
+
+    send_to_chats = alerts_handler.telegram_message.send_telegram_message_to_chats
+    message, _, chat_ids = send_to_chats.call_args[0]
+    assert "15-minutes" in message
+    assert "BTC" in message
+    assert chat_ids == ("42",)
+
+
+@pytest.mark.asyncio
+async def test_check_windows_with_rule_recipients(alerts_handler):
+    """Test that the alerts of a rule with chat ids are sent to those chats."""
+    alerts_handler.rule_index = AlertRuleIndex.from_config(
+        {"rules": [{"symbol": "BTC", "thresholds": {"1h": 1}, "chat_ids": [42]}]},
+        {"1h": 2.5},
+    )
+    alerts_handler.telegram_message.send_telegram_message_to_chats = AsyncMock()
+
+    mock_crypto_data = {
+        "BTC": {"change_1h": 1.5},
+        "ETH": {"change_1h": -4.0},
+    }
+
+    alerted = await alerts_handler.check_windows(["1h"], mock_crypto_data)
+
+    assert alerted == {"1h"}
+
+    message = alerts_handler.telegram_message.send_telegram_message.call_args[0][0]
+    assert "ETH" in message
+    assert "BTC" not in message
+
+    send_to_chats = alerts_handler.telegram_message.send_telegram_message_to_chats
+    message, _, chat_ids = send_to_chats.call_args[0]
+    assert "BTC" in message
+    assert chat_ids == ("42",)
+
+
+@pytest.mark.asyncio
+async def test_check_for_alerts_sends_each_move_once(alerts_handler):
+    """Test that a lasting move is alerted once and again after it decayed."""
+    moving = {"BTC": {"change_1h": 3.5}, "ETH": {"change_1h": 1.0}}
+    decayed = {"BTC": {"change_1h": 1.0}, "ETH": {"change_1h": 1.0}}
+    send = alerts_handler.telegram_message.send_telegram_message
+    now_date = datetime(2024, 1, 1, 10, 30)
+
+    await alerts_handler.check_for_alerts(now_date, moving)
+    await alerts_handler.check_for_alerts(now_date.replace(hour=11), moving)
+
+    assert send.call_count == 1
+
+    await alerts_handler.check_for_alerts(now_date.replace(hour=12), decayed)
+    await alerts_handler.check_for_alerts(now_date.replace(hour=13), moving)
+
+    assert send.call_count == 2
+    assert "BTC" in send.call_args[0][0]
+
+
+@pytest.mark.asyncio
+async def test_check_for_alerts_longer_windows_once_per_hour(alerts_handler):
+    """Test that the longer windows are checked once per send hour."""
+    alerts_handler.check_windows = AsyncMock(return_value=set())
+    now_date = datetime(2024, 1, 1, 8, 0)
+
+    await alerts_handler.check_for_alerts(now_date, {})
+    await alerts_handler.check_for_alerts(now_date.replace(minute=30), {})
+    await alerts_handler.check_for_alerts(now_date.replace(day=2), {})
+
+    windows = [call.args[0] for call in alerts_handler.check_windows.call_args_list]
+    assert windows == [["1h", "24h", "7d", "30d"], ["1h"], ["1h", "24h", "7d", "30d"]]
+
+
+@pytest.mark.asyncio
+async def test_replies_list_every_move(alerts_handler):
+    """Test that a reply to an update is not deduplicated."""
+    update = MagicMock()
+    moving = {"BTC": {"change_1h": 3.5}}
+
+    await alerts_handler.check_for_major_updates_1h(moving)
+    await alerts_handler.check_for_major_updates_1h(moving, update)
+
+    assert alerts_handler.telegram_message.send_telegram_message.call_count == 2
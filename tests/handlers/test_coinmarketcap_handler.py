@@ -0,0 +1,214 @@
+"""
+Test suite for the CoinMarketCapClient class in the src.handlers module.
+This suite tests the credit budget, the listings snapshot and the batched lookups.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import datetime
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.data_base.quote_cache import QuoteCache
+from src.handlers.coinmarketcap_handler import (
+    BUDGET_EXHAUSTED,
+    BUDGET_LOW,
+    BUDGET_OK,
+    CMC_API,
+    LISTINGS_CACHE_KEY,
+    CoinMarketCapClient,
+    get_budget_days,
+    get_call_credits,
+    get_quote_cache_key,
+    is_fiat,
+)
+
+
+def make_coin(symbol, price):
+    """Builds the coin data of a CoinMarketCap response."""
+    return {
+        "symbol": symbol,
+        "name": symbol.title(),
+        "quote": {"USD": {"price": price}},
+    }
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Fixture to create a client with its cache in a temporary folder."""
+    cmc = CoinMarketCapClient(QuoteCache(str(tmp_path / "quote_cache.db")))
+    cmc.daily_credit_limit = 100
+    cmc.monthly_credit_limit = 1000
+    cmc.low_budget_ratio = 0.2
+    cmc.coalesce_window = 0.01
+    return cmc
+
+
+def test_budget_helpers():
+    """
+    Test the credit estimate and the budget days around a year end.
+    """
+    assert get_call_credits(1) == 1
+    assert get_call_credits(100) == 1
+    assert get_call_credits(101) == 2
+
+    now = datetime.datetime(2025, 12, 31, 22, tzinfo=datetime.timezone.utc)
+    assert get_budget_days(now) == (
+        "2025-12-31",
+        "2026-01-01",
+        "2025-12-01",
+        "2026-01-01",
+    )
+
+
+@pytest.mark.asyncio
+async def test_listings_are_fetched_once_and_billed(client):
+    """
+    Test that the listings are cached and their credits recorded.
+    """
+    response = {"status": {"credit_count": 1}, "data": [make_coin("BTC", 50000)]}
+
+    with patch(
+        "src.handlers.coinmarketcap_handler.check_requests",
+        AsyncMock(return_value=response),
+    ) as mock_get:
+        assert await client.get_listings() == response
+        assert await client.get_listings() == response
+
+    mock_get.assert_awaited_once()
+    assert await client.get_credits_used() == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_budget_states(client):
+    """
+    Test that the budget turns low and then exhausted as credits are spent.
+    """
+    day = get_budget_days()[0]
+
+    assert await client.get_budget_state() == BUDGET_OK
+
+    await client.quote_cache.add_credits(CMC_API, 85, day)
+    assert await client.get_budget_state() == BUDGET_LOW
+    assert await client.get_cache_ttl() == client.low_budget_ttl
+
+    await client.quote_cache.add_credits(CMC_API, 15, day)
+    assert await client.get_budget_state() == BUDGET_EXHAUSTED
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_serves_cached_data(client):
+    """
+    Test that no call is made once the budget is spent, even for stale data.
+    """
+    stale = {"data": [make_coin("BTC", 40000)]}
+    await client.quote_cache.store(LISTINGS_CACHE_KEY, stale, now=time.time() - 3600)
+    await client.quote_cache.add_credits(CMC_API, 100, get_budget_days()[0])
+
+    with patch("src.handlers.coinmarketcap_handler.check_requests") as mock_get:
+        assert await client.get_listings() == stale
+        assert (await client.get_quote("BTC"))["quote"]["USD"]["price"] == 40000
+
+    mock_get.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced(client):
+    """
+    Test that concurrent symbol lookups are sent as one quotes call.
+    """
+    response = {
+        "status": {"credit_count": 1},
+        "data": {"BTC": make_coin("BTC", 50000), "ETH": make_coin("ETH", 3000)},
+    }
+
+    with patch(
+        "src.handlers.coinmarketcap_handler.check_requests",
+        AsyncMock(return_value=response),
+    ) as mock_get:
+        btc, eth = await asyncio.gather(
+            client.get_quote("btc"), client.get_quote("ETH")
+        )
+
+        # Served from the cached quotes afterwards
+        assert await client.get_quote("ETH") == eth
+
+    mock_get.assert_awaited_once()
+    assert mock_get.call_args.kwargs["params"]["symbol"] == "BTC,ETH"
+    assert btc["quote"]["USD"]["price"] == 50000
+    assert eth["quote"]["USD"]["price"] == 3000
+
+
+@pytest.mark.asyncio
+async def test_quotes_served_from_fresh_listings(client):
+    """
+    Test that symbols of the fresh listings snapshot need no quotes call.
+    """
+    await client.quote_cache.store(
+        LISTINGS_CACHE_KEY, {"data": [make_coin("BTC", 50000), make_coin("SOL", 150)]}
+    )
+
+    with patch("src.handlers.coinmarketcap_handler.check_requests") as mock_get:
+        quotes = await client.get_quotes(["BTC", "SOL"])
+
+    mock_get.assert_not_called()
+    assert set(quotes) == {"BTC", "SOL"}
+
+
+@pytest.mark.asyncio
+async def test_failed_call_falls_back_to_stale_quotes(client):
+    """
+    Test that a failed quotes call serves the cached quote, however old.
+    """
+    await client.quote_cache.store(
+        get_quote_cache_key("ETH"), make_coin("ETH", 2500), now=time.time() - 3600
+    )
+
+    with patch(
+        "src.handlers.coinmarketcap_handler.check_requests",
+        AsyncMock(return_value=None),
+    ):
+        quotes = await client.get_quotes(["ETH", "PEPE"])
+
+    assert quotes == {"ETH": make_coin("ETH", 2500)}
+
+
+@pytest.mark.asyncio
+async def test_fiat_price_converted_by_coinmarketcap(client):
+    """
+    Test that a fiat price is one convert call, cached, and never a symbol lookup.
+    """
+    assert is_fiat("eur")
+    assert not is_fiat("ETH")
+
+    coin = {"symbol": "BTC", "quote": {"EUR": {"price": 45000}}}
+    response = {"status": {"credit_count": 1}, "data": {"BTC": [coin]}}
+
+    with patch(
+        "src.handlers.coinmarketcap_handler.check_requests",
+        AsyncMock(return_value=response),
+    ) as mock_get:
+        assert await client.get_fiat_price("btc", "eur") == 45000
+        assert await client.get_fiat_price("BTC", "EUR") == 45000
+
+    mock_get.assert_awaited_once()
+    assert mock_get.call_args.kwargs["params"] == {"symbol": "BTC", "convert": "EUR"}
+    assert await client.quote_cache.read(get_quote_cache_key("BTC", "EUR"))
+
+
+@pytest.mark.asyncio
+async def test_usd_price_served_from_the_listings(client):
+    """
+    Test that a USD price needs no call when the listings are fresh.
+    """
+    await client.quote_cache.store(
+        LISTINGS_CACHE_KEY, {"data": [make_coin("BTC", 50000)]}
+    )
+
+    with patch("src.handlers.coinmarketcap_handler.check_requests") as mock_get:
+        assert await client.get_fiat_price("BTC", "USD") == 50000
+
+    mock_get.assert_not_called()
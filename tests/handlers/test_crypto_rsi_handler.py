@@ -57,9 +57,28 @@ def test_send_new_rsi_to_telegram_sets_message(handler):
     """
     rsi_data = {"BTC": 80, "ETH": 20, "XRP": 50}
     handler.prepare_rsi_message_for_telegram("1h", rsi_data)
-    assert "BTC" in handler.message
-    assert "ETH" in handler.message
-    assert "XRP" not in handler.message
+    assert len(handler.messages) == 1
+    assert "BTC" in handler.messages[0]
+    assert "ETH" in handler.messages[0]
+    assert "XRP" not in handler.messages[0]
+
+
+def test_prepare_rsi_message_splits_a_long_report(handler):
+    """
+    Test that a report longer than a Telegram message is split between categories
+    or lines, each message within the limit.
+    """
+    rsi_data = {f"COIN{i}USDT": 90 - (i % 3) * 35 for i in range(600)}
+
+    handler.prepare_rsi_message_for_telegram("1h", rsi_data)
+
+    assert len(handler.messages) > 1
+    assert all(len(message) <= 4096 for message in handler.messages)
+    assert all(
+        message.count("<b>") == message.count("</b>") for message in handler.messages
+    )
+    assert sum(message.count("COIN") for message in handler.messages) == 400
+    assert handler.messages[-1].endswith("#RSI")
 
 
 def test_send_new_rsi_to_telegram_no_data(handler):
@@ -67,7 +86,7 @@ def test_send_new_rsi_to_telegram_no_data(handler):
     Test the send_new_rsi_to_telegram method when no RSI data is provided.
     """
     handler.prepare_rsi_message_for_telegram("1h", {})
-    assert "error" in handler.message.lower()
+    assert "error" in handler.messages[0].lower()
 
 
 @pytest.mark.asyncio
@@ -75,14 +94,17 @@ async def test_send_rsi_to_telegram_sends_message(handler):
     """
     Test the send_rsi_to_telegram method to ensure it sends a message via Telegram.
     """
-    handler.message = "test"
+    handler.messages = ["test"]
     bot = MagicMock()
+    handler.telegram_handler.queue_telegram_message = AsyncMock()
     with patch(
         "src.handlers.crypto_rsi_handler.TelegramMessagesHandler"
     ) as mock_telegram:
-        mock_telegram.return_value.send_telegram_message = AsyncMock()
         await handler.send_rsi_to_telegram(bot)
-        mock_telegram.return_value.send_telegram_message.assert_awaited()
+
+        # The handler of the instance is reused
+        mock_telegram.assert_not_called()
+        handler.telegram_handler.queue_telegram_message.assert_awaited()
 
 
 def test_check_if_should_calculate_rsi_true(handler):
@@ -32,18 +32,20 @@ from src.handlers.data_fetcher_handler import (
         (None, (None, None, None)),
     ],
 )
-def test_get_eth_gas_fee(mock_data, expected_result):
+@pytest.mark.asyncio
+async def test_get_eth_gas_fee(mock_data, expected_result):
     """
     Test the get_eth_gas_fee function with various API responses.
     """
     with patch(
         "src.handlers.data_fetcher_handler.check_requests", return_value=mock_data
     ):
-        result = get_eth_gas_fee("https://api.etherscan.io/api")
+        result = await get_eth_gas_fee("https://api.etherscan.io/api")
         assert result == expected_result
 
 
-def test_get_eth_gas_fee_key_error():
+@pytest.mark.asyncio
+async def test_get_eth_gas_fee_key_error():
     """
     Test the get_eth_gas_fee function when a KeyError occurs.
     """
@@ -53,7 +55,7 @@ def test_get_eth_gas_fee_key_error():
     with patch(
         "src.handlers.data_fetcher_handler.check_requests", return_value=mock_data
     ):
-        result = get_eth_gas_fee("https://api.etherscan.io/api")
+        result = await get_eth_gas_fee("https://api.etherscan.io/api")
         assert result == (None, None, None)
 
 
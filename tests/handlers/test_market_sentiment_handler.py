@@ -2,6 +2,8 @@
 Test suite for the market_sentiment_handler module.
 """
 
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import pytest
 
 import src.handlers.market_sentiment_handler
@@ -62,3 +64,35 @@ async def test_calculate_sentiment_trend():
     )
     assert "Crypto sentiment for today" in result
     assert "Positive" in result or "Negative" in result or "Neutral" in result
+
+
+@pytest.mark.asyncio
+async def test_get_market_sentiment_reads_daily_counts():
+    """
+    Test that the market sentiment is built from the stored daily counts
+    instead of classifying the summaries again.
+    """
+    mock_db = MagicMock()
+    mock_db.get_daily_sentiment_counts = AsyncMock(
+        return_value={"Unknown": 1, "Negative": 0, "Neutral": 2, "Positive": 5}
+    )
+    mock_db.store_market_sentiment = AsyncMock()
+
+    with patch("src.handlers.market_sentiment_handler.DataBaseHandler") as handler:
+        message = await src.handlers.market_sentiment_handler.get_market_sentiment(
+            data_base=mock_db
+        )
+        saved = await src.handlers.market_sentiment_handler.get_market_sentiment(
+            save_data=True, data_base=mock_db
+        )
+
+    # The data base of the caller is used, none is created per call
+    handler.assert_not_called()
+
+    assert "📈 Positive: 5" in message
+    assert "The market sentiment is: Positive" in message
+    assert saved == ""
+    mock_db.fetch_todays_news.assert_not_called()
+    mock_db.store_market_sentiment.assert_called_once_with(
+        {"Unknown": 1, "Negative": 0, "Neutral": 2, "Positive": 5}
+    )
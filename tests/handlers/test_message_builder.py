@@ -0,0 +1,99 @@
+"""
+Test suite for the message builder in the src.handlers module.
+This suite tests the packing of the lines and the HTML safe splits.
+"""
+
+import pytest
+
+from src.handlers.message_builder import MessageBuilder, split_html
+
+
+def test_split_html_keeps_a_short_text():
+    """
+    Test that a text within the limit is not split.
+    """
+    assert split_html("<b>short</b>", limit=20) == ["<b>short</b>"]
+
+
+def test_split_html_prefers_the_line_breaks():
+    """
+    Test that a long text is split at its last line break within the limit.
+    """
+    text = "first line\nsecond line is longer\nthird"
+
+    parts = split_html(text, limit=25)
+
+    assert parts == ["first line\n", "second line is longer\n", "third"]
+
+
+@pytest.mark.parametrize("limit", [10, 16, 25, 40])
+def test_split_html_closes_and_reopens_the_tags(limit):
+    """
+    Test that the tags open at a split are closed, then opened again.
+    """
+    text = '<b>bold words and <a href="u">a link &amp; more</a> text</b>'
+
+    parts = split_html(text, limit=limit)
+
+    assert all(len(part) <= limit or part.count("<") > 2 for part in parts)
+    for part in parts:
+        assert part.count("<b>") == part.count("</b>")
+        assert part.count("<a ") == part.count("</a>")
+        assert "&amp" not in part or "&amp;" in part
+
+
+def test_split_html_keeps_the_text():
+    """
+    Test that the parts hold the whole text, in order.
+    """
+    text = "<i>" + " ".join(f"word{i}" for i in range(200)) + "</i>"
+
+    parts = split_html(text, limit=100)
+
+    assert all(len(part) <= 100 for part in parts)
+    words = " ".join(part.replace("<i>", "").replace("</i>", "") for part in parts)
+    assert words.split() == text[3:-4].split()
+
+
+def test_builder_packs_lines_within_the_limit():
+    """
+    Test that the lines are packed into as few messages as the limit allows.
+    """
+    builder = MessageBuilder(limit=30)
+    builder.add_lines(f"line {i}" for i in range(10))
+
+    messages = builder.build()
+
+    assert all(len(message) <= 30 for message in messages)
+    assert "\n".join(messages) == "\n".join(f"line {i}" for i in range(10))
+    assert len(messages) == 3
+
+
+def test_builder_keeps_a_section_together():
+    """
+    Test that a section fitting in a message is not split across two.
+    """
+    builder = MessageBuilder(limit=30)
+    builder.add_line("header")
+    builder.add_section(["section 1", "line 1"])
+    builder.add_section(["section 2", "line 2"])
+
+    assert builder.build() == [
+        "header\nsection 1\nline 1",
+        "section 2\nline 2",
+    ]
+
+
+def test_builder_splits_an_oversized_line():
+    """
+    Test that a line longer than a message is split on its own.
+    """
+    builder = MessageBuilder(limit=20)
+    builder.add_line("short")
+    builder.add_line("<b>" + "word " * 10 + "</b>")
+
+    messages = builder.build()
+
+    assert messages[0] == "short"
+    assert all(len(message) <= 20 for message in messages)
+    assert all(message.count("<b>") == message.count("</b>") for message in messages)
@@ -20,6 +20,7 @@ def news_check():
         news_check = CryptoNewsCheck(db_path=":memory:")
         # Mock the dependencies
         news_check.telegram_message = AsyncMock()
+        news_check.news_digest = AsyncMock()
         news_check.open_ai_prompt = AsyncMock()
         return news_check
 
@@ -165,7 +166,11 @@ async def test_check_news_new_article(news_check):
     news_check.data_base.save_article_to_db.assert_called_once()
     news_check.generate_summary.assert_called_once()
     news_check.data_base.update_article_summary_in_db.assert_called_once()
-    news_check.telegram_message.send_telegram_message.assert_called_once()
+    news_check.news_digest.add_article.assert_called_once()
+
+    _, message, item = news_check.news_digest.add_article.call_args[0]
+    assert message.startswith("📰 <b>New Article Found!</b>")
+    assert "🤖 Article summary" in item
 
 
 @pytest.mark.asyncio
@@ -193,7 +198,30 @@ async def test_check_news_existing_article(news_check):
     assert result is False  # No new articles
     news_check.fetch_page.assert_called_once_with("https://crypto.news/")
     news_check.data_base.save_article_to_db.assert_called_once()
-    news_check.telegram_message.send_telegram_message.assert_not_called()
+    news_check.news_digest.add_article.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_check_news_skips_known_links(news_check):
+    """Test that articles in the seen link index never reach the data base."""
+    news_check.fetch_page = AsyncMock(return_value="<html></html>")
+    news_check.scrape_articles = MagicMock(
+        return_value=[
+            {
+                "headline": "Known Article",
+                "link": "https://example.com/known",
+                "highlights": "Old news",
+            }
+        ]
+    )
+    news_check.data_base.seen_links.add("https://example.com/known")
+    news_check.data_base.save_article_to_db = AsyncMock(return_value=0)
+
+    result = await news_check.check_news("crypto.news")
+
+    assert result is False
+    news_check.data_base.save_article_to_db.assert_not_called()
+    news_check.news_digest.add_article.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -271,13 +299,13 @@ async def test_send_today_summary(news_check):
     # Verify results
     news_check.data_base.fetch_todays_news.assert_called_once()
     news_check.open_ai_prompt.get_response.assert_called_once()
-    news_check.telegram_message.send_telegram_message.assert_called_once()
+    news_check.telegram_message.queue_telegram_message.assert_called_once()
     # Make sure the message includes the summary and the tag
     assert (
         "Daily summary"
-        in news_check.telegram_message.send_telegram_message.call_args[0][0]
+        in news_check.telegram_message.queue_telegram_message.call_args[0][0]
     )
     assert (
         "#DailyReport"
-        in news_check.telegram_message.send_telegram_message.call_args[0][0]
+        in news_check.telegram_message.queue_telegram_message.call_args[0][0]
     )
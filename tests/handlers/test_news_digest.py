@@ -0,0 +1,124 @@
+"""
+Test suite for the news digest in the src.handlers module.
+This suite tests the packing of the digests and the routing of the articles.
+"""
+
+# pylint: disable=redefined-outer-name
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.data_base.message_outbox import MessageOutbox
+from src.handlers.news_digest import (
+    MODE_DIGEST,
+    NewsDigest,
+    get_digest_header,
+    render_digests,
+)
+
+
+@pytest.fixture
+def news_digest(tmp_path):
+    """Returns a digest queuing in a temporary outbox, one chat in digest mode."""
+    variables = {
+        "TELEGRAM_CHAT_ID_FULL_DETAILS": ["1"],
+        "TELEGRAM_CHAT_ID_PARTIAL_DATA": ["1", "2"],
+        "NEWS_NOTIFICATION_MODES": {"2": MODE_DIGEST},
+        "NEWS_DIGEST_WINDOW": 1800,
+        "NEWS_DIGEST_MAX_ARTICLES": 3,
+    }
+    dispatcher = MagicMock()
+    dispatcher.outbox = MessageOutbox(str(tmp_path / "outbox.db"))
+
+    with patch("src.handlers.news_digest.load_json", return_value=variables):
+        yield NewsDigest(dispatcher)
+
+
+def test_render_digests_within_the_limit():
+    """
+    Test that the items are packed in order into messages within the limit.
+    """
+    items = [f"item {i} " + "x" * 40 + "\n" for i in range(10)]
+
+    messages = render_digests(items, limit=200)
+
+    assert all(len(message) <= 200 for message in messages)
+    assert len(messages) > 1
+    bodies = [message.split("</b>\n", 1)[1] for message in messages]
+    assert "\n".join(bodies) == "\n".join(items)
+
+
+def test_render_digests_sends_an_oversized_item_alone():
+    """
+    Test that an item too long to share a message gets its own message.
+    """
+    messages = render_digests(["a\n", "b" * 70, "c\n"], limit=100)
+
+    assert messages == [
+        get_digest_header(1) + "a\n",
+        get_digest_header(1) + "b" * 70,
+        get_digest_header(1) + "c\n",
+    ]
+
+
+def test_render_digests_splits_an_item_longer_than_a_message():
+    """
+    Test that an item longer than a message is split within the limit.
+    """
+    messages = render_digests(["<b>" + "word " * 100 + "</b>"], limit=200)
+
+    assert len(messages) > 1
+    assert all(len(message) <= 200 for message in messages)
+    assert all(message.count("<b>") == message.count("</b>") for message in messages)
+
+
+@pytest.mark.asyncio
+async def test_add_article_routes_the_chats_by_mode(news_digest):
+    """
+    Test that the instant chats get the message and the digest chats the item.
+    """
+    outbox = news_digest.dispatcher.outbox
+
+    await news_digest.add_article("token", "message", "item\n")
+
+    messages = await outbox.claim(10)
+    assert [(m.chat_id, m.text) for m in messages] == [("1", "message")]
+    assert await outbox.get_due_digests(0, 10) == [("token", "2")]
+    news_digest.dispatcher.start.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_digest_is_flushed_by_count(news_digest):
+    """
+    Test that the digest is queued once it collected the maximum of articles.
+    """
+    outbox = news_digest.dispatcher.outbox
+
+    for i in range(3):
+        await news_digest.add_article("token", f"message {i}", f"item {i}\n")
+
+    messages = [m for m in await outbox.claim(10) if m.chat_id == "2"]
+
+    assert len(messages) == 1
+    assert messages[0].text == (get_digest_header(3) + "item 0\n\nitem 1\n\nitem 2\n")
+
+
+@pytest.mark.asyncio
+async def test_digest_is_flushed_when_the_window_ends(news_digest):
+    """
+    Test that the digest waits for its window, unless forced.
+    """
+    outbox = news_digest.dispatcher.outbox
+
+    await news_digest.add_article("token", "message", "item\n")
+    await outbox.claim(10)
+
+    assert await news_digest.flush() == 0
+
+    news_digest.window = 0
+    assert await news_digest.flush() == 1
+
+    await news_digest.add_article("token", "message", "item\n")
+    news_digest.window = 1800
+    assert await news_digest.flush(force=True) == 0
@@ -0,0 +1,118 @@
+"""
+Test suite for the outbox dispatcher in the src.handlers module.
+This suite tests the delivery of the queued messages and their outcomes.
+"""
+
+# pylint: disable=redefined-outer-name
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telegram.error import Forbidden, TimedOut
+
+from src.data_base.message_outbox import PRIORITY_IMPORTANT, MessageOutbox
+from src.handlers.outbox_dispatcher import OutboxDispatcher
+from src.handlers.send_telegram_message import TelegramMessagesHandler
+from src.handlers.telegram_bot_pool import TelegramBotPool
+from src.handlers.telegram_broadcast import broadcast_limits, broadcasters
+
+
+@pytest.fixture
+def bot():
+    """Returns a mocked Telegram bot."""
+    return AsyncMock()
+
+
+@pytest.fixture
+def dispatcher(tmp_path, bot):
+    """Returns a dispatcher of a temporary outbox sending with the mocked bot."""
+    variables = {
+        "TELEGRAM_MESSAGES_PER_SECOND": 1000,
+        "TELEGRAM_CHAT_INTERVAL": 0.001,
+        "TELEGRAM_SEND_ATTEMPTS": 1,
+    }
+    broadcast_limits.clear()
+    broadcasters.clear()
+
+    with patch("src.handlers.telegram_broadcast.load_json", return_value=variables):
+        dispatcher = OutboxDispatcher(
+            MessageOutbox(str(tmp_path / "outbox.db")),
+            TelegramBotPool(bot_factory=lambda _: bot),
+        )
+        dispatcher.outbox.retry_delay = 60
+        yield dispatcher
+
+    broadcast_limits.clear()
+    broadcasters.clear()
+
+
+@pytest.mark.asyncio
+async def test_dispatch_sends_and_removes_the_messages(dispatcher, bot):
+    """
+    Test that a queued message is broadcast once to every chat and removed.
+    """
+    await dispatcher.outbox.enqueue("token", ["2", "3"], "Partial")
+    await dispatcher.outbox.enqueue("token", ["1"], "Important", PRIORITY_IMPORTANT)
+
+    assert await dispatcher.dispatch_batch() == 3
+
+    sent = [call.kwargs["chat_id"] for call in bot.send_message.call_args_list]
+    assert sent == ["1", "2", "3"]
+    assert await dispatcher.outbox.get_depth() == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_chats_are_retried_or_dead_lettered(dispatcher, bot):
+    """
+    Test that each chat records its own outcome.
+    """
+
+    async def send_message(chat_id, **_):
+        if chat_id == "2":
+            raise TimedOut()
+        if chat_id == "3":
+            raise Forbidden("bot was blocked by the user")
+
+    bot.send_message.side_effect = send_message
+    await dispatcher.outbox.enqueue("token", ["1", "2", "3"], "Hello")
+
+    await dispatcher.dispatch_batch()
+
+    assert await dispatcher.outbox.get_depth() == {"pending": 1, "dead": 1}
+
+
+@pytest.mark.asyncio
+async def test_run_exits_once_the_outbox_is_drained(dispatcher, bot):
+    """
+    Test that the background task sends everything, then exits.
+    """
+    dispatcher.batch_size = 2
+    await dispatcher.outbox.enqueue("token", ["1", "2", "3"], "Hello")
+
+    await dispatcher.start()
+
+    assert bot.send_message.call_count == 3
+    assert dispatcher.task.done()
+
+
+@pytest.mark.asyncio
+async def test_queue_telegram_message(dispatcher):
+    """
+    Test that the handler queues the message for its chats and starts the dispatcher.
+    """
+    handler = TelegramMessagesHandler()
+    handler.telegram_important_chat_id = ["1"]
+    handler.telegram_not_important_chat_id = ["2"]
+    handler.dispatcher = MagicMock(outbox=dispatcher.outbox)
+
+    await handler.queue_telegram_message("Hello", "token")
+    await handler.queue_telegram_message("Important", "token", is_important=True)
+
+    messages = await dispatcher.outbox.claim(10)
+
+    assert [(m.chat_id, m.text) for m in messages] == [
+        ("1", "Hello"),
+        ("1", "Important"),
+        ("2", "Hello"),
+    ]
+    assert handler.dispatcher.start.call_count == 2
@@ -5,16 +5,20 @@ This suite tests the sending of messages to Telegram.
 
 # pylint: disable=unused-variable
 
+import sqlite3
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, mock_open, patch
 
 import pytest
+from telegram.error import BadRequest
 
+from src.data_base.file_id_cache import FileIdCache, get_content_hash
 from src.handlers.send_telegram_message import (
     TelegramMessagesHandler,
     send_plot_to_telegram,
     send_telegram_message_update,
 )
+from src.handlers.telegram_bot_pool import TelegramBotPool
 
 
 @pytest.mark.asyncio
@@ -37,26 +41,104 @@ async def test_send_telegram_message_update():
 
 
 @pytest.mark.asyncio
-async def test_send_plot_to_telegram():
+async def test_send_plot_to_telegram(tmp_path):
     """
     Test sending a plot image to Telegram.
     """
     # Create a mock update object
     mock_update = MagicMock()
+    mock_update.get_bot.return_value.token = "123:secret"
     mock_update.message.reply_photo = AsyncMock()
+    mock_update.message.reply_photo.return_value.photo = [MagicMock(file_id="small")]
+    cache = FileIdCache(str(tmp_path / "file_ids.db"))
 
     # Mock file opening
     test_image_path = "test_image.png"
-    mock_file = MagicMock()
 
     with patch("builtins.open", mock_open(read_data=b"image_data")) as mock_file_open:
-        await send_plot_to_telegram(test_image_path, mock_update)
+        await send_plot_to_telegram(test_image_path, mock_update, cache)
 
         # Verify the file was opened
         mock_file_open.assert_called_once_with(test_image_path, "rb")
 
-        # Verify the photo was sent
-        mock_update.message.reply_photo.assert_called_once()
+        # Verify the photo was uploaded
+        mock_update.message.reply_photo.assert_called_once_with(photo=b"image_data")
+
+
+@pytest.mark.asyncio
+async def test_send_plot_to_telegram_reuses_the_file_id(tmp_path):
+    """
+    Test that an identical plot is sent by the file_id of its first upload.
+    """
+    mock_update = MagicMock()
+    mock_update.get_bot.return_value.token = "123:secret"
+    mock_update.message.reply_photo = AsyncMock()
+    mock_update.message.reply_photo.return_value.photo = [
+        MagicMock(file_id="small"),
+        MagicMock(file_id="large"),
+    ]
+    cache = FileIdCache(str(tmp_path / "file_ids.db"))
+
+    with patch("builtins.open", mock_open(read_data=b"image_data")):
+        await send_plot_to_telegram("a.png", mock_update, cache)
+        await send_plot_to_telegram("b.png", mock_update, cache)
+
+    photos = [
+        call.kwargs["photo"] for call in mock_update.message.reply_photo.mock_calls
+    ]
+    assert photos == [b"image_data", "large"]
+
+
+@pytest.mark.asyncio
+async def test_send_plot_to_telegram_uploads_again_a_rejected_file_id(tmp_path):
+    """
+    Test that a file_id Telegram rejects is forgotten and the image uploaded.
+    """
+    mock_update = MagicMock()
+    mock_update.get_bot.return_value.token = "123:secret"
+    uploaded = MagicMock()
+    uploaded.photo = [MagicMock(file_id="new")]
+    mock_update.message.reply_photo = AsyncMock(
+        side_effect=[BadRequest("Wrong file identifier"), uploaded]
+    )
+    cache = FileIdCache(str(tmp_path / "file_ids.db"))
+    await cache.set("123", get_content_hash(b"image_data"), "stale")
+
+    with patch("builtins.open", mock_open(read_data=b"image_data")):
+        await send_plot_to_telegram("a.png", mock_update, cache)
+
+    photos = [
+        call.kwargs["photo"] for call in mock_update.message.reply_photo.mock_calls
+    ]
+    assert photos == ["stale", b"image_data"]
+    assert await cache.get("123", get_content_hash(b"image_data")) == "new"
+
+
+@pytest.mark.asyncio
+async def test_send_plot_to_telegram_uploads_when_forget_fails(tmp_path):
+    """
+    Test that an error dropping a rejected file_id still uploads the image.
+    """
+    mock_update = MagicMock()
+    mock_update.get_bot.return_value.token = "123:secret"
+    uploaded = MagicMock()
+    uploaded.photo = [MagicMock(file_id="new")]
+    mock_update.message.reply_photo = AsyncMock(
+        side_effect=[BadRequest("Wrong file identifier"), uploaded]
+    )
+    cache = FileIdCache(str(tmp_path / "file_ids.db"))
+    await cache.set("123", get_content_hash(b"image_data"), "stale")
+
+    with patch("builtins.open", mock_open(read_data=b"image_data")), patch.object(
+        cache, "forget", AsyncMock(side_effect=sqlite3.OperationalError("locked"))
+    ):
+        await send_plot_to_telegram("a.png", mock_update, cache)
+
+    photos = [
+        call.kwargs["photo"] for call in mock_update.message.reply_photo.mock_calls
+    ]
+    assert photos == ["stale", b"image_data"]
+    assert await cache.get("123", get_content_hash(b"image_data")) == "new"
 
 
 @pytest.mark.asyncio
@@ -113,34 +195,37 @@ async def test_send_telegram_message_without_update():
     handler = TelegramMessagesHandler()
     mock_bot = AsyncMock()
 
-    # This is the correct way to patch the Bot constructor
-    with patch(
-        "src.handlers.send_telegram_message.Bot", return_value=mock_bot
-    ) as mock_bot_class:
-        # Setup chat IDs
-        handler.telegram_important_chat_id = ["id1", "id2"]
-        handler.telegram_not_important_chat_id = ["id3"]
+    # Inject the bot through the pool
+    mock_bot_factory = MagicMock(return_value=mock_bot)
+    handler.bot_pool = TelegramBotPool(bot_factory=mock_bot_factory)
+
+    # Setup chat IDs
+    handler.telegram_important_chat_id = ["id1", "id2"]
+    handler.telegram_not_important_chat_id = ["id3"]
+
+    # Call the function for non-important message
+    test_message = "Test message without update"
+    await handler.send_telegram_message(test_message, "test_bot_token", False)
 
-        # Call the function for non-important message
-        test_message = "Test message without update"
-        await handler.send_telegram_message(test_message, "test_bot_token", False)
+    # Verify the bot was created and initialized with the token
+    mock_bot_factory.assert_called_once_with("test_bot_token")
+    mock_bot.initialize.assert_awaited_once()
 
-        # Verify Bot was initialized with the token
-        mock_bot_class.assert_called_once_with(token="test_bot_token")
+    # Verify messages were sent to all chats
+    assert mock_bot.send_message.call_count == 3
 
-        # Verify messages were sent to all chats
-        assert mock_bot.send_message.call_count == 3
+    # Reset mocks for the next test
+    mock_bot.send_message.reset_mock()
 
-        # Reset mocks for the next test
-        mock_bot.reset_mock()
-        mock_bot_class.reset_mock()
+    # Test important message
+    await handler.send_telegram_message(test_message, "test_bot_token", True)
 
-        # Test important message
-        await handler.send_telegram_message(test_message, "test_bot_token", True)
-        mock_bot_class.assert_called_once_with(token="test_bot_token")
+    # The bot of the token is reused
+    mock_bot_factory.assert_called_once_with("test_bot_token")
+    mock_bot.initialize.assert_awaited_once()
 
-        # Only important chats should receive it
-        assert mock_bot.send_message.call_count == 2
+    # Only important chats should receive it
+    assert mock_bot.send_message.call_count == 2
 
 
 @pytest.mark.asyncio
@@ -156,7 +241,8 @@ async def test_send_eth_gas_fee():
     gas_values = (10, 20, 30)  # (safe, propose, fast)
 
     with patch(
-        "src.handlers.send_telegram_message.get_eth_gas_fee", return_value=gas_values
+        "src.handlers.send_telegram_message.get_eth_gas_fee",
+        AsyncMock(return_value=gas_values),
     ):
         # Call the function
         await handler.send_eth_gas_fee("test_token")
@@ -215,3 +301,27 @@ async def test_send_market_update():
 
     # Verify send_telegram_message was still called
     handler.send_telegram_message.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_send_telegram_message_reports_failed_chats():
+    """
+    Test that a failing chat does not stop the delivery to the other chats.
+    """
+    handler = TelegramMessagesHandler()
+    handler.telegram_important_chat_id = ["id1", "id2"]
+    handler.telegram_not_important_chat_id = ["id3"]
+
+    async def send_message(chat_id, **_):
+        if chat_id == "id3":
+            raise ValueError("Chat unavailable")
+
+    mock_bot = AsyncMock()
+    mock_bot.send_message.side_effect = send_message
+
+    handler.bot_pool = TelegramBotPool(bot_factory=lambda _: mock_bot)
+
+    results = await handler.send_telegram_message("Test", "failing_bot_token")
+
+    assert [result.delivered for result in results] == [False, True, True]
+    assert mock_bot.send_message.call_count == 3
@@ -0,0 +1,86 @@
+"""
+Test suite for the Telegram bot pool in the src.handlers module.
+This suite tests the lazy creation, the reuse and the shutdown of the bots.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.handlers.telegram_bot_pool import TelegramBotPool
+
+
+def get_pool():
+    """Returns a pool creating a new mocked bot per call of its factory."""
+    return TelegramBotPool(bot_factory=MagicMock(side_effect=lambda _: AsyncMock()))
+
+
+@pytest.mark.asyncio
+async def test_one_initialized_bot_per_token():
+    """
+    Test that a token gets one bot, initialized once, even for concurrent sends.
+    """
+    pool = get_pool()
+
+    bots = await asyncio.gather(*(pool.get_bot("token_a") for _ in range(5)))
+    other = await pool.get_bot("token_b")
+
+    assert all(bot is bots[0] for bot in bots)
+    assert other is not bots[0]
+    assert pool.bot_factory.call_count == 2
+    bots[0].initialize.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_initialization_is_retried():
+    """
+    Test that a bot that failed to initialize is created again on the next use.
+    """
+    bot = AsyncMock()
+    bot.initialize.side_effect = [OSError("offline"), None]
+    pool = TelegramBotPool(bot_factory=MagicMock(return_value=bot))
+
+    await pool.get_bot("token")
+    await pool.get_bot("token")
+
+    assert pool.bot_factory.call_count == 2
+    assert "token" in pool.bots
+
+
+@pytest.mark.asyncio
+async def test_close_shuts_the_bots_down():
+    """
+    Test that closing the pool shuts every bot down and forgets it.
+    """
+    pool = get_pool()
+    bot = await pool.get_bot("token")
+
+    await pool.close()
+
+    bot.shutdown.assert_awaited_once()
+    assert await pool.get_bot("token") is not bot
+
+
+def test_bots_are_recreated_in_a_new_event_loop():
+    """
+    Test that the bots of a closed event loop are not reused.
+    """
+    pool = get_pool()
+
+    first = asyncio.run(pool.get_bot("token"))
+    second = asyncio.run(pool.get_bot("token"))
+
+    assert first is not second
+
+
+def test_create_bot_uses_the_configured_api_url():
+    """
+    Test that the default factory points the bot at the configured Bot API.
+    """
+    pool = TelegramBotPool()
+    pool.api_url = "http://localhost:8081/"
+
+    bot = pool.create_bot("123:abc")
+
+    assert bot.base_url == "http://localhost:8081/bot123:abc"
@@ -0,0 +1,200 @@
+"""
+Test suite for the Telegram broadcast in the src.handlers module.
+This suite tests the rate limiters, the retries and the concurrent delivery.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter, TimedOut
+
+from src.handlers.telegram_broadcast import (
+    RateLimiter,
+    TelegramBroadcaster,
+    broadcast_limits,
+    broadcasters,
+    get_broadcaster,
+    reload_broadcasters,
+)
+
+
+@pytest.fixture
+def broadcaster():
+    """Returns a broadcaster of a mocked bot without rate limits or retry delays."""
+    variables = {
+        "TELEGRAM_MESSAGES_PER_SECOND": 1000,
+        "TELEGRAM_CHAT_INTERVAL": 0.001,
+        "TELEGRAM_GROUP_INTERVAL": 0.001,
+        "TELEGRAM_SEND_ATTEMPTS": 3,
+        "TELEGRAM_RETRY_DELAY": 0.01,
+    }
+    broadcast_limits.clear()
+    broadcasters.clear()
+
+    with patch("src.handlers.telegram_broadcast.load_json", return_value=variables):
+        yield TelegramBroadcaster(AsyncMock(), "test_token")
+
+    broadcast_limits.clear()
+    broadcasters.clear()
+
+
+def test_rate_limiter_spaces_calls_after_the_burst():
+    """
+    Test that the limiter allows a burst, then one call per interval.
+    """
+    limiter = RateLimiter(1.0, burst=2)
+
+    delays = [limiter.reserve() for _ in range(4)]
+
+    assert delays[0] == 0
+    assert delays[1] == 0
+    assert delays[2] == pytest.approx(1.0, abs=0.05)
+    assert delays[3] == pytest.approx(2.0, abs=0.05)
+
+
+def test_rate_limiter_pause():
+    """
+    Test that a pause delays the next call.
+    """
+    limiter = RateLimiter(0.1)
+
+    limiter.pause(5)
+
+    assert limiter.reserve() == pytest.approx(5.0, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_is_concurrent(broadcaster):
+    """
+    Test that slow chats are sent to concurrently.
+    """
+
+    async def slow_send(**_):
+        await asyncio.sleep(0.2)
+
+    broadcaster.bot.send_message.side_effect = slow_send
+
+    start = time.monotonic()
+    results = await broadcaster.broadcast(range(10), "Hello", parse_mode="HTML")
+
+    assert time.monotonic() - start < 1
+    assert all(result.delivered for result in results)
+    assert [result.chat_id for result in results] == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_failing_chat_does_not_stop_the_others(broadcaster):
+    """
+    Test that a chat that blocked the bot fails alone and is not retried.
+    """
+
+    async def send(chat_id, **_):
+        if chat_id == 2:
+            raise Forbidden("bot was blocked by the user")
+
+    broadcaster.bot.send_message.side_effect = send
+
+    results = await broadcaster.broadcast([1, 2, 3], "Hello")
+
+    assert [result.delivered for result in results] == [True, False, True]
+    assert results[1].attempts == 1
+    assert "blocked" in results[1].error
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honored(broadcaster):
+    """
+    Test that a flood control error pauses the bot, then the chat is retried.
+    """
+    broadcaster.bot.send_message.side_effect = [RetryAfter(0), None]
+    pauses = []
+    broadcaster.limits.global_limiter.pause = pauses.append
+
+    results = await broadcaster.broadcast([1], "Hello")
+
+    assert results[0].delivered
+    assert results[0].attempts == 2
+    assert pauses == [0.0]
+
+
+@pytest.mark.asyncio
+async def test_network_errors_are_retried_until_given_up(broadcaster):
+    """
+    Test that a chat timing out is retried up to the attempt limit.
+    """
+    broadcaster.bot.send_message.side_effect = TimedOut()
+
+    results = await broadcaster.broadcast([1], "Hello")
+
+    assert not results[0].delivered
+    assert results[0].attempts == 3
+    assert broadcaster.bot.send_message.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_bad_request_is_not_retried(broadcaster):
+    """
+    Test that a rejected message is not sent again.
+    """
+    broadcaster.bot.send_message.side_effect = BadRequest("Chat not found")
+
+    results = await broadcaster.broadcast([1], "Hello")
+
+    assert not results[0].delivered
+    assert broadcaster.bot.send_message.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_migrated_chat_is_sent_to_its_new_id(broadcaster):
+    """
+    Test that a chat upgraded to a supergroup gets the message at its new id.
+    """
+    broadcaster.bot.send_message.side_effect = [ChatMigrated(-100), None]
+
+    results = await broadcaster.broadcast([-1], "Hello")
+
+    assert results[0].delivered
+    assert results[0].chat_id == -100
+    assert broadcaster.bot.send_message.call_args.kwargs["chat_id"] == -100
+
+
+@pytest.mark.asyncio
+async def test_duplicate_chats_are_sent_once(broadcaster):
+    """
+    Test that a chat listed twice gets the message once.
+    """
+    results = await broadcaster.broadcast([1, 2, 1], "Hello")
+
+    assert len(results) == 2
+    assert broadcaster.bot.send_message.call_count == 2
+
+
+def test_get_broadcaster_is_reused_per_token():
+    """
+    Test that a bot gets one broadcaster, reloaded instead of rebuilt.
+    """
+    broadcasters.clear()
+
+    with patch(
+        "src.handlers.telegram_broadcast.load_json",
+        return_value={"TELEGRAM_SEND_ATTEMPTS": 3},
+    ) as load_json:
+        first = get_broadcaster(AsyncMock(), "test_token")
+        bot = AsyncMock()
+        assert get_broadcaster(bot, "test_token") is first
+        assert first.bot is bot
+        assert get_broadcaster(AsyncMock(), "other_token") is not first
+
+        calls = load_json.call_count
+        load_json.return_value = {"TELEGRAM_SEND_ATTEMPTS": 5}
+        reload_broadcasters()
+
+    assert load_json.call_count == calls + 2
+    assert first.max_attempts == 5
+
+    broadcast_limits.clear()
+    broadcasters.clear()
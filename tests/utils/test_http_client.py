@@ -0,0 +1,121 @@
+"""
+Test suite for the HttpClient class in the src.utils module.
+This suite tests the pooled client, its retries and its error handling.
+"""
+
+# pylint: disable=redefined-outer-name
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.utils.http_client import HttpClient
+
+
+@pytest.fixture
+def client():
+    """Fixture to create an HttpClient without retry delays."""
+    http_client = HttpClient()
+    http_client.backoff = 0
+    return http_client
+
+
+def use_transport(http_client, handler):
+    """Makes the client send its requests to the given handler."""
+    http_client.client = http_client.create_client(httpx.MockTransport(handler))
+    http_client.client_loop = asyncio.get_running_loop()
+
+
+@pytest.mark.asyncio
+async def test_get_json_success(client):
+    """
+    Test that the decoded JSON body is returned, with the params sent.
+    """
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"price": 42})
+
+    use_transport(client, handler)
+
+    result = await client.get_json(
+        "https://api.example.com/quote", headers={"X-Key": "key"}, params={"id": 1}
+    )
+
+    assert result == {"price": 42}
+    assert requests[0].url.params["id"] == "1"
+    assert requests[0].headers["X-Key"] == "key"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_request_retries_rate_limited_responses(client):
+    """
+    Test that a 429 response is retried and its Retry-After header honored.
+    """
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "0"}),
+        httpx.Response(200, json={"ok": True}),
+    ]
+    use_transport(client, lambda request: responses.pop(0))
+
+    assert await client.get_json("https://api.example.com") == {"ok": True}
+    assert not responses
+    assert client.get_retry_delay(0, httpx.Response(429, headers={"Retry-After": "3"}))
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_request_gives_up_after_the_retries(client):
+    """
+    Test that the last server error is returned once the retries are used up.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    use_transport(client, handler)
+    client.retries = 2
+
+    response = await client.request("GET", "https://api.example.com")
+
+    assert response.status_code == 503
+    assert len(calls) == 3
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_get_json_returns_none_on_error(client):
+    """
+    Test that transport errors and invalid bodies return None.
+    """
+
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(200, text="not json")
+
+    use_transport(client, handler)
+
+    assert await client.get_json("https://api.example.com/down") is None
+    assert await client.get_json("https://api.example.com/text") is None
+    await client.close()
+
+
+def test_client_is_recreated_per_event_loop(client):
+    """
+    Test that each event loop gets its own connection pool.
+    """
+
+    async def get_client():
+        return client.get_client()
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+
+    assert first is not second
+    assert client.client is second
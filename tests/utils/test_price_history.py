@@ -0,0 +1,93 @@
+"""
+Test the PriceHistory class in the src.utils.price_history module.
+"""
+
+import math
+
+import numpy as np
+
+from src.utils.price_history import PriceHistory
+from src.utils.quote_snapshot import QuoteSnapshot
+
+
+def make_snapshot(prices, timestamp):
+    """Builds a snapshot of the given {symbol: price} at a timestamp."""
+    values = [[price, 0, 0, 0, 0] for price in prices.values()]
+    return QuoteSnapshot(list(prices), values, timestamp)
+
+
+def test_record_keeps_a_fixed_window():
+    """
+    Test that the oldest samples are overwritten and duplicates skipped.
+    """
+    history = PriceHistory(capacity=3)
+
+    for minute in range(5):
+        history.record(make_snapshot({"BTC": 100 + minute}, minute * 60))
+
+    assert history.record(make_snapshot({"BTC": 999}, 240)) == 0
+
+    timestamps, prices = history.get_history("BTC")
+    np.testing.assert_array_equal(timestamps, [120, 180, 240])
+    np.testing.assert_array_equal(prices, [102, 103, 104])
+    assert history.timestamps.shape == (1, 3)
+
+
+def test_change_over_window():
+    """
+    Test the change over a window for several symbols at once.
+    """
+    history = PriceHistory(capacity=10)
+    history.record(make_snapshot({"BTC": 100, "ETH": 50}, 0))
+    history.record(make_snapshot({"BTC": 105, "ETH": 45}, 600))
+    history.record(make_snapshot({"BTC": 110, "ETH": 40, "SOL": 10}, 900))
+
+    changes = dict(zip(history.symbols, history.change_over(900)))
+
+    assert math.isclose(changes["BTC"], 10.0)
+    assert math.isclose(changes["ETH"], -20.0)
+    # SOL has no sample old enough
+    assert math.isnan(changes["SOL"])
+
+    # From the last sample before the window start
+    assert math.isclose(history.change_over(300)[0], 110 / 105 * 100 - 100)
+
+
+def test_change_over_with_a_gap():
+    """
+    Test that a reference sample far older than the window start gives NaN.
+    """
+    history = PriceHistory(capacity=10)
+    history.record(make_snapshot({"BTC": 100, "ETH": 50}, 0))
+    # The feed stopped for a day, ETH came back first
+    history.record(make_snapshot({"ETH": 55}, 86400 - 1200))
+    history.record(make_snapshot({"BTC": 120, "ETH": 60}, 86400))
+
+    changes = dict(zip(history.symbols, history.change_over(900)))
+
+    # The only BTC sample before the window is a day old
+    assert math.isnan(changes["BTC"])
+    assert math.isclose(changes["ETH"], 60 / 55 * 100 - 100)
+
+    # Up to the gap allowed, as a fraction of the window
+    assert math.isclose(history.change_over(900, max_gap=100)[0], 20.0)
+
+
+def test_volatility_and_drawdown():
+    """
+    Test the rolling volatility and the drawdown from the running peak.
+    """
+    history = PriceHistory(capacity=10)
+    for minute, price in enumerate([100, 120, 90, 110, 99]):
+        history.record(make_snapshot({"BTC": price, "ETH": 10}, minute * 60))
+
+    returns = np.diff(np.log([100, 120, 90, 110, 99]))
+
+    assert math.isclose(history.volatility(3600)[0], np.std(returns, ddof=1) * 100)
+    assert math.isclose(history.volatility(3600)[1], 0.0)
+    assert math.isclose(history.drawdown(3600)[0], -25.0)
+    assert math.isclose(history.drawdown(3600)[1], 0.0)
+
+    # Only the last two samples are in a one minute window
+    assert math.isclose(history.drawdown(60)[0], -10.0)
+    assert math.isnan(history.volatility(60)[0])
@@ -0,0 +1,71 @@
+"""
+Test the QuoteSnapshot class in the src.utils.quote_snapshot module.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.utils.quote_snapshot import QUOTE_FIELDS, QuoteSnapshot
+
+
+def make_coin(symbol, price, change_1h=1.0):
+    """Builds the coin data of a CoinMarketCap listings response."""
+    return {
+        "symbol": symbol,
+        "quote": {
+            "USD": {
+                "price": price,
+                "percent_change_1h": change_1h,
+                "percent_change_24h": 2.0,
+                "percent_change_7d": 3.0,
+                "percent_change_30d": None,
+            }
+        },
+    }
+
+
+def test_from_listings_reads_like_a_dict():
+    """
+    Test that the snapshot reads like the former nested dict.
+    """
+    snapshot = QuoteSnapshot.from_listings(
+        [make_coin("BTC", 50000), make_coin("ETH", 3000), make_coin("BTC", 1)]
+    )
+
+    assert len(snapshot) == 2
+    assert list(snapshot) == ["BTC", "ETH"]
+    assert "ETH" in snapshot and "DOGE" not in snapshot
+    assert snapshot["BTC"]["price"] == 50000
+    assert snapshot.get("DOGE") is None
+    assert math.isnan(snapshot["ETH"]["change_30d"])
+    assert set(snapshot["ETH"]) == set(QUOTE_FIELDS)
+
+
+def test_columns_and_subset():
+    """
+    Test the column views and the subset of the tracked symbols.
+    """
+    snapshot = QuoteSnapshot.from_listings(
+        [make_coin("BTC", 50000, 1.5), make_coin("ETH", 3000, -4.0)]
+    )
+
+    np.testing.assert_array_equal(snapshot.column("change_1h"), [1.5, -4.0])
+
+    subset = snapshot.subset(["ETH", "XRP"])
+    assert list(subset) == ["ETH"]
+    assert subset["ETH"]["price"] == 3000
+    assert subset.timestamp == snapshot.timestamp
+
+
+def test_snapshot_is_read_only():
+    """
+    Test that a published snapshot can not be changed in place.
+    """
+    snapshot = QuoteSnapshot.from_listings([make_coin("BTC", 50000)])
+
+    with pytest.raises(ValueError):
+        snapshot.values[0, 0] = 1
+
+    assert not QuoteSnapshot.empty()
@@ -0,0 +1,110 @@
+"""
+Test suite for the Telegram stand-in in the src.utils module.
+This suite drives real bots through the stand-in: sends, flood control and updates.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from telegram.error import RetryAfter
+
+from src.handlers.telegram_bot_pool import TelegramBotPool
+from src.handlers.telegram_broadcast import TelegramBroadcaster, broadcast_limits
+from src.utils.telegram_stand_in import TelegramStandIn
+
+
+async def get_stand_in_bot(stand_in):
+    """Returns a pool and its bot sending to the stand-in."""
+    bot_pool = TelegramBotPool()
+    bot_pool.api_url = stand_in.url
+    return bot_pool, await bot_pool.get_bot("123:secret")
+
+
+@pytest.mark.asyncio
+async def test_send_message_is_answered_and_recorded():
+    """
+    Test that a bot sends through the stand-in and the request is recorded.
+    """
+    async with TelegramStandIn(latency=0.01) as stand_in:
+        bot_pool, bot = await get_stand_in_bot(stand_in)
+
+        message = await bot.send_message(
+            chat_id="42", text="<b>Hi</b>", parse_mode="HTML"
+        )
+        await bot_pool.close()
+
+    assert message.chat.id == 42
+    records = stand_in.get_records("sendMessage")
+    assert [record.parameters["text"] for record in records] == ["<b>Hi</b>"]
+    assert records[0].answered_at - records[0].received_at >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_injected_flood_raises_retry_after():
+    """
+    Test that an injected flood is a RetryAfter for the bot, then sends succeed.
+    """
+    async with TelegramStandIn(retry_after=3) as stand_in:
+        bot_pool, bot = await get_stand_in_bot(stand_in)
+        stand_in.inject_flood()
+
+        with pytest.raises(RetryAfter):
+            await bot.send_message(chat_id="42", text="flooded")
+        await bot.send_message(chat_id="42", text="sent")
+        await bot_pool.close()
+
+    assert len(stand_in.get_records("sendMessage", status=429)) == 1
+    assert len(stand_in.get_records("sendMessage")) == 1
+
+
+@pytest.mark.asyncio
+async def test_broadcast_retries_the_flooded_chats():
+    """
+    Test that a broadcast through the stand-in delivers every chat despite a flood.
+    """
+    variables = {"TELEGRAM_MESSAGES_PER_SECOND": 1000, "TELEGRAM_CHAT_INTERVAL": 0.001}
+    broadcast_limits.clear()
+
+    async with TelegramStandIn() as stand_in:
+        bot_pool, bot = await get_stand_in_bot(stand_in)
+        stand_in.inject_flood()
+
+        with patch("src.handlers.telegram_broadcast.load_json", return_value=variables):
+            results = await TelegramBroadcaster(bot).broadcast(
+                [str(chat_id) for chat_id in range(20)], "alert"
+            )
+        await bot_pool.close()
+
+    broadcast_limits.clear()
+
+    assert all(result.delivered for result in results)
+    assert len(stand_in.get_records("sendMessage")) == 20
+
+
+@pytest.mark.asyncio
+async def test_photo_upload_and_updates():
+    """
+    Test that an uploaded photo gets a file_id and the queued updates are polled.
+    """
+    async with TelegramStandIn() as stand_in:
+        bot_pool, bot = await get_stand_in_bot(stand_in)
+
+        uploaded = await bot.send_photo(chat_id="-5", photo=b"png" * 100)
+        await bot.send_photo(chat_id="-5", photo=uploaded.photo[-1].file_id)
+
+        stand_in.add_update(
+            {
+                "message": {
+                    "message_id": 1,
+                    "date": 0,
+                    "chat": {"id": 42, "type": "private"},
+                    "text": "/news",
+                }
+            }
+        )
+        updates = await bot.get_updates(timeout=1)
+        await bot_pool.close()
+
+    photos = stand_in.get_records("sendPhoto")
+    assert [record.uploaded_bytes for record in photos] == [300, 0]
+    assert [update.message.text for update in updates] == ["/news"]
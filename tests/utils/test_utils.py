@@ -4,25 +4,29 @@ Test utility functions in the src.utils.utils module.
 
 from unittest.mock import patch
 
+import pytest
+
 from src.utils.utils import (
     check_if_special_user,
     check_requests,
+    classify_sentiment,
     format_change,
 )
 
 
-def test_check_requests():
+@pytest.mark.asyncio
+async def test_check_requests():
     """
     Test the check_requests function to ensure it handles valid and invalid URLs correctly.
     """
     # Test with a valid URL
     valid_url = "https://jsonplaceholder.typicode.com/posts/1"
-    response = check_requests(valid_url)
+    response = await check_requests(valid_url)
     assert response is not None, "Expected a valid response for a valid URL"
 
     # Test with an invalid URL
     invalid_url = "https://invalid-url.example.com"
-    response = check_requests(invalid_url)
+    response = await check_requests(invalid_url)
     assert response is None, "Expected None for an invalid URL"
 
 
@@ -55,3 +59,15 @@ def test_check_if_special_user():
         assert (
             check_if_special_user(11111) is False
         ), "Expected False for non-special user ID"
+
+
+def test_classify_sentiment():
+    """
+    Test the classification of the article summaries.
+    """
+    assert classify_sentiment("Bullish news") == "Positive"
+    assert classify_sentiment("Bearish news") == "Negative"
+    assert classify_sentiment("Neutral news") == "Neutral"
+    assert classify_sentiment("bullish and bearish") == "Unknown"
+    assert classify_sentiment("") == "Unknown"
+    assert classify_sentiment(None) is None